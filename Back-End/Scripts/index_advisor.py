@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Script to check the cases indexes against the statistics query shapes
+
+Creates the declared indexes, runs explain() on every registered statistics
+query shape and reports the ones that fall back to a COLLSCAN, plus the indexes
+made redundant by a compound index with the same prefix. With --drop the
+redundant indexes are removed.
+
+Usage:
+    python3 Scripts/index_advisor.py [--drop]
+
+Arguments:
+    --drop: Drop the redundant indexes after the report
+"""
+
+import sys
+import os
+import asyncio
+import argparse
+
+# Add project root directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.database import get_database, close_mongo_connection
+from app.modules.cases.repositories.case_repository import CaseRepository
+from app.modules.cases.services.index_advisor import IndexAdvisor
+
+
+async def run_advisor(drop: bool) -> bool:
+    """Print the report. Returns True when no query shape does a COLLSCAN."""
+    db = await get_database()
+    try:
+        await CaseRepository(db).ensure_indexes()
+        advisor = IndexAdvisor(db)
+        report = await advisor.report()
+
+        print(f"{'='*60}")
+        for name, plan in report["plans"].items():
+            status = "COLLSCAN" if plan["collscan"] else "ok"
+            print(f"{name:<30} {status:<9} {', '.join(plan['indexes']) or '-'}")
+
+        print(f"\nRedundant indexes: {len(report['redundant'])}")
+        for name, covered_by in report["redundant"].items():
+            print(f"  {name} (covered by {covered_by})")
+
+        if drop and report["redundant"]:
+            dropped = await advisor.drop_redundant()
+            print(f"\n✅ Dropped {len(dropped)} redundant indexes")
+        print(f"{'='*60}")
+        return not report["collscans"]
+    finally:
+        await close_mongo_connection()
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Check cases indexes against the statistics query shapes")
+    parser.add_argument("--drop", action="store_true", help="Drop redundant indexes")
+    args = parser.parse_args()
+
+    ok = asyncio.run(run_advisor(args.drop))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Script to rebuild the case search tokens (cases.search_tokens)
+
+Recomputes the normalized search tokens of every case in batches and marks the
+token search as ready, so case listings stop using unanchored regex searches.
+New and updated cases keep their tokens in sync on every write.
+
+Usage:
+    python3 Scripts/rebuild_case_search.py
+"""
+
+import sys
+import os
+import asyncio
+from datetime import datetime
+
+# Add project root directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.database import get_database, close_mongo_connection
+from app.modules.cases.repositories.case_search_repository import CaseSearchRepository
+
+
+async def rebuild_case_search() -> int:
+    """Rebuild search tokens. Returns the number of cases updated."""
+    db = await get_database()
+    try:
+        print("Rebuilding case search tokens...")
+        started = datetime.now()
+        updated = await CaseSearchRepository(db).rebuild()
+        elapsed = (datetime.now() - started).total_seconds()
+
+        print(f"\n{'='*60}")
+        print(f"Cases updated: {updated}")
+        print(f"Elapsed: {elapsed:.1f}s")
+        print("\n✅ Rebuild completed")
+        print(f"{'='*60}")
+        return updated
+    finally:
+        await close_mongo_connection()
+
+
+def main():
+    """Main function"""
+    asyncio.run(rebuild_case_search())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Script to rebuild the daily case statistics rollup (case_stats_daily)
+
+Without a range it rebuilds the whole history of cases, removes stale rows and
+marks the rollup as ready so the statistics endpoints start reading from it.
+With --from/--to only the months covering that range are recomputed.
+
+Usage:
+    python3 Scripts/rebuild_case_stats_daily.py [--from YYYY-MM-DD] [--to YYYY-MM-DD]
+
+Arguments:
+    --from: First creation day to recompute (inclusive)
+    --to: Last creation day to recompute (exclusive)
+"""
+
+import sys
+import os
+import asyncio
+import argparse
+from datetime import datetime, timezone
+from typing import Optional
+
+# Add project root directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.database import get_database, close_mongo_connection
+from app.modules.cases.repositories.statistics.case_stats_daily_repository import CaseStatsDailyRepository
+
+
+def parse_day(value: Optional[str]) -> Optional[datetime]:
+    # Parse YYYY-MM-DD as UTC midnight
+    if not value:
+        return None
+    return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+
+
+async def rebuild_case_stats(start: Optional[datetime], end: Optional[datetime]) -> int:
+    """Rebuild the rollup. Returns the number of rows written."""
+    db = await get_database()
+    try:
+        repository = CaseStatsDailyRepository(db)
+        await repository.ensure_indexes()
+
+        if start is None and end is None:
+            print("Rebuilding full case statistics history...")
+        else:
+            start = start or datetime(1970, 1, 1, tzinfo=timezone.utc)
+            end = end or datetime.now(timezone.utc)
+            print(f"Rebuilding case statistics from {start.date()} to {end.date()}...")
+
+        started = datetime.now()
+        written = await repository.rebuild(start, end)
+        elapsed = (datetime.now() - started).total_seconds()
+
+        print(f"\n{'='*60}")
+        print(f"Rows written: {written}")
+        print(f"Elapsed: {elapsed:.1f}s")
+        print("\n✅ Rebuild completed")
+        print(f"{'='*60}")
+        return written
+    finally:
+        await close_mongo_connection()
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description="Rebuild the daily case statistics rollup",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python3 Scripts/rebuild_case_stats_daily.py                                   # Full rebuild
+  python3 Scripts/rebuild_case_stats_daily.py --from 2025-01-01 --to 2025-02-01  # Only January 2025
+        """
+    )
+
+    parser.add_argument("--from", dest="start", help="First creation day (YYYY-MM-DD, inclusive)")
+    parser.add_argument("--to", dest="end", help="Last creation day (YYYY-MM-DD, exclusive)")
+
+    args = parser.parse_args()
+
+    # Execute rebuild
+    asyncio.run(rebuild_case_stats(parse_day(args.start), parse_day(args.end)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Script to rebuild the case x test fact collection (case_tests)
+
+Recreates the whole collection from cases on the server, one row per requested
+test, and marks it as ready so the test statistics start reading from it.
+After that the collection is kept in sync on every case write.
+
+Usage:
+    python3 Scripts/rebuild_case_tests.py
+"""
+
+import sys
+import os
+import asyncio
+from datetime import datetime
+
+# Add project root directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.database import get_database, close_mongo_connection
+from app.modules.cases.repositories.statistics.case_tests_repository import CaseTestsRepository
+
+
+async def rebuild_case_tests() -> int:
+    """Rebuild case_tests. Returns the number of rows written."""
+    db = await get_database()
+    try:
+        print("Rebuilding case_tests from cases...")
+        started = datetime.now()
+        written = await CaseTestsRepository(db).rebuild()
+        elapsed = (datetime.now() - started).total_seconds()
+
+        print(f"\n{'='*60}")
+        print(f"Rows written: {written}")
+        print(f"Elapsed: {elapsed:.1f}s")
+        print("\n✅ Rebuild completed")
+        print(f"{'='*60}")
+        return written
+    finally:
+        await close_mongo_connection()
+
+
+def main():
+    """Main function"""
+    asyncio.run(rebuild_case_tests())
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,10 @@ from .database import (
     connect_to_mongo,
     close_mongo_connection,
     get_database,
-    get_database_sync
+    get_database_sync,
+    check_database_health,
+    start_health_monitor,
+    stop_health_monitor
 )
 from .security import (
     create_access_token,
@@ -22,6 +25,9 @@ __all__ = [
     "close_mongo_connection",
     "get_database",
     "get_database_sync",
+    "check_database_health",
+    "start_health_monitor",
+    "stop_health_monitor",
     "create_access_token",
     "verify_password",
     "get_password_hash",
@@ -1,7 +1,9 @@
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from app.config.settings import settings
 from typing import Optional
+import asyncio
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +22,10 @@ class DatabaseManager:
             "retryWrites": True,
             "retryReads": True
         }
+        # Estado según el último ping del monitor de salud (no se hace ping por request)
+        self.healthy: bool = False
+        self.last_ping_at: Optional[float] = None
+        self._monitor_task: Optional[asyncio.Task] = None
 
 database_manager = DatabaseManager()
 
@@ -33,6 +39,8 @@ async def connect_to_mongo():
             database_manager.database = database_manager.client[settings.DATABASE_NAME]
             
             await database_manager.client.admin.command('ping')
+            database_manager.healthy = True
+            database_manager.last_ping_at = time.monotonic()
             logger.info(f"Conectado a MongoDB: {settings.DATABASE_NAME}")
             
         return database_manager.database
@@ -40,28 +48,74 @@ async def connect_to_mongo():
         logger.error(f"Error al conectar con MongoDB: {str(e)}")
         database_manager.client = None
         database_manager.database = None
+        database_manager.healthy = False
         raise
 
 async def close_mongo_connection():
+    await stop_health_monitor()
     if database_manager.client:
         database_manager.client.close()
         database_manager.client = None
         database_manager.database = None
+        database_manager.healthy = False
         logger.info("Conexión a MongoDB cerrada")
 
+async def check_database_health() -> bool:
+    """
+    Ping a MongoDB y actualizar el estado de salud. Si el ping falla se conserva el
+    cliente (el driver reconecta solo y los servicios en segundo plano guardan su
+    handle); si no hay cliente, porque la conexión inicial falló, se reintenta.
+    """
+    if database_manager.client is None:
+        try:
+            await connect_to_mongo()
+        except Exception:
+            return False
+        return database_manager.healthy
+    try:
+        await database_manager.client.admin.command('ping')
+    except Exception as e:
+        if database_manager.healthy:
+            logger.warning(f"MongoDB no responde: {str(e)}")
+        database_manager.healthy = False
+        return False
+    if not database_manager.healthy:
+        logger.info("Conexión a MongoDB restablecida")
+    database_manager.healthy = True
+    database_manager.last_ping_at = time.monotonic()
+    return True
+
+async def _health_monitor_loop(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        await check_database_health()
+
+def start_health_monitor():
+    """Iniciar el monitor de salud de la conexión (una tarea por proceso)."""
+    task = database_manager._monitor_task
+    if task is not None and not task.done():
+        return
+    interval = max(1.0, settings.MONGODB_HEALTH_CHECK_SECONDS)
+    database_manager._monitor_task = asyncio.get_running_loop().create_task(_health_monitor_loop(interval))
+
+async def stop_health_monitor():
+    task = database_manager._monitor_task
+    database_manager._monitor_task = None
+    if task is None or task.done():
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
 async def get_database() -> AsyncIOMotorDatabase:
+    # Sin ping por request: el handle se devuelve tal cual y el monitor de salud vigila la conexión
     if database_manager.database is None:
         await connect_to_mongo()
     
     if database_manager.database is None:
         raise Exception("No se pudo establecer conexión con la base de datos")
-    
-    try:
-        await database_manager.client.admin.command('ping')
-    except Exception:
-        database_manager.client = None
-        database_manager.database = None
-        await connect_to_mongo()
         
     return database_manager.database
 
@@ -36,6 +36,8 @@ class Settings(BaseSettings):
     # MongoDB Configuration
     MONGODB_URL: str = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
     DATABASE_NAME: str = os.getenv("DATABASE_NAME", "lime_pathsys")
+    # Intervalo (s) del ping de salud en segundo plano (las requests no hacen ping)
+    MONGODB_HEALTH_CHECK_SECONDS: float = float(os.getenv("MONGODB_HEALTH_CHECK_SECONDS", "15"))
     
     @field_validator("MONGODB_URL")
     @classmethod
@@ -73,7 +75,74 @@ class Settings(BaseSettings):
     # File Storage
     UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "uploads")
     MAX_FILE_SIZE: int = int(os.getenv("MAX_FILE_SIZE", "10485760"))  # 10MB
-    
+
+    # Pool de navegadores para PDFs (N navegadores x M contextos)
+    PDF_POOL_BROWSERS: int = int(os.getenv("PDF_POOL_BROWSERS", "1"))
+    PDF_POOL_CONTEXTS_PER_BROWSER: int = int(os.getenv("PDF_POOL_CONTEXTS_PER_BROWSER", "4"))
+    PDF_POOL_CHECKOUT_TIMEOUT: float = float(os.getenv("PDF_POOL_CHECKOUT_TIMEOUT", "30"))  # segundos en cola
+    PDF_POOL_SLOT_TIMEOUT: float = float(os.getenv("PDF_POOL_SLOT_TIMEOUT", "30"))  # segundos por operación de página
+    PDF_POOL_MAX_RENDERS_PER_BROWSER: int = int(os.getenv("PDF_POOL_MAX_RENDERS_PER_BROWSER", "500"))
+    PDF_POOL_MAX_BROWSER_RSS_MB: int = int(os.getenv("PDF_POOL_MAX_BROWSER_RSS_MB", "1024"))
+
+    # Caché de PDFs renderizados (memoria LRU + disco bajo PDF_CACHE_DIR)
+    PDF_CACHE_ENABLED: bool = os.getenv("PDF_CACHE_ENABLED", "True").lower() == "true"
+    PDF_CACHE_DIR: str = os.getenv("PDF_CACHE_DIR", "storage/pdf_cache")  # fuera de uploads: no se sirve como estático
+    PDF_CACHE_MEMORY_MB: int = int(os.getenv("PDF_CACHE_MEMORY_MB", "64"))
+
+    # Directorio donde precompilar las plantillas de informes al iniciar (vacío = no precompilar)
+    PDF_TEMPLATES_COMPILED_DIR: str = os.getenv("PDF_TEMPLATES_COMPILED_DIR", "")
+
+    # Caché de firmas de patólogos usada por los informes (por proceso)
+    SIGNATURE_CACHE_TTL_SECONDS: float = float(os.getenv("SIGNATURE_CACHE_TTL_SECONDS", "300"))
+    SIGNATURE_CACHE_NEGATIVE_TTL_SECONDS: float = float(os.getenv("SIGNATURE_CACHE_NEGATIVE_TTL_SECONDS", "30"))
+    SIGNATURE_CACHE_MAX_ENTRIES: int = int(os.getenv("SIGNATURE_CACHE_MAX_ENTRIES", "256"))
+    SIGNATURE_CACHE_MAX_MB: int = int(os.getenv("SIGNATURE_CACHE_MAX_MB", "32"))
+
+    # PDFs por lote en streaming (ZIP por caso) y archivo temporal del PDF combinado
+    PDF_BATCH_STREAM_MAX_CASES: int = int(os.getenv("PDF_BATCH_STREAM_MAX_CASES", "500"))
+    PDF_BATCH_SPOOL_MEMORY_MB: int = int(os.getenv("PDF_BATCH_SPOOL_MEMORY_MB", "16"))  # luego pasa a disco
+
+    # Trabajos de PDFs en segundo plano (colección pdf_jobs)
+    PDF_JOBS_ENABLED: bool = os.getenv("PDF_JOBS_ENABLED", "True").lower() == "true"
+    PDF_JOBS_DIR: str = os.getenv("PDF_JOBS_DIR", "storage/pdf_jobs")  # fuera de uploads: no se sirve como estático
+    PDF_JOBS_WORKERS: int = int(os.getenv("PDF_JOBS_WORKERS", "2"))
+    PDF_JOBS_MAX_CASES: int = int(os.getenv("PDF_JOBS_MAX_CASES", "5000"))
+    PDF_JOBS_RETENTION_HOURS: int = int(os.getenv("PDF_JOBS_RETENTION_HOURS", "24"))
+    PDF_JOBS_POLL_INTERVAL: float = float(os.getenv("PDF_JOBS_POLL_INTERVAL", "5"))  # segundos
+    PDF_JOBS_STALE_SECONDS: float = float(os.getenv("PDF_JOBS_STALE_SECONDS", "300"))  # latido vencido => se retoma
+    PDF_JOBS_SWEEP_INTERVAL: float = float(os.getenv("PDF_JOBS_SWEEP_INTERVAL", "600"))
+    # Encolar el render del informe al firmar (queda en la caché para la entrega)
+    PDF_PRERENDER_ON_SIGN: bool = os.getenv("PDF_PRERENDER_ON_SIGN", "False").lower() == "true"
+
+    # Rollup diario de estadísticas (colección case_stats_daily)
+    STATISTICS_ROLLUP_ENABLED: bool = os.getenv("STATISTICS_ROLLUP_ENABLED", "True").lower() == "true"
+    # Reintentos (con espera exponencial) del recálculo incremental; agotados => lecturas vuelven a `cases`
+    STATISTICS_REFRESH_RETRIES: int = int(os.getenv("STATISTICS_REFRESH_RETRIES", "5"))
+    STATISTICS_REFRESH_RETRY_SECONDS: float = float(os.getenv("STATISTICS_REFRESH_RETRY_SECONDS", "2"))
+
+    # Caché de resultados de estadísticas (por proceso; se invalida al escribir casos)
+    STATISTICS_CACHE_ENABLED: bool = os.getenv("STATISTICS_CACHE_ENABLED", "True").lower() == "true"
+    STATISTICS_CACHE_TTL_SECONDS: float = float(os.getenv("STATISTICS_CACHE_TTL_SECONDS", "30"))
+    # TTL por endpoint, p. ej. "dashboard.overview=15,opportunity.yearly=300"
+    STATISTICS_CACHE_TTLS: str = os.getenv("STATISTICS_CACHE_TTLS", "")
+    STATISTICS_CACHE_MAX_ENTRIES: int = int(os.getenv("STATISTICS_CACHE_MAX_ENTRIES", "512"))
+    # Filtrar estadísticas por id de entidad/patólogo resuelto desde el nombre (en lugar de regex)
+    STATISTICS_CANONICAL_FILTERS: bool = os.getenv("STATISTICS_CANONICAL_FILTERS", "True").lower() == "true"
+    STATISTICS_NAME_LOOKUP_TTL_SECONDS: float = float(os.getenv("STATISTICS_NAME_LOOKUP_TTL_SECONDS", "300"))
+    # Tabla de hechos caso x prueba (colección case_tests) para las estadísticas por prueba
+    STATISTICS_CASE_TESTS_ENABLED: bool = os.getenv("STATISTICS_CASE_TESTS_ENABLED", "True").lower() == "true"
+    # Periodo máximo (días) de los reportes exportables de estadísticas
+    STATISTICS_EXPORT_MAX_DAYS: int = int(os.getenv("STATISTICS_EXPORT_MAX_DAYS", "400"))
+    # Registrar al arrancar las consultas de estadísticas sin índice y los índices redundantes
+    INDEX_ADVISOR_ON_STARTUP: bool = os.getenv("INDEX_ADVISOR_ON_STARTUP", "False").lower() == "true"
+
+    # Panel de casos urgentes materializado (colección urgent_cases) y su intervalo de refresco
+    URGENT_CASES_MATERIALIZED: bool = os.getenv("URGENT_CASES_MATERIALIZED", "True").lower() == "true"
+    URGENT_CASES_REFRESH_SECONDS: float = float(os.getenv("URGENT_CASES_REFRESH_SECONDS", "60"))
+
+    # Búsqueda de casos por tokens normalizados (search_tokens) en lugar de regex sin anclar
+    CASE_SEARCH_TOKENS_ENABLED: bool = os.getenv("CASE_SEARCH_TOKENS_ENABLED", "True").lower() == "true"
+
     # Email Configuration (for future use)
     SMTP_HOST: str = os.getenv("SMTP_HOST", "")
     SMTP_PORT: int = int(os.getenv("SMTP_PORT", "587"))
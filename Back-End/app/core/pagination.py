@@ -0,0 +1,73 @@
+"""
+Paginación por cursor (keyset).
+
+En lugar de `skip`, la página siguiente se pide con un cursor opaco que guarda el
+valor del campo de orden y el desempate (normalmente `_id`) del último elemento
+entregado; la consulta continúa desde ahí con un rango sobre el índice, sin
+recorrer ni descartar los documentos anteriores.
+"""
+from __future__ import annotations
+
+from enum import Enum
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+import base64
+
+from bson import json_util
+
+from app.core.exceptions import BadRequestError
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(value: Any, tiebreak: Any) -> str:
+    if isinstance(value, Enum):
+        value = value.value
+    raw = json_util.dumps([value, tiebreak], json_options=json_util.CANONICAL_JSON_OPTIONS)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, tiebreak = json_util.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except Exception:
+        raise BadRequestError("Cursor de paginación inválido")
+    return value, tiebreak
+
+
+def keyset_filter(cursor: str, field: str, direction: int = -1, tiebreak_field: str = "_id") -> Dict[str, Any]:
+    """Condición para los documentos posteriores al cursor en el orden (field, tiebreak_field) `direction`."""
+    value, tiebreak = decode_cursor(cursor)
+    after = "$lt" if direction < 0 else "$gt"
+    same_value = {field: value, tiebreak_field: {after: tiebreak}}
+    if value is None:
+        # Los nulos ordenan primero: en descendente solo quedan nulos; en ascendente, nulos y todo lo demás
+        if direction < 0:
+            return same_value
+        return {"$or": [same_value, {field: {"$ne": None}}]}
+    beyond: Dict[str, Any] = {field: {after: value}}
+    if direction < 0:
+        # En descendente también siguen los documentos sin el campo
+        return {"$or": [beyond, same_value, {field: None}]}
+    return {"$or": [beyond, same_value]}
+
+
+def apply_keyset(
+    filters: Dict[str, Any],
+    cursor: Optional[str],
+    field: str,
+    direction: int = -1,
+    tiebreak_field: str = "_id",
+) -> Dict[str, Any]:
+    """`filters` restringido a lo que sigue al cursor (sin cursor, `filters` tal cual)."""
+    if not cursor:
+        return filters
+    keyset = keyset_filter(cursor, field, direction, tiebreak_field)
+    return {"$and": [filters, keyset]} if filters else keyset
+
+
+def next_cursor(items: Sequence[Any], limit: int, key: Callable[[Any], Tuple[Any, Any]]) -> Optional[str]:
+    """Cursor de la página siguiente, o None si la página no llegó a `limit` (no hay más)."""
+    if not items or len(items) < limit:
+        return None
+    return encode_cursor(*key(items[-1]))
@@ -0,0 +1,88 @@
+"""
+Serialización de confianza para datos leídos de nuestra propia base de datos.
+
+Los documentos que ya normalizan los servicios (p. ej. `CaseService._to_response`)
+no necesitan pasar otra vez por la validación de Pydantic: `construct_trusted`
+arma el modelo y sus submodelos con `model_construct`, y `json_response` los
+serializa directamente a JSON con el serializador de Pydantic, sin la segunda
+validación contra `response_model` que FastAPI hace al devolver un modelo.
+Como `model_construct` no coerciona, los escalares que en datos antiguos se
+guardaron con otro tipo (números como string o float, ids como ObjectId) se
+normalizan antes con `loose_int` / `loose_str`. No usar con datos de entrada del
+cliente.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+from types import UnionType
+from typing import Any, Dict, Optional, Tuple, Type, TypeVar, Union, get_args, get_origin
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+M = TypeVar("M", bound=BaseModel)
+
+
+def _nested_model(annotation: Any) -> Tuple[Optional[Type[BaseModel]], bool]:
+    # (submodelo, es_lista) de una anotación tipo Model / Optional[Model] / List[Model]
+    origin = get_origin(annotation)
+    if origin in (Union, UnionType):
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        return _nested_model(args[0]) if len(args) == 1 else (None, False)
+    if origin is list:
+        args = get_args(annotation)
+        model, _ = _nested_model(args[0]) if args else (None, False)
+        return model, model is not None
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, False
+    return None, False
+
+
+@lru_cache(maxsize=None)
+def _plan(model: Type[BaseModel]) -> Dict[str, Tuple[Optional[Type[BaseModel]], bool]]:
+    return {name: _nested_model(field.annotation) for name, field in model.model_fields.items()}
+
+
+def _construct_value(nested: Optional[Type[BaseModel]], is_list: bool, value: Any) -> Any:
+    if nested is None or value is None:
+        return value
+    if is_list:
+        return [construct_trusted(nested, item) if isinstance(item, dict) else item for item in value]
+    return construct_trusted(nested, value) if isinstance(value, dict) else value
+
+
+def construct_trusted(model: Type[M], data: Dict[str, Any]) -> M:
+    """Instancia `model` (y sus submodelos) desde un dict confiable, sin validar."""
+    values = {
+        name: _construct_value(nested, is_list, data[name])
+        for name, (nested, is_list) in _plan(model).items()
+        if name in data
+    }
+    return model.model_construct(**values)
+
+
+def loose_int(value: Any) -> Any:
+    """Entero desde "2" o 3.0 (lo que la validación laxa aceptaría); otro valor se devuelve igual."""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and value.strip().lstrip("-").isdigit():
+        return int(value)
+    return value
+
+
+def loose_str(value: Any) -> Any:
+    """String desde ids o números guardados con otro tipo (ObjectId, int); None se conserva."""
+    if value is None or isinstance(value, str):
+        return value
+    return str(value)
+
+
+def json_response(adapter: TypeAdapter, content: Any, status_code: int = 200, **dump_options: Any) -> Response:
+    """Respuesta JSON serializada por `adapter` (sin validar contra response_model)."""
+    return Response(
+        content=adapter.dump_json(content, **dump_options),
+        status_code=status_code,
+        media_type="application/json",
+    )
@@ -0,0 +1,59 @@
+"""
+Coalescencia de cargas concurrentes (single-flight).
+
+Las peticiones que piden la misma llave mientras otra ya la está cargando esperan
+ese mismo resultado en lugar de repetir la consulta. Si la carga compartida se
+cancela (p. ej. el cliente que la inició cerró la conexión), quienes esperaban no
+quedan colgados: uno de ellos toma la carga y el resto lo espera a él.
+"""
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import asyncio
+
+
+def _cancelling() -> bool:
+    # True si la tarea actual tiene una cancelación pendiente (la cancelada es esta petición)
+    task = asyncio.current_task()
+    return bool(task and task.cancelling())
+
+
+class SingleFlight:
+    """Cargas en curso por llave; `run` ejecuta `loader` solo si nadie más la está cargando."""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def run(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        while True:
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # Solo se reintenta si la cancelada fue la carga compartida, no esta petición
+                if not inflight.cancelled() or _cancelling():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except Exception as e:
+            future.set_exception(e)
+            # Evitar "exception was never retrieved" si nadie más esperaba
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            # Cancelación u otra BaseException: liberar a quienes esperaban
+            if not future.done():
+                future.cancel()
+            if self._inflight.get(key) is future:
+                self._inflight.pop(key, None)
+
+    def clear(self) -> None:
+        self._inflight.clear()
@@ -8,13 +8,18 @@ from fastapi.encoders import jsonable_encoder
 from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 import os, logging
 from app.config.settings import settings
-from app.config.database import connect_to_mongo, close_mongo_connection, get_database
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.config.database import connect_to_mongo, close_mongo_connection, get_database, database_manager, start_health_monitor
 from app.modules.cases.repositories.case_repository import CaseRepository
 from app.modules.cases.repositories.consecutive_repository import CaseConsecutiveRepository
 from app.modules.approvals.repositories.approval_repository import ApprovalRepository
 from app.modules.approvals.repositories.consecutive_repository import ApprovalConsecutiveRepository
 from app.modules.patients.repositories.patient_repository import PatientRepository
 from app.modules.unread_cases.repositories.unread_case_repository import UnreadCaseRepository
+from app.modules.cases.repositories.pdf_job_repository import PdfJobRepository
+from app.modules.cases.repositories.statistics.case_stats_daily_repository import CaseStatsDailyRepository
+from app.modules.cases.repositories.statistics.case_tests_repository import CaseTestsRepository
+from app.modules.cases.repositories.case_search_repository import CaseSearchRepository
 
 app = FastAPI(title="WEB-LIS PathSys - New Backend", version="1.0.0")
 
@@ -26,6 +31,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Cursor de la página siguiente en los listados paginados por keyset
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 os.makedirs("uploads/signatures", exist_ok=True)
@@ -46,9 +53,12 @@ async def on_startup():
     # Conectar a Mongo y preparar índices críticos del módulo de casos
     await connect_to_mongo()
     db = await get_database()
+    # Vigilar la conexión en segundo plano (get_database ya no hace ping por request)
+    start_health_monitor()
     # Casos
     await CaseRepository(db).ensure_indexes()
     await CaseConsecutiveRepository(db).ensure_indexes()
+    await CaseSearchRepository(db).ensure_indexes()
     # Aprobaciones
     await ApprovalRepository(db).ensure_indexes()
     await ApprovalConsecutiveRepository(db).ensure_indexes()
@@ -56,7 +66,23 @@ async def on_startup():
     await PatientRepository(db).ensure_indexes()
     # Casos sin lectura
     await UnreadCaseRepository(db).ensure_indexes()
+    # Trabajos de PDFs por lote
+    await PdfJobRepository(db).ensure_indexes()
+    # Rollup diario de estadísticas
+    await CaseStatsDailyRepository(db).ensure_indexes()
+    # Tabla de hechos caso x prueba
+    await CaseTestsRepository(db).ensure_indexes()
+    if settings.INDEX_ADVISOR_ON_STARTUP:
+        from app.modules.cases.services.index_advisor import log_index_report
+        await log_index_report(db)
     
+    # Compilar la plantilla de informes y cargar logos antes del primer PDF
+    try:
+        from app.modules.cases.services.pdf_service import get_render_context
+        get_render_context()
+    except Exception as e:
+        logging.getLogger("app.main").warning(f"No se pudo preparar la plantilla de informes (se preparará lazy): {e}")
+
     # Inicializar pool de navegadores para PDFs (opcional, se inicializa lazy si falla)
     try:
         from app.modules.cases.services.browser_pool import BrowserPool
@@ -66,8 +92,31 @@ async def on_startup():
     except Exception as e:
         logging.getLogger("app.main").warning(f"No se pudo inicializar el pool de navegadores (se inicializará lazy): {e}")
 
+    # Workers de trabajos de PDFs en segundo plano
+    if settings.PDF_JOBS_ENABLED:
+        from app.modules.cases.services.pdf_job_service import PdfJobRunner
+        await PdfJobRunner.get_instance().start(db)
+
+    # Refresco periódico del panel de casos urgentes
+    if settings.URGENT_CASES_MATERIALIZED:
+        from app.modules.cases.services.urgent_cases_service import UrgentCasesRefresher
+        await UrgentCasesRefresher.get_instance().start(db)
+
 @app.on_event("shutdown")
 async def on_shutdown():
+    # Detener workers de trabajos PDF antes de cerrar el pool que usan
+    try:
+        from app.modules.cases.services.pdf_job_service import PdfJobRunner
+        await PdfJobRunner.get_instance().stop()
+    except Exception as e:
+        logging.getLogger("app.main").warning(f"Error deteniendo workers de trabajos PDF: {e}")
+
+    try:
+        from app.modules.cases.services.urgent_cases_service import UrgentCasesRefresher
+        await UrgentCasesRefresher.get_instance().stop()
+    except Exception as e:
+        logging.getLogger("app.main").warning(f"Error deteniendo el refresco de casos urgentes: {e}")
+
     # Cerrar pool de navegadores
     try:
         from app.modules.cases.services.browser_pool import BrowserPool
@@ -82,7 +131,7 @@ async def on_shutdown():
 
 @app.get("/health")
 async def health():
-    return {"status": "ok"}
+    return {"status": "ok", "database": "ok" if database_manager.healthy else "unavailable"}
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
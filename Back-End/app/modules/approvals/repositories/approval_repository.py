@@ -4,6 +4,7 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime, timezone
 from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.core.pagination import apply_keyset
 from app.shared.repositories.base import BaseRepository
 from app.modules.approvals.models.approval_request import ApprovalRequest, ApprovalStateEnum
 from app.modules.approvals.schemas.approval import ApprovalRequestSearch
@@ -20,7 +21,7 @@ class ApprovalRepository(BaseRepository[ApprovalRequest, dict, dict]):
         await self.collection.create_index([("approval_code", 1)], unique=True)
         await self.collection.create_index([("original_case_code", 1)], unique=True)
         await self.collection.create_index([("approval_state", 1)])
-        await self.collection.create_index([("created_at", -1)])
+        await self.collection.create_index([("created_at", -1), ("_id", -1)])
 
     async def get_by_approval_code(self, approval_code: str) -> Optional[ApprovalRequest]:
         """Obtener solicitud por código de aprobación."""
@@ -39,6 +40,21 @@ class ApprovalRepository(BaseRepository[ApprovalRequest, dict, dict]):
             return doc, ApprovalRequest(**doc)
         return None, None
 
+    async def get_by_original_case_codes(self, original_case_codes: List[str], states: List[ApprovalStateEnum]) -> List[ApprovalRequest]:
+        """Obtener solicitudes de varios casos en los estados indicados (una sola consulta)."""
+        if not original_case_codes:
+            return []
+        cursor = self.collection.find({
+            "original_case_code": {"$in": list(original_case_codes)},
+            "approval_state": {"$in": [s.value for s in states]},
+        }).sort("created_at", -1)
+        docs = await cursor.to_list(length=None)
+        result = []
+        for d in docs:
+            d['id'] = str(d['_id'])
+            result.append(ApprovalRequest(**d))
+        return result
+
     async def _build_search_query(self, search_params: ApprovalRequestSearch) -> Dict[str, Any]:
         """Construir query de búsqueda."""
         q: Dict[str, Any] = {}
@@ -55,11 +71,15 @@ class ApprovalRepository(BaseRepository[ApprovalRequest, dict, dict]):
             q["approval_info.request_date"] = f
         return q
 
-    async def search(self, search_params: ApprovalRequestSearch, skip: int = 0, limit: int = 50) -> List[ApprovalRequest]:
-        """Buscar solicitudes con filtros."""
-        q = await self._build_search_query(search_params)
-        cursor = self.collection.find(q).skip(skip).limit(limit).sort("created_at", -1)
-        docs = await cursor.to_list(length=limit)
+    async def search(
+        self, search_params: ApprovalRequestSearch, skip: int = 0, limit: int = 50, cursor: Optional[str] = None
+    ) -> List[ApprovalRequest]:
+        """Buscar solicitudes con filtros (paginación por skip o por cursor)."""
+        q = apply_keyset(await self._build_search_query(search_params), cursor, "created_at", -1)
+        find_cursor = self.collection.find(q).sort([("created_at", -1), ("_id", -1)])
+        if not cursor:
+            find_cursor = find_cursor.skip(skip)
+        docs = await find_cursor.limit(limit).to_list(length=limit)
         result = []
         for d in docs:
             d['id'] = str(d['_id'])
@@ -1,6 +1,7 @@
 """Rutas API para solicitudes de aprobación."""
 
 from typing import List, Optional
+from bson import ObjectId
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.config.database import get_database
@@ -15,6 +16,7 @@ from app.modules.approvals.schemas.approval import (
 from app.modules.approvals.services.approval_service import ApprovalService
 from app.modules.auth.routes.auth_routes import get_current_user_id, get_current_user_id_optional
 from app.core.exceptions import NotFoundError, ConflictError, BadRequestError
+from app.core.pagination import next_cursor
 
 router = APIRouter(tags=["Solicitudes de Aprobación"])
 
@@ -91,16 +93,21 @@ async def search_approval_requests(
     search_params: ApprovalRequestSearch,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (next_cursor); reemplaza a skip"),
     service: ApprovalService = Depends(get_approval_service)
 ):
     """Buscar solicitudes de aprobación con filtros."""
-    approvals = await service.search_approvals(search_params, skip, limit)
+    try:
+        approvals = await service.search_approvals(search_params, skip, limit, cursor=cursor)
+    except BadRequestError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     total = await service.count_approvals(search_params)
     return {
         "data": approvals,
         "total": total,
         "skip": skip,
-        "limit": limit
+        "limit": limit,
+        "next_cursor": next_cursor(approvals, limit, lambda a: (a.created_at, ObjectId(a.id))),
     }
 
 
@@ -111,9 +111,16 @@ class ApprovalService:
         approval = await self.repository.get_by_approval_code(approval_code)
         return self._map(approval) if approval else None
 
-    async def search_approvals(self, search_params: ApprovalRequestSearch, skip: int = 0, limit: int = 50) -> List[ApprovalRequestResponse]:
+    async def get_approvals_by_case_codes(self, case_codes: List[str], states: List[ApprovalStateEnum]) -> List[ApprovalRequestResponse]:
+        """Obtener solicitudes de varios casos en los estados indicados."""
+        approvals = await self.repository.get_by_original_case_codes(case_codes, states)
+        return [self._map(approval) for approval in approvals]
+
+    async def search_approvals(
+        self, search_params: ApprovalRequestSearch, skip: int = 0, limit: int = 50, cursor: Optional[str] = None
+    ) -> List[ApprovalRequestResponse]:
         """Buscar solicitudes con filtros."""
-        approvals = await self.repository.search(search_params, skip, limit)
+        approvals = await self.repository.search(search_params, skip, limit, cursor=cursor)
         return [self._map(approval) for approval in approvals]
 
     async def count_approvals(self, search_params: ApprovalRequestSearch) -> int:
@@ -34,7 +34,7 @@ class FakeService:
         it = self.items.get(code)
         return it
 
-    async def search_approvals(self, search, skip=0, limit=50):
+    async def search_approvals(self, search, skip=0, limit=50, cursor=None):
         res = []
         for it in self.items.values():
             ok = True
@@ -41,7 +41,7 @@ class FakeApprovalRepo:
         ap_code = self.by_case.get(case_code)
         return await self.get_by_approval_code(ap_code) if ap_code else None
 
-    async def search(self, search_params, skip, limit):
+    async def search(self, search_params, skip, limit, cursor=None):
         res = []
         for v in self.by_code.values():
             ok = True
@@ -1,8 +1,71 @@
 # Repositorio de casos: acceso CRUD y creación de índices.
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
+from app.modules.cases.repositories.case_search_repository import case_search_tokens
+
+
+# Índices declarados de `cases` como (claves, opciones). Los compuestos siguen las formas
+# de consulta de estadísticas (rango de fechas + estado / entidad / patólogo) y
+# reemplazan a los índices simples state, created_at, assigned_pathologist.id y
+# patient_info.entity_info.id, que quedan cubiertos por sus prefijos.
+# Scripts/index_advisor.py revisa los planes y elimina los índices redundantes.
+CASE_INDEXES: List[Tuple[List[Tuple[str, int]], Dict[str, Any]]] = [
+    ([("case_code", 1)], {"unique": True}),
+    ([("patient_info.patient_code", 1)], {}),
+    ([("patient_info.identification_number", 1)], {}),
+    ([("patient_info.identification_type", 1)], {}),
+    ([("assigned_pathologist.name", 1)], {}),
+    ([("assigned_resident.name", 1)], {}),
+    ([("assigned_resident.id", 1)], {}),
+    ([("patient_info.entity_info.name", 1)], {}),
+    ([("samples.tests.id", 1)], {}),
+    ([("additional_notes.date", 1)], {}),
+    ([("created_at", -1), ("state", 1), ("assigned_pathologist.name", 1)], {}),
+    # Listado de casos paginado por cursor (created_at, _id)
+    ([("created_at", -1), ("_id", -1)], {}),
+    # Oportunidad y dashboard: estado + rango de creación (+ días hábiles)
+    ([("state", 1), ("created_at", 1), ("business_days", 1)], {}),
+    # Completados firmados en un rango, opcionalmente por entidad
+    ([("signed_at", 1), ("patient_info.entity_info.id", 1)], {"partialFilterExpression": {"state": "Completado"}}),
+    # Filtros por patólogo y por entidad
+    ([("assigned_pathologist.id", 1), ("state", 1), ("signed_at", 1)], {}),
+    ([("patient_info.entity_info.id", 1), ("state", 1), ("created_at", 1)], {}),
+]
+
+# Campos de CaseListItem (listado view=summary) y las rutas de `cases` que proyecta cada uno
+CASE_LIST_FIELDS: Dict[str, List[str]] = {
+    "case_code": ["case_code"],
+    "patient_info": [
+        "patient_info.patient_code",
+        "patient_info.name",
+        "patient_info.identification_type",
+        "patient_info.identification_number",
+        "patient_info.entity_info",
+        "patient_info.care_type",
+    ],
+    "requesting_physician": ["requesting_physician"],
+    "service": ["service"],
+    "samples": ["samples.body_region", "samples.tests.id", "samples.tests.name", "samples.tests.quantity"],
+    "state": ["state"],
+    "priority": ["priority"],
+    "created_at": ["created_at"],
+    "updated_at": ["updated_at"],
+    "signed_at": ["signed_at"],
+    "assigned_pathologist": ["assigned_pathologist.id", "assigned_pathologist.name"],
+    "delivered_at": ["delivered_at"],
+    "business_days": ["business_days"],
+}
+
+
+def case_list_projection(fields: List[str]) -> Dict[str, int]:
+    """Proyección de los campos pedidos del listado; created_at siempre se incluye (cursor)."""
+    projection = {"created_at": 1}
+    for field in fields:
+        projection.update({path: 1 for path in CASE_LIST_FIELDS[field]})
+    return projection
+
 
 class CaseRepository:
     def __init__(self, db: AsyncIOMotorDatabase):
@@ -10,40 +73,35 @@ class CaseRepository:
 
     # Crea índices clave para mejorar búsquedas y ordenamientos.
     async def ensure_indexes(self):
-        await self.collection.create_index("case_code", unique=True)
-        await self.collection.create_index("patient_info.patient_code")
-        await self.collection.create_index("patient_info.identification_number")
-        await self.collection.create_index("patient_info.identification_type")
-        await self.collection.create_index("state")
-        await self.collection.create_index("created_at")
-        await self.collection.create_index("assigned_pathologist.name")
-        await self.collection.create_index("assigned_pathologist.id")
-        await self.collection.create_index("assigned_resident.name")
-        await self.collection.create_index("assigned_resident.id")
-        await self.collection.create_index("patient_info.entity_info.name")
-        await self.collection.create_index("samples.tests.id")
-        await self.collection.create_index("additional_notes.date")
-        await self.collection.create_index([
-            ("created_at", -1),
-            ("state", 1),
-            ("assigned_pathologist.name", 1)
-        ])
+        for keys, options in CASE_INDEXES:
+            await self.collection.create_index(keys, **options)
 
     # Obtiene un caso por su código único.
     async def get_by_case_code(self, case_code: str) -> Optional[Dict[str, Any]]:
         return await self.collection.find_one({"case_code": case_code})
 
+    # Obtiene varios casos por código en una sola consulta.
+    async def get_by_case_codes(self, case_codes: List[str]) -> List[Dict[str, Any]]:
+        if not case_codes:
+            return []
+        cursor = self.collection.find({"case_code": {"$in": list(case_codes)}})
+        return await cursor.to_list(length=len(case_codes))
+
     # Crea un caso y gestiona marcas de tiempo.
     async def create(self, data: Dict[str, Any]) -> Dict[str, Any]:
         now = datetime.now(timezone.utc)
         data.setdefault("created_at", now)
         data["updated_at"] = now
+        data["search_tokens"] = case_search_tokens(data)
         res = await self.collection.insert_one(data)
         return await self.collection.find_one({"_id": res.inserted_id})
 
     # Actualiza campos del caso por código y marca actualización.
     async def update_by_case_code(self, case_code: str, update: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         update["updated_at"] = datetime.now(timezone.utc)
+        if update.get("patient_info"):
+            # patient_info se reemplaza completo: recalcular sus tokens de búsqueda
+            update["search_tokens"] = case_search_tokens({"case_code": case_code, "patient_info": update["patient_info"]})
         await self.collection.update_one({"case_code": case_code}, {"$set": update})
         return await self.get_by_case_code(case_code)
 
@@ -0,0 +1,149 @@
+"""
+Índice de búsqueda de casos.
+
+Cada caso guarda en `search_tokens` sus términos normalizados (minúsculas y sin
+tildes): las palabras del nombre del paciente, la identificación compacta (y solo
+sus dígitos) y los componentes del patient_code y del case_code. Sobre el índice
+multikey de `search_tokens` cada término buscado es una regex anclada
+(`^término`), que Mongo resuelve como un rango del índice, en lugar de las regex
+sin anclar sobre cuatro campos que recorren toda la colección.
+
+CaseRepository escribe los tokens con cada caso; el histórico se rellena con
+Scripts/rebuild_case_search.py y, hasta entonces, la búsqueda usa las regex originales.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+import re
+import unicodedata
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from app.config.settings import settings
+
+SEARCH_META_ID = "case_search"
+# Términos considerados por búsqueda (el resto solo añadiría filtros)
+MAX_QUERY_TERMS = 6
+
+_TOKEN_PROJECTION = {
+    "case_code": 1,
+    "patient_info.name": 1,
+    "patient_info.patient_code": 1,
+    "patient_info.identification_number": 1,
+}
+
+
+def fold(text: Any) -> str:
+    """Texto en minúsculas y sin tildes ("Peña" -> "pena")."""
+    decomposed = unicodedata.normalize("NFKD", str(text or ""))
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+
+def _words(text: Any) -> List[str]:
+    return re.findall(r"[a-z0-9]+", fold(text))
+
+
+def case_search_tokens(case: Dict[str, Any]) -> List[str]:
+    """Tokens de búsqueda de un caso (ordenados, sin repetir)."""
+    patient = case.get("patient_info") or {}
+    tokens = set(_words(patient.get("name")))
+    identification = "".join(_words(patient.get("identification_number")))
+    if identification:
+        tokens.add(identification)
+        digits = re.sub(r"\D", "", identification)
+        if digits:
+            tokens.add(digits)
+    tokens.update(_words(patient.get("patient_code")))
+    tokens.update(_words(case.get("case_code")))
+    return sorted(tokens)
+
+
+def query_terms(text: Optional[str]) -> List[str]:
+    """Términos de una búsqueda con la misma normalización que los tokens ("1.234.567" -> "1234567")."""
+    terms: List[str] = []
+    for chunk in fold(text).split():
+        # Separadores de miles dentro de números de documento
+        chunk = re.sub(r"(?<=\d)[.,](?=\d)", "", chunk)
+        for term in re.findall(r"[a-z0-9]+", chunk):
+            if term not in terms:
+                terms.append(term)
+    return terms[:MAX_QUERY_TERMS]
+
+
+def search_filter(terms: List[str]) -> Dict[str, Any]:
+    """Cada término debe ser prefijo de algún token del caso."""
+    clauses = [{"search_tokens": {"$regex": f"^{re.escape(term)}"}} for term in terms]
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+async def retokenize_cases(collection: Any, query: Dict[str, Any], batch_size: int = 1000) -> int:
+    """Reemplazar `search_tokens` de los casos de `query` por los de sus campos actuales."""
+    updated = 0
+    ops: List[UpdateOne] = []
+    async for case in collection.find(query, projection=_TOKEN_PROJECTION):
+        ops.append(UpdateOne({"_id": case["_id"]}, {"$set": {"search_tokens": case_search_tokens(case)}}))
+        if len(ops) >= batch_size:
+            await collection.bulk_write(ops, ordered=False)
+            updated += len(ops)
+            ops = []
+    if ops:
+        await collection.bulk_write(ops, ordered=False)
+        updated += len(ops)
+    return updated
+
+
+class CaseSearchRepository:
+    # Se marca al encontrar el documento de reconstrucción completa (por proceso)
+    _ready: bool = False
+
+    def __init__(self, database: AsyncIOMotorDatabase):
+        self.collection = database.cases
+        self.meta = database.case_stats_meta
+
+    async def ensure_indexes(self) -> None:
+        await self.collection.create_index("search_tokens")
+
+    async def is_ready(self) -> bool:
+        """True si todos los casos ya tienen tokens y la búsqueda por tokens está habilitada."""
+        if not settings.CASE_SEARCH_TOKENS_ENABLED:
+            return False
+        if CaseSearchRepository._ready:
+            return True
+        meta = await self.meta.find_one({"_id": SEARCH_META_ID})
+        CaseSearchRepository._ready = bool(meta and meta.get("built_at"))
+        return CaseSearchRepository._ready
+
+    async def rebuild(self, batch_size: int = 1000) -> int:
+        """Recalcular los tokens de todos los casos por lotes y marcar la búsqueda lista."""
+        updated = await retokenize_cases(self.collection, {}, batch_size)
+        await self.ensure_indexes()
+        await self.meta.update_one(
+            {"_id": SEARCH_META_ID},
+            {"$set": {"built_at": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+        CaseSearchRepository._ready = True
+        return updated
+
+    async def search(
+        self,
+        filters: Dict[str, Any],
+        terms: List[str],
+        skip: int = 0,
+        limit: int = 100,
+        projection: Optional[Dict[str, int]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Casos que cumplen `filters` y los términos, ordenados por relevancia: primero los que
+        tienen más términos como token completo, luego los más recientes.
+        """
+        match = search_filter(terms)
+        pipeline: List[Dict[str, Any]] = [
+            {"$match": {"$and": [filters, match]} if filters else match},
+            {"$addFields": {"_search_rank": {"$size": {"$setIntersection": [{"$ifNull": ["$search_tokens", []]}, terms]}}}},
+            {"$sort": {"_search_rank": -1, "created_at": -1, "_id": -1}},
+            {"$skip": int(skip)},
+            {"$limit": int(limit)},
+            {"$project": projection or {"_search_rank": 0}},
+        ]
+        return await self.collection.aggregate(pipeline).to_list(length=limit)
@@ -0,0 +1,139 @@
+"""
+Repositorio de trabajos de PDFs por lote: estado, progreso y arrendamiento de trabajos.
+"""
+from datetime import datetime, timezone, timedelta
+from typing import Optional, Dict, Any, List
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+
+FINAL_STATUSES = ["completed", "failed", "cancelled"]
+
+
+class PdfJobRepository:
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.collection = db.pdf_jobs
+
+    # Índices para reclamar trabajos en orden de llegada y barrer los vencidos.
+    async def ensure_indexes(self):
+        await self.collection.create_index("job_id", unique=True)
+        await self.collection.create_index([("status", 1), ("created_at", 1)])
+        await self.collection.create_index("expires_at", sparse=True)
+
+    async def create(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        await self.collection.insert_one(job)
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"job_id": job_id}, {"_id": 0})
+
+    # Evita encolar dos pre-renders del mismo caso mientras el primero sigue en cola.
+    async def has_queued_prerender(self, case_code: str) -> bool:
+        doc = await self.collection.find_one(
+            {"kind": "prerender", "case_codes": case_code, "status": "queued"}, {"_id": 1}
+        )
+        return doc is not None
+
+    # Toma el siguiente trabajo en cola, o uno "running" cuyo worker dejó de reportar
+    # (proceso reiniciado), y lo marca como propio del worker.
+    async def claim_next(self, worker_id: str, stale_seconds: float) -> Optional[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        stale = now - timedelta(seconds=stale_seconds)
+        return await self.collection.find_one_and_update(
+            {
+                "cancel_requested": {"$ne": True},
+                "$or": [
+                    {"status": "queued"},
+                    {"status": "running", "heartbeat_at": {"$lt": stale}},
+                ],
+            },
+            {"$set": {
+                "status": "running",
+                "worker_id": worker_id,
+                "started_at": now,
+                "heartbeat_at": now,
+                "rendered": 0,
+                "failed": 0,
+            }},
+            sort=[("created_at", 1)],
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    # Suma progreso y renueva el latido; retorna el documento para detectar cancelaciones.
+    async def add_progress(self, job_id: str, worker_id: str, rendered: int = 0, failed: int = 0) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one_and_update(
+            {"job_id": job_id, "worker_id": worker_id, "status": "running"},
+            {
+                "$inc": {"rendered": rendered, "failed": failed},
+                "$set": {"heartbeat_at": datetime.now(timezone.utc)},
+            },
+            projection={"_id": 0, "cancel_requested": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    # Renueva el latido sin tocar el progreso; False si el trabajo ya no es de este worker.
+    async def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        result = await self.collection.update_one(
+            {"job_id": job_id, "worker_id": worker_id, "status": "running"},
+            {"$set": {"heartbeat_at": datetime.now(timezone.utc)}},
+        )
+        return result.matched_count > 0
+
+    async def finish(
+        self,
+        job_id: str,
+        worker_id: str,
+        status: str,
+        retention: timedelta,
+        artifact_path: Optional[str] = None,
+        error: Optional[str] = None,
+    ) -> bool:
+        now = datetime.now(timezone.utc)
+        result = await self.collection.update_one(
+            {"job_id": job_id, "worker_id": worker_id, "status": "running"},
+            {"$set": {
+                "status": status,
+                "finished_at": now,
+                "expires_at": now + retention,
+                "artifact_path": artifact_path,
+                "error": error,
+            }},
+        )
+        return result.modified_count > 0
+
+    # Cancela en el acto si aún está en cola; si está corriendo, pide al worker que se detenga.
+    async def request_cancel(self, job_id: str, retention: timedelta) -> Optional[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        doc = await self.collection.find_one_and_update(
+            {"job_id": job_id, "status": "queued"},
+            {"$set": {"status": "cancelled", "cancel_requested": True, "finished_at": now, "expires_at": now + retention}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc:
+            return doc
+        return await self.collection.find_one_and_update(
+            {"job_id": job_id, "status": "running"},
+            {"$set": {"cancel_requested": True}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    # Trabajos con cancelación pedida cuyo worker desapareció: cerrarlos como cancelados.
+    async def close_abandoned_cancellations(self, stale_seconds: float, retention: timedelta) -> int:
+        now = datetime.now(timezone.utc)
+        result = await self.collection.update_many(
+            {"status": "running", "cancel_requested": True, "heartbeat_at": {"$lt": now - timedelta(seconds=stale_seconds)}},
+            {"$set": {"status": "cancelled", "finished_at": now, "expires_at": now + retention}},
+        )
+        return result.modified_count
+
+    async def list_expired(self, limit: int = 100) -> List[Dict[str, Any]]:
+        cursor = self.collection.find(
+            {"status": {"$in": FINAL_STATUSES}, "expires_at": {"$lte": datetime.now(timezone.utc)}},
+            {"_id": 0, "job_id": 1, "artifact_path": 1},
+        ).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def delete(self, job_id: str) -> None:
+        await self.collection.delete_one({"job_id": job_id})
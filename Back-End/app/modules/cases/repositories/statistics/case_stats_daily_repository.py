@@ -0,0 +1,314 @@
+"""
+Rollup diario de estadísticas de casos (colección `case_stats_daily`).
+
+Cada fila agrupa los casos de un día de creación por firma (día), entidad,
+patólogo, estado y tipo de atención. Las filas `kind="case"` cuentan casos y
+muestras; las filas `kind="test"` cuentan cada prueba solicitada (caso x prueba).
+En lugar de sumas fijas se guarda el histograma de `business_days`
+(`days: {"<días>": casos}` más `days_missing`), de modo que cualquier umbral de
+oportunidad, promedio, mínimo o máximo se obtiene de las filas sin volver a
+recorrer `cases`.
+
+Un día se recalcula completo desde `cases` (ids de fila deterministas, así que
+recalcular es idempotente); los servicios que escriben casos programan el
+recálculo del día afectado y `Scripts/rebuild_case_stats_daily.py` reconstruye
+todo el histórico. Las lecturas solo usan el rollup cuando ya existe una
+reconstrucción completa (documento en `case_stats_meta`).
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+import asyncio
+import hashlib
+import json
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DeleteMany, ReplaceOne
+
+from app.config.settings import settings
+
+ROLLUP_META_ID = "case_stats_daily"
+
+# Campos que forman la llave de una fila (además de `kind`)
+KEY_FIELDS = (
+    "day",
+    "signed_day",
+    "entity_id",
+    "entity_code",
+    "entity_short_code",
+    "entity_name",
+    "pathologist_id",
+    "pathologist_name",
+    "test_code",
+    "test_name",
+    "state",
+    "care_type",
+)
+
+
+def _day_expr(path: str) -> Dict[str, Any]:
+    # Medianoche UTC del campo de fecha; None si no es una fecha
+    return {
+        "$cond": [
+            {"$eq": [{"$type": path}, "date"]},
+            {"$dateFromParts": {"year": {"$year": path}, "month": {"$month": path}, "day": {"$dayOfMonth": path}}},
+            None,
+        ]
+    }
+
+
+_CASE_KEY: Dict[str, Any] = {
+    "day": _day_expr("$created_at"),
+    "signed_day": _day_expr("$signed_at"),
+    "entity_id": "$patient_info.entity_info.id",
+    "entity_code": "$patient_info.entity_info.entity_code",
+    "entity_short_code": "$patient_info.entity_info.code",
+    "entity_name": "$patient_info.entity_info.name",
+    "pathologist_id": "$assigned_pathologist.id",
+    "pathologist_name": "$assigned_pathologist.name",
+    "state": "$state",
+    "care_type": "$patient_info.care_type",
+    "bd": "$business_days",
+}
+
+
+def _row_id(kind: str, key: Dict[str, Any]) -> str:
+    # El tipo forma parte del id: un ObjectId y su hex en string son entidades distintas
+    parts = [kind] + [key.get(f) for f in KEY_FIELDS]
+    raw = json.dumps(parts, default=lambda v: f"{type(v).__name__}:{v}", ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def fold_groups(groups: Iterable[Dict[str, Any]], kind: str) -> Dict[str, Dict[str, Any]]:
+    """Convertir grupos (llave + business_days) en filas del rollup con histograma de días."""
+    rows: Dict[str, Dict[str, Any]] = {}
+    for group in groups:
+        key = group["_id"]
+        row_key = {f: key.get(f) for f in KEY_FIELDS}
+        row_id = _row_id(kind, row_key)
+        row = rows.get(row_id)
+        if row is None:
+            row = rows[row_id] = {
+                "_id": row_id,
+                "kind": kind,
+                **row_key,
+                "cases": 0,
+                "samples": 0,
+                "days": {},
+                "days_missing": 0,
+            }
+        count = group.get("n", 0)
+        row["cases"] += count
+        row["samples"] += group.get("samples", 0)
+        days = key.get("bd")
+        if isinstance(days, (int, float)) and not isinstance(days, bool):
+            bucket = str(int(days))
+            row["days"][bucket] = row["days"].get(bucket, 0) + count
+        else:
+            row["days_missing"] += count
+    return rows
+
+
+@dataclass
+class RollupBucket:
+    """Acumulado de filas del rollup para un grupo de lectura."""
+
+    cases: int = 0
+    samples: int = 0
+    days: Dict[int, int] = field(default_factory=dict)
+    days_missing: int = 0
+
+    def add(self, row: Dict[str, Any]) -> None:
+        self.cases += row.get("cases", 0)
+        self.samples += row.get("samples", 0)
+        self.days_missing += row.get("days_missing", 0)
+        for days, count in (row.get("days") or {}).items():
+            self.days[int(days)] = self.days.get(int(days), 0) + count
+
+    @property
+    def days_count(self) -> int:
+        return sum(self.days.values())
+
+    @property
+    def days_sum(self) -> int:
+        return sum(days * count for days, count in self.days.items())
+
+    def average(self, missing_as_zero: bool = False) -> Optional[float]:
+        # Igual que $avg (ignora nulos) o que $avg con $ifNull a 0
+        count = self.days_count + (self.days_missing if missing_as_zero else 0)
+        return self.days_sum / count if count else None
+
+    def within(self, threshold: int, include_missing: bool = False) -> int:
+        # En agregaciones {$lte: [null, n]} es verdadero: las pipelines originales cuentan los nulos dentro
+        within = sum(count for days, count in self.days.items() if days <= threshold)
+        return within + (self.days_missing if include_missing else 0)
+
+    def outside(self, threshold: int) -> int:
+        return sum(count for days, count in self.days.items() if days > threshold)
+
+    @property
+    def min_days(self) -> Optional[int]:
+        return min(self.days) if self.days else None
+
+    @property
+    def max_days(self) -> Optional[int]:
+        return max(self.days) if self.days else None
+
+
+def group_rows(rows: Iterable[Dict[str, Any]], key: Callable[[Dict[str, Any]], Hashable]) -> Dict[Hashable, RollupBucket]:
+    """Agrupar filas del rollup por `key(row)` conservando el orden de aparición."""
+    buckets: Dict[Hashable, RollupBucket] = {}
+    for row in rows:
+        group = key(row)
+        bucket = buckets.get(group)
+        if bucket is None:
+            bucket = buckets[group] = RollupBucket()
+        bucket.add(row)
+    return buckets
+
+
+def round_or_none(value: Optional[float], digits: int = 2) -> Optional[float]:
+    return round(value, digits) if value is not None else None
+
+
+def is_day_aligned(value: datetime) -> bool:
+    return value.hour == 0 and value.minute == 0 and value.second == 0 and value.microsecond == 0
+
+
+class CaseStatsDailyRepository:
+    # Acceso a la colección case_stats_daily (escritura por día y lecturas por rango)
+
+    # Se marca al encontrar el documento de reconstrucción completa (por proceso)
+    _ready: bool = False
+
+    def __init__(self, database: AsyncIOMotorDatabase):
+        self.database = database
+        self.cases = database.cases
+        self.collection = database.case_stats_daily
+        self.meta = database.case_stats_meta
+
+    async def ensure_indexes(self) -> None:
+        await self.collection.create_index([("kind", ASCENDING), ("day", ASCENDING)], name="kind_day")
+        await self.collection.create_index([("kind", ASCENDING), ("signed_day", ASCENDING)], name="kind_signed_day")
+
+    async def is_ready(self) -> bool:
+        """True si el rollup ya se reconstruyó completo y está habilitado."""
+        if not settings.STATISTICS_ROLLUP_ENABLED:
+            return False
+        if CaseStatsDailyRepository._ready:
+            return True
+        meta = await self.meta.find_one({"_id": ROLLUP_META_ID})
+        CaseStatsDailyRepository._ready = bool(meta and meta.get("built_at"))
+        return CaseStatsDailyRepository._ready
+
+    async def _aggregate_range(self, start: datetime, end: datetime) -> Dict[str, Dict[str, Any]]:
+        match = {"$match": {"created_at": {"$gte": start, "$lt": end}}}
+        case_pipeline = [
+            match,
+            {
+                "$group": {
+                    "_id": _CASE_KEY,
+                    "n": {"$sum": 1},
+                    "samples": {"$sum": {"$size": {"$ifNull": ["$samples", []]}}},
+                }
+            },
+        ]
+        test_pipeline = [
+            match,
+            {"$unwind": "$samples"},
+            {"$unwind": "$samples.tests"},
+            {
+                "$group": {
+                    "_id": {**_CASE_KEY, "test_code": "$samples.tests.id", "test_name": "$samples.tests.name"},
+                    "n": {"$sum": 1},
+                }
+            },
+        ]
+        case_groups, test_groups = await asyncio.gather(
+            self.cases.aggregate(case_pipeline, allowDiskUse=True).to_list(length=None),
+            self.cases.aggregate(test_pipeline, allowDiskUse=True).to_list(length=None),
+        )
+        rows = fold_groups(case_groups, "case")
+        rows.update(fold_groups(test_groups, "test"))
+        return rows
+
+    async def refresh_range(self, start: datetime, end: datetime) -> int:
+        """Recalcular las filas de los días de creación en [start, end). Retorna filas escritas."""
+        rows = await self._aggregate_range(start, end)
+        now = datetime.now(timezone.utc)
+        ops: List[Any] = [ReplaceOne({"_id": row_id}, {**row, "updated_at": now}, upsert=True) for row_id, row in rows.items()]
+        # Filas que ya no existen (casos borrados o movidos de grupo)
+        ops.append(DeleteMany({"day": {"$gte": start, "$lt": end}, "_id": {"$nin": list(rows)}}))
+        await self.collection.bulk_write(ops, ordered=True)
+        return len(rows)
+
+    async def refresh_day(self, day: datetime) -> int:
+        start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+        return await self.refresh_range(start, start + timedelta(days=1))
+
+    async def rebuild(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> int:
+        """
+        Reconstruir el rollup mes a mes. Sin rango, cubre todo el histórico de `cases`,
+        elimina filas fuera de él y marca el rollup como listo para lecturas.
+        """
+        full = start is None and end is None
+        if full:
+            first = await self.cases.find({"created_at": {"$type": "date"}}, {"created_at": 1}).sort("created_at", 1).to_list(1)
+            last = await self.cases.find({"created_at": {"$type": "date"}}, {"created_at": 1}).sort("created_at", -1).to_list(1)
+            if not first:
+                await self.collection.delete_many({})
+                await self._mark_built()
+                return 0
+            start, end = first[0]["created_at"], last[0]["created_at"] + timedelta(days=1)
+
+        cursor = datetime(start.year, start.month, 1, tzinfo=timezone.utc)
+        end = end if end.tzinfo else end.replace(tzinfo=timezone.utc)
+        written = 0
+        while cursor < end:
+            next_month = datetime(cursor.year + (cursor.month // 12), cursor.month % 12 + 1, 1, tzinfo=timezone.utc)
+            written += await self.refresh_range(cursor, next_month)
+            cursor = next_month
+
+        if full:
+            first_day = datetime(start.year, start.month, 1, tzinfo=timezone.utc)
+            await self.collection.delete_many({"$or": [{"day": {"$lt": first_day}}, {"day": {"$gte": cursor}}, {"day": None}]})
+            await self._mark_built()
+        return written
+
+    async def _mark_built(self) -> None:
+        await self.meta.update_one(
+            {"_id": ROLLUP_META_ID},
+            {"$set": {"built_at": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+        CaseStatsDailyRepository._ready = True
+
+    async def mark_stale(self) -> None:
+        """Dejar de leer del rollup hasta la próxima reconstrucción completa."""
+        CaseStatsDailyRepository._ready = False
+        await self.meta.update_one({"_id": ROLLUP_META_ID}, {"$unset": {"built_at": ""}})
+
+    async def find_rows(
+        self,
+        kind: str,
+        date_field: str,
+        start: datetime,
+        end: datetime,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Filas de `kind` cuyo `date_field` ("day" o "signed_day") cae en [start, end)."""
+        query: Dict[str, Any] = {"kind": kind, date_field: {"$gte": start, "$lt": end}}
+        if filters:
+            query.update(filters)
+        cursor = self.collection.find(query, projection={"updated_at": 0})
+        return await cursor.to_list(length=None)
+
+    async def count_cases(self, filters: Dict[str, Any], group_by: Any = None) -> List[Dict[str, Any]]:
+        """Sumar casos de filas `kind="case"` en el servidor, opcionalmente agrupados."""
+        pipeline = [
+            {"$match": {"kind": "case", **filters}},
+            {"$group": {"_id": group_by, "count": {"$sum": "$cases"}}},
+        ]
+        return await self.collection.aggregate(pipeline).to_list(length=None)
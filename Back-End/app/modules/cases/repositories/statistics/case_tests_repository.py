@@ -0,0 +1,147 @@
+"""
+Tabla de hechos `case_tests`: una fila por caso x prueba solicitada.
+
+Cada fila conserva la forma que tiene un documento de `cases` después de
+`{$unwind: "$samples"}` y `{$unwind: "$samples.tests"}` (`samples` es un objeto y
+`samples.tests` la prueba), con solo los campos que usan las estadísticas. Así las
+pipelines de estadísticas escritas sobre `cases` corren tal cual sobre
+`case_tests` quitando esos dos `$unwind` (ver `aggregate_tests`).
+
+Se mantiene por caso (los servicios que escriben casos programan la
+sincronización) y se reconstruye completa con `Scripts/rebuild_case_tests.py`;
+las lecturas solo la usan cuando ya existe una reconstrucción completa.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DeleteMany, ReplaceOne
+
+from app.config.settings import settings
+
+CASE_TESTS_META_ID = "case_tests"
+
+# Campos de `cases` que se copian a cada fila
+FACT_PROJECTION: Dict[str, Any] = {
+    "_id": 0,
+    "case_code": 1,
+    "state": 1,
+    "created_at": 1,
+    "signed_at": 1,
+    "business_days": 1,
+    "patient_info.patient_code": 1,
+    "patient_info.entity_info": 1,
+    "patient_info.care_type": 1,
+    "assigned_pathologist.id": 1,
+    "assigned_pathologist.name": 1,
+    "samples.body_region": 1,
+    "samples.tests": 1,
+}
+
+UNWIND_STAGES = ({"$unwind": "$samples"}, {"$unwind": "$samples.tests"})
+
+
+def _as_list(value: Any) -> List[Any]:
+    # Igual que $unwind: un valor que no es arreglo cuenta como un solo elemento
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def case_test_rows(case: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Filas de `case_tests` de un caso (ya proyectado con FACT_PROJECTION)."""
+    case_code = case.get("case_code")
+    base = {k: v for k, v in case.items() if k not in ("_id", "samples")}
+    rows: List[Dict[str, Any]] = []
+    for sample_index, sample in enumerate(_as_list(case.get("samples"))):
+        if not isinstance(sample, dict):
+            continue
+        for test_index, test in enumerate(_as_list(sample.get("tests"))):
+            rows.append({
+                "_id": f"{case_code}:{sample_index}:{test_index}",
+                **base,
+                "samples": {**sample, "tests": test},
+            })
+    return rows
+
+
+def strip_test_unwinds(pipeline: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+    """La pipeline sin los `$unwind` de samples/samples.tests; None si no los tiene."""
+    stages = [stage for stage in pipeline if stage not in UNWIND_STAGES]
+    return stages if len(stages) == len(pipeline) - len(UNWIND_STAGES) else None
+
+
+class CaseTestsRepository:
+    # Acceso a la colección case_tests (sincronización por caso y lecturas)
+
+    # Se marca al encontrar el documento de reconstrucción completa (por proceso)
+    _ready: bool = False
+
+    def __init__(self, database: AsyncIOMotorDatabase):
+        self.cases = database.cases
+        self.collection = database.case_tests
+        self.meta = database.case_stats_meta
+
+    async def ensure_indexes(self) -> None:
+        await self.collection.create_index("case_code")
+        await self.collection.create_index([("state", ASCENDING), ("signed_at", ASCENDING)])
+        await self.collection.create_index([("state", ASCENDING), ("created_at", ASCENDING)])
+        await self.collection.create_index("samples.tests.id")
+
+    async def is_ready(self) -> bool:
+        """True si case_tests ya se reconstruyó completa y está habilitada."""
+        if not settings.STATISTICS_CASE_TESTS_ENABLED:
+            return False
+        if CaseTestsRepository._ready:
+            return True
+        meta = await self.meta.find_one({"_id": CASE_TESTS_META_ID})
+        CaseTestsRepository._ready = bool(meta and meta.get("built_at"))
+        return CaseTestsRepository._ready
+
+    async def mark_stale(self) -> None:
+        """Dejar de leer de case_tests hasta la próxima reconstrucción completa."""
+        CaseTestsRepository._ready = False
+        await self.meta.update_one({"_id": CASE_TESTS_META_ID}, {"$unset": {"built_at": ""}})
+
+    async def sync_case(self, case_code: str) -> int:
+        """Reemplazar las filas de un caso con su estado actual en `cases` (borrado => sin filas)."""
+        case = await self.cases.find_one({"case_code": case_code}, projection=FACT_PROJECTION)
+        rows = case_test_rows(case) if case else []
+        ops: List[Any] = [ReplaceOne({"_id": row["_id"]}, row, upsert=True) for row in rows]
+        # Pruebas o muestras que ya no existen en el caso
+        ops.append(DeleteMany({"case_code": case_code, "_id": {"$nin": [row["_id"] for row in rows]}}))
+        await self.collection.bulk_write(ops, ordered=True)
+        return len(rows)
+
+    async def rebuild(self) -> int:
+        """Reconstruir la colección completa en el servidor ($out) y marcarla lista para lecturas."""
+        index = lambda field: {"$ifNull": [{"$toString": f"${field}"}, "0"]}
+        pipeline = [
+            {"$project": FACT_PROJECTION},
+            {"$unwind": {"path": "$samples", "includeArrayIndex": "sample_index"}},
+            {"$unwind": {"path": "$samples.tests", "includeArrayIndex": "test_index"}},
+            {"$addFields": {"_id": {"$concat": ["$case_code", ":", index("sample_index"), ":", index("test_index")]}}},
+            {"$project": {"sample_index": 0, "test_index": 0}},
+            {"$out": "case_tests"},
+        ]
+        await self.cases.aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+        await self.ensure_indexes()
+        await self.meta.update_one(
+            {"_id": CASE_TESTS_META_ID},
+            {"$set": {"built_at": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+        CaseTestsRepository._ready = True
+        return await self.collection.count_documents({})
+
+    async def aggregate_tests(self, pipeline: List[Dict[str, Any]], length: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Ejecutar una pipeline escrita para `cases` que desenrolla samples/samples.tests:
+        sobre `case_tests` sin los `$unwind` si está lista, o sobre `cases` tal cual.
+        """
+        stripped = strip_test_unwinds(pipeline)
+        if stripped is not None and await self.is_ready():
+            return await self.collection.aggregate(stripped).to_list(length=length)
+        return await self.cases.aggregate(pipeline).to_list(length=length)
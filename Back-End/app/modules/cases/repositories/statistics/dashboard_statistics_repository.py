@@ -1,7 +1,28 @@
-from datetime import datetime, timezone
-from typing import Dict, Any, List
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Tuple
+import asyncio
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
+from app.modules.cases.repositories.statistics.case_stats_daily_repository import CaseStatsDailyRepository
+
+# Clave de paciente: código de paciente, o tipo-número de identificación si no hay código
+PATIENT_KEY: Dict[str, Any] = {
+    "$ifNull": [
+        "$patient_info.patient_code",
+        {
+            "$cond": [
+                {
+                    "$and": [
+                        {"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_type", ""]}}, 0]},
+                        {"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_number", ""]}}, 0]}
+                    ]
+                },
+                {"$concat": ["$patient_info.identification_type", "-", "$patient_info.identification_number"]},
+                "$patient_info.identification_number"
+            ]
+        }
+    ]
+}
 
 
 class DashboardStatisticsRepository:
@@ -13,6 +34,11 @@ class DashboardStatisticsRepository:
             self.excluded_entity_oid = ObjectId(self.excluded_entity_id)
         except:
             self.excluded_entity_oid = self.excluded_entity_id
+        self.rollup = CaseStatsDailyRepository(db)
+
+    def _rollup_exclusion(self) -> Dict[str, Any]:
+        # Mismo filtro de entidad excluida, sobre las filas del rollup
+        return {"entity_id": {"$nin": [self.excluded_entity_id, self.excluded_entity_oid]}}
 
     # Cantidad de casos por mes del año indicado.
     async def get_cases_by_month(self, year: int) -> Dict[str, Any]:
@@ -42,7 +68,13 @@ class DashboardStatisticsRepository:
             }
         ]
         
-        results = await self.collection.aggregate(pipeline).to_list(length=12)
+        if await self.rollup.is_ready():
+            results = await self.rollup.count_cases(
+                {"day": {"$gte": start_date, "$lt": end_date}, **self._rollup_exclusion()},
+                {"$month": "$day"},
+            )
+        else:
+            results = await self.collection.aggregate(pipeline).to_list(length=12)
         monthly_data = [0] * 12
         for result in results:
             month_index = result["_id"] - 1
@@ -82,7 +114,17 @@ class DashboardStatisticsRepository:
             }
         ]
         
-        results = await self.collection.aggregate(pipeline).to_list(length=12)
+        if await self.rollup.is_ready():
+            results = await self.rollup.count_cases(
+                {
+                    "day": {"$gte": start_date, "$lt": end_date},
+                    "pathologist_id": pathologist_code,
+                    **self._rollup_exclusion(),
+                },
+                {"$month": "$day"},
+            )
+        else:
+            results = await self.collection.aggregate(pipeline).to_list(length=12)
         monthly_data = [0] * 12
         for result in results:
             month_index = result["_id"] - 1
@@ -96,88 +138,46 @@ class DashboardStatisticsRepository:
     # Resumen del dashboard actual y mes anterior.
     async def get_dashboard_overview(self) -> Dict[str, Any]:
         now = datetime.now(timezone.utc)
-        current_month_start = datetime(now.year, now.month, 1, tzinfo=timezone.utc)
-        previous_month_start = (
-            datetime(now.year - 1, 12, 1, tzinfo=timezone.utc)
-            if now.month == 1
-            else datetime(now.year, now.month - 1, 1, tzinfo=timezone.utc)
-        )
-        next_month_start = (
-            datetime(now.year + 1, 1, 1, tzinfo=timezone.utc)
-            if now.month == 12
-            else datetime(now.year, now.month + 1, 1, tzinfo=timezone.utc)
-        )
-        
-        current_month_pipeline = [
-            {
-                "$match": {
-                    "created_at": {
-                        "$gte": current_month_start,
-                        "$lt": next_month_start
-                    },
-                    "patient_info.entity_info.id": {
-                        "$nin": [self.excluded_entity_id, self.excluded_entity_oid]
-                    }
-                }
-            },
-            {
-                "$count": "total"
-            }
-        ]
-        previous_month_pipeline = [
-            {
-                "$match": {
-                    "created_at": {
-                        "$gte": previous_month_start,
-                        "$lt": current_month_start
-                    },
-                    "patient_info.entity_info.id": {
-                        "$nin": [self.excluded_entity_id, self.excluded_entity_oid]
-                    }
-                }
-            },
-            {
-                "$count": "total"
-            }
-        ]
-        total_pipeline = [
-            {
-                "$match": {
-                    "patient_info.entity_info.id": {
-                        "$nin": [self.excluded_entity_id, self.excluded_entity_oid]
-                    }
-                }
-            },
-            {
-                "$count": "total"
-            }
-        ]
-        cases_by_state_pipeline = [
-            {
-                "$match": {
-                    "patient_info.entity_info.id": {
-                        "$nin": [self.excluded_entity_id, self.excluded_entity_oid]
-                    }
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$state",
-                    "count": {"$sum": 1}
-                }
-            }
-        ]
-        current_month_result = await self.collection.aggregate(current_month_pipeline).to_list(1)
-        previous_month_result = await self.collection.aggregate(previous_month_pipeline).to_list(1)
-        total_result = await self.collection.aggregate(total_pipeline).to_list(1)
-        cases_by_state_result = await self.collection.aggregate(cases_by_state_pipeline).to_list(length=None)
-        casos_mes_actual = current_month_result[0]["total"] if current_month_result else 0
-        casos_mes_anterior = previous_month_result[0]["total"] if previous_month_result else 0
-        total_casos = total_result[0]["total"] if total_result else 0
-        if casos_mes_anterior > 0:
-            cambio_porcentual = ((casos_mes_actual - casos_mes_anterior) / casos_mes_anterior) * 100
+        _, previous_month_start, current_month_start, next_month_start = self._month_starts(now)
+        if await self.rollup.is_ready():
+            # Dos lecturas del rollup: meses actual/anterior y conteo por estado (cuyo total es el global)
+            exclusion = self._rollup_exclusion()
+            by_month, cases_by_state_result = await asyncio.gather(
+                self.rollup.count_cases(
+                    {"day": {"$gte": previous_month_start, "$lt": next_month_start}, **exclusion},
+                    {"$gte": ["$day", current_month_start]},
+                ),
+                self.rollup.count_cases(exclusion, "$state"),
+            )
+            counts = {r["_id"]: r["count"] for r in by_month}
+            casos_mes_actual = counts.get(True, 0)
+            casos_mes_anterior = counts.get(False, 0)
         else:
-            cambio_porcentual = 100.0 if casos_mes_actual > 0 else 0.0
+            # Una sola agregación: los conteos por mes y por estado salen del mismo recorrido
+            pipeline = [
+                {"$match": self._exclusion_match()},
+                {"$project": {"created_at": 1, "state": 1}},
+                {
+                    "$facet": {
+                        "current": [
+                            {"$match": {"created_at": {"$gte": current_month_start, "$lt": next_month_start}}},
+                            {"$count": "total"},
+                        ],
+                        "previous": [
+                            {"$match": {"created_at": {"$gte": previous_month_start, "$lt": current_month_start}}},
+                            {"$count": "total"},
+                        ],
+                        "by_state": [{"$group": {"_id": "$state", "count": {"$sum": 1}}}],
+                    }
+                },
+            ]
+            result = await self.collection.aggregate(pipeline).to_list(1)
+            facets = result[0] if result else {}
+            casos_mes_actual = self._facet_total(facets, "current")
+            casos_mes_anterior = self._facet_total(facets, "previous")
+            cases_by_state_result = facets.get("by_state") or []
+        # Cada caso cae en exactamente un grupo de estado: la suma es el total
+        total_casos = sum(r["count"] for r in cases_by_state_result)
         casos_por_estado = {}
         for result in cases_by_state_result:
             casos_por_estado[result["_id"]] = result["count"]
@@ -185,585 +185,134 @@ class DashboardStatisticsRepository:
             "total_casos": total_casos,
             "casos_mes_actual": casos_mes_actual,
             "casos_mes_anterior": casos_mes_anterior,
-            "cambio_porcentual": round(cambio_porcentual, 2),
+            "cambio_porcentual": round(self._percent_change(casos_mes_actual, casos_mes_anterior), 2),
             "casos_por_estado": casos_por_estado,
         }
 
     async def get_metrics_general(self) -> Dict[str, Any]:
         """Obtener métricas generales del laboratorio"""
         now = datetime.now(timezone.utc)
-        current_month_start = datetime(now.year, now.month, 1, tzinfo=timezone.utc)
-        
-        # Mes anterior
-        if now.month == 1:
-            previous_month_start = datetime(now.year - 1, 12, 1, tzinfo=timezone.utc)
-        else:
-            previous_month_start = datetime(now.year, now.month - 1, 1, tzinfo=timezone.utc)
-
-        # Mes ante-anterior (dos meses atrás)
-        if now.month == 1:
-            two_months_ago_start = datetime(now.year - 1, 11, 1, tzinfo=timezone.utc)
-        elif now.month == 2:
-            two_months_ago_start = datetime(now.year - 1, 12, 1, tzinfo=timezone.utc)
-        else:
-            two_months_ago_start = datetime(now.year, now.month - 2, 1, tzinfo=timezone.utc)
-        
-        # Próximo mes para el rango
-        if now.month == 12:
-            next_month_start = datetime(now.year + 1, 1, 1, tzinfo=timezone.utc)
-        else:
-            next_month_start = datetime(now.year, now.month + 1, 1, tzinfo=timezone.utc)
-        
-        # Pipeline para pacientes del mes actual
-        current_month_patients_pipeline = [
-            {
-                "$match": {
-                    "created_at": {
-                        "$gte": current_month_start,
-                        "$lt": next_month_start
-                    }
-                }
-            },
-            {
-                "$addFields": {
-                    "patient_key": {
-                        "$ifNull": [
-                            "$patient_info.patient_code",
-                            {
-                                "$cond": [
-                                    {
-                                        "$and": [
-                                            {"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_type", ""]}}, 0]},
-                                            {"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_number", ""]}}, 0]}
-                                        ]
-                                    },
-                                    {"$concat": ["$patient_info.identification_type", "-", "$patient_info.identification_number"]},
-                                    "$patient_info.identification_number"
-                                ]
-                            }
-                        ]
-                    }
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$patient_key",
-                    "count": {"$sum": 1}
-                }
-            },
-            {
-                "$count": "total"
-            }
-        ]
-        
-        # Pipeline para pacientes del mes anterior
-        previous_month_patients_pipeline = [
-            {
-                "$match": {
-                    "created_at": {
-                        "$gte": previous_month_start,
-                        "$lt": current_month_start
-                    }
-                }
-            },
-            {
-                "$addFields": {
-                    "patient_key": {
-                        "$ifNull": [
-                            "$patient_info.patient_code",
-                            {
-                                "$cond": [
-                                    {
-                                        "$and": [
-                                            {"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_type", ""]}}, 0]},
-                                            {"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_number", ""]}}, 0]}
-                                        ]
-                                    },
-                                    {"$concat": ["$patient_info.identification_type", "-", "$patient_info.identification_number"]},
-                                    "$patient_info.identification_number"
-                                ]
-                            }
-                        ]
-                    }
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$patient_key",
-                    "count": {"$sum": 1}
-                }
-            },
-            {
-                "$count": "total"
-            }
-        ]
-
-        # Pipeline para pacientes del mes ante-anterior
-        two_months_ago_patients_pipeline = [
-            {
-                "$match": {
-                    "created_at": {
-                        "$gte": two_months_ago_start,
-                        "$lt": previous_month_start
-                    },
-                    "patient_info.entity_info.id": {
-                        "$nin": [self.excluded_entity_id, self.excluded_entity_oid]
-                    }
-                }
-            },
-            {
-                "$addFields": {
-                    "patient_key": {
-                        "$ifNull": [
-                            "$patient_info.patient_code",
-                            {
-                                "$cond": [
-                                    {
-                                        "$and": [
-                                            {"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_type", ""]}}, 0]},
-                                            {"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_number", ""]}}, 0]}
-                                        ]
-                                    },
-                                    {"$concat": ["$patient_info.identification_type", "-", "$patient_info.identification_number"]},
-                                    "$patient_info.identification_number"
-                                ]
-                            }
-                        ]
-                    }
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$patient_key",
-                    "count": {"$sum": 1}
-                }
-            },
-            {
-                "$count": "total"
-            }
-        ]
-        
-        # Pipeline para casos del mes actual
-        current_month_cases_pipeline = [
-            {
-                "$match": {
-                    "created_at": {
-                        "$gte": current_month_start,
-                        "$lt": next_month_start
-                    }
-                }
-            },
-            {
-                "$count": "total"
-            }
-        ]
-        
-        # Pipeline para casos del mes anterior
-        previous_month_cases_pipeline = [
-            {
-                "$match": {
-                    "created_at": {
-                        "$gte": previous_month_start,
-                        "$lt": current_month_start
-                    }
-                }
-            },
-            {
-                "$count": "total"
-            }
-        ]
-
-        # Pipeline para casos del mes ante-anterior
-        two_months_ago_cases_pipeline = [
-            {
-                "$match": {
-                    "created_at": {
-                        "$gte": two_months_ago_start,
-                        "$lt": previous_month_start
-                    },
-                    "patient_info.entity_info.id": {
-                        "$nin": [self.excluded_entity_id, self.excluded_entity_oid]
-                    }
-                }
-            },
-            {
-                "$count": "total"
-            }
-        ]
-        
-        # Ejecutar agregaciones
-        current_month_patients_result = await self.collection.aggregate(current_month_patients_pipeline).to_list(1)
-        previous_month_patients_result = await self.collection.aggregate(previous_month_patients_pipeline).to_list(1)
-        two_months_ago_patients_result = await self.collection.aggregate(two_months_ago_patients_pipeline).to_list(1)
-        current_month_cases_result = await self.collection.aggregate(current_month_cases_pipeline).to_list(1)
-        previous_month_cases_result = await self.collection.aggregate(previous_month_cases_pipeline).to_list(1)
-        two_months_ago_cases_result = await self.collection.aggregate(two_months_ago_cases_pipeline).to_list(1)
-        
-        # Procesar resultados
-        pacientes_mes_actual = current_month_patients_result[0]["total"] if current_month_patients_result else 0
-        pacientes_mes_anterior = previous_month_patients_result[0]["total"] if previous_month_patients_result else 0
-        pacientes_mes_ante_anterior = two_months_ago_patients_result[0]["total"] if two_months_ago_patients_result else 0
-        casos_mes_actual = current_month_cases_result[0]["total"] if current_month_cases_result else 0
-        casos_mes_anterior = previous_month_cases_result[0]["total"] if previous_month_cases_result else 0
-        casos_mes_ante_anterior = two_months_ago_cases_result[0]["total"] if two_months_ago_cases_result else 0
-        
-        # Calcular cambios porcentuales con ventanas rodantes de 30 días
-        from datetime import timedelta
+        two_months_ago_start, previous_month_start, current_month_start, next_month_start = self._month_starts(now)
         last30_start = now - timedelta(days=30)
         prev30_start = now - timedelta(days=60)
-        prev30_end = last30_start
 
-        # Pacientes últimos 30 días (únicos por clave de paciente)
-        last30_patients_pipeline = [
-            {
-                "$match": {
-                    "created_at": {"$gte": last30_start, "$lt": now},
-                    "patient_info.entity_info.id": {
-                        "$nin": [self.excluded_entity_id, self.excluded_entity_oid]
-                    }
-                }
-            },
-            {"$addFields": {"patient_key": {"$ifNull": ["$patient_info.patient_code", {"$cond": [{"$and": [{"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_type", ""]}}, 0]}, {"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_number", ""]}}, 0]}]}, {"$concat": ["$patient_info.identification_type", "-", "$patient_info.identification_number"]}, "$patient_info.identification_number"]}]}}},
-            {"$group": {"_id": "$patient_key", "count": {"$sum": 1}}},
-            {"$count": "total"}
-        ]
-        prev30_patients_pipeline = [
-            {
-                "$match": {
-                    "created_at": {"$gte": prev30_start, "$lt": prev30_end},
-                    "patient_info.entity_info.id": {
-                        "$nin": [self.excluded_entity_id, self.excluded_entity_oid]
-                    }
-                }
-            },
-            {"$addFields": {"patient_key": {"$ifNull": ["$patient_info.patient_code", {"$cond": [{"$and": [{"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_type", ""]}}, 0]}, {"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_number", ""]}}, 0]}]}, {"$concat": ["$patient_info.identification_type", "-", "$patient_info.identification_number"]}, "$patient_info.identification_number"]}]}}},
-            {"$group": {"_id": "$patient_key", "count": {"$sum": 1}}},
-            {"$count": "total"}
-        ]
+        # (inicio, fin, excluir entidad, pacientes únicos); los meses actual y anterior no excluyen la entidad
+        counts = await self._windowed_counts({}, {
+            "pacientes_mes_actual": (current_month_start, next_month_start, False, True),
+            "pacientes_mes_anterior": (previous_month_start, current_month_start, False, True),
+            "pacientes_mes_ante_anterior": (two_months_ago_start, previous_month_start, True, True),
+            "casos_mes_actual": (current_month_start, next_month_start, False, False),
+            "casos_mes_anterior": (previous_month_start, current_month_start, False, False),
+            "casos_mes_ante_anterior": (two_months_ago_start, previous_month_start, True, False),
+            "pacientes_last30": (last30_start, now, True, True),
+            "pacientes_prev30": (prev30_start, last30_start, True, True),
+            "casos_last30": (last30_start, now, True, False),
+            "casos_prev30": (prev30_start, last30_start, True, False),
+        })
+        return self._metrics_response(counts)
 
-        # Casos últimos 30 días (conteo total)
-        last30_cases_pipeline = [
-            {
-                "$match": {
-                    "created_at": {"$gte": last30_start, "$lt": now},
-                    "patient_info.entity_info.id": {
-                        "$nin": [self.excluded_entity_id, self.excluded_entity_oid]
-                    }
-                }
-            },
-            {"$count": "total"}
-        ]
-        prev30_cases_pipeline = [
-            {
-                "$match": {
-                    "created_at": {"$gte": prev30_start, "$lt": prev30_end},
-                    "patient_info.entity_info.id": {
-                        "$nin": [self.excluded_entity_id, self.excluded_entity_oid]
-                    }
-                }
-            },
-            {"$count": "total"}
-        ]
+    async def get_metrics_pathologist(self, pathologist_code: str) -> Dict[str, Any]:
+        """Obtener métricas específicas de un patólogo"""
+        now = datetime.now(timezone.utc)
+        two_months_ago_start, previous_month_start, current_month_start, next_month_start = self._month_starts(now)
+        last30_start = now - timedelta(days=30)
+        prev30_start = now - timedelta(days=60)
 
-        last30_patients_result = await self.collection.aggregate(last30_patients_pipeline).to_list(1)
-        prev30_patients_result = await self.collection.aggregate(prev30_patients_pipeline).to_list(1)
-        last30_cases_result = await self.collection.aggregate(last30_cases_pipeline).to_list(1)
-        prev30_cases_result = await self.collection.aggregate(prev30_cases_pipeline).to_list(1)
+        # (inicio, fin, excluir entidad, pacientes únicos); solo los casos del mes actual no excluyen la entidad
+        counts = await self._windowed_counts({"assigned_pathologist.id": pathologist_code}, {
+            "pacientes_mes_actual": (current_month_start, next_month_start, True, True),
+            "pacientes_mes_anterior": (previous_month_start, current_month_start, True, True),
+            "pacientes_mes_ante_anterior": (two_months_ago_start, previous_month_start, True, True),
+            "casos_mes_actual": (current_month_start, next_month_start, False, False),
+            "casos_mes_anterior": (previous_month_start, current_month_start, True, False),
+            "casos_mes_ante_anterior": (two_months_ago_start, previous_month_start, True, False),
+            "pacientes_last30": (last30_start, now, True, True),
+            "pacientes_prev30": (prev30_start, last30_start, True, True),
+            "casos_last30": (last30_start, now, True, False),
+            "casos_prev30": (prev30_start, last30_start, True, False),
+        })
+        return self._metrics_response(counts)
 
-        pacientes_last30 = last30_patients_result[0]["total"] if last30_patients_result else 0
-        pacientes_prev30 = prev30_patients_result[0]["total"] if prev30_patients_result else 0
-        casos_last30 = last30_cases_result[0]["total"] if last30_cases_result else 0
-        casos_prev30 = prev30_cases_result[0]["total"] if prev30_cases_result else 0
+    @staticmethod
+    def _month_starts(now: datetime) -> Tuple[datetime, datetime, datetime, datetime]:
+        # Inicio del mes ante-anterior, anterior, actual y siguiente
+        def shift(months: int) -> datetime:
+            index = now.year * 12 + (now.month - 1) + months
+            return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
 
-        if pacientes_prev30 > 0:
-            pacientes_cambio = ((pacientes_last30 - pacientes_prev30) / pacientes_prev30) * 100
-        else:
-            pacientes_cambio = 100.0 if pacientes_last30 > 0 else 0.0
-        
-        if casos_prev30 > 0:
-            casos_cambio = ((casos_last30 - casos_prev30) / casos_prev30) * 100
-        else:
-            casos_cambio = 100.0 if casos_last30 > 0 else 0.0
-        
-        return {
-            "pacientes": {
-                "mes_actual": pacientes_mes_actual,
-                "mes_anterior": pacientes_mes_anterior,
-                "mes_anterior_anterior": pacientes_mes_ante_anterior,
-                "cambio_porcentual": round(pacientes_cambio, 2)
-            },
-            "casos": {
-                "mes_actual": casos_mes_actual,
-                "mes_anterior": casos_mes_anterior,
-                "mes_anterior_anterior": casos_mes_ante_anterior,
-                "cambio_porcentual": round(casos_cambio, 2)
-            }
-        }
+        return shift(-2), shift(-1), shift(0), shift(1)
 
-    async def get_metrics_pathologist(self, pathologist_code: str) -> Dict[str, Any]:
-        """Obtener métricas específicas de un patólogo"""
-        now = datetime.now(timezone.utc)
-        current_month_start = datetime(now.year, now.month, 1, tzinfo=timezone.utc)
-        
-        # Mes anterior
-        if now.month == 1:
-            previous_month_start = datetime(now.year - 1, 12, 1, tzinfo=timezone.utc)
-        else:
-            previous_month_start = datetime(now.year, now.month - 1, 1, tzinfo=timezone.utc)
+    @staticmethod
+    def _percent_change(current: int, previous: int) -> float:
+        if previous > 0:
+            return ((current - previous) / previous) * 100
+        return 100.0 if current > 0 else 0.0
 
-        # Mes ante-anterior (dos meses atrás)
-        if now.month == 1:
-            two_months_ago_start = datetime(now.year - 1, 11, 1, tzinfo=timezone.utc)
-        elif now.month == 2:
-            two_months_ago_start = datetime(now.year - 1, 12, 1, tzinfo=timezone.utc)
-        else:
-            two_months_ago_start = datetime(now.year, now.month - 2, 1, tzinfo=timezone.utc)
-        
-        # Próximo mes para el rango
-        if now.month == 12:
-            next_month_start = datetime(now.year + 1, 1, 1, tzinfo=timezone.utc)
-        else:
-            next_month_start = datetime(now.year, now.month + 1, 1, tzinfo=timezone.utc)
-        
-        # Pipeline para pacientes del patólogo en el mes actual
-        current_month_patients_pipeline = [
-            {
-                "$match": {
-                    "created_at": {
-                        "$gte": current_month_start,
-                        "$lt": next_month_start
-                    },
-                    "assigned_pathologist.id": pathologist_code,
-                    "patient_info.entity_info.id": {
-                        "$nin": [self.excluded_entity_id, self.excluded_entity_oid]
-                    }
-                }
-            },
-            {"$addFields": {"patient_key": {"$ifNull": ["$patient_info.patient_code", {"$cond": [{"$and": [{"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_type", ""]}}, 0]}, {"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_number", ""]}}, 0]}]}, {"$concat": ["$patient_info.identification_type", "-", "$patient_info.identification_number"]}, "$patient_info.identification_number"]}]}}},
-            {
-                "$group": {
-                    "_id": "$patient_key",
-                    "count": {"$sum": 1}
-                }
-            },
-            {
-                "$count": "total"
-            }
-        ]
-        
-        # Pipeline para pacientes del patólogo en el mes anterior
-        previous_month_patients_pipeline = [
-            {
-                "$match": {
-                    "created_at": {
-                        "$gte": previous_month_start,
-                        "$lt": current_month_start
-                    },
-                    "assigned_pathologist.id": pathologist_code,
-                    "patient_info.entity_info.id": {
-                        "$nin": [self.excluded_entity_id, self.excluded_entity_oid]
-                    }
-                }
-            },
-            {"$addFields": {"patient_key": {"$ifNull": ["$patient_info.patient_code", {"$cond": [{"$and": [{"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_type", ""]}}, 0]}, {"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_number", ""]}}, 0]}]}, {"$concat": ["$patient_info.identification_type", "-", "$patient_info.identification_number"]}, "$patient_info.identification_number"]}]}}},
-            {
-                "$group": {
-                    "_id": "$patient_key",
-                    "count": {"$sum": 1}
-                }
-            },
-            {
-                "$count": "total"
-            }
-        ]
+    @staticmethod
+    def _facet_total(facets: Dict[str, Any], name: str) -> int:
+        values = facets.get(name) or []
+        return values[0].get("total", 0) if values else 0
 
-        # Pipeline para pacientes del patólogo en el mes ante-anterior
-        two_months_ago_patients_pipeline = [
-            {
-                "$match": {
-                    "created_at": {
-                        "$gte": two_months_ago_start,
-                        "$lt": previous_month_start
-                    },
-                    "assigned_pathologist.id": pathologist_code,
-                    "patient_info.entity_info.id": {
-                        "$nin": [self.excluded_entity_id, self.excluded_entity_oid]
-                    }
-                }
-            },
-            {"$addFields": {"patient_key": {"$ifNull": ["$patient_info.patient_code", {"$cond": [{"$and": [{"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_type", ""]}}, 0]}, {"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_number", ""]}}, 0]}]}, {"$concat": ["$patient_info.identification_type", "-", "$patient_info.identification_number"]}, "$patient_info.identification_number"]}]}}},
-            {
-                "$group": {
-                    "_id": "$patient_key",
-                    "count": {"$sum": 1}
-                }
-            },
-            {
-                "$count": "total"
-            }
-        ]
-        
-        # Pipeline para casos del patólogo en el mes actual
-        current_month_cases_pipeline = [
-            {
-                "$match": {
-                    "created_at": {
-                        "$gte": current_month_start,
-                        "$lt": next_month_start
-                    },
-                    "assigned_pathologist.id": pathologist_code
-                }
-            },
-            {
-                "$count": "total"
-            }
-        ]
-        
-        # Pipeline para casos del patólogo en el mes anterior
-        previous_month_cases_pipeline = [
-            {
-                "$match": {
-                    "created_at": {
-                        "$gte": previous_month_start,
-                        "$lt": current_month_start
-                    },
-                    "assigned_pathologist.id": pathologist_code,
-                    "patient_info.entity_info.id": {
-                        "$nin": [self.excluded_entity_id, self.excluded_entity_oid]
-                    }
-                }
-            },
-            {
-                "$count": "total"
-            }
-        ]
+    def _exclusion_match(self) -> Dict[str, Any]:
+        return {"patient_info.entity_info.id": {"$nin": [self.excluded_entity_id, self.excluded_entity_oid]}}
 
-        # Pipeline para casos del patólogo en el mes ante-anterior
-        two_months_ago_cases_pipeline = [
-            {
-                "$match": {
-                    "created_at": {
-                        "$gte": two_months_ago_start,
-                        "$lt": previous_month_start
-                    },
-                    "assigned_pathologist.id": pathologist_code,
-                    "patient_info.entity_info.id": {
-                        "$nin": [self.excluded_entity_id, self.excluded_entity_oid]
-                    }
-                }
-            },
-            {
-                "$count": "total"
-            }
-        ]
-        
-        # Ejecutar agregaciones
-        current_month_patients_result = await self.collection.aggregate(current_month_patients_pipeline).to_list(1)
-        previous_month_patients_result = await self.collection.aggregate(previous_month_patients_pipeline).to_list(1)
-        two_months_ago_patients_result = await self.collection.aggregate(two_months_ago_patients_pipeline).to_list(1)
-        current_month_cases_result = await self.collection.aggregate(current_month_cases_pipeline).to_list(1)
-        previous_month_cases_result = await self.collection.aggregate(previous_month_cases_pipeline).to_list(1)
-        two_months_ago_cases_result = await self.collection.aggregate(two_months_ago_cases_pipeline).to_list(1)
-        
-        # Procesar resultados
-        pacientes_mes_actual = current_month_patients_result[0]["total"] if current_month_patients_result else 0
-        pacientes_mes_anterior = previous_month_patients_result[0]["total"] if previous_month_patients_result else 0
-        pacientes_mes_ante_anterior = two_months_ago_patients_result[0]["total"] if two_months_ago_patients_result else 0
-        casos_mes_actual = current_month_cases_result[0]["total"] if current_month_cases_result else 0
-        casos_mes_anterior = previous_month_cases_result[0]["total"] if previous_month_cases_result else 0
-        casos_mes_ante_anterior = two_months_ago_cases_result[0]["total"] if two_months_ago_cases_result else 0
-        
-        # Calcular cambios porcentuales con ventanas rodantes de 30 días (filtrando por patólogo)
-        from datetime import timedelta
-        last30_start = now - timedelta(days=30)
-        prev30_start = now - timedelta(days=60)
-        prev30_end = last30_start
+    @staticmethod
+    def windowed_match(base_match: Dict[str, Any], start: datetime, end: datetime) -> Dict[str, Any]:
+        """$match inicial de los conteos por ventana: la ventana más amplia, sin excluir entidad."""
+        return {**base_match, "created_at": {"$gte": start, "$lt": end}}
 
-        last30_patients_pipeline = [
-            {
-                "$match": {
-                    "created_at": {"$gte": last30_start, "$lt": now},
-                    "assigned_pathologist.id": pathologist_code,
-                    "patient_info.entity_info.id": {
-                        "$nin": [self.excluded_entity_id, self.excluded_entity_oid]
-                    }
-                }
-            },
-            {"$addFields": {"patient_key": {"$ifNull": ["$patient_info.patient_code", {"$cond": [{"$and": [{"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_type", ""]}}, 0]}, {"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_number", ""]}}, 0]}]}, {"$concat": ["$patient_info.identification_type", "-", "$patient_info.identification_number"]}, "$patient_info.identification_number"]}]}}},
-            {"$group": {"_id": "$patient_key", "count": {"$sum": 1}}},
-            {"$count": "total"}
-        ]
-        prev30_patients_pipeline = [
-            {
-                "$match": {
-                    "created_at": {"$gte": prev30_start, "$lt": prev30_end},
-                    "assigned_pathologist.id": pathologist_code,
-                    "patient_info.entity_info.id": {
-                        "$nin": [self.excluded_entity_id, self.excluded_entity_oid]
-                    }
-                }
-            },
-            {"$addFields": {"patient_key": {"$ifNull": ["$patient_info.patient_code", {"$cond": [{"$and": [{"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_type", ""]}}, 0]}, {"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_number", ""]}}, 0]}]}, {"$concat": ["$patient_info.identification_type", "-", "$patient_info.identification_number"]}, "$patient_info.identification_number"]}]}}},
-            {"$group": {"_id": "$patient_key", "count": {"$sum": 1}}},
-            {"$count": "total"}
-        ]
+    async def _windowed_counts(
+        self,
+        base_match: Dict[str, Any],
+        windows: Dict[str, Tuple[datetime, datetime, bool, bool]],
+    ) -> Dict[str, int]:
+        """
+        Contar casos (o pacientes únicos) de varias ventanas de fecha en una sola agregación:
+        un $match sobre la ventana más amplia y un $facet por conteo.
+        """
+        facets: Dict[str, List[Dict[str, Any]]] = {}
+        for name, (start, end, exclude_entity, distinct_patients) in windows.items():
+            window_match: Dict[str, Any] = {"created_at": {"$gte": start, "$lt": end}}
+            if exclude_entity:
+                window_match.update(self._exclusion_match())
+            stages: List[Dict[str, Any]] = [{"$match": window_match}]
+            if distinct_patients:
+                stages.append({"$group": {"_id": PATIENT_KEY}})
+            stages.append({"$count": "total"})
+            facets[name] = stages
 
-        last30_cases_pipeline = [
+        widest_start = min(start for start, _, _, _ in windows.values())
+        widest_end = max(end for _, end, _, _ in windows.values())
+        pipeline = [
+            {"$match": self.windowed_match(base_match, widest_start, widest_end)},
             {
-                "$match": {
-                    "created_at": {"$gte": last30_start, "$lt": now},
-                    "assigned_pathologist.id": pathologist_code,
-                    "patient_info.entity_info.id": {
-                        "$nin": [self.excluded_entity_id, self.excluded_entity_oid]
-                    }
+                "$project": {
+                    "created_at": 1,
+                    "patient_info.entity_info.id": 1,
+                    "patient_info.patient_code": 1,
+                    "patient_info.identification_type": 1,
+                    "patient_info.identification_number": 1,
                 }
             },
-            {"$count": "total"}
+            {"$facet": facets},
         ]
-        prev30_cases_pipeline = [
-            {
-                "$match": {
-                    "created_at": {"$gte": prev30_start, "$lt": prev30_end},
-                    "assigned_pathologist.id": pathologist_code,
-                    "patient_info.entity_info.id": {
-                        "$nin": [self.excluded_entity_id, self.excluded_entity_oid]
-                    }
-                }
-            },
-            {"$count": "total"}
-        ]
-
-        last30_patients_result = await self.collection.aggregate(last30_patients_pipeline).to_list(1)
-        prev30_patients_result = await self.collection.aggregate(prev30_patients_pipeline).to_list(1)
-        last30_cases_result = await self.collection.aggregate(last30_cases_pipeline).to_list(1)
-        prev30_cases_result = await self.collection.aggregate(prev30_cases_pipeline).to_list(1)
+        result = await self.collection.aggregate(pipeline).to_list(1)
+        row = result[0] if result else {}
+        return {name: self._facet_total(row, name) for name in windows}
 
-        pacientes_last30 = last30_patients_result[0]["total"] if last30_patients_result else 0
-        pacientes_prev30 = prev30_patients_result[0]["total"] if prev30_patients_result else 0
-        casos_last30 = last30_cases_result[0]["total"] if last30_cases_result else 0
-        casos_prev30 = prev30_cases_result[0]["total"] if prev30_cases_result else 0
-
-        if pacientes_prev30 > 0:
-            pacientes_cambio = ((pacientes_last30 - pacientes_prev30) / pacientes_prev30) * 100
-        else:
-            pacientes_cambio = 100.0 if pacientes_last30 > 0 else 0.0
-        
-        if casos_prev30 > 0:
-            casos_cambio = ((casos_last30 - casos_prev30) / casos_prev30) * 100
-        else:
-            casos_cambio = 100.0 if casos_last30 > 0 else 0.0
-        
+    def _metrics_response(self, counts: Dict[str, int]) -> Dict[str, Any]:
+        # Los cambios porcentuales usan las ventanas rodantes de 30 días
         return {
             "pacientes": {
-                "mes_actual": pacientes_mes_actual,
-                "mes_anterior": pacientes_mes_anterior,
-                "mes_anterior_anterior": pacientes_mes_ante_anterior,
-                "cambio_porcentual": round(pacientes_cambio, 2)
+                "mes_actual": counts["pacientes_mes_actual"],
+                "mes_anterior": counts["pacientes_mes_anterior"],
+                "mes_anterior_anterior": counts["pacientes_mes_ante_anterior"],
+                "cambio_porcentual": round(self._percent_change(counts["pacientes_last30"], counts["pacientes_prev30"]), 2)
             },
             "casos": {
-                "mes_actual": casos_mes_actual,
-                "mes_anterior": casos_mes_anterior,
-                "mes_anterior_anterior": casos_mes_ante_anterior,
-                "cambio_porcentual": round(casos_cambio, 2)
+                "mes_actual": counts["casos_mes_actual"],
+                "mes_anterior": counts["casos_mes_anterior"],
+                "mes_anterior_anterior": counts["casos_mes_ante_anterior"],
+                "cambio_porcentual": round(self._percent_change(counts["casos_last30"], counts["casos_prev30"]), 2)
             }
         }
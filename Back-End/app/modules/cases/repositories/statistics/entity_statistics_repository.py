@@ -1,11 +1,34 @@
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.modules.cases.repositories.statistics.case_stats_daily_repository import (
+    CaseStatsDailyRepository,
+    group_rows,
+    round_or_none,
+)
+from app.modules.cases.repositories.statistics.case_tests_repository import CaseTestsRepository
+from app.modules.cases.repositories.statistics.name_filters import StatisticsNameResolver, merge_match
 
 
 class EntityStatisticsRepository:
     def __init__(self, database: AsyncIOMotorDatabase):
         self.collection = database.cases
+        self.rollup = CaseStatsDailyRepository(database)
+        self.case_tests = CaseTestsRepository(database)
+        self.names = StatisticsNameResolver(database)
+
+    @staticmethod
+    def completed_match(start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+        """$match de casos completados firmados en el rango sobre `cases`."""
+        return {"state": "Completado", "signed_at": {"$gte": start_date, "$lt": end_date}}
+
+    async def _completed_rows(
+        self, kind: str, start_date: datetime, end_date: datetime, filters: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        # Filas del rollup de casos completados firmados en el rango
+        return await self.rollup.find_rows(
+            kind, "signed_day", start_date, end_date, {"state": "Completado", **filters}
+        )
 
     # Rendimiento mensual por entidad (solo casos completados).
     async def get_monthly_entity_performance(
@@ -17,12 +40,11 @@ class EntityStatisticsRepository:
         start_date = datetime(year, month, 1)
         end_date = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
         match_conditions = {
-            "state": "Completado",
-            "signed_at": {"$gte": start_date, "$lt": end_date},
+            **self.completed_match(start_date, end_date),
             "patient_info.entity_info.name": {"$exists": True, "$ne": None, "$ne": ""}
         }
         if entity_name:
-            match_conditions["patient_info.entity_info.name"] = {"$regex": entity_name.strip(), "$options": "i"}
+            merge_match(match_conditions, await self.names.entity_match(entity_name.strip()))
         
         pipeline = [
             {"$match": match_conditions},
@@ -69,11 +91,32 @@ class EntityStatisticsRepository:
             {"$sort": {"total": -1}}
         ]
         
-        results = await self.collection.aggregate(pipeline).to_list(length=1000)
+        if await self.rollup.is_ready():
+            rollup_filters: Dict[str, Any] = {"entity_name": {"$nin": [None, ""]}}
+            if entity_name:
+                merge_match(rollup_filters, await self.names.entity_match(entity_name.strip(), rollup=True))
+            rows = await self._completed_rows("case", start_date, end_date, rollup_filters)
+            grouped = group_rows(rows, lambda r: (r.get("entity_name"), r.get("entity_id")))
+            care = group_rows(rows, lambda r: (r.get("entity_name"), r.get("entity_id"), r.get("care_type")))
+            results = []
+            for (name, code), bucket in grouped.items():
+                ambulatorios = care.get((name, code, "Ambulatorio"))
+                hospitalizados = care.get((name, code, "Hospitalizado"))
+                results.append({
+                    "ambulatorios": ambulatorios.cases if ambulatorios else 0,
+                    "hospitalizados": hospitalizados.cases if hospitalizados else 0,
+                    "nombre": name,
+                    "codigo": code,
+                    "total": bucket.cases,
+                    "avg_business_days": round_or_none(bucket.average()),
+                })
+            results.sort(key=lambda e: e["total"], reverse=True)
+        else:
+            results = await self.collection.aggregate(pipeline).to_list(length=1000)
         total_ambulatorios = sum(entity["ambulatorios"] for entity in results)
         total_hospitalizados = sum(entity["hospitalizados"] for entity in results)
         total_cases = sum(entity["total"] for entity in results)
-        weighted_days = sum(entity["avg_business_days"] * entity["total"] for entity in results)
+        weighted_days = sum((entity["avg_business_days"] or 0) * entity["total"] for entity in results)
         tiempo_promedio = weighted_days / total_cases if total_cases > 0 else 0
         
         summary = {
@@ -95,9 +138,8 @@ class EntityStatisticsRepository:
         start_date = datetime(year, month, 1)
         end_date = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
         match_conditions = {
-            "patient_info.entity_info.name": {"$regex": entity_name.strip(), "$options": "i"},
-            "state": "Completado",
-            "signed_at": {"$gte": start_date, "$lt": end_date}
+            **await self.names.entity_match(entity_name.strip()),
+            **self.completed_match(start_date, end_date),
         }
         basic_stats_pipeline = [
             {"$match": match_conditions},
@@ -146,6 +188,11 @@ class EntityStatisticsRepository:
             }
         ]
         
+        if await self.rollup.is_ready():
+            return await self._entity_details_from_rollup(
+                start_date, end_date, await self.names.entity_match(entity_name.strip(), rollup=True)
+            )
+
         basic_stats = await self.collection.aggregate(basic_stats_pipeline).to_list(length=None)
         basic_stats = basic_stats[0] if basic_stats else {
             "total_pacientes": 0,
@@ -207,7 +254,60 @@ class EntityStatisticsRepository:
             {"$limit": 10}
         ]
         
-        tests_results = await self.collection.aggregate(tests_pipeline).to_list(length=None)
+        tests_results = await self.case_tests.aggregate_tests(tests_pipeline, length=None)
+        return {
+            "detalles": {
+                "estadisticas_basicas": basic_stats,
+                "tiempos_procesamiento": business_days_stats,
+                "pruebas_mas_solicitadas": tests_results
+            }
+        }
+
+    async def _entity_details_from_rollup(
+        self, start_date: datetime, end_date: datetime, filters: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        # Mismo resultado que get_entity_details, calculado sobre case_stats_daily
+        case_rows = await self._completed_rows("case", start_date, end_date, filters)
+        test_rows = await self._completed_rows("test", start_date, end_date, filters)
+
+        total = group_rows(case_rows, lambda r: None).get(None)
+        if total is not None and total.cases:
+            care = group_rows(case_rows, lambda r: r.get("care_type"))
+            basic_stats = {
+                "total_pacientes": total.cases,
+                "ambulatorios": care["Ambulatorio"].cases if "Ambulatorio" in care else 0,
+                "hospitalizados": care["Hospitalizado"].cases if "Hospitalizado" in care else 0,
+                "promedio_muestras_por_paciente": round(total.samples / total.cases, 2),
+            }
+            business_days_stats = {
+                "minimo_dias": total.min_days,
+                "maximo_dias": total.max_days,
+                "promedio_dias": round_or_none(total.average()),
+                "muestras_completadas": total.cases,
+            }
+        else:
+            basic_stats = {
+                "total_pacientes": 0,
+                "ambulatorios": 0,
+                "hospitalizados": 0,
+                "promedio_muestras_por_paciente": 0
+            }
+            business_days_stats = {
+                "minimo_dias": 0,
+                "maximo_dias": 0,
+                "promedio_dias": 0,
+                "muestras_completadas": 0
+            }
+
+        tests = group_rows(test_rows, lambda r: (r.get("test_code"), r.get("test_name")))
+        tests_results = sorted(
+            (
+                {"total_solicitudes": bucket.cases, "codigo": code, "nombre": name}
+                for (code, name), bucket in tests.items()
+            ),
+            key=lambda t: t["total_solicitudes"],
+            reverse=True,
+        )[:10]
         return {
             "detalles": {
                 "estadisticas_basicas": basic_stats,
@@ -233,9 +333,8 @@ class EntityStatisticsRepository:
         pipeline = [
             {
                 "$match": {
-                    "patient_info.entity_info.name": {"$regex": entity_name.strip(), "$options": "i"},
-                    "state": "Completado",
-                    "signed_at": {"$gte": start_date, "$lt": end_date}
+                    **await self.names.entity_match(entity_name.strip()),
+                    **self.completed_match(start_date, end_date),
                 }
             },
             {
@@ -271,7 +370,27 @@ class EntityStatisticsRepository:
             {"$sort": {"total_casos": -1}}
         ]
         
-        results = await self.collection.aggregate(pipeline).to_list(length=None)
+        if await self.rollup.is_ready():
+            rows = await self._completed_rows(
+                "case", start_date, end_date, await self.names.entity_match(entity_name.strip(), rollup=True)
+            )
+            grouped = group_rows(rows, lambda r: (r.get("pathologist_id"), r.get("pathologist_name")))
+            results = sorted(
+                (
+                    {
+                        "total_casos": bucket.cases,
+                        "casos_completados": bucket.cases,
+                        "codigo": code,
+                        "nombre": name,
+                        "tiempo_promedio": round_or_none(bucket.average()),
+                    }
+                    for (code, name), bucket in grouped.items()
+                ),
+                key=lambda p: p["total_casos"],
+                reverse=True,
+            )
+        else:
+            results = await self.collection.aggregate(pipeline).to_list(length=None)
         return {"patologos": results}
     
     async def debug_unique_entities(self, month: int, year: int) -> Dict[str, Any]:
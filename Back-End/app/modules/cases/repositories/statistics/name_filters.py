@@ -0,0 +1,165 @@
+"""
+Filtros por id canónico para las estadísticas.
+
+Los endpoints reciben nombres (o abreviaturas) de entidad y patólogo y filtraban
+`cases` con regex sin anclar e insensibles a mayúsculas, que no pueden usar
+índices. Aquí el nombre se resuelve contra los catálogos `entities` y
+`pathologists` (tabla nombre -> ids cacheada por proceso con TTL) y el filtro se
+expresa sobre `patient_info.entity_info.id` / `assigned_pathologist.id`, que sí
+están indexados. Si el nombre no corresponde a nada del catálogo se conserva el
+regex original, de modo que un texto libre sigue funcionando como antes.
+"""
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import re
+import time
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.config.settings import settings
+
+# (campo de id, campo de nombre) en `cases` y en las filas del rollup
+CASE_FIELDS = {
+    "entity": ("patient_info.entity_info.id", "patient_info.entity_info.name"),
+    "pathologist": ("assigned_pathologist.id", "assigned_pathologist.name"),
+}
+ROLLUP_FIELDS = {
+    "entity": ("entity_id", "entity_name"),
+    "pathologist": ("pathologist_id", "pathologist_name"),
+}
+
+CatalogRows = List[Tuple[str, List[str]]]
+
+
+class CatalogTables:
+    """Tablas nombre -> ids de los catálogos, cacheadas con TTL (por proceso)."""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._tables: Dict[str, Tuple[float, CatalogRows]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _fresh(self, kind: str) -> Optional[CatalogRows]:
+        entry = self._tables.get(kind)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    async def get(self, kind: str, loader: Callable[[], Awaitable[CatalogRows]]) -> CatalogRows:
+        rows = self._fresh(kind)
+        if rows is not None:
+            return rows
+        # Una sola carga aunque lleguen varias peticiones a la vez
+        async with self._locks.setdefault(kind, asyncio.Lock()):
+            rows = self._fresh(kind)
+            if rows is None:
+                rows = await loader()
+                self._tables[kind] = (time.monotonic() + self.ttl_seconds, rows)
+            return rows
+
+    def invalidate(self, kind: Optional[str] = None) -> None:
+        if kind is None:
+            self._tables.clear()
+        else:
+            self._tables.pop(kind, None)
+
+
+catalog_tables = CatalogTables(ttl_seconds=settings.STATISTICS_NAME_LOOKUP_TTL_SECONDS)
+
+
+def invalidate_name_lookup(kind: Optional[str] = None) -> None:
+    """Hook para los servicios de entidades y patólogos al crear, renombrar o borrar."""
+    catalog_tables.invalidate(kind)
+
+
+def with_object_ids(ids: Iterable[str]) -> List[Any]:
+    """Ids en string más su forma ObjectId cuando son válidos (datos antiguos guardan el _id tipado)."""
+    typed: List[Any] = []
+    for value in ids:
+        typed.append(value)
+        if ObjectId.is_valid(value):
+            typed.append(ObjectId(value))
+    return typed
+
+
+def merge_match(match: Dict[str, Any], fragment: Dict[str, Any]) -> Dict[str, Any]:
+    """Agregar `fragment` a `match` combinando operadores si el campo ya tiene condición."""
+    for field, condition in fragment.items():
+        current = match.get(field)
+        if field == "$or" and current is not None:
+            match.setdefault("$and", []).append({"$or": condition})
+        elif isinstance(current, dict) and isinstance(condition, dict) and all(
+            key.startswith("$") for key in (*current, *condition)
+        ):
+            match[field] = {**current, **condition}
+        else:
+            match[field] = condition
+    return match
+
+
+class StatisticsNameResolver:
+    # Resuelve nombres de entidad/patólogo a filtros sobre ids indexados
+
+    def __init__(self, database: AsyncIOMotorDatabase):
+        self.entities = database.entities
+        self.pathologists = database.pathologists
+
+    async def _entity_table(self) -> CatalogRows:
+        async def load() -> CatalogRows:
+            docs = await self.entities.find({}, {"name": 1, "entity_code": 1}).to_list(length=None)
+            # Los casos guardan en entity_info.id el código de la entidad o, en datos antiguos, su _id
+            return [
+                (str(d.get("name") or ""), [str(v) for v in (d.get("entity_code"), d.get("_id")) if v])
+                for d in docs
+            ]
+
+        return await catalog_tables.get("entity", load)
+
+    async def _pathologist_table(self) -> CatalogRows:
+        async def load() -> CatalogRows:
+            docs = await self.pathologists.find({}, {"pathologist_name": 1, "pathologist_code": 1}).to_list(length=None)
+            return [
+                (str(d.get("pathologist_name") or ""), [str(d["pathologist_code"])] if d.get("pathologist_code") else [])
+                for d in docs
+            ]
+
+        return await catalog_tables.get("pathologist", load)
+
+    @staticmethod
+    def resolve(rows: CatalogRows, pattern: str, accept_codes: Iterable[str] = ()) -> Optional[List[str]]:
+        """Ids cuyo nombre coincide con `pattern` (regex, sin distinguir mayúsculas); None si ninguno."""
+        try:
+            regex = re.compile(pattern, re.IGNORECASE)
+        except re.error:
+            return None
+        ids = {i for name, row_ids in rows if regex.search(name) for i in row_ids}
+        known = {i for _, row_ids in rows for i in row_ids}
+        ids.update(code for code in accept_codes if code in known)
+        return sorted(ids) or None
+
+    async def entity_match(self, name: str, rollup: bool = False) -> Dict[str, Any]:
+        """Condición para filtrar por entidad (ids canónicos o el regex original)."""
+        id_field, name_field = (ROLLUP_FIELDS if rollup else CASE_FIELDS)["entity"]
+        if settings.STATISTICS_CANONICAL_FILTERS:
+            ids = self.resolve(await self._entity_table(), name)
+            if ids:
+                return {id_field: {"$in": with_object_ids(ids)}}
+        return {name_field: {"$regex": name, "$options": "i"}}
+
+    async def pathologist_match(self, name: str, rollup: bool = False, accept_code: bool = False) -> Dict[str, Any]:
+        """
+        Condición para filtrar por patólogo. Con `accept_code`, `name` también puede ser
+        el código del patólogo (equivale al `$or` id/nombre de los filtros originales).
+        """
+        id_field, name_field = (ROLLUP_FIELDS if rollup else CASE_FIELDS)["pathologist"]
+        if settings.STATISTICS_CANONICAL_FILTERS:
+            ids = self.resolve(await self._pathologist_table(), name, [name] if accept_code else ())
+            if ids:
+                return {id_field: {"$in": ids}}
+        regex = {name_field: {"$regex": name, "$options": "i"}}
+        if accept_code:
+            return {"$or": [{id_field: name}, regex]}
+        return regex
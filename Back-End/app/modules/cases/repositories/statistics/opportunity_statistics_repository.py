@@ -1,6 +1,13 @@
 from datetime import datetime, timedelta, timezone
+import asyncio
 from typing import Any, Dict, Optional, Union
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.modules.cases.repositories.statistics.case_stats_daily_repository import (
+    CaseStatsDailyRepository,
+    group_rows,
+    is_day_aligned,
+)
+from app.modules.cases.repositories.statistics.name_filters import StatisticsNameResolver, merge_match
 
 
 class OpportunityStatisticsRepository:
@@ -8,6 +15,31 @@ class OpportunityStatisticsRepository:
     def __init__(self, db: AsyncIOMotorDatabase):
         self.collection = db.cases
         self.excluded_entity_code = "HAMA"
+        self.rollup = CaseStatsDailyRepository(db)
+        self.names = StatisticsNameResolver(db)
+
+    async def _rollup_rows(
+        self, kind: str, start_date: datetime, end_date: datetime, filters: Optional[Dict[str, Any]] = None
+    ) -> list[Dict[str, Any]]:
+        # Filas del rollup completadas o por entregar, creadas en el rango y sin la entidad excluida
+        return await self.rollup.find_rows(kind, "day", start_date, end_date, merge_match({
+            "state": {"$in": ["Completado", "Por entregar"]},
+            "entity_id": {"$ne": self.excluded_entity_code},
+            "entity_code": {"$ne": self.excluded_entity_code},
+            "entity_short_code": {"$ne": self.excluded_entity_code},
+        }, filters or {}))
+
+    def opportunity_match(self, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+        """$match de oportunidad sobre `cases` (casos creados en el rango con días hábiles)."""
+        return {
+            "created_at": {"$gte": start_date, "$lt": end_date},
+            "state": {"$in": ["Completado", "Por entregar"]},
+            "business_days": {"$ne": None},
+            # Excluir Hospital Alma Máter por código (el código se guarda en id/entity_code/code)
+            "patient_info.entity_info.id": {"$ne": self.excluded_entity_code},
+            "patient_info.entity_info.entity_code": {"$ne": self.excluded_entity_code},
+            "patient_info.entity_info.code": {"$ne": self.excluded_entity_code},
+        }
 
     def _month_range(self, ref: Optional[datetime] = None) -> Dict[str, datetime]:
         # Calcula inicios de mes: actual, anterior y pre-anterior
@@ -38,35 +70,41 @@ class OpportunityStatisticsRepository:
         opportunity_days_threshold: int = 7,
     ) -> Dict[str, Any]:
         # Calcula porcentaje y tiempos dentro/fuera de oportunidad en un rango
-        match_stage: Dict[str, Any] = {
-            "created_at": {"$gte": start_date, "$lt": end_date},
-            # Excluir Hospital Alma Máter por código (el código se guarda en id/entity_code/code)
-            "patient_info.entity_info.id": {"$ne": self.excluded_entity_code},
-            "patient_info.entity_info.entity_code": {"$ne": self.excluded_entity_code},
-            "patient_info.entity_info.code": {"$ne": self.excluded_entity_code},
-        }
+        if is_day_aligned(start_date) and is_day_aligned(end_date) and await self.rollup.is_ready():
+            rows = await self._rollup_rows(
+                "case", start_date, end_date, {"pathologist_id": pathologist_code} if pathologist_code else None
+            )
+            bucket = group_rows(rows, lambda r: None).get(None)
+            # Los casos sin business_days no cuentan, igual que en el cálculo sobre documentos
+            if bucket is None:
+                return self._opportunity_result(0, 0, 0)
+            return self._opportunity_result(
+                bucket.days_count, bucket.within(opportunity_days_threshold), bucket.days_sum
+            )
+
+        match_stage = self.opportunity_match(start_date, end_date)
         if pathologist_code:
             match_stage["assigned_pathologist.id"] = pathologist_code
 
-        projection = {
-            "created_at": 1,
-            "state": 1,
-            "assigned_pathologist.id": 1,
-            "business_days": 1,
-            "_id": 0,
-        }
-
-        cursor = self.collection.find(match_stage, projection=projection)
-        docs = await cursor.to_list(length=None)
-
-        filtered = [
-            d for d in docs
-            if str(d.get("state")) in ["Completado", "Por entregar"]
-            and d.get("created_at")
-            and d.get("business_days") is not None
+        pipeline = [
+            {"$match": match_stage},
+            {
+                "$group": {
+                    "_id": None,
+                    "total": {"$sum": 1},
+                    "dentro": {"$sum": {"$cond": [{"$lte": ["$business_days", opportunity_days_threshold]}, 1, 0]}},
+                    "sum_days": {"$sum": "$business_days"},
+                }
+            },
         ]
+        result = await self.collection.aggregate(pipeline).to_list(1)
+        group = result[0] if result else {}
+        return self._opportunity_result(
+            int(group.get("total", 0)), int(group.get("dentro", 0)), float(group.get("sum_days", 0))
+        )
 
-        total_considerados = len(filtered)
+    @staticmethod
+    def _opportunity_result(total_considerados: int, dentro: int, sum_days: float) -> Dict[str, Any]:
         if total_considerados == 0:
             return {
                 "porcentaje_oportunidad": 0.0,
@@ -75,26 +113,11 @@ class OpportunityStatisticsRepository:
                 "casos_fuera_oportunidad": 0,
                 "total_casos_mes_anterior": 0,
             }
-
-        diffs_days = []
-        dentro = 0
-        fuera = 0
-        for d in filtered:
-            business_days: int = d["business_days"]
-            diffs_days.append(business_days)
-            if business_days <= opportunity_days_threshold:
-                dentro += 1
-            else:
-                fuera += 1
-
-        promedio = sum(diffs_days) / len(diffs_days) if diffs_days else 0.0
-        porcentaje = (dentro / total_considerados) * 100.0 if total_considerados else 0.0
-
         return {
-            "porcentaje_oportunidad": round(porcentaje, 2),
-            "tiempo_promedio": round(promedio, 2),
+            "porcentaje_oportunidad": round(dentro / total_considerados * 100.0, 2),
+            "tiempo_promedio": round(sum_days / total_considerados, 2),
             "casos_dentro_oportunidad": dentro,
-            "casos_fuera_oportunidad": fuera,
+            "casos_fuera_oportunidad": total_considerados - dentro,
             "total_casos_mes_anterior": total_considerados,
         }
 
@@ -106,18 +129,19 @@ class OpportunityStatisticsRepository:
 
         pre_prev_start = rng["pre_previous_month_start"]
 
-        current_metrics = await self._compute_opportunity_for_range(
-            start_date=prev_start,
-            end_date=curr_start,
-            pathologist_code=None,
-            opportunity_days_threshold=opportunity_days_threshold,
-        )
-
-        previous_metrics = await self._compute_opportunity_for_range(
-            start_date=pre_prev_start,
-            end_date=prev_start,
-            pathologist_code=None,
-            opportunity_days_threshold=opportunity_days_threshold,
+        current_metrics, previous_metrics = await asyncio.gather(
+            self._compute_opportunity_for_range(
+                start_date=prev_start,
+                end_date=curr_start,
+                pathologist_code=None,
+                opportunity_days_threshold=opportunity_days_threshold,
+            ),
+            self._compute_opportunity_for_range(
+                start_date=pre_prev_start,
+                end_date=prev_start,
+                pathologist_code=None,
+                opportunity_days_threshold=opportunity_days_threshold,
+            ),
         )
 
         prev_percent = previous_metrics.get("porcentaje_oportunidad", 0.0)
@@ -154,18 +178,19 @@ class OpportunityStatisticsRepository:
         curr_start = rng["current_month_start"]
         pre_prev_start = rng["pre_previous_month_start"]
 
-        current_metrics = await self._compute_opportunity_for_range(
-            start_date=prev_start,
-            end_date=curr_start,
-            pathologist_code=pathologist_code,
-            opportunity_days_threshold=opportunity_days_threshold,
-        )
-
-        previous_metrics = await self._compute_opportunity_for_range(
-            start_date=pre_prev_start,
-            end_date=prev_start,
-            pathologist_code=pathologist_code,
-            opportunity_days_threshold=opportunity_days_threshold,
+        current_metrics, previous_metrics = await asyncio.gather(
+            self._compute_opportunity_for_range(
+                start_date=prev_start,
+                end_date=curr_start,
+                pathologist_code=pathologist_code,
+                opportunity_days_threshold=opportunity_days_threshold,
+            ),
+            self._compute_opportunity_for_range(
+                start_date=pre_prev_start,
+                end_date=prev_start,
+                pathologist_code=pathologist_code,
+                opportunity_days_threshold=opportunity_days_threshold,
+            ),
         )
 
         prev_percent = previous_metrics.get("porcentaje_oportunidad", 0.0)
@@ -214,155 +239,217 @@ class OpportunityStatisticsRepository:
     ) -> dict:
         # Desglose mensual de oportunidad por pruebas y patólogos
         start, end = self._month_bounds(year, month)
+        by_month = await self._opportunity_by_month(start, end, threshold_days, entity, pathologist, breakdown=True)
+        return by_month.get(month) or _empty_opportunity()
 
-        match_stage: Dict[str, Any] = {
-            "state": {"$in": ["Completado", "Por entregar"]},
-            "created_at": {"$gte": start, "$lt": end},
-            # Excluir Hospital Alma Máter por código (el código se guarda en id/entity_code/code)
-            "patient_info.entity_info.id": {"$ne": self.excluded_entity_code},
-            "patient_info.entity_info.entity_code": {"$ne": self.excluded_entity_code},
-            "patient_info.entity_info.code": {"$ne": self.excluded_entity_code},
-        }
+    async def get_opportunity_by_month(
+        self,
+        year: int,
+        threshold_days: int = 7,
+        entity: Union[str, None] = None,
+        pathologist: Union[str, None] = None,
+        breakdown: bool = False,
+    ) -> list[dict]:
+        """Oportunidad de los 12 meses del año en una sola consulta (con desglose opcional)."""
+        start = datetime(year, 1, 1, tzinfo=timezone.utc)
+        end = datetime(year + 1, 1, 1, tzinfo=timezone.utc)
+        by_month = await self._opportunity_by_month(start, end, threshold_days, entity, pathologist, breakdown)
+        return [{"month": m, **(by_month.get(m) or _empty_opportunity(breakdown))} for m in range(1, 13)]
 
-        if entity:
-            match_stage["patient_info.entity_info.name"] = {"$regex": entity, "$options": "i"}
+    async def get_yearly_opportunity(self, year: int, threshold_days: int = 7) -> list[float]:
+        # Serie de 12 meses con porcentajes de oportunidad para un año
+        out: list[float] = []
+        for monthly in await self.get_opportunity_by_month(year, threshold_days):
+            total = monthly["summary"]["total"]
+            within = monthly["summary"]["within"]
+            out.append(round((within / total) * 100.0, 1) if total else 0.0)
+        return out
 
+    async def _opportunity_by_month(
+        self,
+        start: datetime,
+        end: datetime,
+        threshold_days: int,
+        entity: Union[str, None],
+        pathologist: Union[str, None],
+        breakdown: bool,
+    ) -> Dict[int, dict]:
+        # Resultado por número de mes; el rango debe caer dentro de un mismo año
+        if await self.rollup.is_ready():
+            return await self._opportunity_by_month_from_rollup(start, end, threshold_days, entity, pathologist, breakdown)
+
+        match_stage = self.opportunity_match(start, end)
+        if entity:
+            merge_match(match_stage, await self.names.entity_match(entity))
         if pathologist:
-            match_stage["$or"] = [
-                {"assigned_pathologist.id": pathologist},
-                {"assigned_pathologist.name": {"$regex": pathologist, "$options": "i"}},
+            merge_match(match_stage, await self.names.pathologist_match(pathologist, accept_code=True))
+
+        month = {"$month": "$created_at"}
+        within = {"$sum": {"$cond": [{"$lte": ["$business_days", threshold_days]}, 1, 0]}}
+        summary_stages = [
+            {
+                "$group": {
+                    "_id": month,
+                    "total": {"$sum": 1},
+                    "within": within,
+                    "sum_days": {"$sum": "$business_days"},
+                }
+            }
+        ]
+
+        def breakdown_stages(code_path: str, name_path: str) -> list[Dict[str, Any]]:
+            # Agrupar por código (o nombre si no hay código), igual que el desglose original
+            code = {"$ifNull": [{"$toString": code_path}, ""]}
+            name = {"$ifNull": [{"$toString": name_path}, ""]}
+            return [
+                {"$addFields": {"_key": {"$cond": [{"$ne": [code, ""]}, code, name]}}},
+                {"$match": {"_key": {"$ne": ""}}},
+                {
+                    "$group": {
+                        "_id": {"month": month, "key": "$_key"},
+                        "code": {"$first": code},
+                        "name": {"$first": name},
+                        "count": {"$sum": 1},
+                        "within": within,
+                        "sum_days": {"$sum": "$business_days"},
+                    }
+                },
             ]
 
         projection = {
             "created_at": 1,
-            "state": 1,
+            "business_days": 1,
             "assigned_pathologist.id": 1,
             "assigned_pathologist.name": 1,
-            "patient_info.entity_info.name": 1,
-            "patient_info.patient_code": 1,
-            "patient_info.created_at": 1,
             "samples.tests.id": 1,
             "samples.tests.name": 1,
-            "business_days": 1,
-            "_id": 0,
         }
-
-        cursor = self.collection.find(match_stage, projection=projection)
-        docs = await cursor.to_list(length=None)
-
-        tests_map: Dict[str, Dict[str, Any]] = {}
-        pat_map: Dict[str, Dict[str, Any]] = {}
-        total = 0
-        total_within = 0
-        sum_days_all = 0.0
-
-        for d in docs:
-            created_at: Optional[datetime] = d.get("created_at")
-            business_days: Optional[int] = d.get("business_days")
-            if not created_at or business_days is None:
-                continue
-            days = business_days
-            within = days <= threshold_days
-            total += 1
-            sum_days_all += days
-            if within:
-                total_within += 1
-
-            # Aggregate by tests
-            samples = d.get("samples") or []
-            for s in samples:
-                for t in s.get("tests", []) or []:
-                    code = str(t.get("id") or "")
-                    name = str(t.get("name") or "")
-                    if not code and not name:
-                        continue
-                    key = code or name
-                    rec = tests_map.get(key)
-                    if not rec:
-                        rec = {
-                            "code": code,
-                            "name": name,
-                            "within": 0,
-                            "out": 0,
-                            "sumDays": 0.0,
-                            "count": 0,
-                        }
-                        tests_map[key] = rec
-                    rec["sumDays"] += days
-                    rec["count"] += 1
-                    if within:
-                        rec["within"] += 1
-                    else:
-                        rec["out"] += 1
-
-            # Aggregate by pathologist
-            ap = d.get("assigned_pathologist") or {}
-            pcode = str(ap.get("id") or "")
-            pname = str(ap.get("name") or "")
-            pkey = pcode or pname
-            if pkey:
-                prec = pat_map.get(pkey)
-                if not prec:
-                    prec = {
-                        "code": pcode,
-                        "name": pname,
-                        "within": 0,
-                        "out": 0,
-                        "sumDays": 0.0,
-                        "count": 0,
+        if breakdown:
+            pipeline = [
+                {"$match": match_stage},
+                {"$project": projection},
+                {
+                    "$facet": {
+                        "summary": summary_stages,
+                        "pathologists": breakdown_stages("$assigned_pathologist.id", "$assigned_pathologist.name"),
+                        "tests": [
+                            {"$unwind": "$samples"},
+                            {"$unwind": "$samples.tests"},
+                            *breakdown_stages("$samples.tests.id", "$samples.tests.name"),
+                        ],
                     }
-                    pat_map[pkey] = prec
-                prec["sumDays"] += days
-                prec["count"] += 1
-                if within:
-                    prec["within"] += 1
-                else:
-                    prec["out"] += 1
-
-        def to_test_item(v: Dict[str, Any]) -> Dict[str, Any]:
-            count = max(1, int(v.get("count", 0)))
-            avg = (float(v.get("sumDays", 0.0)) / count) if count else 0.0
-            return {
-                "code": v.get("code", ""),
-                "name": v.get("name", ""),
-                "withinOpportunity": int(v.get("within", 0)),
-                "outOfOpportunity": int(v.get("out", 0)),
-                "averageDays": round(avg, 2),
+                },
+            ]
+            result = await self.collection.aggregate(pipeline, allowDiskUse=True).to_list(1)
+            facets = result[0] if result else {}
+        else:
+            pipeline = [{"$match": match_stage}, {"$project": {"created_at": 1, "business_days": 1}}, *summary_stages]
+            facets = {"summary": await self.collection.aggregate(pipeline).to_list(length=None)}
+
+        out: Dict[int, dict] = {}
+        for group in facets.get("summary") or []:
+            total = int(group.get("total", 0))
+            out[group["_id"]] = {
+                **_empty_opportunity(breakdown),
+                "summary": {
+                    "total": total,
+                    "within": int(group.get("within", 0)),
+                    "out": total - int(group.get("within", 0)),
+                    "averageDays": round(float(group.get("sum_days", 0)) / total, 2) if total else 0.0,
+                },
             }
+        for kind in ("tests", "pathologists") if breakdown else ():
+            for group in facets.get(kind) or []:
+                count = int(group.get("count", 0))
+                item = {
+                    "code": group.get("code", ""),
+                    "name": group.get("name", ""),
+                    "withinOpportunity": int(group.get("within", 0)),
+                    "outOfOpportunity": count - int(group.get("within", 0)),
+                    "averageDays": round(float(group.get("sum_days", 0)) / count, 2) if count else 0.0,
+                }
+                out.setdefault(group["_id"]["month"], _empty_opportunity(breakdown))[kind].append(item)
+        return out
+
+    async def _opportunity_by_month_from_rollup(
+        self,
+        start: datetime,
+        end: datetime,
+        threshold_days: int,
+        entity: Union[str, None],
+        pathologist: Union[str, None],
+        breakdown: bool,
+    ) -> Dict[int, dict]:
+        # Mismo resultado que _opportunity_by_month, sobre case_stats_daily
+        filters: Dict[str, Any] = {}
+        if entity:
+            merge_match(filters, await self.names.entity_match(entity, rollup=True))
+        if pathologist:
+            merge_match(filters, await self.names.pathologist_match(pathologist, rollup=True, accept_code=True))
+        if breakdown:
+            case_rows, test_rows = await asyncio.gather(
+                self._rollup_rows("case", start, end, filters),
+                self._rollup_rows("test", start, end, filters),
+            )
+        else:
+            case_rows, test_rows = await self._rollup_rows("case", start, end, filters), []
 
-        def to_pat_item(v: Dict[str, Any]) -> Dict[str, Any]:
-            count = max(1, int(v.get("count", 0)))
-            avg = (float(v.get("sumDays", 0.0)) / count) if count else 0.0
+        def to_item(code: Any, name: Any, bucket) -> Dict[str, Any]:
+            count = bucket.days_count
             return {
-                "code": v.get("code", ""),
-                "name": v.get("name", ""),
-                "withinOpportunity": int(v.get("within", 0)),
-                "outOfOpportunity": int(v.get("out", 0)),
-                "averageDays": round(avg, 2),
+                "code": code,
+                "name": name,
+                "withinOpportunity": bucket.within(threshold_days),
+                "outOfOpportunity": bucket.outside(threshold_days),
+                "averageDays": round(bucket.days_sum / count, 2) if count else 0.0,
             }
 
-        tests = [to_test_item(v) for v in tests_map.values()]
-        pathologists = [to_pat_item(v) for v in pat_map.values()]
-        avg_all = round((sum_days_all / total), 2) if total else 0.0
+        def items(rows: list[Dict[str, Any]], code_field: str, name_field: str) -> list[Dict[str, Any]]:
+            # Agrupar por código (o nombre si no hay código), como el desglose sobre documentos
+            labels: Dict[str, tuple[str, str]] = {}
 
-        return {
-            "tests": tests,
-            "pathologists": pathologists,
-            "summary": {
-                "total": total,
-                "within": total_within,
-                "out": total - total_within,
-                "averageDays": avg_all,
-            },
-        }
+            def key(row: Dict[str, Any]) -> str:
+                code, name = str(row.get(code_field) or ""), str(row.get(name_field) or "")
+                labels.setdefault(code or name, (code, name))
+                return code or name
 
-    async def get_yearly_opportunity(self, year: int, threshold_days: int = 7) -> list[float]:
-        # Serie de 12 meses con porcentajes de oportunidad para un año
-        out: list[float] = []
-        for m in range(1, 13):
-            monthly = await self.get_monthly_opportunity(m, year, threshold_days)
-            total = monthly.get("summary", {}).get("total", 0)
-            within = monthly.get("summary", {}).get("within", 0)
-            pct = round((within / total) * 100.0, 1) if total else 0.0
-            out.append(pct)
+            return [
+                to_item(*labels[k], bucket)
+                for k, bucket in group_rows(rows, key).items()
+                if k and bucket.days_count
+            ]
+
+        def by_month(rows: list[Dict[str, Any]]) -> Dict[int, list[Dict[str, Any]]]:
+            months: Dict[int, list[Dict[str, Any]]] = {}
+            for row in rows:
+                months.setdefault(row["day"].month, []).append(row)
+            return months
+
+        case_months, test_months = by_month(case_rows), by_month(test_rows)
+        out: Dict[int, dict] = {}
+        for month, rows in case_months.items():
+            overall = group_rows(rows, lambda r: None)[None]
+            total = overall.days_count
+            if not total:
+                continue
+            within = overall.within(threshold_days)
+            out[month] = {
+                **_empty_opportunity(breakdown),
+                "summary": {
+                    "total": total,
+                    "within": within,
+                    "out": total - within,
+                    "averageDays": round(overall.days_sum / total, 2),
+                },
+            }
+            if breakdown:
+                out[month]["tests"] = items(test_months.get(month, []), "test_code", "test_name")
+                out[month]["pathologists"] = items(rows, "pathologist_id", "pathologist_name")
         return out
+
+
+def _empty_opportunity(breakdown: bool = True) -> dict:
+    empty: dict = {"summary": {"total": 0, "within": 0, "out": 0, "averageDays": 0.0}}
+    if breakdown:
+        empty = {"tests": [], "pathologists": [], **empty}
+    return empty
@@ -1,12 +1,22 @@
 from typing import Dict, Any, List
 from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.modules.cases.repositories.statistics.case_stats_daily_repository import (
+    CaseStatsDailyRepository,
+    group_rows,
+    round_or_none,
+)
+from app.modules.cases.repositories.statistics.case_tests_repository import CaseTestsRepository
+from app.modules.cases.repositories.statistics.name_filters import StatisticsNameResolver, merge_match
 
 
 class PathologistStatisticsRepository:
     def __init__(self, database: AsyncIOMotorDatabase):
         self.collection = database["cases"]
         self.excluded_entity_code = "HAMA"
+        self.rollup = CaseStatsDailyRepository(database)
+        self.case_tests = CaseTestsRepository(database)
+        self.names = StatisticsNameResolver(database)
 
     def _exclude_entity_match(self) -> Dict[str, Any]:
         """Excluir entidad por código en entity_info."""
@@ -16,6 +26,26 @@ class PathologistStatisticsRepository:
             "patient_info.entity_info.code": {"$ne": self.excluded_entity_code},
         }
 
+    def performance_match(self, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+        """$match de rendimiento sobre `cases`: creados en el rango, completados o por entregar."""
+        return {
+            "state": {"$in": ["Completado", "Por entregar"]},
+            "created_at": {"$gte": start_date, "$lt": end_date},
+            **self._exclude_entity_match(),
+        }
+
+    async def _rollup_rows(
+        self, kind: str, start_date: datetime, end_date: datetime, filters: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        # Filas del rollup (creados en el rango, completados o por entregar, sin la entidad excluida)
+        return await self.rollup.find_rows(kind, "day", start_date, end_date, {
+            "state": {"$in": ["Completado", "Por entregar"]},
+            "entity_id": {"$ne": self.excluded_entity_code},
+            "entity_code": {"$ne": self.excluded_entity_code},
+            "entity_short_code": {"$ne": self.excluded_entity_code},
+            **filters,
+        })
+
     # Rendimiento mensual por patólogo (casos completados).
     async def get_pathologist_monthly_performance(
         self,
@@ -26,13 +56,9 @@ class PathologistStatisticsRepository:
     ) -> Dict[str, Any]:
         start_date = datetime(year, month, 1)
         end_date = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
-        match_conditions = {
-            "state": {"$in": ["Completado", "Por entregar"]},
-            "created_at": {"$gte": start_date, "$lt": end_date},
-            **self._exclude_entity_match()
-        }
+        match_conditions = self.performance_match(start_date, end_date)
         if pathologist_name:
-            match_conditions["assigned_pathologist.name"] = {"$regex": pathologist_name.strip(), "$options": "i"}
+            merge_match(match_conditions, await self.names.pathologist_match(pathologist_name.strip()))
         
         pipeline = [
             {"$match": match_conditions},
@@ -78,7 +104,25 @@ class PathologistStatisticsRepository:
             {"$sort": {"total_cases": -1}}
         ]
         
-        results = await self.collection.aggregate(pipeline).to_list(length=None)
+        if await self.rollup.is_ready():
+            filters = {}
+            if pathologist_name:
+                filters = await self.names.pathologist_match(pathologist_name.strip(), rollup=True)
+            rows = await self._rollup_rows("case", start_date, end_date, filters)
+            grouped = group_rows(rows, lambda r: (r.get("pathologist_id"), r.get("pathologist_name")))
+            ordered = sorted(grouped.items(), key=lambda item: item[1].cases, reverse=True)
+            results = [
+                {
+                    "code": code,
+                    "name": name,
+                    "withinOpportunity": bucket.within(threshold_days, include_missing=True),
+                    "outOfOpportunity": bucket.outside(threshold_days),
+                    "averageDays": round_or_none(bucket.average()),
+                }
+                for (code, name), bucket in ordered
+            ]
+        else:
+            results = await self.collection.aggregate(pipeline).to_list(length=None)
         return {"pathologists": results}
     
     # Entidades en las que trabaja un patólogo.
@@ -94,10 +138,8 @@ class PathologistStatisticsRepository:
         pipeline = [
             {
                 "$match": {
-                    "assigned_pathologist.name": {"$regex": pathologist_name.strip(), "$options": "i"},
-                    "state": {"$in": ["Completado", "Por entregar"]},
-                    "created_at": {"$gte": start_date, "$lt": end_date},
-                    **self._exclude_entity_match()
+                    **await self.names.pathologist_match(pathologist_name.strip()),
+                    **self.performance_match(start_date, end_date),
                 }
             },
             {
@@ -121,7 +163,21 @@ class PathologistStatisticsRepository:
             {"$sort": {"casesCount": -1}}
         ]
         
-        results = await self.collection.aggregate(pipeline).to_list(length=None)
+        if await self.rollup.is_ready():
+            rows = await self._rollup_rows(
+                "case", start_date, end_date, await self.names.pathologist_match(pathologist_name.strip(), rollup=True)
+            )
+            grouped = group_rows(rows, lambda r: (r.get("entity_name"), r.get("entity_short_code")))
+            results = sorted(
+                (
+                    {"casesCount": bucket.cases, "name": name, "codigo": code, "type": "Institución"}
+                    for (name, code), bucket in grouped.items()
+                ),
+                key=lambda e: e["casesCount"],
+                reverse=True,
+            )
+        else:
+            results = await self.collection.aggregate(pipeline).to_list(length=None)
         return {"entidades": results}
     
     # Pruebas asociadas a un patólogo.
@@ -137,10 +193,8 @@ class PathologistStatisticsRepository:
         pipeline = [
             {
                 "$match": {
-                    "assigned_pathologist.name": {"$regex": pathologist_name.strip(), "$options": "i"},
-                    "state": {"$in": ["Completado", "Por entregar"]},
-                    "created_at": {"$gte": start_date, "$lt": end_date},
-                    **self._exclude_entity_match()
+                    **await self.names.pathologist_match(pathologist_name.strip()),
+                    **self.performance_match(start_date, end_date),
                 }
             },
             {"$unwind": "$samples"},
@@ -166,7 +220,21 @@ class PathologistStatisticsRepository:
             {"$sort": {"count": -1}}
         ]
         
-        results = await self.collection.aggregate(pipeline).to_list(length=None)
+        if await self.rollup.is_ready():
+            rows = await self._rollup_rows(
+                "test", start_date, end_date, await self.names.pathologist_match(pathologist_name.strip(), rollup=True)
+            )
+            grouped = group_rows(rows, lambda r: (r.get("test_code"), r.get("test_name")))
+            results = sorted(
+                (
+                    {"count": bucket.cases, "name": name, "codigo": code, "category": "Laboratorio"}
+                    for (code, name), bucket in grouped.items()
+                ),
+                key=lambda t: t["count"],
+                reverse=True,
+            )
+        else:
+            results = await self.case_tests.aggregate_tests(pipeline, length=None)
         return {"pruebas": results}
     
     # Resumen de oportunidad (dentro/fuera) para un patólogo.
@@ -238,9 +306,7 @@ class PathologistStatisticsRepository:
             {
                 "$match": {
                     "pathologist.name": pathologist_name.strip(),
-                    "state": {"$in": ["Completado", "Por entregar"]},
-                    "created_at": {"$gte": start_date, "$lt": end_date},
-                    **self._exclude_entity_match()
+                    **self.performance_match(start_date, end_date),
                 }
             },
             {
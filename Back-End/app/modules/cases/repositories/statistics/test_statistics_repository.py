@@ -1,12 +1,73 @@
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.modules.cases.repositories.statistics.case_stats_daily_repository import (
+    CaseStatsDailyRepository,
+    RollupBucket,
+    group_rows,
+    round_or_none,
+)
+from app.modules.cases.repositories.statistics.case_tests_repository import CaseTestsRepository
+from app.modules.cases.repositories.statistics.name_filters import StatisticsNameResolver, merge_match
 
 
 class TestStatisticsRepository:
     # Repositorio para estadísticas de pruebas (rendimiento y oportunidad)
     def __init__(self, database: AsyncIOMotorDatabase):
         self.collection = database.cases
+        self.tests_catalog = database.tests
+        self.rollup = CaseStatsDailyRepository(database)
+        self.case_tests = CaseTestsRepository(database)
+        self.names = StatisticsNameResolver(database)
+
+    @staticmethod
+    def completed_tests_match(
+        start_date: datetime, end_date: datetime, test_code: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """$match de casos completados firmados en el rango con pruebas (o con `test_code`)."""
+        match: Dict[str, Any] = {"state": "Completado", "signed_at": {"$gte": start_date, "$lt": end_date}}
+        if test_code:
+            match["samples.tests.id"] = test_code
+        else:
+            match["samples.tests"] = {"$exists": True, "$ne": []}
+        return match
+
+    async def _entity_filter(self, entity_name: Optional[str], rollup: bool = False) -> Dict[str, Any]:
+        # Filtro de entidad (ids canónicos si el patrón resuelve en el catálogo)
+        entity_pattern = self._get_entity_filter_pattern(entity_name) if entity_name else ""
+        if not entity_pattern:
+            return {}
+        return await self.names.entity_match(entity_pattern, rollup=rollup)
+
+    async def _completed_test_rows(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        entity_name: Optional[str] = None,
+        test_code: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        # Filas caso x prueba del rollup, completadas y firmadas en el rango
+        filters: Dict[str, Any] = {"state": "Completado"}
+        merge_match(filters, await self._entity_filter(entity_name, rollup=True))
+        if test_code:
+            filters["test_code"] = test_code
+        return await self.rollup.find_rows("test", "signed_day", start_date, end_date, filters)
+
+    def _pathologists_from_rows(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        grouped = group_rows(rows, lambda r: (r.get("pathologist_name"), r.get("pathologist_id")))
+        return sorted(
+            (
+                {
+                    "total_procesadas": bucket.cases,
+                    "nombre": name,
+                    "codigo": code,
+                    "tiempo_promedio": round_or_none(bucket.average()),
+                }
+                for (name, code), bucket in grouped.items()
+            ),
+            key=lambda p: p["total_procesadas"],
+            reverse=True,
+        )
     
     def _get_entity_filter_pattern(self, entity_name: str) -> str:
         # Devuelve patrón regex para filtrar entidades (soporta abreviaturas)
@@ -52,34 +113,17 @@ class TestStatisticsRepository:
         # Rendimiento mensual de pruebas basado únicamente en casos completados
         start_date = datetime(year, month, 1)
         end_date = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
-        match_conditions = {
-            "state": "Completado",
-            "signed_at": {"$gte": start_date, "$lt": end_date},
-            "samples.tests": {"$exists": True, "$ne": []}
-        }
-        if entity_name:
-            entity_pattern = self._get_entity_filter_pattern(entity_name)
-            if entity_pattern:
-                match_conditions["patient_info.entity_info.name"] = {"$regex": entity_pattern, "$options": "i"}
+        match_conditions = self.completed_tests_match(start_date, end_date)
+        merge_match(match_conditions, await self._entity_filter(entity_name))
         pipeline = [
             {"$match": match_conditions},
             {"$unwind": "$samples"},
             {"$unwind": "$samples.tests"},
-            {
-                "$lookup": {
-                    "from": "tests",
-                    "localField": "samples.tests.id",
-                    "foreignField": "test_code",
-                    "as": "test_info"
-                }
-            },
-            {"$unwind": {"path": "$test_info", "preserveNullAndEmptyArrays": True}},
             {
                 "$group": {
                     "_id": {
                         "test_code": "$samples.tests.id"
                     },
-                    "test_name": {"$first": "$test_info.name"},
                     # Al filtrar por Completado, solicitadas = completadas = total en el período
                     "total_solicitadas": {"$sum": 1},
                     "total_completadas": {"$sum": 1},
@@ -87,11 +131,20 @@ class TestStatisticsRepository:
                     "avg_business_days": {"$avg": {"$ifNull": ["$business_days", 0]}}
                 }
             },
+            # Nombre desde el catálogo: un $lookup por prueba agrupada, no por fila
+            {
+                "$lookup": {
+                    "from": "tests",
+                    "localField": "_id.test_code",
+                    "foreignField": "test_code",
+                    "as": "test_info"
+                }
+            },
             {
                 "$project": {
                     "_id": 0,
                     "codigo": "$_id.test_code",
-                    "nombre": {"$ifNull": ["$test_name", "$_id.test_code"]},
+                    "nombre": {"$ifNull": [{"$arrayElemAt": ["$test_info.name", 0]}, "$_id.test_code"]},
                     "solicitadas": "$total_solicitadas",
                     "completadas": "$total_completadas",
                     "tiempoPromedio": {"$round": ["$avg_business_days", 2]},
@@ -106,7 +159,32 @@ class TestStatisticsRepository:
             {"$sort": {"solicitadas": -1}}
         ]
         
-        results = await self.collection.aggregate(pipeline).to_list(length=1000)
+        if await self.rollup.is_ready():
+            rows = await self._completed_test_rows(start_date, end_date, entity_name)
+            grouped = group_rows(rows, lambda r: r.get("test_code"))
+            # Nombres desde el catálogo de pruebas, igual que el $lookup de la pipeline
+            catalog = await self.tests_catalog.find(
+                {"test_code": {"$in": [code for code in grouped if code is not None]}},
+                {"test_code": 1, "name": 1},
+            ).to_list(length=None)
+            names = {t.get("test_code"): t.get("name") for t in catalog}
+            results = sorted(
+                (
+                    {
+                        "codigo": code,
+                        "nombre": names.get(code) or code,
+                        "solicitadas": bucket.cases,
+                        "completadas": bucket.cases,
+                        "tiempoPromedio": round_or_none(bucket.average(missing_as_zero=True)),
+                        "porcentajeCompletado": 100.0,
+                    }
+                    for code, bucket in grouped.items()
+                ),
+                key=lambda t: t["solicitadas"],
+                reverse=True,
+            )
+        else:
+            results = await self.case_tests.aggregate_tests(pipeline, length=1000)
         total_solicitadas = sum(test["solicitadas"] for test in results)
         total_completadas = sum(test["completadas"] for test in results)
         if total_solicitadas > 0:
@@ -132,15 +210,8 @@ class TestStatisticsRepository:
     ) -> Dict[str, Any]:
         start_date = datetime(year, month, 1)
         end_date = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
-        match_conditions = {
-            "state": "Completado",
-            "signed_at": {"$gte": start_date, "$lt": end_date},
-            "samples.tests.id": test_code
-        }
-        if entity_name:
-            entity_pattern = self._get_entity_filter_pattern(entity_name)
-            if entity_pattern:
-                match_conditions["patient_info.entity_info.name"] = {"$regex": entity_pattern, "$options": "i"}
+        match_conditions = self.completed_tests_match(start_date, end_date, test_code)
+        merge_match(match_conditions, await self._entity_filter(entity_name))
         basic_stats_pipeline = [
             {"$match": match_conditions},
             {"$unwind": "$samples"},
@@ -171,7 +242,25 @@ class TestStatisticsRepository:
             }
         ]
         
-        basic_stats_result = await self.collection.aggregate(basic_stats_pipeline).to_list(length=1)
+        if await self.rollup.is_ready():
+            rows = await self._completed_test_rows(start_date, end_date, entity_name, test_code)
+            total = group_rows(rows, lambda r: None).get(None) or RollupBucket()
+            return {
+                "estadisticas_principales": {
+                    "total_solicitadas": total.cases,
+                    "total_completadas": total.cases,
+                    "porcentaje_completado": 100.0 if total.cases else 0
+                },
+                "tiempos_procesamiento": {
+                    "promedio_dias": round_or_none(total.average(missing_as_zero=True)) if total.cases else 0,
+                    "dentro_oportunidad": total.within(7, include_missing=True),
+                    "fuera_oportunidad": total.outside(7),
+                    "total_casos": total.cases
+                },
+                "patologos": self._pathologists_from_rows(rows)
+            }
+
+        basic_stats_result = await self.case_tests.aggregate_tests(basic_stats_pipeline, length=1)
         basic_stats = basic_stats_result[0] if basic_stats_result else {
             "total_solicitadas": 0,
             "total_completadas": 0,
@@ -201,7 +290,7 @@ class TestStatisticsRepository:
             }
         ]
         
-        opportunity_result = await self.collection.aggregate(opportunity_pipeline).to_list(length=1)
+        opportunity_result = await self.case_tests.aggregate_tests(opportunity_pipeline, length=1)
         opportunity_stats = opportunity_result[0] if opportunity_result else {
             "dentro_oportunidad": 0,
             "fuera_oportunidad": 0,
@@ -236,7 +325,7 @@ class TestStatisticsRepository:
             {"$sort": {"total_procesadas": -1}}
         ]
         
-        pathologists_result = await self.collection.aggregate(pathologists_pipeline).to_list(length=1000)
+        pathologists_result = await self.case_tests.aggregate_tests(pathologists_pipeline, length=1000)
         
         return {
             "estadisticas_principales": {
@@ -267,17 +356,10 @@ class TestStatisticsRepository:
         end_date = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
         
         # Base match conditions - Only completed cases
-        match_conditions = {
-            "state": "Completado",
-            "signed_at": {"$gte": start_date, "$lt": end_date},
-            "samples.tests.id": test_code
-        }
+        match_conditions = self.completed_tests_match(start_date, end_date, test_code)
         
-        # Add entity filter if specified - support partial matching for abbreviated names
-        if entity_name:
-            entity_pattern = self._get_entity_filter_pattern(entity_name)
-            if entity_pattern:
-                match_conditions["patient_info.entity_info.name"] = {"$regex": entity_pattern, "$options": "i"}
+        # Add entity filter if specified - support abbreviated names
+        merge_match(match_conditions, await self._entity_filter(entity_name))
         
         pipeline = [
             {"$match": match_conditions},
@@ -306,7 +388,11 @@ class TestStatisticsRepository:
             {"$sort": {"total_procesadas": -1}}
         ]
         
-        results = await self.collection.aggregate(pipeline).to_list(length=1000)
+        if await self.rollup.is_ready():
+            rows = await self._completed_test_rows(start_date, end_date, entity_name, test_code)
+            return self._pathologists_from_rows(rows)
+
+        results = await self.case_tests.aggregate_tests(pipeline, length=1000)
         return results
     
     async def get_test_opportunity_summary(
@@ -323,17 +409,10 @@ class TestStatisticsRepository:
         end_date = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
         
         # Base match conditions - Only completed cases
-        match_conditions = {
-            "state": "Completado",
-            "signed_at": {"$gte": start_date, "$lt": end_date},
-            "samples.tests": {"$exists": True, "$ne": []}
-        }
+        match_conditions = self.completed_tests_match(start_date, end_date)
         
-        # Add entity filter if specified - support partial matching for abbreviated names
-        if entity_name:
-            entity_pattern = self._get_entity_filter_pattern(entity_name)
-            if entity_pattern:
-                match_conditions["patient_info.entity_info.name"] = {"$regex": entity_pattern, "$options": "i"}
+        # Add entity filter if specified - support abbreviated names
+        merge_match(match_conditions, await self._entity_filter(entity_name))
         
         pipeline = [
             {"$match": match_conditions},
@@ -379,7 +458,24 @@ class TestStatisticsRepository:
             {"$sort": {"total_casos": -1}}
         ]
         
-        results = await self.collection.aggregate(pipeline).to_list(length=1000)
+        if await self.rollup.is_ready():
+            rows = await self._completed_test_rows(start_date, end_date, entity_name)
+            grouped = group_rows(rows, lambda r: (r.get("test_code"), r.get("test_name")))
+            results = []
+            for (code, name), bucket in grouped.items():
+                dentro = bucket.within(threshold_days, include_missing=True)
+                results.append({
+                    "total_casos": bucket.cases,
+                    "dentro_oportunidad": dentro,
+                    "fuera_oportunidad": bucket.outside(threshold_days),
+                    "codigo": code,
+                    "nombre": name,
+                    "tiempo_promedio": round_or_none(bucket.average()),
+                    "porcentaje_oportunidad": round(dentro / bucket.cases * 100, 2),
+                })
+            results.sort(key=lambda t: t["total_casos"], reverse=True)
+        else:
+            results = await self.case_tests.aggregate_tests(pipeline, length=1000)
         
         # Calculate summary
         total_casos = sum(test["total_casos"] for test in results)
@@ -406,14 +502,7 @@ class TestStatisticsRepository:
         
         pipeline = [
             {
-                "$match": {
-                    "state": "Completado",
-                    "signed_at": {
-                        "$gte": datetime(year, 1, 1),
-                        "$lt": datetime(year + 1, 1, 1)
-                    },
-                    "samples.tests": {"$exists": True, "$ne": []}
-                }
+                "$match": self.completed_tests_match(datetime(year, 1, 1), datetime(year + 1, 1, 1))
             },
             {"$unwind": "$samples"},
             {"$unwind": "$samples.tests"},
@@ -439,11 +528,23 @@ class TestStatisticsRepository:
             {"$sort": {"mes": 1, "total_casos": -1}}
         ]
         
-        # Add entity filter if specified - support partial matching for abbreviated names
-        if entity_name:
-            entity_pattern = self._get_entity_filter_pattern(entity_name)
-            if entity_pattern:
-                pipeline[0]["$match"]["patient_info.entity_info.name"] = {"$regex": entity_pattern, "$options": "i"}
+        # Add entity filter if specified - support abbreviated names
+        merge_match(pipeline[0]["$match"], await self._entity_filter(entity_name))
         
-        results = await self.collection.aggregate(pipeline).to_list(length=1000)
-        return results
\ No newline at end of file
+        if await self.rollup.is_ready():
+            rows = await self._completed_test_rows(datetime(year, 1, 1), datetime(year + 1, 1, 1), entity_name)
+            grouped = group_rows(rows, lambda r: (r["signed_day"].month, r.get("test_code")))
+            results = [
+                {
+                    "total_casos": bucket.cases,
+                    "mes": month,
+                    "codigo": code,
+                    "tiempo_promedio": round_or_none(bucket.average()),
+                }
+                for (month, code), bucket in grouped.items()
+            ]
+            results.sort(key=lambda t: (t["mes"], -t["total_casos"]))
+            return results
+
+        results = await self.case_tests.aggregate_tests(pipeline, length=1000)
+        return results
@@ -1,14 +1,149 @@
 """
 Repositorio de casos urgentes: agrega métricas y lista casos según días en sistema.
+
+Los casos abiertos se materializan en `urgent_cases` (una fila por caso con los
+campos del panel ya calculados) desde un refresco periódico
+(`UrgentCasesRefresher`) y la sincronización por caso tras cada escritura. Mientras
+la colección esté al día el panel es una lectura por rango sobre `created_at`
+indexado; si no, se calcula sobre `cases` como antes.
 """
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any, Optional
+import time
+
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING
+
+from app.config.settings import settings
+
+OPEN_STATES = ["En proceso", "Por firmar"]
+
+# Agrupa las pruebas de cada caso en "código - nombre" (sin repetir) y conserva el documento
+_TESTS_BY_CASE: List[Dict[str, Any]] = [
+    {"$unwind": {"path": "$samples", "preserveNullAndEmptyArrays": True}},
+    {"$unwind": {"path": "$samples.tests", "preserveNullAndEmptyArrays": True}},
+    {
+        "$group": {
+            "_id": "$case_code",
+            "doc": {"$first": "$$ROOT"},
+            "tests_list": {
+                "$addToSet": {
+                    "$cond": [
+                        {"$ifNull": ["$samples.tests.id", False]},
+                        {"$concat": [
+                            {"$toString": "$samples.tests.id"},
+                            " - ",
+                            {"$ifNull": ["$samples.tests.name", ""]}
+                        ]},
+                        None
+                    ]
+                }
+            }
+        }
+    },
+    {
+        "$project": {
+            "doc": 1,
+            "tests_list": {
+                "$filter": {
+                    "input": "$tests_list",
+                    "as": "t",
+                    "cond": {"$ne": ["$$t", None]},
+                }
+            }
+        }
+    },
+]
+
+# Campos del panel a partir de la salida de _TESTS_BY_CASE
+_ROW_FIELDS: Dict[str, Any] = {
+    "case_code": "$_id",
+    "patient_name": "$doc.patient_info.name",
+    "patient_code": {
+        "$ifNull": [
+            "$doc.patient_info.patient_code",
+            {
+                "$cond": [
+                    {
+                        "$and": [
+                            {"$gt": [{"$strLenCP": {"$ifNull": ["$doc.patient_info.identification_type", ""]}}, 0]},
+                            {"$gt": [{"$strLenCP": {"$ifNull": ["$doc.patient_info.identification_number", ""]}}, 0]}
+                        ]
+                    },
+                    {"$concat": ["$doc.patient_info.identification_type", "-", "$doc.patient_info.identification_number"]},
+                    "$doc.patient_info.identification_number"
+                ]
+            }
+        ]
+    },
+    "entity_name": "$doc.patient_info.entity_info.name",
+    "tests": "$tests_list",
+    "pathologist_name": "$doc.assigned_pathologist.name",
+    "created_at": "$doc.created_at",
+    "state": "$doc.state",
+    "priority": "$doc.priority",
+    "entity_code": "$doc.patient_info.entity_info.id",
+}
+
+
+def days_in_system(created_at: Optional[datetime], now: datetime) -> Optional[int]:
+    # Días calendario (UTC) entre la creación y ahora, como $dateDiff con unit "day"
+    if not isinstance(created_at, datetime):
+        return None
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc)
+    return (now.date() - created_at.date()).days
 
 
 class UrgentCasesRepository:
+    # Momento (monotonic) del último refresco completo de urgent_cases en este proceso
+    _refreshed_at: Optional[float] = None
+
     def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
         self.collection = db.cases
 
+    @property
+    def view(self):
+        return self.db.urgent_cases
+
+    async def ensure_indexes(self) -> None:
+        await self.view.create_index("created_at")
+        await self.view.create_index([("pathologist_id", ASCENDING), ("created_at", ASCENDING)])
+
+    def is_fresh(self) -> bool:
+        """True si urgent_cases se refrescó hace menos de tres intervalos del scheduler."""
+        if not settings.URGENT_CASES_MATERIALIZED or UrgentCasesRepository._refreshed_at is None:
+            return False
+        max_age = 3 * settings.URGENT_CASES_REFRESH_SECONDS
+        return time.monotonic() - UrgentCasesRepository._refreshed_at <= max_age
+
+    def mark_stale(self) -> None:
+        """Leer de `cases` hasta el próximo refresco completo."""
+        UrgentCasesRepository._refreshed_at = None
+
+    def _view_pipeline(self, match: Dict[str, Any]) -> List[Dict[str, Any]]:
+        # Filas de urgent_cases (_id = case_code) para los casos abiertos que cumplen `match`
+        return [
+            {"$match": {"state": {"$in": OPEN_STATES}, **match}},
+            *_TESTS_BY_CASE,
+            {"$project": {**_ROW_FIELDS, "pathologist_id": "$doc.assigned_pathologist.id"}},
+        ]
+
+    # Reemplaza urgent_cases con todos los casos abiertos.
+    async def refresh(self) -> None:
+        await self.collection.aggregate([*self._view_pipeline({}), {"$out": "urgent_cases"}]).to_list(length=None)
+        await self.ensure_indexes()
+        UrgentCasesRepository._refreshed_at = time.monotonic()
+
+    # Actualiza la fila de un caso (o la elimina si ya no está abierto).
+    async def sync_case(self, case_code: str) -> None:
+        rows = await self.collection.aggregate(self._view_pipeline({"case_code": case_code})).to_list(length=1)
+        if rows:
+            await self.view.replace_one({"_id": case_code}, rows[0], upsert=True)
+        else:
+            await self.view.delete_one({"_id": case_code})
+
     # Retorna casos en estados críticos con días en sistema >= min_days.
     async def find_urgent_cases(
         self,
@@ -16,8 +151,11 @@ class UrgentCasesRepository:
         min_days: int = 6,
         pathologist_code: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
+        if self.is_fresh():
+            return await self._find_materialized(limit, min_days, pathologist_code)
+
         match_stage: Dict[str, Any] = {
-            "state": {"$in": ["En proceso", "Por firmar"]},
+            "state": {"$in": OPEN_STATES},
         }
         if pathologist_code:
             match_stage["assigned_pathologist.id"] = pathologist_code
@@ -37,75 +175,25 @@ class UrgentCasesRepository:
                 }
             },
             {"$match": {"days_in_system": {"$gte": int(min_days)}}},
-            {"$unwind": {"path": "$samples", "preserveNullAndEmptyArrays": True}},
-            {"$unwind": {"path": "$samples.tests", "preserveNullAndEmptyArrays": True}},
-            {
-                "$group": {
-                    "_id": "$case_code",
-                    "doc": {"$first": "$$ROOT"},
-                    "tests_list": {
-                        "$addToSet": {
-                            "$cond": [
-                                {"$ifNull": ["$samples.tests.id", False]},
-                                {"$concat": [
-                                    {"$toString": "$samples.tests.id"},
-                                    " - ",
-                                    {"$ifNull": ["$samples.tests.name", ""]}
-                                ]},
-                                None
-                            ]
-                        }
-                    }
-                }
-            },
-            {
-                "$project": {
-                    "doc": 1,
-                    "tests_list": {
-                        "$filter": {
-                            "input": "$tests_list",
-                            "as": "t",
-                            "cond": {"$ne": ["$$t", None]},
-                        }
-                    }
-                }
-            },
+            *_TESTS_BY_CASE,
             {"$sort": {"doc.days_in_system": -1, "doc.created_at": 1}},
             {"$limit": int(limit)},
-            {
-                "$project": {
-                    "_id": 0,
-                    "case_code": "$_id",
-                    "patient_name": "$doc.patient_info.name",
-                    "patient_code": {
-                        "$ifNull": [
-                            "$doc.patient_info.patient_code",
-                            {
-                                "$cond": [
-                                    {
-                                        "$and": [
-                                            {"$gt": [{"$strLenCP": {"$ifNull": ["$doc.patient_info.identification_type", ""]}}, 0]},
-                                            {"$gt": [{"$strLenCP": {"$ifNull": ["$doc.patient_info.identification_number", ""]}}, 0]}
-                                        ]
-                                    },
-                                    {"$concat": ["$doc.patient_info.identification_type", "-", "$doc.patient_info.identification_number"]},
-                                    "$doc.patient_info.identification_number"
-                                ]
-                            }
-                        ]
-                    },
-                    "entity_name": "$doc.patient_info.entity_info.name",
-                    "tests": "$tests_list",
-                    "pathologist_name": "$doc.assigned_pathologist.name",
-                    "created_at": "$doc.created_at",
-                    "state": "$doc.state",
-                    "priority": "$doc.priority",
-                    "days_in_system": "$doc.days_in_system",
-                    "entity_code": "$doc.patient_info.entity_info.id"
-                }
-            }
+            {"$project": {"_id": 0, **_ROW_FIELDS, "days_in_system": "$doc.days_in_system"}},
         ]
 
         return await self.collection.aggregate(pipeline).to_list(length=limit)
 
-
+    async def _find_materialized(
+        self, limit: int, min_days: int, pathologist_code: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        # Días >= min_days equivale a creado antes del inicio del día (hoy - min_days + 1), en UTC
+        now = datetime.now(timezone.utc)
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        query: Dict[str, Any] = {"created_at": {"$lt": today - timedelta(days=int(min_days) - 1)}}
+        if pathologist_code:
+            query["pathologist_id"] = pathologist_code
+        cursor = self.view.find(query, {"_id": 0, "pathologist_id": 0}).sort("created_at", ASCENDING).limit(int(limit))
+        rows = await cursor.to_list(length=limit)
+        for row in rows:
+            row["days_in_system"] = days_in_system(row.get("created_at"), now)
+        return rows
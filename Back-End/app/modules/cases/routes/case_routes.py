@@ -1,16 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from typing import Optional, List
+from bson import ObjectId
+from pydantic import TypeAdapter
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.config.database import get_database
-from app.modules.cases.schemas.case import CaseCreate, CaseUpdate, CaseResponse
+from app.modules.cases.schemas.case import CaseCreate, CaseUpdate, CaseResponse, CaseListItem
 from app.modules.cases.services.case_service import CaseService
+from app.modules.cases.repositories.case_repository import CASE_LIST_FIELDS
 from app.core.exceptions import NotFoundError, ConflictError, BadRequestError
+from app.core.pagination import NEXT_CURSOR_HEADER, next_cursor
+from app.core.serialization import json_response
 from app.modules.auth.routes.auth_routes import get_current_user_id
 
 # Importar las rutas de resultado y firma
 from .result_routes import router as result_router
 from .sign_routes import router as sign_router
 from .pdf_routes import router as pdf_router
+from .pdf_job_routes import router as pdf_job_router
 # Importar las rutas de estadísticas
 from .statistics.statistics_router import router as statistics_router
 from .urgent_routes import router as urgent_router
@@ -18,10 +24,16 @@ from .urgent_routes import router as urgent_router
 
 router = APIRouter(tags=["cases"]) 
 
+# Las respuestas de lectura ya vienen construidas desde la BD: se serializan sin revalidar
+CASE_ADAPTER = TypeAdapter(CaseResponse)
+CASE_LIST_ADAPTER = TypeAdapter(List[CaseResponse])
+CASE_SUMMARY_ADAPTER = TypeAdapter(List[CaseListItem])
+
 # Incluir las rutas de resultado y firma
 router.include_router(result_router)
 router.include_router(sign_router)
 router.include_router(pdf_router)
+router.include_router(pdf_job_router)
 # Incluir las rutas de estadísticas
 router.include_router(statistics_router)
 router.include_router(urgent_router)
@@ -77,11 +89,19 @@ async def list_cases(
     date_from: Optional[str] = Query(None, description="Fecha de inicio (YYYY-MM-DD)"),
     date_to: Optional[str] = Query(None, description="Fecha de fin (YYYY-MM-DD)"),
     entity_codes: Optional[List[str]] = Query(None, description="Lista de códigos de entidad para filtrar"),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (cabecera X-Next-Cursor); reemplaza a skip"),
+    view: str = Query("full", pattern="^(full|summary)$", description="summary: filas CaseListItem con las columnas del listado"),
+    fields: Optional[str] = Query(None, description="Campos de CaseListItem separados por coma (implica view=summary)"),
     service: CaseService = Depends(get_service),
     current_user_id: Optional[str] = Depends(get_current_user_id)
 ):
+    list_fields = None
+    if fields:
+        list_fields = [field.strip() for field in fields.split(",") if field.strip()]
+    elif view == "summary":
+        list_fields = list(CASE_LIST_FIELDS)
     try:
-        return await service.list_cases(
+        cases = await service.list_cases(
             skip=skip,
             limit=limit,
             search=search,
@@ -92,8 +112,20 @@ async def list_cases(
             date_from=date_from,
             date_to=date_to,
             entity_codes=entity_codes,
-            current_user_id=current_user_id
+            current_user_id=current_user_id,
+            cursor=cursor,
+            fields=list_fields
         )
+        # Las búsquedas se ordenan por relevancia y se paginan por skip
+        token = None if search else next_cursor(cases, limit, lambda c: (c.created_at, ObjectId(c.id)))
+        if list_fields is not None:
+            # Filas ligeras: solo los campos proyectados
+            payload = json_response(CASE_SUMMARY_ADAPTER, cases, exclude_unset=True)
+        else:
+            payload = json_response(CASE_LIST_ADAPTER, cases)
+        if token:
+            payload.headers[NEXT_CURSOR_HEADER] = token
+        return payload
     except BadRequestError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -103,7 +135,7 @@ async def list_cases(
 @router.get("/{case_code}", response_model=CaseResponse)
 async def get_case(case_code: str, service: CaseService = Depends(get_service)):
     try:
-        return await service.get_case(case_code)
+        return json_response(CASE_ADAPTER, await service.get_case(case_code))
     except NotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
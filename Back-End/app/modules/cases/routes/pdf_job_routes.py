@@ -0,0 +1,63 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.config.database import get_database
+from app.modules.cases.schemas.pdf_job import PdfJobCreate, PdfJobResponse
+from app.modules.cases.services.pdf_job_service import PdfJobService
+from app.core.exceptions import NotFoundError, ConflictError, BadRequestError
+
+router = APIRouter(tags=["pdf-jobs"])
+
+
+def get_job_service(db: AsyncIOMotorDatabase = Depends(get_database)) -> PdfJobService:
+    return PdfJobService(db)
+
+
+@router.post("/batch/pdf/jobs", response_model=PdfJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_pdf_job(payload: PdfJobCreate, service: PdfJobService = Depends(get_job_service)):
+    """
+    Encolar la generación de un lote de PDFs en segundo plano
+
+    Retorna el `job_id` para consultar el progreso y descargar el archivo cuando esté listo
+    """
+    try:
+        return await service.submit(payload)
+    except BadRequestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/batch/pdf/jobs/{job_id}", response_model=PdfJobResponse)
+async def get_pdf_job(job_id: str, service: PdfJobService = Depends(get_job_service)):
+    try:
+        return await service.get_job(job_id)
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.delete("/batch/pdf/jobs/{job_id}", response_model=PdfJobResponse)
+async def cancel_pdf_job(job_id: str, service: PdfJobService = Depends(get_job_service)):
+    try:
+        return await service.cancel_job(job_id)
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/batch/pdf/jobs/{job_id}/download")
+async def download_pdf_job(job_id: str, service: PdfJobService = Depends(get_job_service)):
+    try:
+        path, file_name, media_type = await service.get_artifact(job_id)
+        return FileResponse(path, media_type=media_type, filename=file_name)
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,16 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List
+from typing import List, Literal
 import re
 from urllib.parse import quote
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.config.database import get_database
+from app.config.settings import settings
+from app.modules.cases.services.pdf_metrics import PdfTimings, pdf_metrics
 from app.modules.cases.services.pdf_service import CasePdfService
 from app.core.exceptions import NotFoundError, BadRequestError
 
 router = APIRouter(tags=["pdf"])
 
+BATCH_PDF_MAX_CASES = 100
+
 
 def get_pdf_service(db: AsyncIOMotorDatabase = Depends(get_database)) -> CasePdfService:
     return CasePdfService(db)
@@ -18,6 +22,22 @@ def get_pdf_service(db: AsyncIOMotorDatabase = Depends(get_database)) -> CasePdf
 
 class BatchPdfRequest(BaseModel):
     case_codes: List[str]
+    # "pdf": un único PDF combinado; "zip": un PDF por caso dentro de un ZIP (siempre en streaming)
+    format: Literal["pdf", "zip"] = "pdf"
+    # Envío incremental: responde con el ZIP por caso aunque se pida "pdf", porque el PDF
+    # combinado solo puede enviarse tras renderizar y combinar el lote completo
+    stream: bool = False
+
+
+def _batch_file_name(case_codes: List[str], extension: str) -> tuple[str, str]:
+    # Generar nombre de archivo basado en los códigos de caso
+    case_codes_str = "_".join(case_codes[:5])  # Limitar a primeros 5 para el nombre
+    if len(case_codes) > 5:
+        case_codes_str += f"_y_{len(case_codes) - 5}_mas"
+
+    safe_name = re.sub(r"[^\w\-. ]+", "", case_codes_str).replace(" ", "_")
+    utf8_name = quote(f"casos_combinados_{safe_name}.{extension}")
+    return f"casos_combinados_{safe_name}.{extension}", utf8_name
 
 
 @router.post("/batch/pdf")
@@ -27,33 +47,40 @@ async def generate_batch_pdf(
 ):
     """
     Generar un PDF combinado con múltiples casos
-    
+
     - **case_codes**: Lista de códigos de caso (ej: ["2025-00001", "2025-00002"])
-    
-    Retorna un archivo PDF con todos los casos combinados
+    - **format**: "pdf" (combinado) o "zip" (un PDF por caso, enviado a medida que se renderiza)
+    - **stream**: enviar los casos a medida que se renderizan; implica "zip"
+
+    Retorna un archivo PDF con todos los casos combinados, o un ZIP con un PDF por caso
     """
     try:
         if not request.case_codes:
             raise HTTPException(status_code=400, detail="Se requiere al menos un código de caso")
-        
-        if len(request.case_codes) > 100:
-            raise HTTPException(status_code=400, detail="Máximo 100 casos por PDF")
-        
+
+        streaming = request.stream or request.format == "zip"
+        max_cases = settings.PDF_BATCH_STREAM_MAX_CASES if streaming else BATCH_PDF_MAX_CASES
+        if len(request.case_codes) > max_cases:
+            raise HTTPException(status_code=400, detail=f"Máximo {max_cases} casos por PDF")
+
+        if streaming:
+            file_name, utf8_name = _batch_file_name(request.case_codes, "zip")
+            return StreamingResponse(
+                pdf_service.stream_batch_zip(request.case_codes),
+                media_type="application/zip",
+                headers={
+                    "Content-Disposition": f"attachment; filename=\"{file_name}\"; filename*=UTF-8''{utf8_name}"
+                }
+            )
+
+        file_name, utf8_name = _batch_file_name(request.case_codes, "pdf")
         pdf_bytes = await pdf_service.generate_batch_pdf(request.case_codes)
-        
-        # Generar nombre de archivo basado en los códigos de caso
-        case_codes_str = "_".join(request.case_codes[:5])  # Limitar a primeros 5 para el nombre
-        if len(request.case_codes) > 5:
-            case_codes_str += f"_y_{len(request.case_codes) - 5}_mas"
-        
-        safe_name = re.sub(r"[^\w\-. ]+", "", case_codes_str).replace(" ", "_")
-        utf8_name = quote(f"casos_combinados_{safe_name}.pdf")
-        
+
         return StreamingResponse(
             iter([pdf_bytes]),
             media_type="application/pdf",
             headers={
-                "Content-Disposition": f"inline; filename=\"casos_combinados_{safe_name}.pdf\"; filename*=UTF-8''{utf8_name}"
+                "Content-Disposition": f"inline; filename=\"{file_name}\"; filename*=UTF-8''{utf8_name}"
             }
         )
     except ValueError as e:
@@ -66,6 +93,20 @@ async def generate_batch_pdf(
         raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
 
 
+@router.get("/pdf/metrics")
+async def get_pdf_metrics():
+    """
+    Métricas del pipeline de PDFs de este proceso
+
+    Retorna histogramas de tiempo por etapa (segundos, buckets acumulados) y el
+    estado del pool de navegadores (páginas en uso, peticiones en cola, reinicios).
+    """
+    from app.modules.cases.services.browser_pool import BrowserPool
+
+    browser_pool = await BrowserPool.get_instance()
+    return {**pdf_metrics.snapshot(), "pool": browser_pool.stats()}
+
+
 @router.get("/{case_code}/pdf")
 async def generate_case_pdf(
     case_code: str,
@@ -73,13 +114,14 @@ async def generate_case_pdf(
 ):
     """
     Generar PDF del informe de resultados de un caso
-    
+
     - **case_code**: Código del caso (ej: 2025-00001)
-    
-    Retorna un archivo PDF con el informe completo del caso
+
+    Retorna un archivo PDF con el informe completo del caso (con cabecera Server-Timing por etapa)
     """
     try:
-        pdf_bytes = await pdf_service.generate_case_pdf(case_code)
+        timings = PdfTimings()
+        pdf_bytes = await pdf_service.generate_case_pdf(case_code, timings=timings)
 
         # Intentar obtener el nombre del paciente para el filename
         patient_name = ""
@@ -99,7 +141,8 @@ async def generate_case_pdf(
             iter([pdf_bytes]),
             media_type="application/pdf",
             headers={
-                "Content-Disposition": f"inline; filename=\"{safe_name}.pdf\"; filename*=UTF-8''{utf8_name}"
+                "Content-Disposition": f"inline; filename=\"{safe_name}.pdf\"; filename*=UTF-8''{utf8_name}",
+                "Server-Timing": timings.server_timing(),
             }
         )
     except ValueError as e:
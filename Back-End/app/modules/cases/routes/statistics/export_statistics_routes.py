@@ -0,0 +1,46 @@
+from datetime import date
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.config.database import get_database
+from app.core.exceptions import BadRequestError
+from app.modules.cases.services.statistics.analytics_export_service import AnalyticsExportService
+
+
+router = APIRouter(prefix="/export", tags=["statistics-export"])
+
+
+def get_export_service(db: AsyncIOMotorDatabase = Depends(get_database)) -> AnalyticsExportService:
+    return AnalyticsExportService(db)
+
+
+@router.get("/report")
+async def export_statistics_report(
+    start_date: date = Query(..., description="Fecha inicial (YYYY-MM-DD)"),
+    end_date: date = Query(..., description="Fecha final incluida (YYYY-MM-DD)"),
+    format: Literal["csv", "xlsx"] = Query("xlsx", description="Formato del archivo"),
+    report: Literal["all", "entities", "pathologists", "tests", "opportunity"] = Query(
+        "all", description="Reporte a exportar (CSV requiere uno solo)"
+    ),
+    threshold_days: int = Query(7, ge=1, le=60, description="Días de oportunidad"),
+    service: AnalyticsExportService = Depends(get_export_service)
+):
+    """Exportar los desgloses de estadísticas de un periodo como CSV o XLSX"""
+    try:
+        content, media_type, file_name = await service.export(
+            start_date=start_date,
+            end_date=end_date,
+            file_format=format,
+            report=report,
+            opportunity_days_threshold=threshold_days,
+        )
+        return Response(
+            content=content,
+            media_type=media_type,
+            headers={"Content-Disposition": f"attachment; filename=\"{file_name}\""}
+        )
+    except BadRequestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
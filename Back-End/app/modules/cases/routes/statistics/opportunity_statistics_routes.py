@@ -72,6 +72,22 @@ async def opportunity_yearly(
         raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
 
 
+@router.get("/yearly/{year}/detail")
+async def opportunity_yearly_detail(
+    year: int,
+    threshold_days: int = Query(7, ge=1, le=60, alias="thresholdDays"),
+    entity_code: str = Query(None, alias="entity"),
+    pathologist_code: str = Query(None, alias="pathologist"),
+    service: OpportunityStatisticsService = Depends(get_opportunity_service)
+):
+    try:
+        return await service.get_yearly_detail(year, threshold_days, entity_code, pathologist_code)
+    except BadRequestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
+
+
 @router.get("/pathologists")
 async def opportunity_pathologists(
     month: int = Query(..., ge=1, le=12),
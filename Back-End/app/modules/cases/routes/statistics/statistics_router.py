@@ -7,6 +7,7 @@ from .opportunity_statistics_routes import router as opportunity_router
 from .pathologist_statistics_routes import router as pathologist_router
 from .entity_statistics_routes import router as entity_router
 from .test_statistics_routes import router as test_router
+from .export_statistics_routes import router as export_router
 
 router = APIRouter(prefix="/statistics", tags=["statistics"])
 
@@ -16,3 +17,4 @@ router.include_router(opportunity_router)
 router.include_router(pathologist_router)
 router.include_router(entity_router, prefix="/entities")
 router.include_router(test_router, prefix="/tests")
+router.include_router(export_router)
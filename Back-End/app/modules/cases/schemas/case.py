@@ -136,3 +136,29 @@ class CaseResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+
+class CaseListPatient(BaseModel):
+    patient_code: Optional[str] = None
+    name: Optional[str] = None
+    identification_type: Optional[int] = None
+    identification_number: Optional[str] = None
+    entity_info: Optional[Dict[str, Any]] = None
+    care_type: Optional[str] = None
+
+
+class CaseListItem(BaseModel):
+    """Fila del listado de casos (view=summary): solo las columnas de la tabla, sin resultado ni notas."""
+    id: str
+    case_code: Optional[str] = None
+    patient_info: Optional[CaseListPatient] = None
+    requesting_physician: Optional[str] = None
+    service: Optional[str] = None
+    samples: Optional[List[Dict[str, Any]]] = None
+    state: Optional[str] = None
+    priority: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    signed_at: Optional[datetime] = None
+    assigned_pathologist: Optional[Dict[str, Any]] = None
+    delivered_at: Optional[datetime] = None
+    business_days: Optional[int] = None
@@ -0,0 +1,35 @@
+from typing import Optional, List, Literal
+from datetime import datetime
+from pydantic import BaseModel, Field
+from pydantic.config import ConfigDict
+
+
+PdfJobStatus = Literal["queued", "running", "completed", "failed", "cancelled"]
+
+
+class PdfJobCreate(BaseModel):
+    """Schema para encolar la generación de un lote de PDFs"""
+    case_codes: List[str] = Field(..., min_length=1)
+    # "pdf": un único PDF combinado; "zip": un PDF por caso
+    format: Literal["pdf", "zip"] = "pdf"
+
+
+class PdfJobResponse(BaseModel):
+    """Schema de respuesta con el estado y progreso de un trabajo de PDFs"""
+    job_id: str
+    # "batch": lote solicitado por un usuario; "prerender": informe firmado que se deja en la caché
+    kind: Literal["batch", "prerender"] = "batch"
+    status: PdfJobStatus
+    format: Literal["pdf", "zip"]
+    total: int
+    rendered: int = 0
+    failed: int = 0
+    cancel_requested: bool = False
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+    download_url: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
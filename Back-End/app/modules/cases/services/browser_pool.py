@@ -1,35 +1,154 @@
 """
 Pool de navegadores persistentes para generación de PDFs
-Optimiza el rendimiento reutilizando instancias de Playwright en lugar de crear/cerrar en cada request
+Optimiza el rendimiento reutilizando instancias de Playwright en lugar de crear/cerrar en cada request.
+
+Topología: N procesos de Chromium x M contextos por proceso. Cada contexto mantiene una
+única página reutilizable (un "slot"); el número total de renders simultáneos queda acotado
+a N x M. Las peticiones que no encuentran slot libre esperan en una cola FIFO con timeout.
+Un navegador se recicla tras K renders o cuando su RSS supera el límite configurado, y si
+un proceso se cae solo se pierden los renders de sus slots; el resto del pool sigue sirviendo
+mientras el slot caído se reinicia en segundo plano.
 """
 from __future__ import annotations
-from typing import Optional
+from typing import Optional, List, Dict, Any, AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
 import asyncio
 import logging
+import time
 from playwright.async_api import async_playwright, Playwright, Browser, BrowserContext, Page  # type: ignore
 
+from app.config.settings import settings
+
 logger = logging.getLogger(__name__)
 
 
+BROWSER_ARGS = [
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    '--disable-software-rasterizer',
+    '--disable-extensions',
+    '--disable-background-timer-throttling',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-renderer-backgrounding',
+    '--disable-features=TranslateUI',
+    '--disable-ipc-flooding-protection',
+    '--disable-background-networking',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--metrics-recording-only',
+    '--no-first-run',
+    '--mute-audio',
+    '--no-default-browser-check',
+    '--no-pings',
+    '--password-store=basic',
+    '--use-mock-keychain',
+    '--disable-blink-features=AutomationControlled',
+]
+
+CONTEXT_OPTIONS: Dict[str, Any] = {
+    'viewport': {'width': 1240, 'height': 1754},  # Letter size en puntos
+    'java_script_enabled': True,
+    'accept_downloads': False,
+    'has_touch': False,
+    'is_mobile': False,
+    'locale': 'es-CO',
+    'timezone_id': 'America/Bogota',
+    'ignore_https_errors': True,
+    'bypass_csp': True,
+}
+
+# Cada cuántos renders se consulta el RSS de un navegador (leer /proc no es gratis)
+RSS_CHECK_EVERY = 10
+
+
+class PoolTimeoutError(RuntimeError):
+    """No se obtuvo un slot del pool dentro del tiempo de espera."""
+
+
+def _read_rss_bytes(pids: List[int]) -> Optional[int]:
+    """Suma VmRSS de los procesos indicados leyendo /proc (solo Linux)."""
+    total = 0
+    found = False
+    for pid in pids:
+        try:
+            status = Path(f"/proc/{pid}/status").read_text()
+        except Exception:
+            continue
+        for line in status.splitlines():
+            if line.startswith("VmRSS:"):
+                parts = line.split()
+                if len(parts) >= 2 and parts[1].isdigit():
+                    total += int(parts[1]) * 1024
+                    found = True
+                break
+    return total if found else None
+
+
+class _BrowserSlot:
+    """Un contexto aislado con su página reutilizable."""
+
+    def __init__(self, worker: _BrowserWorker, context: BrowserContext, page: Page, index: int):
+        self.worker = worker
+        self.context = context
+        self.page = page
+        self.index = index
+        self.generation = worker.generation
+
+
+class _BrowserWorker:
+    """Un proceso de Chromium con sus M contextos."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.browser: Optional[Browser] = None
+        self.cdp_session: Any = None
+        self.slots: List[_BrowserSlot] = []
+        self.generation = 0
+        self.renders = 0
+        self.in_use = 0
+        self.draining = False
+        self.restarting = False
+        self.restarts = 0
+        self.pids: List[int] = []
+        self.last_rss_bytes: Optional[int] = None
+
+
 class BrowserPool:
     """
     Pool singleton para reutilizar navegadores de Playwright.
-    Mantiene una instancia persistente del navegador para reducir el overhead
-    de crear/cerrar navegadores en cada generación de PDF.
+    Mantiene N navegadores persistentes con M contextos cada uno y entrega páginas
+    con semántica de checkout real: préstamo acotado, cola de espera y devolución.
     """
     _instance: Optional[BrowserPool] = None
     _lock = asyncio.Lock()
-    
-    def __init__(self):
+
+    def __init__(
+        self,
+        browsers: Optional[int] = None,
+        contexts_per_browser: Optional[int] = None,
+        checkout_timeout: Optional[float] = None,
+        slot_timeout: Optional[float] = None,
+        max_renders_per_browser: Optional[int] = None,
+        max_browser_rss_mb: Optional[int] = None,
+    ):
         self.playwright: Optional[Playwright] = None
-        self.browser: Optional[Browser] = None
-        self.context: Optional[BrowserContext] = None
+        self.browsers = max(1, browsers or settings.PDF_POOL_BROWSERS)
+        self.contexts_per_browser = max(1, contexts_per_browser or settings.PDF_POOL_CONTEXTS_PER_BROWSER)
+        self.checkout_timeout = checkout_timeout if checkout_timeout is not None else settings.PDF_POOL_CHECKOUT_TIMEOUT
+        self.slot_timeout = slot_timeout if slot_timeout is not None else settings.PDF_POOL_SLOT_TIMEOUT
+        self.max_renders_per_browser = max_renders_per_browser if max_renders_per_browser is not None else settings.PDF_POOL_MAX_RENDERS_PER_BROWSER
+        self.max_browser_rss_mb = max_browser_rss_mb if max_browser_rss_mb is not None else settings.PDF_POOL_MAX_BROWSER_RSS_MB
+        self._workers: List[_BrowserWorker] = []
+        self._free: Optional[asyncio.Queue[_BrowserSlot]] = None
+        self._leased: Dict[int, _BrowserSlot] = {}
+        self._background: set[asyncio.Task] = set()
+        self._waiting = 0
         self._initialized = False
         self._shutting_down = False
-        # Pool de páginas reutilizables para reducir overhead
-        self._page_pool: Optional[asyncio.Queue[Page]] = None
-        self._max_pool_size = 5  # Máximo 5 páginas en el pool
-        
+
     @classmethod
     async def get_instance(cls) -> BrowserPool:
         """Obtener la instancia singleton del pool"""
@@ -38,197 +157,339 @@ class BrowserPool:
                 if cls._instance is None:
                     cls._instance = cls()
         return cls._instance
-    
+
+    @property
+    def capacity(self) -> int:
+        return self.browsers * self.contexts_per_browser
+
     async def initialize(self) -> None:
-        """Inicializar el pool (crear navegador y contexto)"""
+        """Inicializar el pool (lanzar navegadores y contextos)"""
         if self._initialized or self._shutting_down:
             return
-            
-        try:
-            # Verificar que playwright está disponible
-            from playwright.async_api import async_playwright  # type: ignore
-        except ImportError:
-            raise RuntimeError(
-                "Playwright no está instalado o no se han instalado los navegadores. "
-                "Ejecuta: pip install playwright && playwright install chromium"
-            )
-        
+
         async with self._lock:
             if self._initialized or self._shutting_down:
                 return
-                
+
             try:
-                logger.info("Inicializando pool de navegadores para PDFs...")
-                # async_playwright() retorna un objeto que necesita ser iniciado con .start()
-                p = async_playwright()
-                self.playwright = await p.start()
-                
-                # Configuración optimizada del navegador
-                self.browser = await self.playwright.chromium.launch(
-                    headless=True,
-                    args=[
-                        '--no-sandbox',
-                        '--disable-setuid-sandbox',
-                        '--disable-dev-shm-usage',
-                        '--disable-gpu',
-                        '--disable-software-rasterizer',
-                        '--disable-extensions',
-                        '--disable-background-timer-throttling',
-                        '--disable-backgrounding-occluded-windows',
-                        '--disable-renderer-backgrounding',
-                        '--disable-features=TranslateUI',
-                        '--disable-ipc-flooding-protection',
-                        '--disable-background-networking',
-                        '--disable-default-apps',
-                        '--disable-sync',
-                        '--metrics-recording-only',
-                        '--no-first-run',
-                        '--mute-audio',
-                        '--no-default-browser-check',
-                        '--no-pings',
-                        '--password-store=basic',
-                        '--use-mock-keychain',
-                        '--disable-blink-features=AutomationControlled',
-                    ]
-                )
-                
-                # Crear contexto optimizado para PDFs
-                self.context = await self.browser.new_context(
-                    viewport={'width': 1240, 'height': 1754},  # Letter size en puntos
-                    java_script_enabled=True,
-                    accept_downloads=False,
-                    has_touch=False,
-                    is_mobile=False,
-                    locale='es-CO',
-                    timezone_id='America/Bogota',
-                    # Deshabilitar recursos innecesarios para mejor rendimiento
-                    ignore_https_errors=True,
-                    # Deshabilitar imágenes y otros recursos para acelerar renderizado
-                    bypass_csp=True,
+                logger.info(
+                    "Inicializando pool de navegadores para PDFs (%s navegadores x %s contextos)...",
+                    self.browsers, self.contexts_per_browser,
                 )
-                
-                # Interceptar requests para bloquear recursos innecesarios (opcional, más agresivo)
-                # Esto puede acelerar mucho pero comentado por si afecta el renderizado
-                # await self.context.route("**/*.{png,jpg,jpeg,gif,svg,woff,woff2,ttf}", lambda route: route.abort())
-                
-                # Inicializar pool de páginas
-                self._page_pool = asyncio.Queue(maxsize=self._max_pool_size)
-                
+                self.playwright = await self._start_playwright()
+                self._free = asyncio.Queue()
+                self._workers = [_BrowserWorker(i) for i in range(self.browsers)]
+                for worker in self._workers:
+                    await self._launch_worker(worker)
                 self._initialized = True
                 logger.info("Pool de navegadores inicializado correctamente")
-                
             except Exception as e:
                 logger.error(f"Error inicializando pool de navegadores: {e}")
                 await self._cleanup()
                 raise
-    
-    async def get_page(self) -> Page:
-        """
-        Obtener una página del pool o crear una nueva si no hay disponibles.
-        La página debe ser devuelta con return_page() después de usarse.
-        """
-        if not self._initialized or self._shutting_down:
-            await self.initialize()
-        
-        if not self.context:
-            raise RuntimeError("Browser context no está inicializado")
-        
-        # Intentar obtener una página del pool
-        if self._page_pool and not self._page_pool.empty():
-            try:
-                page = self._page_pool.get_nowait()
-                # Verificar que la página sigue siendo válida
-                if not page.is_closed():
-                    # Limpiar la página antes de reutilizarla
-                    try:
-                        await page.goto("about:blank", wait_until="domcontentloaded", timeout=1000)
-                    except Exception:
-                        # Si falla, crear una nueva
-                        page = await self.context.new_page()
-                    else:
-                        return page
-            except asyncio.QueueEmpty:
-                pass
-            except Exception as e:
-                logger.warning(f"Error obteniendo página del pool: {e}")
-        
-        # Crear una nueva página si no hay disponibles en el pool
-        page = await self.context.new_page()
-        
-        # Optimizaciones adicionales para la página
-        await page.set_extra_http_headers({
-            'Accept-Language': 'es-CO,es;q=0.9'
-        })
-        
+
+    async def _start_playwright(self) -> Playwright:
+        try:
+            return await async_playwright().start()
+        except ImportError:
+            raise RuntimeError(
+                "Playwright no está instalado o no se han instalado los navegadores. "
+                "Ejecuta: pip install playwright && playwright install chromium"
+            )
+
+    async def _launch_browser(self) -> Browser:
+        if not self.playwright:
+            raise RuntimeError("Playwright no está inicializado")
+        return await self.playwright.chromium.launch(headless=True, args=BROWSER_ARGS)
+
+    async def _new_slot_page(self, context: BrowserContext) -> Page:
+        page = await context.new_page()
+        page.set_default_timeout(self.slot_timeout * 1000)
+        await page.set_extra_http_headers({'Accept-Language': 'es-CO,es;q=0.9'})
         return page
-    
-    async def return_page(self, page: Page) -> None:
-        """
-        Devolver una página al pool para reutilización.
-        Si el pool está lleno o la página está cerrada, simplemente la cerramos.
-        """
-        if self._shutting_down or not self._page_pool:
+
+    async def _launch_worker(self, worker: _BrowserWorker) -> None:
+        """Lanzar el navegador de un worker y publicar sus slots en la cola libre."""
+        browser = await self._launch_browser()
+        worker.generation += 1
+        generation = worker.generation
+        worker.browser = browser
+        worker.renders = 0
+        worker.in_use = 0
+        worker.draining = False
+        worker.pids = []
+        worker.last_rss_bytes = None
+        worker.slots = []
+
+        try:
+            browser.on("disconnected", lambda _b: self._on_disconnected(worker, generation))
+        except Exception:
+            pass
+
+        try:
+            worker.cdp_session = await browser.new_browser_cdp_session()
+        except Exception:
+            worker.cdp_session = None
+
+        try:
+            for i in range(self.contexts_per_browser):
+                context = await browser.new_context(**CONTEXT_OPTIONS)
+                page = await self._new_slot_page(context)
+                worker.slots.append(_BrowserSlot(worker, context, page, i))
+        except Exception:
+            worker.generation += 1
+            worker.browser = None
+            worker.slots = []
             try:
-                if not page.is_closed():
-                    await page.close()
+                await browser.close()
             except Exception:
                 pass
+            raise
+
+        if self._free is not None:
+            for slot in worker.slots:
+                self._free.put_nowait(slot)
+
+    def _on_disconnected(self, worker: _BrowserWorker, generation: int) -> None:
+        # Solo reaccionar a la caída del proceso vigente de este worker
+        if self._shutting_down or worker.generation != generation or worker.restarting:
             return
-        
-        try:
-            # Verificar que la página sigue siendo válida
-            if page.is_closed():
-                return
-            
-            # Limpiar la página
+        logger.warning("Navegador %s del pool desconectado; reiniciando en segundo plano", worker.index)
+        self._schedule_restart(worker)
+
+    def _schedule_restart(self, worker: _BrowserWorker) -> None:
+        if worker.restarting or self._shutting_down:
+            return
+        worker.restarting = True
+        task = asyncio.get_running_loop().create_task(self._restart_worker(worker))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _restart_worker(self, worker: _BrowserWorker) -> None:
+        """Cerrar y relanzar un navegador; reintenta con backoff si el lanzamiento falla."""
+        old_browser = worker.browser
+        # Invalidar los slots viejos que sigan en la cola libre
+        worker.generation += 1
+        worker.browser = None
+        worker.slots = []
+        if old_browser is not None:
             try:
-                await page.goto("about:blank", wait_until="domcontentloaded", timeout=1000)
+                await old_browser.close()
             except Exception:
-                # Si falla al limpiar, cerrar la página en lugar de devolverla al pool
+                pass
+
+        delay = 1.0
+        try:
+            while not self._shutting_down:
                 try:
-                    await page.close()
-                except Exception:
-                    pass
-                return
-            
-            # Intentar devolver al pool
-            try:
-                self._page_pool.put_nowait(page)
-            except asyncio.QueueFull:
-                # Si el pool está lleno, cerrar la página
+                    await self._launch_worker(worker)
+                    worker.restarts += 1
+                    logger.info("Navegador %s del pool reiniciado (reinicio #%s)", worker.index, worker.restarts)
+                    return
+                except Exception as e:
+                    logger.error("Error relanzando navegador %s del pool: %s", worker.index, e)
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 30.0)
+        finally:
+            worker.restarting = False
+
+    def _slot_is_live(self, slot: _BrowserSlot) -> bool:
+        worker = slot.worker
+        return (
+            slot.generation == worker.generation
+            and not worker.draining
+            and not worker.restarting
+            and worker.browser is not None
+        )
+
+    async def _acquire(self, timeout: Optional[float]) -> _BrowserSlot:
+        if not self._initialized or self._shutting_down:
+            await self.initialize()
+        if self._free is None:
+            raise RuntimeError("El pool de navegadores no está inicializado")
+
+        wait_for = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + wait_for
+        self._waiting += 1
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(
+                        f"No hay páginas disponibles en el pool de PDFs tras {wait_for:.0f}s de espera"
+                    )
                 try:
-                    await page.close()
-                except Exception:
-                    pass
-        except Exception as e:
-            logger.warning(f"Error devolviendo página al pool: {e}")
-            # En caso de error, cerrar la página
+                    slot = await asyncio.wait_for(self._free.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    raise PoolTimeoutError(
+                        f"No hay páginas disponibles en el pool de PDFs tras {wait_for:.0f}s de espera"
+                    )
+                # Slots de un navegador reciclado o caído se descartan
+                if not self._slot_is_live(slot):
+                    continue
+                if slot.page.is_closed():
+                    try:
+                        slot.page = await self._new_slot_page(slot.context)
+                    except Exception:
+                        self._schedule_restart(slot.worker)
+                        continue
+                slot.worker.in_use += 1
+                return slot
+        finally:
+            self._waiting -= 1
+
+    async def _release(self, slot: _BrowserSlot, failed: bool = False) -> None:
+        worker = slot.worker
+        if slot.generation != worker.generation:
+            # El navegador ya se reinició; el slot viejo muere con él
+            return
+        worker.in_use = max(0, worker.in_use - 1)
+        worker.renders += 1
+
+        if not worker.draining and await self._needs_recycle(worker):
+            worker.draining = True
+            logger.info(
+                "Reciclando navegador %s del pool (renders=%s, rss=%s)",
+                worker.index, worker.renders, worker.last_rss_bytes,
+            )
+
+        if worker.draining:
+            if worker.in_use == 0:
+                self._schedule_restart(worker)
+            return
+
+        healthy = not slot.page.is_closed()
+        if healthy:
+            try:
+                # Liberar el DOM del informe anterior antes de devolver la página
+                await slot.page.goto("about:blank", wait_until="domcontentloaded", timeout=1000)
+            except Exception:
+                healthy = False
+        if not healthy or failed:
+            try:
+                if not slot.page.is_closed():
+                    await slot.page.close()
+                slot.page = await self._new_slot_page(slot.context)
+            except Exception:
+                # Contexto inservible: reiniciar el navegador completo
+                worker.draining = True
+                if worker.in_use == 0:
+                    self._schedule_restart(worker)
+                return
+
+        if self._free is not None and not self._shutting_down:
+            self._free.put_nowait(slot)
+
+    async def _needs_recycle(self, worker: _BrowserWorker) -> bool:
+        if self.max_renders_per_browser and worker.renders >= self.max_renders_per_browser:
+            return True
+        if self.max_browser_rss_mb and worker.renders % RSS_CHECK_EVERY == 0:
+            await self._refresh_pids(worker)
+            rss = _read_rss_bytes(worker.pids)
+            worker.last_rss_bytes = rss
+            if rss is not None and rss > self.max_browser_rss_mb * 1024 * 1024:
+                return True
+        return False
+
+    async def _refresh_pids(self, worker: _BrowserWorker) -> None:
+        """Actualizar los PIDs (navegador y renderers) de un worker usando CDP."""
+        if worker.cdp_session is None:
+            return
+        try:
+            info = await worker.cdp_session.send("SystemInfo.getProcessInfo")
+            worker.pids = [int(p["id"]) for p in info.get("processInfo", []) if p.get("id")]
+        except Exception:
+            worker.pids = []
+
+    @asynccontextmanager
+    async def checkout(self, timeout: Optional[float] = None) -> AsyncIterator[Page]:
+        """
+        Prestar una página del pool durante el bloque `async with`.
+        Espera en cola hasta `timeout` segundos (por defecto PDF_POOL_CHECKOUT_TIMEOUT)
+        y la devuelve siempre al salir, marcándola como fallida si hubo excepción.
+        """
+        slot = await self._acquire(timeout)
+        failed = False
+        try:
+            yield slot.page
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            await self._release(slot, failed=failed)
+
+    async def get_page(self, timeout: Optional[float] = None) -> Page:
+        """
+        Obtener una página del pool esperando si no hay slots libres.
+        La página debe ser devuelta con return_page() después de usarse.
+        """
+        slot = await self._acquire(timeout)
+        self._leased[id(slot.page)] = slot
+        return slot.page
+
+    async def return_page(self, page: Page, failed: bool = False) -> None:
+        """Devolver al pool una página obtenida con get_page()."""
+        slot = self._leased.pop(id(page), None)
+        if slot is None:
+            # Página ajena al pool: simplemente cerrarla
             try:
                 if not page.is_closed():
                     await page.close()
             except Exception:
                 pass
-    
+            return
+        await self._release(slot, failed=failed)
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas instantáneas del pool (para monitoreo y dimensionamiento)."""
+        return {
+            "initialized": self._initialized,
+            "browsers": self.browsers,
+            "contexts_per_browser": self.contexts_per_browser,
+            "capacity": self.capacity,
+            "in_use": sum(w.in_use for w in self._workers),
+            "available": self._free.qsize() if self._free is not None else 0,
+            "waiting": self._waiting,
+            "restarts": sum(w.restarts for w in self._workers),
+            "workers": [
+                {
+                    "index": w.index,
+                    "renders": w.renders,
+                    "in_use": w.in_use,
+                    "draining": w.draining,
+                    "restarting": w.restarting,
+                    "restarts": w.restarts,
+                    "rss_bytes": w.last_rss_bytes,
+                }
+                for w in self._workers
+            ],
+        }
+
     async def _cleanup(self) -> None:
         """Limpiar recursos del pool"""
         try:
-            # Cerrar todas las páginas del pool
-            if self._page_pool:
-                while not self._page_pool.empty():
+            for task in list(self._background):
+                task.cancel()
+            self._background.clear()
+
+            for worker in self._workers:
+                worker.generation += 1
+                for slot in worker.slots:
                     try:
-                        page = self._page_pool.get_nowait()
-                        if not page.is_closed():
-                            await page.close()
+                        await slot.context.close()
                     except Exception:
                         pass
-                self._page_pool = None
-            
-            if self.context:
-                await self.context.close()
-                self.context = None
-            if self.browser:
-                await self.browser.close()
-                self.browser = None
+                worker.slots = []
+                if worker.browser:
+                    try:
+                        await worker.browser.close()
+                    except Exception:
+                        pass
+                    worker.browser = None
+            self._workers = []
+            self._free = None
+            self._leased.clear()
+
             if self.playwright:
                 await self.playwright.stop()
                 self.playwright = None
@@ -236,29 +497,25 @@ class BrowserPool:
             logger.info("Pool de navegadores limpiado")
         except Exception as e:
             logger.error(f"Error limpiando pool de navegadores: {e}")
-    
+
     async def shutdown(self) -> None:
         """Cerrar el pool (llamar en shutdown de la aplicación)"""
         if self._shutting_down:
             return
-        
+
         self._shutting_down = True
         async with self._lock:
             await self._cleanup()
-    
+
     async def is_healthy(self) -> bool:
-        """Verificar si el pool está saludable"""
+        """Verificar si el pool está saludable (al menos un navegador conectado)"""
         if not self._initialized or self._shutting_down:
             return False
-        try:
-            # Intentar crear y cerrar una página de prueba
-            if self.context:
-                test_page = await self.context.new_page()
-                await test_page.close()
-                return True
-            return False
-        except Exception:
-            # Si falla, reinicializar en el próximo uso
-            self._initialized = False
-            return False
-
+        for worker in self._workers:
+            browser = worker.browser
+            try:
+                if browser is not None and browser.is_connected() and not worker.restarting:
+                    return True
+            except Exception:
+                continue
+        return False
@@ -1,12 +1,119 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Union
 from datetime import datetime, timezone
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.core.exceptions import NotFoundError, ConflictError, BadRequestError
-from app.modules.cases.schemas.case import CaseCreate, CaseUpdate, CaseResponse
-from app.modules.cases.repositories.case_repository import CaseRepository
+from app.core.serialization import construct_trusted, loose_int, loose_str
+from app.core.pagination import apply_keyset
+from app.modules.cases.schemas.case import CaseCreate, CaseUpdate, CaseResponse, CaseListItem, CaseListPatient
+from app.modules.cases.repositories.case_repository import CASE_LIST_FIELDS, CaseRepository, case_list_projection
+from app.modules.cases.repositories.case_search_repository import CaseSearchRepository, query_terms
 from app.modules.cases.repositories.consecutive_repository import CaseConsecutiveRepository
+from app.modules.cases.services.pdf_cache import invalidate_case_pdf
+from app.modules.cases.services.statistics.case_stats_rollup import schedule_case_stats_refresh
 from bson import ObjectId
 
+# Valores por defecto de _to_response para los escalares del listado
+LIST_ITEM_DEFAULTS = {"case_code": "", "state": "En proceso", "priority": "Normal"}
+
+
+def normalize_patient_info(patient: Dict[str, Any]) -> Dict[str, Any]:
+    """patient_info de un caso leído de la BD con la forma (y los tipos) de PatientInfo."""
+    # Normalize patient_info using only new structure (no legacy fallbacks)
+    entity_info = patient.get("entity_info") or {}
+    location = patient.get("location") or {}
+
+    normalized_patient = {
+        "patient_code": patient.get("patient_code") or "",
+        "identification_type": loose_int(patient.get("identification_type") or None),
+        "identification_number": loose_str(patient.get("identification_number") or None),
+        "name": patient.get("name") or "",
+        "age": int(patient.get("age") or 0),
+        "gender": patient.get("gender") or "",
+        "entity_info": {
+            "id": loose_str(entity_info.get("id") or ""),
+            "name": entity_info.get("name") or "",
+        },
+        "care_type": patient.get("care_type") or "",
+        "observations": patient.get("observations"),
+    }
+
+    # Agregar birth_date si está presente
+    if patient.get("birth_date"):
+        normalized_patient["birth_date"] = patient.get("birth_date")
+
+    # Agregar location si está presente y tiene al menos un campo
+    if location and any(location.values()):
+        normalized_location = {}
+        if location.get("municipality_code"):
+            normalized_location["municipality_code"] = location.get("municipality_code")
+        if location.get("municipality_name"):
+            normalized_location["municipality_name"] = location.get("municipality_name")
+        if location.get("subregion"):
+            normalized_location["subregion"] = location.get("subregion")
+        if location.get("address"):
+            normalized_location["address"] = location.get("address")
+        if normalized_location:
+            normalized_patient["location"] = normalized_location
+
+    # Derive patient_code if missing and identification is present
+    id_type = normalized_patient.get("identification_type")
+    id_number = normalized_patient.get("identification_number")
+    if not normalized_patient.get("patient_code") and id_type and id_number:
+        normalized_patient["patient_code"] = f"{id_type}-{id_number}"
+
+    return normalized_patient
+
+
+def normalize_samples(samples: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Muestras con `quantity` entera (datos antiguos la guardan como "2" o 2.0)."""
+    normalized = []
+    for sample in samples:
+        tests = sample.get("tests") if isinstance(sample, dict) else None
+        if not tests:
+            normalized.append(sample)
+            continue
+        normalized.append({
+            **sample,
+            "tests": [
+                {**test, "quantity": loose_int(test["quantity"])} if isinstance(test, dict) and "quantity" in test else test
+                for test in tests
+            ],
+        })
+    return normalized
+
+
+def case_response_from_doc(doc: Dict[str, Any]) -> CaseResponse:
+    """CaseResponse desde un documento de `cases` (compartido por los servicios de casos)."""
+    normalized_patient = normalize_patient_info(doc.get("patient_info") or {})
+
+    # Use samples only from new structure
+    samples = normalize_samples(doc.get("samples") or [])
+
+    doc_out = {
+        "id": str(doc.get("_id")),
+        "case_code": doc.get("case_code") or "",
+        "patient_info": normalized_patient,
+        "requesting_physician": doc.get("requesting_physician"),
+        "service": doc.get("service"),
+        "samples": samples,
+        "state": doc.get("state") or "En proceso",
+        "priority": doc.get("priority") or "Normal",
+        "observations": doc.get("observations"),
+        "created_at": doc.get("created_at"),
+        "updated_at": doc.get("updated_at"),
+        "signed_at": doc.get("signed_at"),
+        "assigned_pathologist": doc.get("assigned_pathologist"),
+        "assigned_resident": doc.get("assigned_resident"),
+        "result": doc.get("result"),
+        "delivered_to": doc.get("delivered_to"),
+        "delivered_at": doc.get("delivered_at"),
+        "business_days": loose_int(doc.get("business_days")),
+        "additional_notes": doc.get("additional_notes") or [],
+        "complementary_tests": doc.get("complementary_tests") or [],
+    }
+    # Documento ya normalizado desde nuestra BD: construir sin revalidar
+    return construct_trusted(CaseResponse, doc_out)
+
 
 class CaseService:
     def __init__(self, db: AsyncIOMotorDatabase):
@@ -35,6 +142,7 @@ class CaseService:
 
             try:
                 doc = await self.repo.create(data)
+                schedule_case_stats_refresh(self.db, doc)
                 return self._to_response(doc)
             except Exception as e:
                 if "duplicate key error" in str(e).lower():
@@ -54,6 +162,8 @@ class CaseService:
                 raise BadRequestError(f"No se puede marcar como completado el caso {case_code} que está en estado '{current_state}'. Solo se pueden completar casos en estado 'Por entregar'.")
         
         updated = await self.repo.update_by_case_code(case_code, payload.model_dump(exclude_unset=True))
+        await invalidate_case_pdf(case_code)
+        schedule_case_stats_refresh(self.db, doc, updated)
         return self._to_response(updated)
 
     async def delete_case(self, case_code: str) -> Dict[str, Any]:
@@ -61,6 +171,8 @@ class CaseService:
         if not doc:
             raise NotFoundError(f"Caso con código {case_code} no encontrado")
         ok = await self.repo.delete_by_case_code(case_code)
+        await invalidate_case_pdf(case_code)
+        schedule_case_stats_refresh(self.db, doc)
         return {"deleted": ok, "case_code": case_code}
 
     async def get_case(self, case_code: str) -> CaseResponse:
@@ -69,6 +181,11 @@ class CaseService:
             raise NotFoundError(f"Caso con código {case_code} no encontrado")
         return self._to_response(doc)
 
+    async def get_cases_by_codes(self, case_codes: List[str]) -> Dict[str, CaseResponse]:
+        """Obtener varios casos en una sola consulta, indexados por código"""
+        docs = await self.repo.get_by_case_codes(case_codes)
+        return {doc["case_code"]: self._to_response(doc) for doc in docs}
+
     async def list_cases(
         self,
         skip: int = 0,
@@ -81,16 +198,33 @@ class CaseService:
         date_from: Optional[str] = None,
         date_to: Optional[str] = None,
         entity_codes: Optional[List[str]] = None,
-        current_user_id: Optional[str] = None
-    ) -> List[CaseResponse]:
-        """Listar casos con filtros opcionales"""
+        current_user_id: Optional[str] = None,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None
+    ) -> Union[List[CaseResponse], List[CaseListItem]]:
+        """
+        Listar casos con filtros opcionales (con `cursor`, desde el último caso de la página anterior).
+        Con `fields` se proyectan solo esos campos y se devuelven filas CaseListItem.
+        """
         # Índices inicializados en el arranque; no repetir aquí
+        projection = None
+        if fields is not None:
+            unknown = [field for field in fields if field not in CASE_LIST_FIELDS]
+            if unknown:
+                raise BadRequestError(f"Campos no disponibles en el listado: {', '.join(unknown)}")
+            projection = case_list_projection(fields)
         
         # Construir filtros de MongoDB
         filters = {}
         
-        # Filtro de búsqueda general (nombre, documento o código de caso)
-        if search:
+        # Búsqueda general (nombre, documento o código de caso): por tokens indexados si están
+        # listos, con resultados por relevancia y paginación por skip; si no, con regex
+        terms = query_terms(search) if search else []
+        search_repo = CaseSearchRepository(self.db) if terms else None
+        ranked = search_repo is not None and await search_repo.is_ready()
+        if ranked and cursor:
+            raise BadRequestError("La paginación por cursor no aplica a búsquedas por relevancia; use skip")
+        if search and not ranked:
             search_regex = {"$regex": search, "$options": "i"}
             filters["$or"] = [
                 {"case_code": search_regex},
@@ -162,83 +296,41 @@ class CaseService:
             # Filtrar por lista de códigos de entidad (HAMA, etc.)
             filters["patient_info.entity_info.id"] = {"$in": entity_codes}
         
-        # Ejecutar consulta con paginación
-        cursor = self.repo.collection.find(filters).sort("created_at", -1).skip(skip).limit(limit)
-        docs = await cursor.to_list(length=limit)
-        
+        if ranked:
+            docs = await search_repo.search(filters, terms, skip, limit, projection=projection)
+        else:
+            # Ejecutar consulta con paginación: por cursor (created_at, _id) o por skip
+            query_filters = apply_keyset(filters, cursor, "created_at", -1)
+            if projection is None:
+                query = self.repo.collection.find(query_filters)
+            else:
+                query = self.repo.collection.find(query_filters, projection)
+            query = query.sort([("created_at", -1), ("_id", -1)])
+            if not cursor:
+                query = query.skip(skip)
+            docs = await query.limit(limit).to_list(length=limit)
+
+        if projection is not None:
+            return [self._to_list_item(doc, fields) for doc in docs]
         # Convertir a CaseResponse
         return [self._to_response(doc) for doc in docs]
 
-    def _to_response(self, doc: Dict[str, Any]) -> CaseResponse:
-        # Normalize patient_info using only new structure (no legacy fallbacks)
-        patient = doc.get("patient_info") or {}
-        entity_info = patient.get("entity_info") or {}
-        location = patient.get("location") or {}
-        
-        normalized_patient = {
-            "patient_code": patient.get("patient_code") or "",
-            "identification_type": patient.get("identification_type") or None,
-            "identification_number": patient.get("identification_number") or None,
-            "name": patient.get("name") or "",
-            "age": int(patient.get("age") or 0),
-            "gender": patient.get("gender") or "",
-            "entity_info": {
-                "id": entity_info.get("id") or "",
-                "name": entity_info.get("name") or "",
-            },
-            "care_type": patient.get("care_type") or "",
-            "observations": patient.get("observations"),
-        }
-        
-        # Agregar birth_date si está presente
-        if patient.get("birth_date"):
-            normalized_patient["birth_date"] = patient.get("birth_date")
-        
-        # Agregar location si está presente y tiene al menos un campo
-        if location and any(location.values()):
-            normalized_location = {}
-            if location.get("municipality_code"):
-                normalized_location["municipality_code"] = location.get("municipality_code")
-            if location.get("municipality_name"):
-                normalized_location["municipality_name"] = location.get("municipality_name")
-            if location.get("subregion"):
-                normalized_location["subregion"] = location.get("subregion")
-            if location.get("address"):
-                normalized_location["address"] = location.get("address")
-            if normalized_location:
-                normalized_patient["location"] = normalized_location
-        
-        # Derive patient_code if missing and identification is present
-        id_type = normalized_patient.get("identification_type")
-        id_number = normalized_patient.get("identification_number")
-        if not normalized_patient.get("patient_code") and id_type and id_number:
-            normalized_patient["patient_code"] = f"{id_type}-{id_number}"
-
-        # Use samples only from new structure
-        samples = doc.get("samples") or []
-
-        doc_out = {
-            "id": str(doc.get("_id")),
-            "case_code": doc.get("case_code") or "",
-            "patient_info": normalized_patient,
-            "requesting_physician": doc.get("requesting_physician"),
-            "service": doc.get("service"),
-            "samples": samples,
-            "state": doc.get("state") or "En proceso",
-            "priority": doc.get("priority") or "Normal",
-            "observations": doc.get("observations"),
-            "created_at": doc.get("created_at"),
-            "updated_at": doc.get("updated_at"),
-            "signed_at": doc.get("signed_at"),
-            "assigned_pathologist": doc.get("assigned_pathologist"),
-            "assigned_resident": doc.get("assigned_resident"),
-            "result": doc.get("result"),
-            "delivered_to": doc.get("delivered_to"),
-            "delivered_at": doc.get("delivered_at"),
-            "business_days": doc.get("business_days"),
-            "additional_notes": doc.get("additional_notes") or [],
-            "complementary_tests": doc.get("complementary_tests") or [],
-        }
-        return CaseResponse(**doc_out)
-
+    def _to_list_item(self, doc: Dict[str, Any], fields: List[str]) -> CaseListItem:
+        # Fila proyectada: misma normalización por campo que _to_response, solo en los campos pedidos
+        doc["id"] = str(doc.pop("_id"))
+        for field in fields:
+            if field == "patient_info":
+                patient = normalize_patient_info(doc.get("patient_info") or {})
+                doc[field] = {key: patient.get(key) for key in CaseListPatient.model_fields}
+            elif field == "samples":
+                doc[field] = normalize_samples(doc.get(field) or [])
+            elif field == "business_days":
+                doc[field] = loose_int(doc.get(field))
+            elif field in LIST_ITEM_DEFAULTS:
+                doc[field] = doc.get(field) or LIST_ITEM_DEFAULTS[field]
+            else:
+                doc.setdefault(field, None)
+        return construct_trusted(CaseListItem, doc)
 
+    def _to_response(self, doc: Dict[str, Any]) -> CaseResponse:
+        return case_response_from_doc(doc)
@@ -0,0 +1,122 @@
+"""
+Sanitizador de HTML para los campos de resultado de los informes en PDF.
+
+Recorre el HTML una sola vez con expresiones precompiladas: conserva solo las
+etiquetas permitidas, elimina atributos de eventos (`on*`), deja en `style`
+únicamente las propiedades de alineación y énfasis, y descarta comentarios y
+bloques `<script>`/`<style>` completos. El texto entre etiquetas se copia sin
+cambios. Los resultados se memorizan por hash del contenido, porque los lotes
+renderizan muchas veces los mismos textos (plantillas, textos pegados de Word).
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Optional
+import hashlib
+import re
+
+from markupsafe import Markup
+
+ALLOWED_TAGS = frozenset({"div", "span", "br", "p", "b", "strong", "i", "em", "u", "ul", "ol", "li"})
+ALLOWED_STYLE_PROPS = frozenset({"text-align", "font-weight", "font-style", "text-decoration"})
+# Etiquetas cuyo contenido también se descarta
+DROP_CONTENT_TAGS = frozenset({"script", "style"})
+
+MEMO_MAX_ENTRIES = 2048
+
+_TOKEN_RE = re.compile(
+    r"<!--.*?(?:-->|\Z)"                                   # comentario (incluye condicionales de Word)
+    r"|<(/?)([a-zA-Z][a-zA-Z0-9:_-]*)"                     # apertura o cierre de etiqueta
+    r"((?:\"[^\"]*\"|'[^']*'|[^\"'>])*)"                    # atributos (`/` también separa)
+    r">",
+    re.S,
+)
+# `<` seguido de letra o `/` que no formó una etiqueta válida (p. ej. sin `>`)
+_STRAY_LT_RE = re.compile(r"<(?=[a-zA-Z/])")
+_SELF_CLOSING_RE = re.compile(r"(?:^|[\s\"'])/\s*$")
+_ATTR_RE = re.compile(r"([^\s=>/\"']+)(?:\s*=\s*(\"[^\"]*\"|'[^']*'|[^\s>]+))?")
+_CLOSE_RE = {tag: re.compile(rf"</{tag}\s*>", re.I) for tag in DROP_CONTENT_TAGS}
+
+_memo: OrderedDict[bytes, Markup] = OrderedDict()
+
+
+def _clean_style(value: str) -> str:
+    kept = []
+    for decl in value.split(";"):
+        prop, sep, val = decl.partition(":")
+        if not sep:
+            continue
+        prop = prop.strip().lower()
+        if prop in ALLOWED_STYLE_PROPS:
+            kept.append(f"{prop}: {val.strip()}")
+    return "; ".join(kept).replace('"', "&quot;")
+
+
+def _clean_attrs(raw: str) -> str:
+    out = []
+    for match in _ATTR_RE.finditer(raw):
+        name = match.group(1).lower()
+        if name.startswith("on"):
+            continue
+        value = match.group(2)
+        if name == "style":
+            if value is None:
+                continue
+            if value[:1] in ("'", '"'):
+                value = value[1:-1]
+            style = _clean_style(value)
+            if style:
+                out.append(f' style="{style}"')
+            continue
+        out.append(f" {match.group(0)}")
+    return "".join(out)
+
+
+def _sanitize(html: str) -> str:
+    out = []
+    pos = 0
+    length = len(html)
+    while pos < length:
+        match = _TOKEN_RE.search(html, pos)
+        if match is None:
+            out.append(_STRAY_LT_RE.sub("", html[pos:]))
+            break
+        out.append(_STRAY_LT_RE.sub("", html[pos:match.start()]))
+        pos = match.end()
+
+        tag = match.group(2)
+        if tag is None:
+            # Comentario
+            continue
+        tag = tag.lower()
+        closing = bool(match.group(1))
+        if tag in DROP_CONTENT_TAGS:
+            if not closing:
+                end = _CLOSE_RE[tag].search(html, pos)
+                pos = end.end() if end else length
+            continue
+        if tag not in ALLOWED_TAGS:
+            continue
+        if closing:
+            out.append(f"</{tag}>")
+        else:
+            attrs = match.group(3)
+            self_closing = "/" if _SELF_CLOSING_RE.search(attrs) else ""
+            out.append(f"<{tag}{_clean_attrs(attrs)}{self_closing}>")
+    return "".join(out)
+
+
+def sanitize_html(html: Optional[str]) -> Markup:
+    """Sanitizar HTML de un campo de resultado (memorizado por contenido)."""
+    if not html:
+        return Markup("")
+    key = hashlib.blake2b(html.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    cached = _memo.get(key)
+    if cached is not None:
+        _memo.move_to_end(key)
+        return cached
+    result = Markup(_sanitize(html))
+    _memo[key] = result
+    if len(_memo) > MEMO_MAX_ENTRIES:
+        _memo.popitem(last=False)
+    return result
@@ -0,0 +1,163 @@
+"""
+Asesor de índices de `cases`.
+
+Ejecuta `explain` sobre el `$match` inicial de las consultas de estadísticas (los
+mismos builders que usan sus repositorios) y reporta las que terminan en COLLSCAN
+y el índice que usa cada una. También detecta
+índices simples redundantes (su clave es prefijo de otro índice no parcial), que
+solo encarecen cada inserción de casos, y puede eliminarlos.
+Se usa desde Scripts/index_advisor.py y, opcionalmente, al arrancar la app.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.modules.cases.repositories.statistics.dashboard_statistics_repository import DashboardStatisticsRepository
+from app.modules.cases.repositories.statistics.entity_statistics_repository import EntityStatisticsRepository
+from app.modules.cases.repositories.statistics.name_filters import CASE_FIELDS, merge_match, with_object_ids
+from app.modules.cases.repositories.statistics.opportunity_statistics_repository import (
+    OpportunityStatisticsRepository,
+)
+from app.modules.cases.repositories.statistics.pathologist_statistics_repository import (
+    PathologistStatisticsRepository,
+)
+from app.modules.cases.repositories.statistics.test_statistics_repository import TestStatisticsRepository
+
+logger = logging.getLogger(__name__)
+
+Pipeline = List[Dict[str, Any]]
+MatchBuilder = Callable[[datetime, datetime], Dict[str, Any]]
+
+
+def statistics_query_shapes(database: AsyncIOMotorDatabase) -> Dict[str, MatchBuilder]:
+    """
+    $match iniciales de las estadísticas sobre `cases`, tomados de los mismos builders
+    que usan los repositorios (así el asesor explica las consultas reales).
+    """
+    opportunity = OpportunityStatisticsRepository(database)
+    pathologists = PathologistStatisticsRepository(database)
+    return {
+        "opportunity.range": opportunity.opportunity_match,
+        "dashboard.windowed_counts": lambda start, end: DashboardStatisticsRepository.windowed_match({}, start, end),
+        "completed.by_signed_at": EntityStatisticsRepository.completed_match,
+        "entity.completed": lambda start, end: merge_match(
+            EntityStatisticsRepository.completed_match(start, end),
+            {CASE_FIELDS["entity"][0]: {"$in": with_object_ids(["0" * 24])}},
+        ),
+        "pathologist.performance": lambda start, end: merge_match(
+            pathologists.performance_match(start, end),
+            {CASE_FIELDS["pathologist"][0]: {"$in": ["P"]}},
+        ),
+        "tests.completed": TestStatisticsRepository.completed_tests_match,
+    }
+
+
+def plan_stages(explain: Any) -> Tuple[Set[str], Set[str]]:
+    """(etapas, índices) que aparecen en cualquier nivel de la salida de explain."""
+    stages: Set[str] = set()
+    indexes: Set[str] = set()
+    pending = [explain]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, dict):
+            if isinstance(node.get("stage"), str):
+                stages.add(node["stage"])
+            if isinstance(node.get("indexName"), str):
+                indexes.add(node["indexName"])
+            pending.extend(node.values())
+        elif isinstance(node, list):
+            pending.extend(node)
+    return stages, indexes
+
+
+def _plain_key(info: Dict[str, Any]) -> Optional[List[Tuple[str, Any]]]:
+    # Clave de un índice b-tree sin opciones que cambien su alcance; None si no aplica
+    if any(info.get(option) for option in ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds")):
+        return None
+    key = [(field, direction) for field, direction in info.get("key", [])]
+    if not key or any(direction not in (1, -1) for _, direction in key):
+        return None
+    return key
+
+
+def redundant_indexes(index_info: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Índices cuya clave es prefijo estricto de otro índice no parcial: {redundante: cubierto_por}.
+    Para claves de un campo la dirección no importa; para compuestas debe coincidir o invertirse entera.
+    """
+    keys = {name: _plain_key(info) for name, info in index_info.items() if name != "_id_"}
+    covering = {
+        name: [(field, direction) for field, direction in info.get("key", [])]
+        for name, info in index_info.items()
+        if name != "_id_" and not info.get("partialFilterExpression") and not info.get("sparse")
+    }
+    redundant: Dict[str, str] = {}
+    for name, key in keys.items():
+        if key is None:
+            continue
+        for other, other_key in covering.items():
+            if other == name or len(other_key) <= len(key):
+                continue
+            prefix = other_key[:len(key)]
+            if [f for f, _ in prefix] != [f for f, _ in key]:
+                continue
+            same = all(d == od for (_, d), (_, od) in zip(key, prefix))
+            inverted = all(d == -od for (_, d), (_, od) in zip(key, prefix))
+            if len(key) == 1 or same or inverted:
+                redundant[name] = other
+                break
+    return redundant
+
+
+class IndexAdvisor:
+    def __init__(self, database: AsyncIOMotorDatabase, collection: str = "cases"):
+        self.db = database
+        self.collection_name = collection
+        self.collection = database[collection]
+
+    async def explain(self, pipeline: Pipeline) -> Dict[str, Any]:
+        return await self.db.command(
+            "explain",
+            {"aggregate": self.collection_name, "pipeline": pipeline, "cursor": {}},
+            verbosity="queryPlanner",
+        )
+
+    async def report(self, shapes: Optional[Dict[str, MatchBuilder]] = None) -> Dict[str, Any]:
+        """Plan de cada forma registrada (sobre el último mes), COLLSCANs e índices redundantes."""
+        end = datetime.now(timezone.utc)
+        start = end - timedelta(days=30)
+        plans: Dict[str, Dict[str, Any]] = {}
+        for name, build in (shapes or statistics_query_shapes(self.db)).items():
+            stages, indexes = plan_stages(await self.explain([{"$match": build(start, end)}]))
+            plans[name] = {"collscan": "COLLSCAN" in stages, "indexes": sorted(indexes)}
+        return {
+            "plans": plans,
+            "collscans": [name for name, plan in plans.items() if plan["collscan"]],
+            "redundant": redundant_indexes(await self.collection.index_information()),
+        }
+
+    async def drop_redundant(self) -> List[str]:
+        """Eliminar los índices redundantes. Devuelve sus nombres."""
+        dropped = []
+        for name, covered_by in redundant_indexes(await self.collection.index_information()).items():
+            await self.collection.drop_index(name)
+            logger.info("Índice %s.%s eliminado (cubierto por %s)", self.collection_name, name, covered_by)
+            dropped.append(name)
+        return dropped
+
+
+async def log_index_report(database: AsyncIOMotorDatabase) -> None:
+    """Registrar en el log las consultas con COLLSCAN y los índices redundantes (nunca falla)."""
+    try:
+        report = await IndexAdvisor(database).report()
+    except Exception as e:
+        logger.warning("No se pudo ejecutar el asesor de índices: %s", e)
+        return
+    for name in report["collscans"]:
+        logger.warning("Consulta de estadísticas %s sin índice (COLLSCAN)", name)
+    for name, covered_by in report["redundant"].items():
+        logger.warning("Índice cases.%s redundante (cubierto por %s)", name, covered_by)
@@ -0,0 +1,182 @@
+"""
+Caché direccionada por contenido de los PDFs de informes.
+
+La clave es un SHA-256 del contexto exacto con el que se renderiza la plantilla
+(caso mapeado, pruebas complementarias, firma del patólogo) más la versión de
+`case_report.html`, de modo que un cambio en cualquiera de esas piezas produce
+una clave distinta y nunca se sirve un PDF desactualizado. Tiene dos niveles:
+una LRU en memoria acotada por bytes y un nivel en disco bajo `PDF_CACHE_DIR`,
+fuera de `uploads/` porque ese directorio se sirve sin autenticación.
+Los hooks de invalidación solo liberan espacio de versiones que ya no se usarán.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple
+import asyncio
+import hashlib
+import json
+import logging
+import shutil
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Solo se cachean informes firmados: los borradores cambian con cada edición
+CACHEABLE_STATES = {"Por entregar", "Completado"}
+
+TEMPLATE_PATH = Path(__file__).parent.parent / "templates" / "case_report.html"
+
+_template_version_cache: Optional[Tuple[int, str]] = None
+
+
+def _template_version() -> str:
+    """Hash corto del contenido de la plantilla (se recalcula si cambia el mtime)."""
+    global _template_version_cache
+    try:
+        mtime = TEMPLATE_PATH.stat().st_mtime_ns
+    except OSError:
+        return "missing"
+    if _template_version_cache and _template_version_cache[0] == mtime:
+        return _template_version_cache[1]
+    digest = hashlib.sha256(TEMPLATE_PATH.read_bytes()).hexdigest()[:16]
+    _template_version_cache = (mtime, digest)
+    return digest
+
+
+def compute_pdf_key(
+    case_data: Dict[str, Any],
+    complementary_tests: Optional[Dict[str, Any]],
+    signature: Optional[str],
+) -> str:
+    """Clave de contenido para un informe renderizado."""
+    h = hashlib.sha256()
+    h.update(_template_version().encode())
+    h.update(b"\x00")
+    h.update(json.dumps(case_data, sort_keys=True, default=str, ensure_ascii=False).encode("utf-8"))
+    h.update(b"\x00")
+    h.update(json.dumps(complementary_tests, sort_keys=True, default=str, ensure_ascii=False).encode("utf-8"))
+    h.update(b"\x00")
+    # La firma puede ser un data URL grande; basta con su propio hash
+    h.update(hashlib.sha256((signature or "").encode("utf-8")).digest())
+    return h.hexdigest()
+
+
+class PdfArtifactCache:
+    """LRU en memoria (acotada por bytes) respaldada por archivos en disco."""
+
+    def __init__(self, directory: Path, memory_bytes: int, enabled: bool = True):
+        self.directory = Path(directory)
+        self.memory_bytes = max(0, memory_bytes)
+        self.enabled = enabled
+        # clave -> (case_code, bytes), en orden de uso
+        self._memory: OrderedDict[str, Tuple[str, bytes]] = OrderedDict()
+        self._memory_size = 0
+        self._keys_by_case: Dict[str, Set[str]] = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _case_dir(self, case_code: str) -> Path:
+        # El directorio se nombra por hash del código: `uploads` se sirve como estático
+        # y no queremos rutas predecibles que expongan informes de pacientes.
+        return self.directory / hashlib.sha256(case_code.encode("utf-8")).hexdigest()[:24]
+
+    def _remember(self, case_code: str, key: str, data: bytes) -> None:
+        if not self.memory_bytes or len(data) > self.memory_bytes:
+            return
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = (case_code, data)
+        self._memory_size += len(data)
+        self._keys_by_case.setdefault(case_code, set()).add(key)
+        while self._memory_size > self.memory_bytes and self._memory:
+            old_key, (old_case, old) = self._memory.popitem(last=False)
+            self._memory_size -= len(old)
+            keys = self._keys_by_case.get(old_case)
+            if keys is not None:
+                keys.discard(old_key)
+                if not keys:
+                    self._keys_by_case.pop(old_case, None)
+
+    async def get(self, case_code: str, key: str) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        path = self._case_dir(case_code) / f"{key}.pdf"
+        try:
+            data = await asyncio.to_thread(path.read_bytes)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            logger.warning("No se pudo leer PDF cacheado %s: %s", path, e)
+            self.misses += 1
+            return None
+        self.disk_hits += 1
+        self._remember(case_code, key, data)
+        return data
+
+    async def put(self, case_code: str, key: str, data: bytes) -> None:
+        if not self.enabled or not data:
+            return
+        self._remember(case_code, key, data)
+        case_dir = self._case_dir(case_code)
+        path = case_dir / f"{key}.pdf"
+
+        def _write() -> None:
+            case_dir.mkdir(parents=True, exist_ok=True)
+            # Solo conservar la versión vigente del informe de este caso
+            for old in case_dir.glob("*.pdf"):
+                if old.name != path.name:
+                    old.unlink(missing_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(data)
+            tmp.replace(path)
+
+        try:
+            await asyncio.to_thread(_write)
+        except Exception as e:
+            logger.warning("No se pudo escribir PDF cacheado %s: %s", path, e)
+
+    async def invalidate(self, case_code: str) -> None:
+        """Descartar todas las versiones cacheadas de un caso."""
+        for key in self._keys_by_case.pop(case_code, set()):
+            entry = self._memory.pop(key, None)
+            if entry is not None:
+                self._memory_size -= len(entry[1])
+        case_dir = self._case_dir(case_code)
+        try:
+            await asyncio.to_thread(shutil.rmtree, case_dir, True)
+        except Exception as e:
+            logger.warning("No se pudo invalidar caché de PDF para %s: %s", case_code, e)
+
+    def clear_memory(self) -> None:
+        self._memory.clear()
+        self._keys_by_case.clear()
+        self._memory_size = 0
+
+
+pdf_cache = PdfArtifactCache(
+    directory=Path(settings.PDF_CACHE_DIR),
+    memory_bytes=settings.PDF_CACHE_MEMORY_MB * 1024 * 1024,
+    enabled=settings.PDF_CACHE_ENABLED,
+)
+
+
+async def invalidate_case_pdf(case_code: str) -> None:
+    """Hook para servicios que modifican un caso (firma, resultado, actualización)."""
+    if not case_code:
+        return
+    try:
+        await pdf_cache.invalidate(case_code)
+    except Exception as e:
+        logger.warning("Error invalidando caché de PDF para %s: %s", case_code, e)
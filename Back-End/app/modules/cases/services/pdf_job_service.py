@@ -0,0 +1,315 @@
+"""
+Trabajos en segundo plano para PDFs por lote.
+
+Un lote grande se encola en `pdf_jobs` y la petición HTTP retorna de inmediato con
+el `job_id`. Un conjunto acotado de workers (compartiendo el `BrowserPool`) reclama
+los trabajos en orden de llegada, escribe el artefacto en `PDF_JOBS_DIR` e informa
+el progreso caso a caso. Los trabajos se arriendan mediante `heartbeat_at`: si el
+proceso que los corría muere, otro worker los retoma. Un barrido periódico elimina
+artefactos y documentos vencidos según `PDF_JOBS_RETENTION_HOURS`.
+
+Los trabajos `prerender` (encolados al firmar si `PDF_PRERENDER_ON_SIGN` está
+activo) no producen artefacto: renderizan un único informe para dejarlo en la
+caché de PDFs y que la primera descarga sea inmediata.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+import os
+import uuid
+
+from app.config.settings import settings
+from app.core.exceptions import BadRequestError, ConflictError, NotFoundError
+from app.modules.cases.repositories.pdf_job_repository import FINAL_STATUSES, PdfJobRepository
+from app.modules.cases.schemas.pdf_job import PdfJobCreate, PdfJobResponse
+
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPES = {"pdf": "application/pdf", "zip": "application/zip"}
+
+
+class JobCancelled(Exception):
+    """El trabajo fue cancelado (o perdió su arrendamiento) mientras se procesaba."""
+
+
+def _retention() -> timedelta:
+    return timedelta(hours=settings.PDF_JOBS_RETENTION_HOURS)
+
+
+class PdfJobService:
+    def __init__(self, database: Any):
+        self.repo = PdfJobRepository(database)
+
+    # Encola un lote; los códigos duplicados se descartan conservando el orden.
+    async def submit(self, payload: PdfJobCreate) -> PdfJobResponse:
+        case_codes: List[str] = []
+        seen = set()
+        for code in payload.case_codes:
+            code = (code or "").strip()
+            if code and code not in seen:
+                seen.add(code)
+                case_codes.append(code)
+        if not case_codes:
+            raise BadRequestError("Se requiere al menos un código de caso")
+        if len(case_codes) > settings.PDF_JOBS_MAX_CASES:
+            raise BadRequestError(f"Máximo {settings.PDF_JOBS_MAX_CASES} casos por trabajo")
+
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "kind": "batch",
+            "status": "queued",
+            "format": payload.format,
+            "case_codes": case_codes,
+            "total": len(case_codes),
+            "rendered": 0,
+            "failed": 0,
+            "cancel_requested": False,
+            "created_at": datetime.now(timezone.utc),
+        }
+        await self.repo.create(job)
+        PdfJobRunner.get_instance().notify()
+        return self._to_response(job)
+
+    # Encola el render de un informe recién firmado para dejarlo en la caché de PDFs.
+    async def enqueue_prerender(self, case_code: str) -> Optional[PdfJobResponse]:
+        if not case_code or await self.repo.has_queued_prerender(case_code):
+            return None
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "kind": "prerender",
+            "status": "queued",
+            "format": "pdf",
+            "case_codes": [case_code],
+            "total": 1,
+            "rendered": 0,
+            "failed": 0,
+            "cancel_requested": False,
+            "created_at": datetime.now(timezone.utc),
+        }
+        await self.repo.create(job)
+        PdfJobRunner.get_instance().notify()
+        return self._to_response(job)
+
+    async def get_job(self, job_id: str) -> PdfJobResponse:
+        return self._to_response(await self._get_doc(job_id))
+
+    async def cancel_job(self, job_id: str) -> PdfJobResponse:
+        doc = await self._get_doc(job_id)
+        if doc.get("status") in FINAL_STATUSES:
+            raise ConflictError(f"El trabajo {job_id} ya finalizó con estado {doc.get('status')}")
+        updated = await self.repo.request_cancel(job_id, _retention())
+        # Si terminó justo entre la lectura y la cancelación, devolver su estado final
+        return self._to_response(updated or await self._get_doc(job_id))
+
+    # Retorna (ruta, nombre de archivo, media type) del artefacto listo para descarga.
+    async def get_artifact(self, job_id: str) -> tuple[Path, str, str]:
+        doc = await self._get_doc(job_id)
+        if doc.get("status") != "completed":
+            raise ConflictError(f"El trabajo {job_id} no está listo (estado: {doc.get('status')})")
+        path = Path(doc.get("artifact_path") or "")
+        if not doc.get("artifact_path") or not path.is_file():
+            raise NotFoundError(f"El archivo del trabajo {job_id} ya no está disponible")
+        fmt = doc.get("format", "pdf")
+        return path, f"casos_{job_id[:8]}.{fmt}", MEDIA_TYPES.get(fmt, "application/octet-stream")
+
+    async def _get_doc(self, job_id: str) -> Dict[str, Any]:
+        doc = await self.repo.get(job_id)
+        if not doc:
+            raise NotFoundError(f"Trabajo {job_id} no encontrado")
+        return doc
+
+    def _to_response(self, doc: Dict[str, Any]) -> PdfJobResponse:
+        download_url = None
+        if doc.get("status") == "completed" and doc.get("kind", "batch") == "batch":
+            download_url = f"{settings.API_V1_STR}/cases/batch/pdf/jobs/{doc['job_id']}/download"
+        return PdfJobResponse(**{**doc, "download_url": download_url})
+
+
+class PdfJobRunner:
+    """Workers en segundo plano que procesan los trabajos de `pdf_jobs`."""
+
+    _instance: Optional["PdfJobRunner"] = None
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        stale_seconds: Optional[float] = None,
+        sweep_interval: Optional[float] = None,
+        jobs_dir: Optional[str] = None,
+    ):
+        self.workers = max(1, workers if workers is not None else settings.PDF_JOBS_WORKERS)
+        self.poll_interval = poll_interval if poll_interval is not None else settings.PDF_JOBS_POLL_INTERVAL
+        self.stale_seconds = stale_seconds if stale_seconds is not None else settings.PDF_JOBS_STALE_SECONDS
+        self.sweep_interval = sweep_interval if sweep_interval is not None else settings.PDF_JOBS_SWEEP_INTERVAL
+        self.jobs_dir = Path(jobs_dir or settings.PDF_JOBS_DIR)
+        self.instance_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.database: Any = None
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._running = False
+
+    @classmethod
+    def get_instance(cls) -> "PdfJobRunner":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    async def start(self, database: Any) -> None:
+        if self._running:
+            return
+        self.database = database
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        self._running = True
+        self._tasks = [
+            asyncio.create_task(self._worker_loop(f"{self.instance_id}-{i}"))
+            for i in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._sweeper_loop()))
+        logger.info("Workers de trabajos PDF iniciados: %s", self.workers)
+
+    def notify(self) -> None:
+        """Despertar a los workers tras encolar un trabajo."""
+        self._wakeup.set()
+
+    async def stop(self) -> None:
+        self._running = False
+        self._wakeup.set()
+        for task in self._tasks:
+            task.cancel()
+        # Los trabajos interrumpidos quedan "running" y se retoman al vencer su latido
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker_loop(self, worker_id: str) -> None:
+        repo = PdfJobRepository(self.database)
+        while self._running:
+            try:
+                job = await repo.claim_next(worker_id, self.stale_seconds)
+            except Exception as e:
+                logger.warning("Error reclamando trabajo PDF: %s", e)
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.run_job(job, worker_id)
+
+    async def run_job(self, job: Dict[str, Any], worker_id: str) -> None:
+        # El latido se renueva aparte durante todo el trabajo: la precarga y la escritura
+        # final de un lote grande pueden tardar más que PDF_JOBS_STALE_SECONDS
+        heartbeat = asyncio.create_task(self._heartbeat_loop(job["job_id"], worker_id))
+        try:
+            if job.get("kind") == "prerender":
+                await self._run_prerender(job, worker_id)
+            else:
+                await self._run_batch(job, worker_id)
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+
+    async def _heartbeat_loop(self, job_id: str, worker_id: str) -> None:
+        repo = PdfJobRepository(self.database)
+        interval = self.stale_seconds / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await repo.heartbeat(job_id, worker_id):
+                    # Terminado, cancelado en cola o retomado por otro worker
+                    return
+            except Exception as e:
+                logger.warning("No se pudo renovar el latido del trabajo PDF %s: %s", job_id, e)
+
+    async def _run_batch(self, job: Dict[str, Any], worker_id: str) -> None:
+        from app.modules.cases.services.pdf_service import CasePdfService
+
+        repo = PdfJobRepository(self.database)
+        job_id = job["job_id"]
+        fmt = job.get("format", "pdf")
+        # Archivos por worker: si otro worker retoma el trabajo, ninguno pisa ni borra los del otro
+        final_path = self.jobs_dir / f"{job_id}.{worker_id}.{fmt}"
+        part_path = self.jobs_dir / f"{job_id}.{worker_id}.{fmt}.part"
+
+        async def on_result(case_code: str, result: Any) -> None:
+            failed = isinstance(result, Exception)
+            progress = await repo.add_progress(job_id, worker_id, rendered=0 if failed else 1, failed=1 if failed else 0)
+            if progress is None or progress.get("cancel_requested"):
+                raise JobCancelled(job_id)
+
+        try:
+            with open(part_path, "wb") as output:
+                await CasePdfService(self.database).write_batch(
+                    job["case_codes"], output, format=fmt, on_result=on_result
+                )
+            part_path.replace(final_path)
+        except JobCancelled:
+            part_path.unlink(missing_ok=True)
+            await repo.finish(job_id, worker_id, "cancelled", _retention())
+            logger.info("Trabajo PDF %s cancelado", job_id)
+            return
+        except asyncio.CancelledError:
+            part_path.unlink(missing_ok=True)
+            raise
+        except Exception as e:
+            part_path.unlink(missing_ok=True)
+            await repo.finish(job_id, worker_id, "failed", _retention(), error=str(e))
+            logger.warning("Trabajo PDF %s falló: %s", job_id, e)
+            return
+
+        if not await repo.finish(job_id, worker_id, "completed", _retention(), artifact_path=str(final_path)):
+            # Otro worker retomó el trabajo o fue cancelado al final: el artefacto no es nuestro
+            final_path.unlink(missing_ok=True)
+
+    async def _run_prerender(self, job: Dict[str, Any], worker_id: str) -> None:
+        from app.modules.cases.services.pdf_service import CasePdfService
+
+        repo = PdfJobRepository(self.database)
+        job_id = job["job_id"]
+        case_code = job["case_codes"][0]
+        try:
+            # generate_case_pdf guarda el resultado en la caché al estar el caso firmado
+            await CasePdfService(self.database).generate_case_pdf(case_code)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await repo.add_progress(job_id, worker_id, failed=1)
+            await repo.finish(job_id, worker_id, "failed", _retention(), error=str(e))
+            logger.warning("Pre-render del caso %s falló: %s", case_code, e)
+            return
+        await repo.add_progress(job_id, worker_id, rendered=1)
+        await repo.finish(job_id, worker_id, "completed", _retention())
+
+    async def sweep(self) -> int:
+        """Eliminar artefactos y documentos vencidos. Retorna cuántos trabajos se borraron."""
+        repo = PdfJobRepository(self.database)
+        await repo.close_abandoned_cancellations(self.stale_seconds, _retention())
+        removed = 0
+        for doc in await repo.list_expired():
+            if doc.get("artifact_path"):
+                try:
+                    await asyncio.to_thread(Path(doc["artifact_path"]).unlink, True)
+                except Exception as e:
+                    logger.warning("No se pudo borrar artefacto %s: %s", doc["artifact_path"], e)
+                    continue
+            await repo.delete(doc["job_id"])
+            removed += 1
+        return removed
+
+    async def _sweeper_loop(self) -> None:
+        while self._running:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.warning("Error en barrido de trabajos PDF: %s", e)
+            await asyncio.sleep(self.sweep_interval)
@@ -0,0 +1,117 @@
+"""
+Métricas de tiempo del pipeline de PDFs.
+
+Cada informe mide sus etapas (carga de datos, pruebas complementarias, firma,
+render de la plantilla, espera por una página del pool, `set_content`, `pdf` y
+combinación de lotes). Los tiempos alimentan histogramas por proceso, expuestos en
+`GET /cases/pdf/metrics` junto con el estado del `BrowserPool`, y por petición se
+devuelven en la cabecera `Server-Timing` del PDF individual.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence
+import time
+
+STAGES = ("data", "complementary", "signature", "render", "checkout", "set_content", "pdf", "merge")
+
+# Límites superiores de los buckets, en segundos
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Histograma de buckets fijos con conteo y suma (al estilo Prometheus)."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # el último es +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self._counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def snapshot(self) -> Dict[str, object]:
+        cumulative: List[Dict[str, object]] = []
+        running = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self._counts):
+            running += count
+            cumulative.append({"le": "+Inf" if bound == float("inf") else bound, "count": running})
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "avg": round(self.sum / self.count, 6) if self.count else 0.0,
+            "max": round(self.max, 6),
+            "buckets": cumulative,
+        }
+
+
+class PdfMetrics:
+    """Histogramas por etapa y contadores del pipeline de PDFs (por proceso)."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self._buckets = tuple(buckets)
+        self.reset()
+
+    def reset(self) -> None:
+        self.histograms: Dict[str, Histogram] = {stage: Histogram(self._buckets) for stage in STAGES}
+        self.cache_hits = 0
+        self.started_at = time.time()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = Histogram(self._buckets)
+        histogram.observe(seconds)
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "since": self.started_at,
+            "cache_hits": self.cache_hits,
+            "stages": {stage: h.snapshot() for stage, h in self.histograms.items()},
+        }
+
+
+pdf_metrics = PdfMetrics()
+
+
+class PdfTimings:
+    """
+    Tiempos por etapa de una petición. Cada medición se registra también en
+    `pdf_metrics`; las etapas repetidas (p. ej. "merge" en un lote) se acumulan.
+    """
+
+    def __init__(self, metrics: Optional[PdfMetrics] = None):
+        self.metrics = metrics
+        self.durations: Dict[str, float] = {}
+        self.cache_hit = False
+        self._started = time.perf_counter()
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.durations[stage] = self.durations.get(stage, 0.0) + seconds
+        (self.metrics or pdf_metrics).observe(stage, seconds)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def mark_cache_hit(self) -> None:
+        self.cache_hit = True
+        (self.metrics or pdf_metrics).cache_hits += 1
+
+    def server_timing(self) -> str:
+        """Valor de la cabecera `Server-Timing` (milisegundos)."""
+        parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.durations.items()]
+        if self.cache_hit:
+            parts.append('cache;desc="hit"')
+        parts.append(f"total;dur={(time.perf_counter() - self._started) * 1000:.1f}")
+        return ", ".join(parts)
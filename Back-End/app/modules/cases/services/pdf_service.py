@@ -1,13 +1,24 @@
 from __future__ import annotations
 
-from typing import Any, Optional, Dict
+from collections import deque
+from io import BytesIO
+from typing import IO, Any, AsyncIterator, Awaitable, Callable, Optional, Dict
 import asyncio
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+import tempfile
+import time
+import zipfile
+from functools import cached_property
+from jinja2 import ChoiceLoader, Environment, FileSystemLoader, ModuleLoader, Template, select_autoescape
 from markupsafe import Markup
 import re
 from pathlib import Path
 from datetime import datetime, date
 
+from app.config.settings import settings
+from app.modules.cases.services.html_sanitizer import sanitize_html
+from app.modules.cases.services.pdf_metrics import PdfTimings
+from app.modules.pathologists.services.signature_cache import resolve_signature, signature_cache
+
 # Mapeo valor interno -> etiqueta para informe (tildes, espacios; igual que frontend)
 METHOD_VALUE_TO_LABEL = {
     "hematoxilina-eosina": "Hematoxilina-Eosina",
@@ -60,297 +71,489 @@ def _method_values_to_labels(values: list) -> list:
     return out
 
 
+SPOOL_CHUNK_SIZE = 256 * 1024
+# Casos precargados por consulta en lotes (cases, approvals, residentes y patólogos)
+BATCH_PRELOAD_CHUNK = 200
+
+# Marca para distinguir "pruebas complementarias no consultadas" de "sin pruebas"
+_NOT_LOADED: Any = object()
+
+
+class _ZipChunkSink:
+    """Destino de escritura para `zipfile` que acumula bytes hasta que se drenan.
+    Al no exponer `tell`/`seek`, zipfile lo trata como flujo no seekable."""
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+
+    def write(self, data: bytes) -> int:
+        self._buffer.extend(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def _zip_entry_name(case_code: str) -> str:
+    safe_code = re.sub(r"[^\w\-.]+", "_", case_code) or "caso"
+    return f"{safe_code}.pdf"
+
+
+async def iter_spool(spool: IO[bytes], chunk_size: int = SPOOL_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Leer un archivo temporal por bloques para un StreamingResponse y cerrarlo al terminar."""
+    try:
+        while True:
+            chunk = await asyncio.to_thread(spool.read, chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        spool.close()
+
+
+TEMPLATES_DIR = (Path(__file__).parent.parent / "templates").resolve()
+ASSETS_DIR = TEMPLATES_DIR.parent / "assets"
+REPORT_TEMPLATE = "case_report.html"
+
+
+def _load_logos(assets_dir: Path) -> Dict[str, str]:
+    logos: Dict[str, str] = {}
+    files = {
+        "lime": ("logo_lime.b64", "image/png"),
+        "udea": ("logo_udea.b64", "image/png"),
+        "hama": ("logo_hama.b64", "image/png"),
+    }
+    for key, (filename, mime) in files.items():
+        path = assets_dir / filename
+        if path.exists():
+            data = path.read_text(encoding="utf-8").replace("\n", "").strip()
+            logos[key] = f"data:{mime};base64,{data}" if data else ""
+        else:
+            logos[key] = ""
+    return logos
+
+
+class _RenderContext:
+    """Entorno Jinja, plantilla del informe y logos codificados, compartidos por el proceso."""
+
+    def __init__(self, compiled_dir: str = ""):
+        loader: Any = FileSystemLoader(str(TEMPLATES_DIR))
+        self.compiled_dir = compiled_dir
+        if compiled_dir:
+            # Compilar las plantillas a módulos Python al iniciar el proceso y cargarlas desde ahí.
+            # Los módulos compilados no detectan cambios en disco: editar la plantilla requiere reiniciar.
+            env = Environment(loader=loader, autoescape=select_autoescape(["html", "xml"]), enable_async=True)
+            Path(compiled_dir).mkdir(parents=True, exist_ok=True)
+            env.compile_templates(compiled_dir, zip=None, ignore_errors=False)
+            loader = ChoiceLoader([ModuleLoader(compiled_dir), loader])
+        self.env = Environment(
+            loader=loader,
+            autoescape=select_autoescape(["html", "xml"]),
+            enable_async=True,
+        )
+        self.logos = _load_logos(ASSETS_DIR)
+        self._template = self.env.get_template(REPORT_TEMPLATE)
+
+    def get_template(self) -> Template:
+        # Con FileSystemLoader, is_up_to_date solo compara el mtime del archivo
+        if not self._template.is_up_to_date:
+            self._template = self.env.get_template(REPORT_TEMPLATE)
+        return self._template
+
+
+_render_context: Optional[_RenderContext] = None
+
+
+def get_render_context() -> _RenderContext:
+    """Contexto de render compartido, creado en el primer uso."""
+    global _render_context
+    if _render_context is None:
+        _render_context = _RenderContext(settings.PDF_TEMPLATES_COMPILED_DIR)
+    return _render_context
+
+
 class CasePdfService:
     def __init__(self, database: Any):
+        # Los servicios se crean al primer uso: una descarga individual servida desde
+        # la caché solo necesita CaseService
+        self.database = database
+
+    @cached_property
+    def case_service(self) -> Any:
         from app.modules.cases.services.case_service import CaseService
+        return CaseService(self.database)
+
+    @cached_property
+    def pathologist_service(self) -> Any:
         from app.modules.pathologists.services.pathologist_service import PathologistService
+        return PathologistService(self.database)
+
+    @cached_property
+    def approval_service(self) -> Any:
         from app.modules.approvals.services.approval_service import ApprovalService
+        return ApprovalService(self.database)
+
+    @cached_property
+    def resident_service(self) -> Any:
         from app.modules.residents.services.resident_service import ResidentService
-        
-        self.case_service = CaseService(database)
-        self.pathologist_service = PathologistService(database)
-        self.approval_service = ApprovalService(database)
-        self.resident_service = ResidentService(database)
-        self.database = database
-        
-        templates_dir = Path(__file__).parent.parent / "templates"
-        self.templates_path = templates_dir.resolve()
-        self.jinja_env = Environment(
-            loader=FileSystemLoader(str(self.templates_path)),
-            autoescape=select_autoescape(["html", "xml"]),
-            enable_async=True,
-        )
-        assets_dir = self.templates_path.parent / "assets"
-        self.logos = self._load_logos(assets_dir)
-        
-        # Caché de firmas de patólogos (las firmas raramente cambian)
-        self._signature_cache: Dict[str, Optional[str]] = {}
+        return ResidentService(self.database)
 
-    # Sanitizador básico de HTML para PDF
+    # Sanitizador de HTML para PDF (ver html_sanitizer)
     def _sanitize_html(self, html: Optional[str]) -> Markup:
         """Sanitiza HTML permitiendo un subconjunto seguro de etiquetas y estilos.
         Comentario: Mantiene alineaciones simples de texto y elimina scripts/eventos."""
-        if not html:
-            return Markup("")
-
-        # Remover bloques peligrosos (script/style)
-        clean = re.sub(r"(?is)<(script|style).*?>.*?</\\1>", "", html)
-
-        # Eliminar atributos de eventos (onload, onclick, etc.)
-        clean = re.sub(r"\son[a-zA-Z]+\s*=\s*(\".*?\"|\'.*?\'|[^\s>]+)", "", clean)
-
-        # Permitir solo ciertos estilos en style="..."
-        allowed_props = {"text-align", "font-weight", "font-style", "text-decoration"}
-
-        def _clean_style(match: re.Match) -> str:
-            style_val = match.group(1)
-            parts = [p.strip() for p in style_val.split(";") if p.strip()]
-            kept = []
-            for decl in parts:
-                if ":" not in decl:
-                    continue
-                prop, val = decl.split(":", 1)
-                prop = prop.strip().lower()
-                val = val.strip()
-                if prop in allowed_props:
-                    kept.append(f"{prop}: {val}")
-            return f' style="{"; ".join(kept)}"' if kept else ""
-
-        clean = re.sub(r"\sstyle\s*=\s*\"(.*?)\"", _clean_style, clean)
-        clean = re.sub(r"\sstyle\s*=\s*\'(.*?)\'", _clean_style, clean)
-
-        # Remover etiquetas no permitidas, conservar: div, span, br, p, b, strong, i, em, u, ul, ol, li
-        allowed_tags = {"div", "span", "br", "p", "b", "strong", "i", "em", "u", "ul", "ol", "li"}
-
-        def _filter_tag(match: re.Match) -> str:
-            tag_name = match.group(1).lower()
-            return match.group(0) if tag_name in allowed_tags else ""
-
-        clean = re.sub(r"</?([a-zA-Z0-9]+)(\b[^>]*)?>", _filter_tag, clean)
-        return Markup(clean)
-
-    def _load_logos(self, assets_dir: Path) -> Dict[str, str]:
-        logos: Dict[str, str] = {}
-        files = {
-            "lime": ("logo_lime.b64", "image/png"),
-            "udea": ("logo_udea.b64", "image/png"),
-            "hama": ("logo_hama.b64", "image/png"),
-        }
-        for key, (filename, mime) in files.items():
-            path = assets_dir / filename
-            if path.exists():
-                data = path.read_text(encoding="utf-8").replace("\n", "").strip()
-                logos[key] = f"data:{mime};base64,{data}" if data else ""
-            else:
-                logos[key] = ""
-        return logos
-
-    async def _render_and_generate_pdf(self, case_data: dict, case_code: str) -> bytes:
+        return sanitize_html(html)
+
+    async def _render_and_generate_pdf(
+        self,
+        case_data: dict,
+        case_code: str,
+        complementary_tests: Optional[dict] = _NOT_LOADED,
+        timings: Optional[PdfTimings] = None,
+    ) -> bytes:
         """
         Método interno para renderizar HTML y generar PDF.
         Permite reutilización con datos pre-cargados para optimización en batch.
+        Los tiempos de cada etapa se registran en `timings` (y en las métricas del proceso).
         """
-        # Obtener pruebas complementarias pendientes de aprobación
-        complementary_tests = await self._get_complementary_tests(case_code)
+        timings = timings or PdfTimings()
+
+        # Obtener pruebas complementarias pendientes de aprobación (si no vienen precargadas)
+        if complementary_tests is _NOT_LOADED:
+            with timings.stage("complementary"):
+                complementary_tests = await self._get_complementary_tests(case_code)
         
         # Obtener firma del patólogo
-        pathologist_signature = await self._get_pathologist_signature(case_data)
-        print(f"DEBUG: Firma obtenida: {'SÍ' if pathologist_signature else 'NO'}")
-
-        # Renderizar template
-        template = self.jinja_env.get_template("case_report.html")
-        html: str = await template.render_async(
-            case=case_data, 
-            pathologist_signature=pathologist_signature,
-            pruebas_complementarias=complementary_tests,
-            logos=self.logos,
-            is_pdf=True
-        )
+        with timings.stage("signature"):
+            pathologist_signature = await self._get_pathologist_signature(case_data)
+
+        # Informes firmados: servir desde la caché si ya se renderizó este mismo contenido
+        from app.modules.cases.services.pdf_cache import pdf_cache, compute_pdf_key, CACHEABLE_STATES
+
+        cache_key: Optional[str] = None
+        cache_code = case_data.get('caso_code') or case_code
+        if case_data.get('estado') in CACHEABLE_STATES:
+            cache_key = compute_pdf_key(case_data, complementary_tests, pathologist_signature)
+            cached = await pdf_cache.get(cache_code, cache_key)
+            if cached is not None:
+                timings.mark_cache_hit()
+                return cached
+
+        # Renderizar template (compilado una sola vez por proceso)
+        with timings.stage("render"):
+            render_context = get_render_context()
+            html: str = await render_context.get_template().render_async(
+                case=case_data, 
+                pathologist_signature=pathologist_signature,
+                pruebas_complementarias=complementary_tests,
+                logos=render_context.logos,
+                is_pdf=True
+            )
 
-        # Generar PDF usando el pool de navegadores (mucho más eficiente)
+        # Generar PDF usando el pool de navegadores (checkout acotado con cola de espera)
         from app.modules.cases.services.browser_pool import BrowserPool
         
         browser_pool = await BrowserPool.get_instance()
-        page = await browser_pool.get_page()  # get_page maneja la inicialización si es necesario
-        
-        try:
+        checkout_started = time.perf_counter()
+        async with browser_pool.checkout() as page:  # inicializa el pool si es necesario
+            timings.add("checkout", time.perf_counter() - checkout_started)
             # Usar "domcontentloaded" que es más rápido - solo espera el DOM, no los recursos
             # Para PDFs estáticos con HTML embebido esto es suficiente y mucho más rápido
-            await page.set_content(html, wait_until="domcontentloaded", timeout=10000)
-            pdf_bytes = await page.pdf(
-                format="Letter",
-                margin={"top": "15mm", "right": "12mm", "bottom": "22mm", "left": "12mm"},
-                print_background=True,
-                display_header_footer=True,
-                header_template="<span></span>",
-                footer_template=(
-                    "<div style='font-family: Arial, sans-serif; font-size:10px; color:#000; width:100%; padding:0 15mm;'>"
-                    "<div style='text-align:center; font-style:italic; white-space:nowrap;'>"
-                    "Los informes de resultados, las placas y bloques de estudios anatomopatológicos se archivan por 15 años"
-                    "</div>"
-                    "<div style='border-top:1px solid #000; margin:2mm 0 0 0;'></div>"
-                    "<div style='position:relative; margin-top:1mm;'>"
-                    "<div style='text-align:center; font-weight:bold; white-space:nowrap;'>"
-                    f"Informe No {case_data.get('caso_code') or case_data.get('id') or case_code}"
-                    "</div>"
-                    "<div style='position:absolute; right:0; top:0; font-weight:bold; white-space:nowrap;'>Página <span class='pageNumber'></span> de <span class='totalPages'></span></div>"
-                    "</div>"
-                    "</div>"
-                ),
-            )
-        finally:
-            # Devolver la página al pool para reutilización
-            await browser_pool.return_page(page)
+            with timings.stage("set_content"):
+                await page.set_content(html, wait_until="domcontentloaded", timeout=10000)
+            with timings.stage("pdf"):
+                pdf_bytes = await page.pdf(
+                    format="Letter",
+                    margin={"top": "15mm", "right": "12mm", "bottom": "22mm", "left": "12mm"},
+                    print_background=True,
+                    display_header_footer=True,
+                    header_template="<span></span>",
+                    footer_template=(
+                        "<div style='font-family: Arial, sans-serif; font-size:10px; color:#000; width:100%; padding:0 15mm;'>"
+                        "<div style='text-align:center; font-style:italic; white-space:nowrap;'>"
+                        "Los informes de resultados, las placas y bloques de estudios anatomopatológicos se archivan por 15 años"
+                        "</div>"
+                        "<div style='border-top:1px solid #000; margin:2mm 0 0 0;'></div>"
+                        "<div style='position:relative; margin-top:1mm;'>"
+                        "<div style='text-align:center; font-weight:bold; white-space:nowrap;'>"
+                        f"Informe No {case_data.get('caso_code') or case_data.get('id') or case_code}"
+                        "</div>"
+                        "<div style='position:absolute; right:0; top:0; font-weight:bold; white-space:nowrap;'>Página <span class='pageNumber'></span> de <span class='totalPages'></span></div>"
+                        "</div>"
+                        "</div>"
+                    ),
+                )
+
+        if cache_key:
+            await pdf_cache.put(cache_code, cache_key, pdf_bytes)
 
         return pdf_bytes
 
-    async def generate_case_pdf(self, case_code: str) -> bytes:
+    async def generate_case_pdf(self, case_code: str, timings: Optional[PdfTimings] = None) -> bytes:
+        timings = timings or PdfTimings()
         # Obtener datos del caso
-        case_data = await self._get_case_data(case_code)
+        with timings.stage("data"):
+            case_data = await self._get_case_data(case_code)
         # Usar método interno para renderizar y generar PDF
-        return await self._render_and_generate_pdf(case_data, case_code)
+        return await self._render_and_generate_pdf(case_data, case_code, timings=timings)
 
-    async def generate_batch_pdf(self, case_codes: list[str]) -> bytes:
+    async def preload_batch(self, case_codes: list[str]) -> Dict[str, tuple[dict, Optional[dict]] | Exception]:
         """
-        Generar un PDF combinado con múltiples casos, cada uno con su propia numeración de páginas
-        Optimizado con paralelización y pre-carga de datos para mejorar rendimiento en servidor
-        
-        Args:
-            case_codes: Lista de códigos de caso a incluir en el PDF
-            
-        Returns:
-            bytes: PDF combinado con todos los casos, cada uno con paginación independiente
+        Precargar los datos de plantilla de varios casos con una consulta por colección.
+
+        Trae los casos con un `$in`, y luego en paralelo las solicitudes de aprobación
+        pendientes, los residentes y los patólogos (cuyas firmas quedan en la caché).
+        Retorna por código `(case_data, pruebas_complementarias)` o la excepción del caso.
+        Si la precarga falla, retorna un diccionario vacío y cada caso se carga por separado.
+        """
+        from app.modules.approvals.models.approval_request import ApprovalStateEnum
+
+        try:
+            cases = await self.case_service.get_cases_by_codes(case_codes)
+            case_dicts = {code: case.model_dump() for code, case in cases.items()}
+
+            resident_ids = {
+                (c.get('assigned_resident') or {}).get('id') for c in case_dicts.values()
+            } - {None, ''}
+            pathologist_ids = {
+                (c.get('assigned_pathologist') or {}).get('id') for c in case_dicts.values()
+            } - {None, ''}
+            pending_ids = [pid for pid in pathologist_ids if not signature_cache.contains(pid)]
+
+            approvals, residents, pathologists = await asyncio.gather(
+                self.approval_service.get_approvals_by_case_codes(
+                    list(case_dicts),
+                    [ApprovalStateEnum.REQUEST_MADE, ApprovalStateEnum.PENDING_APPROVAL],
+                ),
+                self.resident_service.get_residents_by_codes(list(resident_ids)),
+                self.pathologist_service.get_pathologists_by_codes(pending_ids),
+            )
+        except Exception as e:
+            print(f"Error precargando lote de casos: {str(e)}")
+            return {}
+
+        # Igual que en la consulta individual: primero "solicitud hecha", luego "pendiente de aprobación"
+        approval_by_case: Dict[str, Any] = {}
+        for state in (ApprovalStateEnum.REQUEST_MADE, ApprovalStateEnum.PENDING_APPROVAL):
+            for approval in approvals:
+                if approval.approval_state == state and approval.original_case_code not in approval_by_case:
+                    approval_by_case[approval.original_case_code] = approval
+
+        for pathologist_id in pending_ids:
+            pathologist = pathologists.get(pathologist_id)
+            signature_cache.set(pathologist_id, await resolve_signature(getattr(pathologist, "signature", None)))
+
+        preloaded: Dict[str, tuple[dict, Optional[dict]] | Exception] = {}
+        for code in case_codes:
+            case_dict = case_dicts.get(code)
+            if case_dict is None:
+                preloaded[code] = ValueError(f"Caso con código {code} no encontrado")
+                continue
+            resident = residents.get((case_dict.get('assigned_resident') or {}).get('id'))
+            approval = approval_by_case.get(code)
+            preloaded[code] = (
+                self._build_case_data(case_dict, (resident.medical_license if resident else '') or ''),
+                self._map_complementary_tests(approval) if approval else None,
+            )
+        return preloaded
+
+    async def _render_case_safe(self, case_code: str, preload: Optional[asyncio.Task] = None) -> bytes | Exception:
+        """Renderizar un caso del lote; los errores se devuelven en lugar de propagarse"""
+        try:
+            entry = (await preload).get(case_code) if preload is not None else None
+            if isinstance(entry, Exception):
+                raise entry
+            if entry is None:
+                # Sin precarga disponible: cargar el caso de forma individual
+                return await self.generate_case_pdf(case_code)
+            case_data, complementary_tests = entry
+            return await self._render_and_generate_pdf(case_data, case_code, complementary_tests)
+        except Exception as e:
+            print(f"Error generando PDF para caso {case_code}: {str(e)}")
+            return e
+
+    async def iter_batch_pdfs(self, case_codes: list[str]) -> AsyncIterator[tuple[str, bytes | Exception]]:
+        """
+        Renderizar un lote de casos y entregarlos en el orden solicitado a medida que terminan.
+
+        Se mantiene una ventana acotada de renders en curso (el doble de la capacidad del
+        pool), de modo que en memoria solo viven los PDFs de esa ventana y el consumidor
+        puede ir escribiendo/enviando resultados sin esperar al lote completo. Los datos
+        se precargan en bloques de BATCH_PRELOAD_CHUNK casos a medida que la ventana avanza.
+        """
+        from app.modules.cases.services.browser_pool import BrowserPool
+
+        browser_pool = await BrowserPool.get_instance()
+        window = max(1, min(browser_pool.capacity * 2, len(case_codes)))
+        pending: deque[tuple[int, str, asyncio.Task]] = deque()
+        preloads: Dict[int, asyncio.Task] = {}
+        next_index = 0
+
+        def _preload_for(index: int) -> asyncio.Task:
+            chunk = index // BATCH_PRELOAD_CHUNK
+            if chunk not in preloads:
+                start = chunk * BATCH_PRELOAD_CHUNK
+                preloads[chunk] = asyncio.create_task(
+                    self.preload_batch(case_codes[start:start + BATCH_PRELOAD_CHUNK])
+                )
+            return preloads[chunk]
+
+        def _fill() -> None:
+            nonlocal next_index
+            while len(pending) < window and next_index < len(case_codes):
+                code = case_codes[next_index]
+                task = asyncio.create_task(self._render_case_safe(code, _preload_for(next_index)))
+                pending.append((next_index, code, task))
+                next_index += 1
+
+        try:
+            _fill()
+            while pending:
+                index, code, task = pending.popleft()
+                result = await task
+                if (index + 1) % BATCH_PRELOAD_CHUNK == 0:
+                    # Bloque consumido por completo: liberar sus datos
+                    preloads.pop(index // BATCH_PRELOAD_CHUNK, None)
+                _fill()
+                yield code, result
+        finally:
+            # Cliente desconectado o consumidor abortado: no dejar renders huérfanos
+            for _, _, task in pending:
+                task.cancel()
+            for task in preloads.values():
+                task.cancel()
+
+    async def write_batch(
+        self,
+        case_codes: list[str],
+        output: IO[bytes],
+        format: str = "pdf",
+        on_result: Optional[Callable[[str, bytes | Exception], Awaitable[None]]] = None,
+    ) -> int:
+        """
+        Escribir el lote en `output`: un PDF combinado ("pdf") o un ZIP con un PDF por caso ("zip").
+
+        En "zip" cada PDF se escribe en `output` en cuanto llega. En "pdf" el PdfWriter
+        conserva todas las páginas en memoria hasta el final y solo entonces escribe el
+        archivo, así que el costo en memoria crece con el lote. `on_result` se invoca por
+        cada caso (éxito o error) y puede lanzar una excepción para abortar el lote.
+        Retorna el número de casos incluidos.
         """
         if not case_codes:
             raise ValueError("Se requiere al menos un código de caso")
-        
-        from io import BytesIO
-        
+
         try:
             from pypdf import PdfWriter, PdfReader
         except ImportError:
             raise RuntimeError("La biblioteca pypdf no está instalada. Instálela con: pip install pypdf")
-        
-        # Pre-cargar todos los datos de casos en paralelo para optimizar consultas a BD
-        # Esto reduce el número de consultas individuales
-        async def preload_case_data(case_code: str) -> tuple[str, dict | Exception]:
-            """Pre-cargar datos del caso"""
-            try:
-                case_data = await self._get_case_data(case_code)
-                return (case_code, case_data)
-            except Exception as e:
-                return (case_code, e)
-        
-        # Pre-cargar datos de todos los casos en paralelo
-        preload_tasks = [preload_case_data(code) for code in case_codes]
-        preloaded_data = await asyncio.gather(*preload_tasks, return_exceptions=False)
-        
-        # Crear un diccionario de datos pre-cargados
-        case_data_cache: Dict[str, dict] = {}
-        for case_code, data in preloaded_data:
-            if isinstance(data, Exception):
-                print(f"Error pre-cargando datos del caso {case_code}: {str(data)}")
-            else:
-                case_data_cache[case_code] = data
-        
-        # Limitar paralelismo para evitar sobrecarga del servidor
-        # 5-8 PDFs simultáneos es un buen balance entre velocidad y recursos
-        max_concurrent = min(8, len(case_codes))
-        semaphore = asyncio.Semaphore(max_concurrent)
-        
-        async def generate_one_pdf(case_code: str) -> tuple[str, bytes | Exception]:
-            """Generar un PDF individual con manejo de errores"""
-            async with semaphore:
-                try:
-                    # Usar datos pre-cargados si están disponibles para optimización
-                    if case_code in case_data_cache:
-                        case_data = case_data_cache[case_code]
-                        # Usar método interno con datos pre-cargados
-                        pdf_bytes = await self._render_and_generate_pdf(case_data, case_code)
-                    else:
-                        # Fallback al método normal si no hay datos pre-cargados
-                        pdf_bytes = await self.generate_case_pdf(case_code)
-                    return (case_code, pdf_bytes)
-                except Exception as e:
-                    print(f"Error generando PDF para caso {case_code}: {str(e)}")
-                    return (case_code, e)
-        
-        # Generar todos los PDFs en paralelo
-        tasks = [generate_one_pdf(code) for code in case_codes]
-        results = await asyncio.gather(*tasks, return_exceptions=False)
-        
-        # Combinar PDFs exitosos de forma optimizada
-        # Para grandes volúmenes, procesar en chunks para evitar cargar todo en memoria
+
+        timings = PdfTimings()
+        pdf_writer = PdfWriter() if format == "pdf" else None
+        zip_file = zipfile.ZipFile(output, mode="w", compression=zipfile.ZIP_STORED) if format == "zip" else None
+        failures: list[str] = []
+
+        def _append(case_code: str, pdf_bytes: bytes) -> None:
+            if zip_file is not None:
+                zip_file.writestr(_zip_entry_name(case_code), pdf_bytes)
+                return
+            pdf_reader = PdfReader(BytesIO(pdf_bytes))
+            for page in pdf_reader.pages:
+                pdf_writer.add_page(page)
+
         successful_count = 0
-        chunk_size = 50  # Procesar en chunks de 50 PDFs
-        
-        if len(case_codes) <= chunk_size:
-            # Para volúmenes pequeños, procesar todo de una vez
-            pdf_writer = PdfWriter()
-            for case_code, result in results:
-                if isinstance(result, Exception):
-                    continue
-                
-                try:
-                    pdf_reader = PdfReader(BytesIO(result))
-                    for page in pdf_reader.pages:
-                        pdf_writer.add_page(page)
-                    successful_count += 1
-                except Exception as e:
-                    print(f"Error procesando PDF del caso {case_code}: {str(e)}")
-                    continue
-            
-            # Generar PDF final
-            output_buffer = BytesIO()
-            pdf_writer.write(output_buffer)
-            output_buffer.seek(0)
-            return output_buffer.read()
-        else:
-            # Para grandes volúmenes, procesar en chunks y combinar incrementalmente
-            pdf_writer = PdfWriter()
-            pdf_chunks = []
-            
-            for i in range(0, len(results), chunk_size):
-                chunk = results[i:i + chunk_size]
-                chunk_writer = PdfWriter()
-                
-                for case_code, result in chunk:
-                    if isinstance(result, Exception):
-                        continue
-                    
+        try:
+            async for case_code, result in self.iter_batch_pdfs(case_codes):
+                if not isinstance(result, Exception):
                     try:
-                        pdf_reader = PdfReader(BytesIO(result))
-                        for page in pdf_reader.pages:
-                            chunk_writer.add_page(page)
+                        with timings.stage("merge"):
+                            await asyncio.to_thread(_append, case_code, result)
                         successful_count += 1
                     except Exception as e:
                         print(f"Error procesando PDF del caso {case_code}: {str(e)}")
-                        continue
-                
-                # Guardar chunk en memoria temporal
-                chunk_buffer = BytesIO()
-                chunk_writer.write(chunk_buffer)
-                chunk_buffer.seek(0)
-                pdf_chunks.append(chunk_buffer)
-            
-            # Combinar todos los chunks
-            for chunk_buffer in pdf_chunks:
-                chunk_reader = PdfReader(chunk_buffer)
-                for page in chunk_reader.pages:
-                    pdf_writer.add_page(page)
-                chunk_buffer.close()
-            
-            # Generar PDF final
-            output_buffer = BytesIO()
-            pdf_writer.write(output_buffer)
-            output_buffer.seek(0)
-            result_bytes = output_buffer.read()
-            output_buffer.close()
-            
+                        result = e
+                if isinstance(result, Exception):
+                    failures.append(f"{case_code}: {result}")
+                if on_result is not None:
+                    await on_result(case_code, result)
+
             if successful_count == 0:
                 raise ValueError("No se pudo generar ningún caso para el PDF")
-            
-            return result_bytes
+
+            if zip_file is not None:
+                if failures:
+                    zip_file.writestr("errores.txt", "\n".join(failures) + "\n")
+            else:
+                with timings.stage("merge"):
+                    await asyncio.to_thread(pdf_writer.write, output)
+        finally:
+            if zip_file is not None:
+                zip_file.close()
+        return successful_count
+
+    async def merge_batch_to_spool(self, case_codes: list[str]) -> tuple[IO[bytes], int]:
+        """
+        Combinar los PDFs del lote en un archivo temporal (en memoria hasta
+        PDF_BATCH_SPOOL_MEMORY_MB, luego en disco).
+
+        Retorna el archivo posicionado al inicio y el número de casos incluidos;
+        el llamador debe cerrarlo.
+        """
+        spool = tempfile.SpooledTemporaryFile(max_size=settings.PDF_BATCH_SPOOL_MEMORY_MB * 1024 * 1024)
+        try:
+            successful_count = await self.write_batch(case_codes, spool, format="pdf")
+            spool.seek(0)
+        except Exception:
+            spool.close()
+            raise
+        return spool, successful_count
+
+    async def generate_batch_pdf(self, case_codes: list[str]) -> bytes:
+        """
+        Generar un PDF combinado con múltiples casos, cada uno con su propia numeración de páginas
+
+        Args:
+            case_codes: Lista de códigos de caso a incluir en el PDF
+
+        Returns:
+            bytes: PDF combinado con todos los casos, cada uno con paginación independiente
+        """
+        spool, _ = await self.merge_batch_to_spool(case_codes)
+        try:
+            return await asyncio.to_thread(spool.read)
+        finally:
+            spool.close()
+
+    async def stream_batch_zip(self, case_codes: list[str]) -> AsyncIterator[bytes]:
+        """
+        Emitir un ZIP con un PDF por caso a medida que se renderizan.
+
+        El ZIP se escribe en modo no seekable (descriptores de datos tras cada entrada),
+        por lo que cada caso se envía al cliente apenas termina. Los casos fallidos se
+        listan en `errores.txt` al final del archivo.
+        """
+        sink = _ZipChunkSink()
+        failures: list[str] = []
+        results = self.iter_batch_pdfs(case_codes)
+        try:
+            # Los PDFs ya vienen comprimidos: almacenarlos sin recomprimir
+            with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as zf:
+                async for case_code, result in results:
+                    if isinstance(result, Exception):
+                        failures.append(f"{case_code}: {result}")
+                        continue
+                    zf.writestr(_zip_entry_name(case_code), result)
+                    yield sink.drain()
+                if failures:
+                    zf.writestr("errores.txt", "\n".join(failures) + "\n")
+            yield sink.drain()
+        finally:
+            # Cliente desconectado: cancelar ya los renders en curso, sin esperar al GC
+            await results.aclose()
 
     async def _get_case_data(self, case_code: str) -> dict:
         """Obtener datos del caso y convertirlos al formato esperado por la plantilla"""
@@ -360,7 +563,21 @@ class CasePdfService:
         
         # Convertir CaseResponse a diccionario compatible con la plantilla
         case_dict = case.model_dump()
-        
+
+        # Registro médico del residente asignado (si no se puede obtener, queda vacío)
+        resident_license = ''
+        resident_id = (case_dict.get('assigned_resident') or {}).get('id', '')
+        if resident_id:
+            try:
+                resident = await self.resident_service.get_resident(resident_id)
+                resident_license = (resident.medical_license if resident else '') or ''
+            except Exception:
+                resident_license = ''
+
+        return self._build_case_data(case_dict, resident_license)
+
+    def _build_case_data(self, case_dict: dict, resident_license: str = '') -> dict:
+        """Mapear un caso (CaseResponse serializado) al formato esperado por la plantilla"""
         # Mapear campos del nuevo formato al formato esperado por la plantilla
         mapped_case = {
             # Información básica
@@ -421,25 +638,15 @@ class CasePdfService:
             'observaciones_generales': case_dict.get('observations', '')
         }
         
-        # Obtener información completa del residente si está asignado
+        # Residente asignado con su registro médico
         if case_dict.get('assigned_resident'):
             resident_id = case_dict.get('assigned_resident', {}).get('id', '')
             if resident_id:
-                try:
-                    resident = await self.resident_service.get_resident(resident_id)
-                    if resident:
-                        mapped_case['residente_asignado'] = {
-                            'nombre': case_dict.get('assigned_resident', {}).get('name', ''),
-                            'codigo': resident_id,
-                            'registro_medico': resident.medical_license or ''
-                        }
-                except Exception:
-                    # Si no se puede obtener el residente, usar solo los datos del caso
-                    mapped_case['residente_asignado'] = {
-                        'nombre': case_dict.get('assigned_resident', {}).get('name', ''),
-                        'codigo': resident_id,
-                        'registro_medico': ''
-        }
+                mapped_case['residente_asignado'] = {
+                    'nombre': case_dict.get('assigned_resident', {}).get('name', ''),
+                    'codigo': resident_id,
+                    'registro_medico': resident_license or ''
+                }
         
         return mapped_case
 
@@ -530,32 +737,7 @@ class CasePdfService:
                     return None
             
             # Tomar la primera solicitud pendiente
-            approval = approval_requests[0]
-            
-            # Extraer motivo del approval_info
-            motivo = ''
-            if approval.approval_info:
-                motivo = approval.approval_info.reason or ''
-            
-            # Mapear al formato esperado por la plantilla
-            complementary_tests = {
-                'pruebas': [],
-                'motivo': motivo,
-                'fecha_solicitud': approval.created_at,
-                'estado': approval.approval_state.value if hasattr(approval.approval_state, 'value') else str(approval.approval_state)
-            }
-            
-            # Mapear pruebas complementarias
-            for test in approval.complementary_tests or []:
-                # test es un objeto ComplementaryTestInfo
-                mapped_test = {
-                    'codigo': test.code if hasattr(test, 'code') else test.get('code', ''),
-                    'nombre': test.name if hasattr(test, 'name') else test.get('name', ''),
-                    'cantidad': test.quantity if hasattr(test, 'quantity') else test.get('quantity', 1)
-                }
-                complementary_tests['pruebas'].append(mapped_test)
-            
-            return complementary_tests
+            return self._map_complementary_tests(approval_requests[0])
             
         except Exception as e:
             print(f"Error obteniendo pruebas complementarias: {e}")
@@ -563,92 +745,58 @@ class CasePdfService:
             traceback.print_exc()
             return None
 
+    def _map_complementary_tests(self, approval: Any) -> dict:
+        """Mapear una solicitud de aprobación al bloque de pruebas complementarias de la plantilla"""
+        # Extraer motivo del approval_info
+        motivo = ''
+        if approval.approval_info:
+            motivo = approval.approval_info.reason or ''
+        
+        # Mapear al formato esperado por la plantilla
+        complementary_tests = {
+            'pruebas': [],
+            'motivo': motivo,
+            'fecha_solicitud': approval.created_at,
+            'estado': approval.approval_state.value if hasattr(approval.approval_state, 'value') else str(approval.approval_state)
+        }
+        
+        # Mapear pruebas complementarias
+        for test in approval.complementary_tests or []:
+            # test es un objeto ComplementaryTestInfo
+            mapped_test = {
+                'codigo': test.code if hasattr(test, 'code') else test.get('code', ''),
+                'nombre': test.name if hasattr(test, 'name') else test.get('name', ''),
+                'cantidad': test.quantity if hasattr(test, 'quantity') else test.get('quantity', 1)
+            }
+            complementary_tests['pruebas'].append(mapped_test)
+        
+        return complementary_tests
+
     async def _get_pathologist_signature(self, case_data: dict) -> Optional[str]:
         """Obtener la firma del patólogo asignado. Soporta firmas base64 en BD y rutas antiguas."""
+        patologo_asignado = case_data.get('patologo_asignado')
+        pathologist_id = None
+        if patologo_asignado:
+            pathologist_id = patologo_asignado.get('codigo') or patologo_asignado.get('id')
+        if not pathologist_id:
+            return None
+
         try:
-            patologo_asignado = case_data.get('patologo_asignado')
-            pathologist_id = None
-
-            if patologo_asignado:
-                pathologist_id = patologo_asignado.get('codigo') or patologo_asignado.get('id')
-                if pathologist_id:
-                    print(f"DEBUG: Patólogo asignado encontrado: {pathologist_id}")
-
-            if not pathologist_id:
-                print("DEBUG: No hay patólogo asignado para obtener firma")
-                return None
-
-            # Verificar caché
-            if pathologist_id in self._signature_cache:
-                cached_signature = self._signature_cache[pathologist_id]
-                if cached_signature is not None:
-                    print(f"DEBUG: Firma obtenida desde caché para ID: {pathologist_id}")
-                return cached_signature
-
-            # Obtener patólogo desde la BD
-            try:
-                pathologist = await self.pathologist_service.get_pathologist(pathologist_id)
-            except Exception as e:
-                print(f"DEBUG: No se pudo obtener el patólogo {pathologist_id}: {e}")
-                self._signature_cache[pathologist_id] = None
-                return None
-
-            signature_value = getattr(pathologist, "signature", None)
-
-            # Sin firma registrada
-            if not signature_value:
-                self._signature_cache[pathologist_id] = None
-                print(f"DEBUG: Patólogo {pathologist_id} no tiene firma registrada")
-                return None
-
-            # Si ya es data URL, usar tal cual
-            if signature_value.startswith("data:"):
-                self._signature_cache[pathologist_id] = signature_value
-                print(f"DEBUG: Firma base64 obtenida desde BD para ID: {pathologist_id}")
-                return signature_value
-
-            # Si es URL absoluta, devolver directamente
-            if signature_value.startswith("http"):
-                self._signature_cache[pathologist_id] = signature_value
-                print(f"DEBUG: Firma URL absoluta para ID: {pathologist_id}")
-                return signature_value
-
-            # Si es una ruta relativa (legacy /uploads/signatures/xxx), leer y convertir a base64
-            import base64
-            from pathlib import Path
-
-            rel_path = signature_value[1:] if signature_value.startswith('/') else signature_value
-            project_root = Path(__file__).parent.parent.parent.parent.parent
-            file_path = project_root / rel_path
-
-            if not file_path.exists():
-                print(f"DEBUG: Ruta de firma no encontrada en disco: {file_path}")
-                self._signature_cache[pathologist_id] = None
-                return None
-
-            mime_map = {
-                '.jpg': 'image/jpeg',
-                '.jpeg': 'image/jpeg',
-                '.png': 'image/png',
-                '.gif': 'image/gif',
-                '.webp': 'image/webp'
-            }
-            file_ext = file_path.suffix.lower()
-            mime = mime_map.get(file_ext, 'image/png')
+            return await signature_cache.get_or_load(pathologist_id, lambda: self._load_signature(pathologist_id))
+        except Exception as e:
+            # Error transitorio (BD): no se cachea, se reintenta en el próximo informe
+            print(f"Error obteniendo firma del patólogo {pathologist_id}: {e}")
+            return None
 
-            with open(file_path, "rb") as img_file:
-                img_data = img_file.read()
-                img_base64 = base64.b64encode(img_data).decode('utf-8')
-                data_url = f"data:{mime};base64,{img_base64}"
-                self._signature_cache[pathologist_id] = data_url
-                print(f"DEBUG: Firma convertida desde archivo legacy para ID: {pathologist_id}")
-                return data_url
+    async def _load_signature(self, pathologist_id: str) -> Optional[str]:
+        """Consultar el patólogo y resolver su firma (None si no existe o no tiene firma)"""
+        from app.core.exceptions import NotFoundError
 
-        except Exception as e:
-            print(f"Error obteniendo firma del patólogo: {e}")
-            if 'pathologist_id' in locals() and pathologist_id:
-                self._signature_cache[pathologist_id] = None
+        try:
+            pathologist = await self.pathologist_service.get_pathologist(pathologist_id)
+        except NotFoundError:
             return None
+        return await resolve_signature(getattr(pathologist, "signature", None))
 
     def _format_patient_age(self, age: Any, birth_date: Any) -> str:
         """Formatea la edad del paciente similar al frontend (meses, año y meses, años)"""
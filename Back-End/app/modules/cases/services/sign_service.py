@@ -4,7 +4,14 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.core.exceptions import NotFoundError, BadRequestError
 from app.modules.cases.schemas.sign import CaseSignRequest, CaseSignResponse, CaseSignValidation
 from app.modules.cases.schemas.case import CaseResponse
+from app.modules.cases.services.case_service import case_response_from_doc
 from app.modules.cases.repositories.sign_repository import SignRepository
+from app.modules.cases.services.pdf_cache import invalidate_case_pdf
+from app.modules.cases.services.statistics.case_stats_rollup import schedule_case_stats_refresh
+from app.config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class SignService:
@@ -36,10 +43,25 @@ class SignService:
         
         if not updated_doc:
             raise NotFoundError(f"Caso con código {case_code} no encontrado")
+
+        await invalidate_case_pdf(case_code)
+        schedule_case_stats_refresh(self.db, updated_doc)
+
+        # Pre-renderizar el informe firmado para que la primera descarga sea inmediata
+        if settings.PDF_PRERENDER_ON_SIGN:
+            await self._enqueue_prerender(case_code)
         
         # Convertir a CaseResponse
         return self._to_case_response(updated_doc)
 
+    async def _enqueue_prerender(self, case_code: str) -> None:
+        # Un fallo al encolar nunca debe impedir la firma
+        try:
+            from app.modules.cases.services.pdf_job_service import PdfJobService
+            await PdfJobService(self.db).enqueue_prerender(case_code)
+        except Exception as e:
+            logger.warning("No se pudo encolar el pre-render del caso %s: %s", case_code, e)
+
     async def validate_case_for_signing(self, case_code: str) -> CaseSignValidation:
         """Validar si un caso puede ser firmado"""
         try:
@@ -91,73 +113,4 @@ class SignService:
 
     def _to_case_response(self, doc: Dict[str, Any]) -> CaseResponse:
         """Convert MongoDB document to CaseResponse using only new structure"""
-        # Normalize patient_info using only new structure
-        patient = doc.get("patient_info") or {}
-        entity_info = patient.get("entity_info") or {}
-        location = patient.get("location") or {}
-        
-        normalized_patient = {
-            "patient_code": patient.get("patient_code") or "",
-            "identification_type": patient.get("identification_type") or None,
-            "identification_number": patient.get("identification_number") or None,
-            "name": patient.get("name") or "",
-            "age": int(patient.get("age") or 0),
-            "gender": patient.get("gender") or "",
-            "entity_info": {
-                "id": entity_info.get("id") or "",
-                "name": entity_info.get("name") or "",
-            },
-            "care_type": patient.get("care_type") or "",
-            "observations": patient.get("observations"),
-        }
-        
-        # Agregar birth_date si está presente
-        if patient.get("birth_date"):
-            normalized_patient["birth_date"] = patient.get("birth_date")
-        
-        # Agregar location si está presente y tiene al menos un campo
-        if location and any(location.values()):
-            normalized_location = {}
-            if location.get("municipality_code"):
-                normalized_location["municipality_code"] = location.get("municipality_code")
-            if location.get("municipality_name"):
-                normalized_location["municipality_name"] = location.get("municipality_name")
-            if location.get("subregion"):
-                normalized_location["subregion"] = location.get("subregion")
-            if location.get("address"):
-                normalized_location["address"] = location.get("address")
-            if normalized_location:
-                normalized_patient["location"] = normalized_location
-        
-        # Derive patient_code if missing and identification present
-        id_type = normalized_patient.get("identification_type")
-        id_number = normalized_patient.get("identification_number")
-        if not normalized_patient.get("patient_code") and id_type and id_number:
-            normalized_patient["patient_code"] = f"{id_type}-{id_number}"
-
-        # Use samples from new format
-        samples = doc.get("samples") or []
-
-        doc_out = {
-            "id": str(doc.get("_id")),
-            "case_code": doc.get("case_code") or "",
-            "patient_info": normalized_patient,
-            "requesting_physician": doc.get("requesting_physician"),
-            "service": doc.get("service"),
-            "samples": samples,
-            "state": doc.get("state") or "En proceso",
-            "priority": doc.get("priority") or "Normal",
-            "observations": doc.get("observations"),
-            "created_at": doc.get("created_at"),
-            "updated_at": doc.get("updated_at"),
-            "signed_at": doc.get("signed_at"),
-            "assigned_pathologist": doc.get("assigned_pathologist"),
-            "assigned_resident": doc.get("assigned_resident"),
-            "result": doc.get("result"),
-            "delivered_to": doc.get("delivered_to"),
-            "delivered_at": doc.get("delivered_at"),
-            "business_days": doc.get("business_days"),
-            "additional_notes": doc.get("additional_notes") or [],
-            "complementary_tests": doc.get("complementary_tests") or [],
-        }
-        return CaseResponse(**doc_out)
+        return case_response_from_doc(doc)
@@ -0,0 +1,204 @@
+"""
+Reportes exportables de estadísticas (CSV / XLSX) calculados con pandas.
+
+Los casos del periodo se cargan una vez (`AnalyticsRepository.load_frames`) y cada
+desglose es un group-by vectorizado sobre esas tablas, con los mismos criterios
+que los endpoints de estadísticas: entidades, patólogos y pruebas sobre casos
+completados firmados en el periodo; oportunidad sobre casos creados en el periodo
+(Completado / Por entregar, con días hábiles, sin Hospital Alma Máter).
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta
+from io import BytesIO
+from typing import Dict, Tuple
+import asyncio
+
+import numpy as np
+import pandas as pd
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.config.settings import settings
+from app.core.exceptions import BadRequestError
+from app.modules.cases.repositories.statistics.analytics_repository import AnalyticsRepository
+
+REPORTS = ("entities", "pathologists", "tests", "opportunity")
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+EXCLUDED_ENTITY_CODE = "HAMA"
+
+
+def _opportunity_columns(frame: pd.DataFrame, threshold: int) -> pd.DataFrame:
+    # Marcas dentro/fuera de oportunidad. Como en los endpoints ({$lte: [null, n]} es verdadero),
+    # los casos sin días hábiles cuentan dentro
+    outside = frame["business_days"] > threshold
+    return frame.assign(dentro=(~outside).astype("int64"), fuera=outside.astype("int64"))
+
+
+def _percentage(part: pd.Series, total: pd.Series) -> pd.Series:
+    return (part / total.where(total > 0) * 100).fillna(0.0).round(2)
+
+
+def entity_breakdown(cases: pd.DataFrame) -> pd.DataFrame:
+    """Casos completados por entidad: total, ambulatorios, hospitalizados y tiempo promedio."""
+    frame = cases[cases["entity_name"].notna() & (cases["entity_name"].astype("string") != "")]
+    frame = frame.assign(
+        ambulatorios=(frame["care_type"] == "Ambulatorio").astype("int64"),
+        hospitalizados=(frame["care_type"] == "Hospitalizado").astype("int64"),
+    )
+    result = (
+        frame.groupby(["entity_code", "entity_name"], observed=True, dropna=False)
+        .agg(
+            total=("case_code", "size"),
+            ambulatorios=("ambulatorios", "sum"),
+            hospitalizados=("hospitalizados", "sum"),
+            tiempoPromedio=("business_days", "mean"),
+        )
+        .reset_index()
+        .rename(columns={"entity_code": "codigo", "entity_name": "nombre"})
+    )
+    result["tiempoPromedio"] = result["tiempoPromedio"].round(2)
+    return result.sort_values("total", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def pathologist_breakdown(cases: pd.DataFrame, threshold: int) -> pd.DataFrame:
+    """Casos completados por patólogo con tiempo promedio y oportunidad."""
+    frame = _opportunity_columns(cases[cases["pathologist_code"].notna()], threshold)
+    result = (
+        frame.groupby(["pathologist_code", "pathologist_name"], observed=True, dropna=False)
+        .agg(
+            casos=("case_code", "size"),
+            dentroOportunidad=("dentro", "sum"),
+            fueraOportunidad=("fuera", "sum"),
+            tiempoPromedio=("business_days", "mean"),
+        )
+        .reset_index()
+        .rename(columns={"pathologist_code": "codigo", "pathologist_name": "nombre"})
+    )
+    result["tiempoPromedio"] = result["tiempoPromedio"].round(2)
+    result["porcentajeOportunidad"] = _percentage(
+        result["dentroOportunidad"], result["dentroOportunidad"] + result["fueraOportunidad"]
+    )
+    return result.sort_values("casos", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def test_breakdown(cases: pd.DataFrame, tests: pd.DataFrame, threshold: int) -> pd.DataFrame:
+    """Pruebas de casos completados: solicitadas, tiempo promedio y oportunidad."""
+    frame = tests[tests["test_code"].notna()].merge(cases[["case_code", "business_days"]], on="case_code")
+    frame = _opportunity_columns(frame, threshold)
+    # Igual que el rendimiento mensual de pruebas: sin días hábiles cuenta como 0 en el promedio
+    frame["business_days"] = frame["business_days"].fillna(0.0)
+    result = (
+        frame.groupby("test_code")
+        .agg(
+            nombre=("test_name", "first"),
+            solicitadas=("case_code", "size"),
+            dentroOportunidad=("dentro", "sum"),
+            fueraOportunidad=("fuera", "sum"),
+            tiempoPromedio=("business_days", "mean"),
+        )
+        .reset_index()
+        .rename(columns={"test_code": "codigo"})
+    )
+    result["nombre"] = result["nombre"].fillna(result["codigo"])
+    result["tiempoPromedio"] = result["tiempoPromedio"].round(2)
+    return result.sort_values("solicitadas", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def opportunity_breakdown(cases: pd.DataFrame, threshold: int) -> pd.DataFrame:
+    """Oportunidad por mes de creación, con una fila final de total del periodo."""
+    frame = _opportunity_columns(cases[cases["business_days"].notna()], threshold)
+    frame = frame.assign(mes=frame["created_at"].dt.strftime("%Y-%m"))
+    result = (
+        frame.groupby("mes")
+        .agg(
+            total=("case_code", "size"),
+            dentro=("dentro", "sum"),
+            fuera=("fuera", "sum"),
+            sumaDias=("business_days", "sum"),
+        )
+        .reset_index()
+    )
+    totals = pd.DataFrame([{"mes": "Total", **result[["total", "dentro", "fuera", "sumaDias"]].sum().to_dict()}])
+    result = pd.concat([result, totals], ignore_index=True) if len(result) else result
+    result["porcentajeOportunidad"] = _percentage(result["dentro"], result["total"])
+    result["tiempoPromedio"] = (result["sumaDias"] / result["total"].where(result["total"] > 0)).fillna(0.0).round(2)
+    return result.drop(columns="sumaDias").astype({"total": "int64", "dentro": "int64", "fuera": "int64"})
+
+
+def build_reports(
+    cases: pd.DataFrame,
+    tests: pd.DataFrame,
+    start: datetime,
+    end: datetime,
+    threshold: int,
+) -> Dict[str, pd.DataFrame]:
+    """Todos los desgloses del periodo [start, end)."""
+    signed = cases["signed_at"].between(start, end, inclusive="left")
+    completed = cases[(cases["state"] == "Completado") & signed]
+    created = cases["created_at"].between(start, end, inclusive="left")
+    opportunity = cases[
+        created
+        & cases["state"].isin(["Completado", "Por entregar"])
+        & (cases["entity_code"].astype("string") != EXCLUDED_ENTITY_CODE).fillna(True)
+    ]
+    return {
+        "entities": entity_breakdown(completed),
+        "pathologists": pathologist_breakdown(completed, threshold),
+        "tests": test_breakdown(completed, tests, threshold),
+        "opportunity": opportunity_breakdown(opportunity, threshold),
+    }
+
+
+def write_reports(reports: Dict[str, pd.DataFrame], file_format: str) -> bytes:
+    """CSV (un reporte, UTF-8 con BOM para Excel) o XLSX (una hoja por reporte)."""
+    if file_format == "csv":
+        (frame,) = reports.values()
+        return frame.to_csv(index=False).encode("utf-8-sig")
+    buffer = BytesIO()
+    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+        for name, frame in reports.items():
+            frame.replace({np.nan: None}).to_excel(writer, sheet_name=name, index=False)
+    return buffer.getvalue()
+
+
+class AnalyticsExportService:
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.repo = AnalyticsRepository(db)
+
+    async def export(
+        self,
+        start_date: date,
+        end_date: date,
+        file_format: str = "xlsx",
+        report: str = "all",
+        opportunity_days_threshold: int = 7,
+    ) -> Tuple[bytes, str, str]:
+        """Generar el archivo del periodo (end_date incluida). Devuelve (contenido, media type, nombre)."""
+        if file_format not in FORMATS:
+            raise BadRequestError(f"Formato no soportado: {file_format}")
+        if report != "all" and report not in REPORTS:
+            raise BadRequestError(f"Reporte no soportado: {report}")
+        if file_format == "csv" and report == "all":
+            raise BadRequestError("El CSV contiene un solo reporte; use XLSX para exportar todos")
+        if end_date < start_date:
+            raise BadRequestError("La fecha final debe ser posterior a la inicial")
+        if (end_date - start_date).days >= settings.STATISTICS_EXPORT_MAX_DAYS:
+            raise BadRequestError(f"El periodo no puede superar {settings.STATISTICS_EXPORT_MAX_DAYS} días")
+
+        start = datetime.combine(start_date, time.min)
+        end = datetime.combine(end_date + timedelta(days=1), time.min)
+        cases, tests = await self.repo.load_frames(start, end)
+
+        def render() -> bytes:
+            reports = build_reports(cases, tests, start, end, opportunity_days_threshold)
+            if report != "all":
+                reports = {report: reports[report]}
+            return write_reports(reports, file_format)
+
+        # Los group-by y la escritura del archivo son CPU: fuera del event loop
+        content = await asyncio.to_thread(render)
+        file_name = f"estadisticas_{report}_{start_date:%Y%m%d}_{end_date:%Y%m%d}.{file_format}"
+        return content, FORMATS[file_format], file_name
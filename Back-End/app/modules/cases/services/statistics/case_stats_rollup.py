@@ -0,0 +1,130 @@
+"""
+Mantenimiento de las estadísticas tras escribir casos.
+
+Los servicios que crean, actualizan, firman o borran casos llaman a
+`schedule_case_stats_refresh` con los documentos afectados. La caché de
+resultados de estadísticas se invalida de inmediato; los días de creación se
+acumulan y una única tarea en segundo plano los recalcula en el rollup
+`case_stats_daily`, de modo que la escritura no espera a la agregación y varias
+escrituras del mismo día se resuelven con un solo recálculo. La misma tarea
+sincroniza las filas de cada caso en la tabla de hechos `case_tests` y en el panel
+materializado `urgent_cases`. Cada paso vuelve a invalidar la caché para no
+retener lecturas anteriores. Un día o caso que falla se reencola con espera
+exponencial; si agota los reintentos, la tabla derivada se marca desactualizada
+y las lecturas vuelven a `cases` hasta la siguiente reconstrucción completa.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+import asyncio
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.config.settings import settings
+from app.modules.cases.repositories.statistics.case_stats_daily_repository import CaseStatsDailyRepository
+from app.modules.cases.repositories.statistics.case_tests_repository import CaseTestsRepository
+from app.modules.cases.repositories.urgent_cases_repository import UrgentCasesRepository
+from app.modules.cases.services.statistics.statistics_cache import invalidate_statistics_cache
+
+logger = logging.getLogger(__name__)
+
+_dirty_days: Set[datetime] = set()
+_dirty_cases: Set[str] = set()
+_refresh_task: Optional[asyncio.Task] = None
+# Fallos consecutivos por (tabla derivada, día o caso) para reintentar con espera
+_attempts: Dict[Tuple[str, Any], int] = {}
+
+
+def schedule_case_stats_refresh(database: AsyncIOMotorDatabase, *docs: Optional[Dict[str, Any]]) -> None:
+    """Invalidar la caché y programar el recálculo de los días y casos de `docs` (nunca falla)."""
+    global _refresh_task
+    invalidate_statistics_cache()
+    for doc in docs:
+        doc = doc or {}
+        created_at = doc.get("created_at")
+        if settings.STATISTICS_ROLLUP_ENABLED and isinstance(created_at, datetime):
+            _dirty_days.add(datetime(created_at.year, created_at.month, created_at.day))
+        if (settings.STATISTICS_CASE_TESTS_ENABLED or settings.URGENT_CASES_MATERIALIZED) and doc.get("case_code"):
+            _dirty_cases.add(str(doc["case_code"]))
+    if not (_dirty_days or _dirty_cases) or (_refresh_task is not None and not _refresh_task.done()):
+        return
+    try:
+        _refresh_task = asyncio.get_running_loop().create_task(_drain(database))
+    except RuntimeError:
+        # Sin event loop (scripts síncronos): la reconstrucción completa lo cubrirá
+        _dirty_days.clear()
+        _dirty_cases.clear()
+
+
+def _retry_delay(attempt: int) -> float:
+    return min(settings.STATISTICS_REFRESH_RETRY_SECONDS * 2 ** (attempt - 1), 60.0)
+
+
+def _should_retry(key: Tuple[str, Any]) -> bool:
+    # Cuenta el fallo; False cuando ya se agotaron los reintentos de `key`
+    attempt = _attempts.get(key, 0) + 1
+    if attempt > settings.STATISTICS_REFRESH_RETRIES:
+        _attempts.pop(key, None)
+        return False
+    _attempts[key] = attempt
+    return True
+
+
+async def _give_up(key: Tuple[str, Any], mark_stale: Callable[[], Any]) -> None:
+    # Sin reintentos: la tabla derivada quedó incompleta, las lecturas vuelven a `cases`
+    logger.error("Reintentos agotados para %s %s; se lee de cases hasta la reconstrucción", *key)
+    try:
+        result = mark_stale()
+        if asyncio.iscoroutine(result):
+            await result
+    except Exception as e:
+        logger.warning("No se pudo marcar %s como desactualizada: %s", key[0], e)
+
+
+async def _drain(database: AsyncIOMotorDatabase) -> None:
+    rollup = CaseStatsDailyRepository(database)
+    facts = CaseTestsRepository(database)
+    urgent = UrgentCasesRepository(database)
+    while _dirty_cases or _dirty_days:
+        retry_cases: Set[str] = set()
+        retry_days: Set[datetime] = set()
+        while _dirty_cases or _dirty_days:
+            if _dirty_cases:
+                case_code = _dirty_cases.pop()
+                steps = []
+                if settings.STATISTICS_CASE_TESTS_ENABLED:
+                    steps.append(("case_tests", facts.sync_case, facts.mark_stale))
+                if settings.URGENT_CASES_MATERIALIZED:
+                    steps.append(("urgent_cases", urgent.sync_case, urgent.mark_stale))
+                for name, sync, mark_stale in steps:
+                    key = (name, case_code)
+                    try:
+                        await sync(case_code)
+                        _attempts.pop(key, None)
+                        invalidate_statistics_cache()
+                    except Exception as e:
+                        logger.warning("No se pudo sincronizar %s para %s: %s", name, case_code, e)
+                        if _should_retry(key):
+                            retry_cases.add(case_code)
+                        else:
+                            await _give_up(key, mark_stale)
+                continue
+            day = _dirty_days.pop()
+            key = ("case_stats_daily", day.date())
+            try:
+                await rollup.refresh_day(day)
+                _attempts.pop(key, None)
+                invalidate_statistics_cache()
+            except Exception as e:
+                logger.warning("No se pudo actualizar case_stats_daily para %s: %s", day.date(), e)
+                if _should_retry(key):
+                    retry_days.add(day)
+                else:
+                    await _give_up(key, rollup.mark_stale)
+        if retry_cases or retry_days:
+            # Los fallos se reintentan juntos tras la espera del más reintentado
+            await asyncio.sleep(_retry_delay(max(_attempts.values(), default=1)))
+            _dirty_cases.update(retry_cases)
+            _dirty_days.update(retry_days)
@@ -10,6 +10,7 @@ from app.modules.cases.schemas.statistics.dashboard_statistics_schemas import (
     OpportunityResponse
 )
 from app.modules.cases.repositories.statistics.dashboard_statistics_repository import DashboardStatisticsRepository
+from app.modules.cases.services.statistics.statistics_cache import cached_statistic
 
 
 class DashboardStatisticsService:
@@ -25,7 +26,7 @@ class DashboardStatisticsService:
             raise BadRequestError(f"Año debe estar entre 2020 y {current_year + 1}")
         
         try:
-            result = await self.repo.get_cases_by_month(year)
+            result = await cached_statistic("dashboard.cases_by_month", lambda: self.repo.get_cases_by_month(year), year=year)
             return CasesByMonthResponse(**result)
         except Exception as e:
             raise BadRequestError(f"Error al obtener estadísticas por mes: {str(e)}")
@@ -42,7 +43,12 @@ class DashboardStatisticsService:
             raise BadRequestError("Código de patólogo es requerido")
         
         try:
-            result = await self.repo.get_cases_by_month_pathologist(year, pathologist_code.strip())
+            result = await cached_statistic(
+                "dashboard.cases_by_month_pathologist",
+                lambda: self.repo.get_cases_by_month_pathologist(year, pathologist_code.strip()),
+                year=year,
+                pathologist_code=pathologist_code.strip(),
+            )
             return CasesByMonthResponse(**result)
         except Exception as e:
             raise BadRequestError(f"Error al obtener estadísticas por mes del patólogo: {str(e)}")
@@ -50,7 +56,7 @@ class DashboardStatisticsService:
     async def get_dashboard_overview(self) -> DashboardOverviewResponse:
         """Obtener resumen general del dashboard"""
         try:
-            result = await self.repo.get_dashboard_overview()
+            result = await cached_statistic("dashboard.overview", self.repo.get_dashboard_overview)
             return DashboardOverviewResponse(**result)
         except Exception as e:
             raise BadRequestError(f"Error al obtener resumen del dashboard: {str(e)}")
@@ -58,7 +64,7 @@ class DashboardStatisticsService:
     async def get_metrics_general(self) -> MetricsResponse:
         """Obtener métricas generales del laboratorio"""
         try:
-            result = await self.repo.get_metrics_general()
+            result = await cached_statistic("dashboard.metrics_general", self.repo.get_metrics_general)
             return MetricsResponse(**result)
         except Exception as e:
             raise BadRequestError(f"Error al obtener métricas generales: {str(e)}")
@@ -70,7 +76,11 @@ class DashboardStatisticsService:
             raise BadRequestError("Código de patólogo es requerido")
         
         try:
-            result = await self.repo.get_metrics_pathologist(pathologist_code.strip())
+            result = await cached_statistic(
+                "dashboard.metrics_pathologist",
+                lambda: self.repo.get_metrics_pathologist(pathologist_code.strip()),
+                pathologist_code=pathologist_code.strip(),
+            )
             return MetricsResponse(**result)
         except Exception as e:
             raise BadRequestError(f"Error al obtener métricas del patólogo: {str(e)}")
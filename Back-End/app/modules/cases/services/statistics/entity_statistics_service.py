@@ -1,5 +1,6 @@
 from typing import Dict, Any, Optional
 from app.modules.cases.repositories.statistics.entity_statistics_repository import EntityStatisticsRepository
+from app.modules.cases.services.statistics.statistics_cache import cached_statistic
 
 
 class EntityStatisticsService:
@@ -23,10 +24,16 @@ class EntityStatisticsService:
         if year < 2020 or year > 2030:
             raise ValueError("Year must be between 2020 and 2030")
         
-        return await self.repository.get_monthly_entity_performance(
+        return await cached_statistic(
+            "entity.monthly_performance",
+            lambda: self.repository.get_monthly_entity_performance(
+                month=month,
+                year=year,
+                entity_name=entity_name
+            ),
             month=month,
             year=year,
-            entity_name=entity_name
+            entity_name=entity_name,
         )
     
     async def get_entity_details(
@@ -47,10 +54,16 @@ class EntityStatisticsService:
         if year < 2020 or year > 2030:
             raise ValueError("Year must be between 2020 and 2030")
         
-        return await self.repository.get_entity_details(
+        return await cached_statistic(
+            "entity.details",
+            lambda: self.repository.get_entity_details(
+                entity_name=entity_name.strip(),
+                month=month,
+                year=year
+            ),
             entity_name=entity_name.strip(),
             month=month,
-            year=year
+            year=year,
         )
     
     async def get_entity_pathologists(
@@ -71,10 +84,16 @@ class EntityStatisticsService:
         if year < 2020 or year > 2030:
             raise ValueError("Year must be between 2020 and 2030")
         
-        return await self.repository.get_entity_pathologists(
+        return await cached_statistic(
+            "entity.pathologists",
+            lambda: self.repository.get_entity_pathologists(
+                entity_name=entity_name.strip(),
+                month=month,
+                year=year
+            ),
             entity_name=entity_name.strip(),
             month=month,
-            year=year
+            year=year,
         )
     
     async def debug_unique_entities(
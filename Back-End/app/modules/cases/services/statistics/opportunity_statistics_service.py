@@ -3,6 +3,7 @@ from datetime import datetime, timezone
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.core.exceptions import BadRequestError
 from app.modules.cases.repositories.statistics.opportunity_statistics_repository import OpportunityStatisticsRepository
+from app.modules.cases.services.statistics.statistics_cache import cached_statistic
 from app.modules.cases.schemas.statistics.dashboard_statistics_schemas import OpportunityResponse, OpportunityMetrics
 
 
@@ -13,7 +14,11 @@ class OpportunityStatisticsService:
 
     async def get_general(self, opportunity_days_threshold: int = 7) -> OpportunityResponse:
         try:
-            data: Dict[str, Any] = await self.repo.get_opportunity_general(opportunity_days_threshold)
+            data: Dict[str, Any] = await cached_statistic(
+                "opportunity.general",
+                lambda: self.repo.get_opportunity_general(opportunity_days_threshold),
+                threshold_days=opportunity_days_threshold,
+            )
             return OpportunityResponse(oportunity=OpportunityMetrics(**data))
         except Exception as e:
             raise BadRequestError(f"Error obteniendo oportunidad general: {str(e)}")
@@ -22,7 +27,12 @@ class OpportunityStatisticsService:
         if not pathologist_code or len(pathologist_code.strip()) == 0:
             raise BadRequestError("Código de patólogo es requerido")
         try:
-            data: Dict[str, Any] = await self.repo.get_opportunity_pathologist(pathologist_code.strip(), opportunity_days_threshold)
+            data: Dict[str, Any] = await cached_statistic(
+                "opportunity.pathologist",
+                lambda: self.repo.get_opportunity_pathologist(pathologist_code.strip(), opportunity_days_threshold),
+                pathologist_code=pathologist_code.strip(),
+                threshold_days=opportunity_days_threshold,
+            )
             return OpportunityResponse(oportunity=OpportunityMetrics(**data))
         except Exception as e:
             raise BadRequestError(f"Error obteniendo oportunidad por patólogo: {str(e)}")
@@ -46,7 +56,15 @@ class OpportunityStatisticsService:
         if threshold_days < 1 or threshold_days > 60:
             raise BadRequestError("thresholdDays must be between 1 and 60")
         try:
-            return await self.repo.get_monthly_opportunity(month, year, threshold_days, entity, pathologist)
+            return await cached_statistic(
+                "opportunity.monthly",
+                lambda: self.repo.get_monthly_opportunity(month, year, threshold_days, entity, pathologist),
+                month=month,
+                year=year,
+                threshold_days=threshold_days,
+                entity=entity,
+                pathologist=pathologist,
+            )
         except Exception as e:
             raise BadRequestError(f"Error computing monthly opportunity: {str(e)}")
 
@@ -57,11 +75,41 @@ class OpportunityStatisticsService:
         if threshold_days < 1 or threshold_days > 60:
             raise BadRequestError("thresholdDays must be between 1 and 60")
         try:
-            arr = await self.repo.get_yearly_opportunity(year, threshold_days)
+            arr = await cached_statistic(
+                "opportunity.yearly",
+                lambda: self.repo.get_yearly_opportunity(year, threshold_days),
+                year=year,
+                threshold_days=threshold_days,
+            )
             return {"percentageByMonth": arr}
         except Exception as e:
             raise BadRequestError(f"Error computing yearly opportunity: {str(e)}")
 
+    async def get_yearly_detail(
+        self,
+        year: int,
+        threshold_days: int = 7,
+        entity: str = None,
+        pathologist: str = None,
+    ) -> Dict[str, Any]:
+        current_year = datetime.now(timezone.utc).year
+        if year < 2020 or year > current_year + 1:
+            raise BadRequestError(f"year must be between 2020 and {current_year + 1}")
+        if threshold_days < 1 or threshold_days > 60:
+            raise BadRequestError("thresholdDays must be between 1 and 60")
+        try:
+            months = await cached_statistic(
+                "opportunity.yearly_detail",
+                lambda: self.repo.get_opportunity_by_month(year, threshold_days, entity, pathologist, breakdown=True),
+                year=year,
+                threshold_days=threshold_days,
+                entity=entity,
+                pathologist=pathologist,
+            )
+            return {"months": months}
+        except Exception as e:
+            raise BadRequestError(f"Error computing yearly opportunity detail: {str(e)}")
+
     async def get_pathologists(
         self,
         month: int,
@@ -1,6 +1,7 @@
 from typing import Dict, Any
 from app.core.exceptions import BadRequestError
 from app.modules.cases.repositories.statistics.pathologist_statistics_repository import PathologistStatisticsRepository
+from app.modules.cases.services.statistics.statistics_cache import cached_statistic
 
 
 class PathologistStatisticsService:
@@ -28,8 +29,15 @@ class PathologistStatisticsService:
             raise BadRequestError("Los días de oportunidad deben estar entre 1 y 60")
         
         try:
-            return await self.repository.get_pathologist_monthly_performance(
-                month, year, threshold_days, pathologist_name
+            return await cached_statistic(
+                "pathologist.monthly_performance",
+                lambda: self.repository.get_pathologist_monthly_performance(
+                    month, year, threshold_days, pathologist_name
+                ),
+                month=month,
+                year=year,
+                threshold_days=threshold_days,
+                pathologist_name=pathologist_name,
             )
         except Exception as e:
             raise BadRequestError(f"Error obteniendo rendimiento de patólogos: {str(e)}")
@@ -52,8 +60,12 @@ class PathologistStatisticsService:
             raise BadRequestError("El año debe estar entre 2020 y 2030")
         
         try:
-            return await self.repository.get_pathologist_entities(
-                pathologist_name.strip(), month, year
+            return await cached_statistic(
+                "pathologist.entities",
+                lambda: self.repository.get_pathologist_entities(pathologist_name.strip(), month, year),
+                pathologist_name=pathologist_name.strip(),
+                month=month,
+                year=year,
             )
         except Exception as e:
             raise BadRequestError(f"Error obteniendo entidades del patólogo: {str(e)}")
@@ -76,8 +88,12 @@ class PathologistStatisticsService:
             raise BadRequestError("El año debe estar entre 2020 y 2030")
         
         try:
-            return await self.repository.get_pathologist_tests(
-                pathologist_name.strip(), month, year
+            return await cached_statistic(
+                "pathologist.tests",
+                lambda: self.repository.get_pathologist_tests(pathologist_name.strip(), month, year),
+                pathologist_name=pathologist_name.strip(),
+                month=month,
+                year=year,
             )
         except Exception as e:
             raise BadRequestError(f"Error obteniendo pruebas del patólogo: {str(e)}")
@@ -96,8 +112,11 @@ class PathologistStatisticsService:
             raise BadRequestError("Los días de oportunidad deben estar entre 1 y 60")
         
         try:
-            return await self.repository.get_pathologist_opportunity_summary(
-                pathologist_name.strip(), threshold_days
+            return await cached_statistic(
+                "pathologist.opportunity_summary",
+                lambda: self.repository.get_pathologist_opportunity_summary(pathologist_name.strip(), threshold_days),
+                pathologist_name=pathologist_name.strip(),
+                threshold_days=threshold_days,
             )
         except Exception as e:
             raise BadRequestError(f"Error obteniendo resumen de oportunidad: {str(e)}")
@@ -120,8 +139,12 @@ class PathologistStatisticsService:
             raise BadRequestError("Los días de oportunidad deben estar entre 1 y 60")
         
         try:
-            return await self.repository.get_pathologist_monthly_trends(
-                pathologist_name.strip(), year, threshold_days
+            return await cached_statistic(
+                "pathologist.monthly_trends",
+                lambda: self.repository.get_pathologist_monthly_trends(pathologist_name.strip(), year, threshold_days),
+                pathologist_name=pathologist_name.strip(),
+                year=year,
+                threshold_days=threshold_days,
             )
         except Exception as e:
             raise BadRequestError(f"Error obteniendo tendencias mensuales: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,125 @@
+"""
+Caché de resultados de los endpoints de estadísticas.
+
+Guarda por proceso el resultado de cada consulta, indexado por endpoint y
+parámetros, con un TTL corto configurable por endpoint. Las peticiones idénticas
+concurrentes comparten una sola agregación (single-flight): cuando todo el turno
+abre el dashboard a la vez, cada widget consulta MongoDB una sola vez.
+
+Cualquier escritura de casos invalida toda la caché (ver `case_stats_rollup`);
+una carga iniciada antes de la invalidación se entrega a quienes la esperaban
+pero no se guarda. En despliegues con varios procesos el TTL acota el tiempo que
+otro proceso puede servir un resultado anterior.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+import copy
+import logging
+import time
+
+from app.config.settings import settings
+from app.core.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, Tuple[Tuple[str, Hashable], ...]]
+
+
+def parse_ttls(raw: str) -> Dict[str, float]:
+    """Interpretar "endpoint=segundos,endpoint=segundos" (entradas inválidas se ignoran)."""
+    ttls: Dict[str, float] = {}
+    for item in (raw or "").split(","):
+        endpoint, _, seconds = item.partition("=")
+        try:
+            ttls[endpoint.strip()] = float(seconds)
+        except ValueError:
+            if item.strip():
+                logger.warning("TTL de estadísticas inválido ignorado: %s", item.strip())
+    return ttls
+
+
+class StatisticsCache:
+    """LRU con TTL por endpoint y coalescencia de cargas concurrentes."""
+
+    def __init__(self, default_ttl: float, ttls: Optional[Dict[str, float]] = None, max_entries: int = 512):
+        self.default_ttl = default_ttl
+        self.ttls = ttls or {}
+        self.max_entries = max(1, max_entries)
+        # llave -> (expira_en, resultado)
+        self._entries: OrderedDict[CacheKey, Tuple[float, Any]] = OrderedDict()
+        self._flights = SingleFlight()
+        # Se incrementa con cada invalidación para descartar cargas iniciadas antes
+        self._generation = 0
+
+    def ttl_for(self, endpoint: str) -> float:
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    @staticmethod
+    def make_key(endpoint: str, params: Dict[str, Hashable]) -> CacheKey:
+        return endpoint, tuple(sorted(params.items()))
+
+    def lookup(self, key: CacheKey) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        if entry[0] <= time.monotonic():
+            self._entries.pop(key, None)
+            return False, None
+        self._entries.move_to_end(key)
+        return True, entry[1]
+
+    def set(self, key: CacheKey, value: Any) -> None:
+        ttl = self.ttl_for(key[0])
+        if ttl <= 0:
+            return
+        self._entries.pop(key, None)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_load(self, endpoint: str, params: Dict[str, Hashable], loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Obtener el resultado cacheado o calcularlo una sola vez aunque haya peticiones
+        concurrentes. Se retorna una copia: los llamadores pueden modificarla.
+        """
+        if not settings.STATISTICS_CACHE_ENABLED:
+            return await loader()
+        key = self.make_key(endpoint, params)
+        found, value = self.lookup(key)
+        if found:
+            return copy.deepcopy(value)
+
+        generation = self._generation
+
+        async def load() -> Any:
+            value = await loader()
+            if self._generation == generation:
+                self.set(key, value)
+            return value
+
+        return copy.deepcopy(await self._flights.run(key, load))
+
+    def invalidate(self) -> None:
+        """Descartar todos los resultados; las cargas en curso ya no se guardan ni se comparten."""
+        self._generation += 1
+        self._entries.clear()
+        self._flights.clear()
+
+
+statistics_cache = StatisticsCache(
+    default_ttl=settings.STATISTICS_CACHE_TTL_SECONDS,
+    ttls=parse_ttls(settings.STATISTICS_CACHE_TTLS),
+    max_entries=settings.STATISTICS_CACHE_MAX_ENTRIES,
+)
+
+
+async def cached_statistic(endpoint: str, loader: Callable[[], Awaitable[Any]], **params: Hashable) -> Any:
+    """Atajo para los servicios de estadísticas: `await cached_statistic("dashboard.overview", repo.get_dashboard_overview)`."""
+    return await statistics_cache.get_or_load(endpoint, params, loader)
+
+
+def invalidate_statistics_cache() -> None:
+    """Hook para las escrituras de casos."""
+    statistics_cache.invalidate()
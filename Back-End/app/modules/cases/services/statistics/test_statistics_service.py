@@ -1,5 +1,6 @@
 from typing import Dict, Any, Optional, List
 from app.modules.cases.repositories.statistics.test_statistics_repository import TestStatisticsRepository
+from app.modules.cases.services.statistics.statistics_cache import cached_statistic
 from app.core.exceptions import BadRequestError
 
 
@@ -24,7 +25,13 @@ class TestStatisticsService:
         if year < 2020 or year > 2030:
             raise BadRequestError("Year must be between 2020 and 2030")
         
-        return await self.repository.get_monthly_test_performance(month, year, entity_name)
+        return await cached_statistic(
+            "test.monthly_performance",
+            lambda: self.repository.get_monthly_test_performance(month, year, entity_name),
+            month=month,
+            year=year,
+            entity_name=entity_name,
+        )
     
     async def get_test_details(
         self, 
@@ -45,7 +52,14 @@ class TestStatisticsService:
         if year < 2020 or year > 2030:
             raise BadRequestError("Year must be between 2020 and 2030")
         
-        return await self.repository.get_test_details(test_code.strip(), month, year, entity_name)
+        return await cached_statistic(
+            "test.details",
+            lambda: self.repository.get_test_details(test_code.strip(), month, year, entity_name),
+            test_code=test_code.strip(),
+            month=month,
+            year=year,
+            entity_name=entity_name,
+        )
     
     async def get_test_pathologists(
         self, 
@@ -66,7 +80,14 @@ class TestStatisticsService:
         if year < 2020 or year > 2030:
             raise BadRequestError("Year must be between 2020 and 2030")
         
-        return await self.repository.get_test_pathologists(test_code.strip(), month, year, entity_name)
+        return await cached_statistic(
+            "test.pathologists",
+            lambda: self.repository.get_test_pathologists(test_code.strip(), month, year, entity_name),
+            test_code=test_code.strip(),
+            month=month,
+            year=year,
+            entity_name=entity_name,
+        )
     
     async def get_test_opportunity_summary(
         self, 
@@ -87,7 +108,14 @@ class TestStatisticsService:
         if not (1 <= threshold_days <= 60):
             raise BadRequestError("Threshold days must be between 1 and 60")
         
-        return await self.repository.get_test_opportunity_summary(month, year, threshold_days, entity_name)
+        return await cached_statistic(
+            "test.opportunity_summary",
+            lambda: self.repository.get_test_opportunity_summary(month, year, threshold_days, entity_name),
+            month=month,
+            year=year,
+            threshold_days=threshold_days,
+            entity_name=entity_name,
+        )
     
     async def get_test_monthly_trends(
         self, 
@@ -100,4 +128,9 @@ class TestStatisticsService:
         if year < 2020 or year > 2030:
             raise BadRequestError("Year must be between 2020 and 2030")
         
-        return await self.repository.get_test_monthly_trends(year, entity_name)
\ No newline at end of file
+        return await cached_statistic(
+            "test.monthly_trends",
+            lambda: self.repository.get_test_monthly_trends(year, entity_name),
+            year=year,
+            entity_name=entity_name,
+        )
\ No newline at end of file
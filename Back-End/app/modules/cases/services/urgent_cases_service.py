@@ -1,7 +1,12 @@
 from typing import List, Dict, Any, Optional
+import asyncio
+import logging
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.config.settings import settings
 from app.modules.cases.repositories.urgent_cases_repository import UrgentCasesRepository
 
+logger = logging.getLogger(__name__)
+
 
 class UrgentCasesService:
     def __init__(self, db: AsyncIOMotorDatabase):
@@ -49,3 +54,43 @@ class UrgentCasesService:
         ]
 
 
+class UrgentCasesRefresher:
+    """Tarea en segundo plano que refresca `urgent_cases` cada URGENT_CASES_REFRESH_SECONDS."""
+
+    _instance: Optional["UrgentCasesRefresher"] = None
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = interval if interval is not None else settings.URGENT_CASES_REFRESH_SECONDS
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def get_instance(cls) -> "UrgentCasesRefresher":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self, db: AsyncIOMotorDatabase) -> None:
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._loop(UrgentCasesRepository(db)))
+        logger.info("Refresco de casos urgentes iniciado (cada %ss)", self.interval)
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _loop(self, repo: UrgentCasesRepository) -> None:
+        while True:
+            try:
+                await repo.refresh()
+            except Exception as e:
+                # Sin refresco el panel vuelve a calcularse sobre cases al vencer la vigencia
+                logger.warning("No se pudo refrescar urgent_cases: %s", e)
+            await asyncio.sleep(self.interval)
@@ -2,6 +2,7 @@ import os
 import sys
 import pytest
 from datetime import datetime, timezone
+from types import SimpleNamespace
 from unittest.mock import AsyncMock
 
 # Asegura que el paquete 'app' se pueda importar durante los tests
@@ -52,17 +53,104 @@ def sample_case_doc():
 
 
 class FakeCursor:
+    # Registra sort/skip/limit/batch_size en `calls` como (método, *args)
     def __init__(self, docs):
         self._docs = docs
+        self.calls = []
 
-    def sort(self, *_args, **_kwargs):
+    def _record(self, name, *args):
+        self.calls.append((name, *args))
         return self
 
-    def skip(self, *_args, **_kwargs):
-        return self
+    def sort(self, *args, **_kwargs):
+        return self._record("sort", *args)
+
+    def skip(self, *args, **_kwargs):
+        return self._record("skip", *args)
+
+    def limit(self, *args, **_kwargs):
+        return self._record("limit", *args)
 
-    def limit(self, *_args, **_kwargs):
+    def batch_size(self, *args, **_kwargs):
+        return self._record("batch_size", *args)
+
+    def __aiter__(self):
+        self._iter = iter(self._docs)
         return self
 
+    async def __anext__(self):
+        try:
+            return dict(next(self._iter))
+        except StopIteration:
+            raise StopAsyncIteration
+
     async def to_list(self, length=None):
-        return self._docs[: length or len(self._docs)]
\ No newline at end of file
+        # Copias: los servicios pueden modificar los documentos que reciben
+        return [dict(doc) for doc in self._docs[: length or len(self._docs)]]
+
+
+class FakeCollection:
+    """Colección en memoria que devuelve `docs` y registra cada operación recibida."""
+
+    def __init__(self, docs=None, doc=None):
+        self.docs = docs if docs is not None else []
+        self.doc = doc
+        self.pipelines = []
+        self.finds = []
+        self.cursors = []
+        self.inserted = []
+        self.updates = []
+        self.replaced = []
+        self.deleted = []
+        self.indexes = []
+        self.ops = []
+
+    def aggregate(self, pipeline, **_kwargs):
+        self.pipelines.append(pipeline)
+        return FakeCursor(self.docs)
+
+    def find(self, query=None, projection=None, **_kwargs):
+        self.finds.append((query, projection))
+        cursor = FakeCursor(self.docs)
+        self.cursors.append(cursor)
+        return cursor
+
+    async def find_one(self, *_args, **_kwargs):
+        # El documento fijado o, si no hay, el último insertado
+        if self.doc is not None:
+            return self.doc
+        return self.inserted[-1] if self.inserted else None
+
+    async def insert_one(self, doc, **_kwargs):
+        self.inserted.append(doc)
+        return SimpleNamespace(inserted_id=len(self.inserted))
+
+    async def update_one(self, query, update, **_kwargs):
+        self.updates.append((query, update))
+        return SimpleNamespace(matched_count=1, modified_count=1)
+
+    async def replace_one(self, query, doc, upsert=False):
+        self.replaced.append((query, doc, upsert))
+
+    async def delete_one(self, query):
+        self.deleted.append(query)
+
+    async def bulk_write(self, ops, ordered=True):
+        self.ops.extend(ops)
+
+    async def create_index(self, keys, **_kwargs):
+        self.indexes.append(keys)
+
+
+class FakeDB:
+    """Base de datos en memoria: las colecciones no indicadas se crean vacías al usarse."""
+
+    def __init__(self, **collections):
+        self.__dict__.update(collections)
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        collection = FakeCollection()
+        setattr(self, name, collection)
+        return collection
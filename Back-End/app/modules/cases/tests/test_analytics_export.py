@@ -0,0 +1,87 @@
+from datetime import date, datetime
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+from app.core.exceptions import BadRequestError
+from app.modules.cases.services.statistics.analytics_export_service import AnalyticsExportService
+from app.modules.cases.tests.conftest import FakeCollection, FakeDB
+
+
+def _case(code, state, created, signed, days, entity, pathologist, tests, care="Ambulatorio"):
+    return {
+        "case_code": code,
+        "state": state,
+        "created_at": created,
+        "signed_at": signed,
+        "business_days": days,
+        "patient_info": {"care_type": care, "entity_info": {"id": entity, "name": f"Entidad {entity}"}},
+        "assigned_pathologist": {"id": pathologist, "name": f"Dr {pathologist}"},
+        "samples": [{"tests": [{"id": t, "name": f"Prueba {t}"} for t in tests]}],
+    }
+
+
+DOCS = [
+    _case("C1", "Completado", datetime(2025, 1, 3), datetime(2025, 1, 8), 3, "E1", "P1", ["T1", "T2"]),
+    _case("C2", "Completado", datetime(2025, 1, 10), datetime(2025, 1, 25), 12, "E1", "P2", ["T1"], "Hospitalizado"),
+    _case("C3", "Por entregar", datetime(2025, 2, 1), None, 5, "E2", "P1", ["T2"]),
+    _case("C4", "Completado", datetime(2025, 2, 2), datetime(2025, 2, 5), None, "HAMA", "P1", ["T1"]),
+    _case("C5", "En proceso", datetime(2025, 3, 1), None, None, "E2", None, []),
+]
+
+
+@pytest.mark.asyncio
+async def test_xlsx_contains_every_breakdown():
+    db = FakeDB(cases=FakeCollection(DOCS))
+    content, media_type, file_name = await AnalyticsExportService(db).export(date(2025, 1, 1), date(2025, 3, 31))
+
+    query, projection = db.cases.finds[0]
+    assert "$or" in query and projection["_id"] == 0
+    assert media_type.endswith("spreadsheetml.sheet")
+    assert file_name == "estadisticas_all_20250101_20250331.xlsx"
+
+    sheets = pd.read_excel(BytesIO(content), sheet_name=None)
+    assert list(sheets) == ["entities", "pathologists", "tests", "opportunity"]
+
+    entities = sheets["entities"].set_index("codigo")
+    assert entities.loc["E1", ["total", "ambulatorios", "hospitalizados"]].tolist() == [2, 1, 1]
+    assert entities.loc["E1", "tiempoPromedio"] == 7.5
+
+    pathologists = sheets["pathologists"].set_index("codigo")
+    assert pathologists.loc["P1", ["casos", "dentroOportunidad", "fueraOportunidad"]].tolist() == [2, 2, 0]
+    assert pathologists.loc["P2", "porcentajeOportunidad"] == 0.0
+
+    tests = sheets["tests"].set_index("codigo")
+    assert tests.loc["T1", ["solicitadas", "dentroOportunidad", "fueraOportunidad"]].tolist() == [3, 2, 1]
+    assert tests.loc["T1", "tiempoPromedio"] == 5.0
+
+    opportunity = sheets["opportunity"].set_index("mes")
+    assert opportunity.loc["2025-01", ["total", "dentro", "fuera"]].tolist() == [2, 1, 1]
+    assert opportunity.loc["Total", ["total", "dentro"]].tolist() == [3, 2]
+    assert opportunity.loc["Total", "tiempoPromedio"] == round(20 / 3, 2)
+
+
+@pytest.mark.asyncio
+async def test_csv_exports_a_single_report():
+    content, media_type, _ = await AnalyticsExportService(FakeDB(cases=FakeCollection(DOCS))).export(
+        date(2025, 1, 1), date(2025, 1, 31), file_format="csv", report="tests"
+    )
+
+    assert media_type.startswith("text/csv")
+    frame = pd.read_csv(BytesIO(content), encoding="utf-8-sig")
+    assert frame["codigo"].tolist() == ["T1", "T2"]
+    assert frame["solicitadas"].tolist() == [2, 1]
+
+
+@pytest.mark.asyncio
+async def test_empty_period_and_invalid_requests():
+    content, _, _ = await AnalyticsExportService(FakeDB(cases=FakeCollection([]))).export(date(2024, 1, 1), date(2024, 1, 31))
+    sheets = pd.read_excel(BytesIO(content), sheet_name=None)
+    assert all(frame.empty for frame in sheets.values())
+
+    service = AnalyticsExportService(FakeDB(cases=FakeCollection(DOCS)))
+    with pytest.raises(BadRequestError):
+        await service.export(date(2025, 1, 1), date(2025, 1, 31), file_format="csv", report="all")
+    with pytest.raises(BadRequestError):
+        await service.export(date(2025, 2, 1), date(2025, 1, 1))
@@ -0,0 +1,165 @@
+import asyncio
+import pytest
+
+from app.modules.cases.services.browser_pool import BrowserPool, PoolTimeoutError
+
+
+class FakePage:
+    def __init__(self):
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+    def set_default_timeout(self, _ms):
+        pass
+
+    async def set_extra_http_headers(self, _headers):
+        pass
+
+    async def goto(self, *_a, **_k):
+        pass
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeContext:
+    async def new_page(self):
+        return FakePage()
+
+    async def close(self):
+        pass
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.handlers = {}
+        self.connected = True
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    async def new_browser_cdp_session(self):
+        raise RuntimeError("sin CDP en tests")
+
+    async def new_context(self, **_kwargs):
+        return FakeContext()
+
+    def is_connected(self):
+        return self.connected
+
+    async def close(self):
+        self.connected = False
+
+    def crash(self):
+        self.connected = False
+        self.handlers["disconnected"](self)
+
+
+class FakePool(BrowserPool):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.launched = []
+
+    async def _start_playwright(self):
+        return None
+
+    async def _launch_browser(self):
+        browser = FakeBrowser()
+        self.launched.append(browser)
+        return browser
+
+
+def _pool(**kwargs):
+    defaults = dict(
+        browsers=2,
+        contexts_per_browser=2,
+        checkout_timeout=1,
+        slot_timeout=5,
+        max_renders_per_browser=0,
+        max_browser_rss_mb=0,
+    )
+    defaults.update(kwargs)
+    return FakePool(**defaults)
+
+
+@pytest.mark.asyncio
+async def test_checkout_is_bounded_and_times_out():
+    pool = _pool(browsers=1, contexts_per_browser=2, checkout_timeout=0.05)
+    await pool.initialize()
+
+    p1 = await pool.get_page()
+    p2 = await pool.get_page()
+    assert p1 is not p2
+    assert pool.stats()["in_use"] == 2
+
+    with pytest.raises(PoolTimeoutError):
+        await pool.get_page()
+
+    await pool.return_page(p1)
+    p3 = await pool.get_page()
+    assert p3 is p1
+    await pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_waiter_gets_slot_when_released():
+    pool = _pool(browsers=1, contexts_per_browser=1)
+    await pool.initialize()
+
+    async with pool.checkout() as page:
+        waiter = asyncio.create_task(pool.get_page())
+        await asyncio.sleep(0)
+        assert pool.stats()["waiting"] == 1
+        held = page
+
+    got = await asyncio.wait_for(waiter, timeout=1)
+    assert got is held
+    await pool.return_page(got)
+    await pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_browser_recycled_after_max_renders():
+    pool = _pool(browsers=1, contexts_per_browser=1, max_renders_per_browser=2)
+    await pool.initialize()
+
+    for _ in range(2):
+        async with pool.checkout():
+            pass
+    # El reinicio corre en segundo plano
+    for _ in range(20):
+        if pool.stats()["restarts"] == 1 and pool.stats()["available"] == 1:
+            break
+        await asyncio.sleep(0.01)
+
+    assert pool.stats()["restarts"] == 1
+    assert len(pool.launched) == 2
+    assert pool.launched[0].connected is False
+    async with pool.checkout():
+        pass
+    await pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_crashed_browser_restarts_without_affecting_others():
+    pool = _pool(browsers=2, contexts_per_browser=1)
+    await pool.initialize()
+
+    crashed = pool.launched[0]
+    crashed.crash()
+    for _ in range(20):
+        if pool.stats()["restarts"] == 1:
+            break
+        await asyncio.sleep(0.01)
+
+    assert pool.stats()["restarts"] == 1
+    assert await pool.is_healthy()
+    # Ambos slots vigentes siguen disponibles; el del navegador caído se descarta
+    a = await pool.get_page()
+    b = await pool.get_page()
+    assert a is not b
+    await pool.return_page(a)
+    await pool.return_page(b)
+    await pool.shutdown()
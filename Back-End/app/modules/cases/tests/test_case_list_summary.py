@@ -0,0 +1,103 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.exceptions import BadRequestError
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.modules.auth.routes.auth_routes import get_current_user_id
+from app.modules.cases.repositories.case_repository import CASE_LIST_FIELDS, case_list_projection
+from app.modules.cases.routes.case_routes import get_service, router
+from app.modules.cases.schemas.case import CaseListItem
+from app.modules.cases.services.case_service import CaseService
+from app.modules.cases.tests.conftest import FakeCollection
+
+OID = ObjectId()
+ROW = {
+    "_id": OID,
+    "case_code": "2025-00007",
+    "state": "En proceso",
+    "created_at": datetime(2025, 5, 1, 10, 0),
+    "patient_info": {"name": "Ana Gómez", "identification_number": "123"},
+}
+
+
+def _service(docs):
+    service = CaseService.__new__(CaseService)
+    service.repo = type("Repo", (), {"collection": FakeCollection(docs)})()
+    return service
+
+
+def test_projection_covers_requested_fields_and_cursor_key():
+    projection = case_list_projection(["state", "assigned_pathologist"])
+    assert projection == {"created_at": 1, "state": 1, "assigned_pathologist.id": 1, "assigned_pathologist.name": 1}
+    full = case_list_projection(list(CASE_LIST_FIELDS))
+    assert not any(path.startswith(("result", "additional_notes", "complementary_tests")) for path in full)
+    assert set(CASE_LIST_FIELDS) == set(CaseListItem.model_fields) - {"id"}
+
+
+@pytest.mark.asyncio
+async def test_list_cases_with_fields_returns_projected_items():
+    service = _service([ROW])
+
+    items = await service.list_cases(fields=["case_code", "state"])
+
+    _, projection = service.repo.collection.finds[0]
+    assert projection == {"created_at": 1, "case_code": 1, "state": 1}
+    assert isinstance(items[0], CaseListItem) and items[0].id == str(OID)
+
+    with pytest.raises(BadRequestError):
+        await service.list_cases(fields=["result"])
+
+
+@pytest.mark.asyncio
+async def test_summary_rows_are_normalized_like_the_full_view():
+    legacy = {
+        "_id": OID,
+        "case_code": "2025-00008",
+        "created_at": datetime(2025, 5, 1, 10, 0),
+        "patient_info": {
+            "name": "Luis Pérez",
+            "identification_type": 1,
+            "identification_number": "98765",
+            "entity_info": {"id": "CES", "name": "Clínica CES", "legacy": True},
+        },
+    }
+    service = _service([legacy])
+
+    item = (await service.list_cases(fields=["patient_info", "state", "priority"]))[0]
+    full = service._to_response(dict(legacy))
+
+    assert item.state == full.state == "En proceso"
+    assert item.priority == full.priority == "Normal"
+    assert item.patient_info.patient_code == full.patient_info.patient_code == "1-98765"
+    assert item.patient_info.entity_info == full.patient_info.entity_info.model_dump() == {"id": "CES", "name": "Clínica CES"}
+
+
+class _FakeService:
+    async def list_cases(self, **kwargs):
+        self.kwargs = kwargs
+        return [CaseListItem.model_validate({**{k: v for k, v in ROW.items() if k != "_id"}, "id": str(OID)})]
+
+
+def test_summary_route_returns_slim_rows_and_cursor():
+    fake = _FakeService()
+    app = FastAPI()
+    app.dependency_overrides[get_service] = lambda: fake
+    app.dependency_overrides[get_current_user_id] = lambda: None
+    app.include_router(router)
+    client = TestClient(app)
+
+    resp = client.get("/", params={"view": "summary", "limit": 1})
+
+    assert resp.status_code == 200
+    assert fake.kwargs["fields"] == list(CASE_LIST_FIELDS)
+    row = resp.json()[0]
+    assert set(row) == {"id", "case_code", "state", "created_at", "patient_info"}
+    assert row["patient_info"] == {"name": "Ana Gómez", "identification_number": "123"}
+    assert resp.headers[NEXT_CURSOR_HEADER]
+
+    client.get("/", params={"fields": "case_code, state"})
+    assert fake.kwargs["fields"] == ["case_code", "state"]
@@ -0,0 +1,81 @@
+import pytest
+
+from app.core.exceptions import BadRequestError
+from app.modules.cases.repositories.case_repository import CaseRepository
+from app.modules.cases.repositories.case_search_repository import (
+    CaseSearchRepository,
+    case_search_tokens,
+    query_terms,
+    search_filter,
+)
+from app.modules.cases.services.case_service import CaseService
+from app.modules.cases.tests.conftest import FakeCollection, FakeDB
+
+CASE = {
+    "case_code": "2025-00042",
+    "patient_info": {
+        "name": "María José Peña",
+        "patient_code": "CC-1.234.567",
+        "identification_number": "1.234.567",
+    },
+}
+
+
+def test_tokens_fold_accents_and_split_codes():
+    tokens = case_search_tokens(CASE)
+    assert {"maria", "jose", "pena", "1234567", "cc", "2025", "00042"} <= set(tokens)
+    assert tokens == sorted(set(tokens))
+
+
+def test_query_terms_use_token_normalization():
+    assert query_terms("  Peña MARÍA ") == ["pena", "maria"]
+    assert query_terms("1.234.567") == ["1234567"]
+    assert query_terms("2025-00042") == ["2025", "00042"]
+    assert query_terms("--") == []
+
+
+def test_search_filter_is_anchored_per_term():
+    assert search_filter(["pe"]) == {"search_tokens": {"$regex": "^pe"}}
+    assert search_filter(["a.b", "2025"]) == {"$and": [
+        {"search_tokens": {"$regex": r"^a\.b"}},
+        {"search_tokens": {"$regex": "^2025"}},
+    ]}
+
+
+@pytest.fixture(autouse=True)
+def reset_ready(monkeypatch):
+    monkeypatch.setattr(CaseSearchRepository, "_ready", False)
+
+
+@pytest.mark.asyncio
+async def test_repository_writes_tokens_with_case():
+    db = FakeDB()
+    repo = CaseRepository(db)
+
+    await repo.create(dict(CASE))
+    assert "pena" in db.cases.inserted[0]["search_tokens"]
+
+    await repo.update_by_case_code("2025-00042", {"patient_info": {"name": "Ana Gómez"}})
+    _, update = db.cases.updates[0]
+    assert update["$set"]["search_tokens"] == ["00042", "2025", "ana", "gomez"]
+
+    await repo.update_by_case_code("2025-00042", {"state": "Por firmar"})
+    assert "search_tokens" not in db.cases.updates[1][1]["$set"]
+
+
+@pytest.mark.asyncio
+async def test_list_cases_ranks_token_matches_when_ready():
+    db = FakeDB(cases=FakeCollection([]))
+    service = CaseService(db)
+    CaseSearchRepository._ready = True
+
+    await service.list_cases(skip=20, limit=10, search="peña 2025", state="En proceso")
+
+    pipeline = db.cases.pipelines[0]
+    assert pipeline[0]["$match"]["$and"][0] == {"state": "En proceso"}
+    assert pipeline[0]["$match"]["$and"][1] == search_filter(["pena", "2025"])
+    assert pipeline[2]["$sort"] == {"_search_rank": -1, "created_at": -1, "_id": -1}
+    assert pipeline[3:5] == [{"$skip": 20}, {"$limit": 10}]
+
+    with pytest.raises(BadRequestError):
+        await service.list_cases(search="peña", cursor="abc")
@@ -0,0 +1,96 @@
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.modules.cases.repositories.statistics.case_stats_daily_repository import (
+    CaseStatsDailyRepository,
+    RollupBucket,
+    fold_groups,
+    group_rows,
+    is_day_aligned,
+)
+from app.modules.cases.services.statistics import case_stats_rollup as rollup_mod
+
+
+def _group(entity: str, bd, n: int, samples: int = 0) -> dict:
+    return {
+        "_id": {"day": datetime(2025, 3, 4), "entity_name": entity, "state": "Completado", "bd": bd},
+        "n": n,
+        "samples": samples,
+    }
+
+
+def test_fold_groups_builds_days_histogram():
+    rows = fold_groups([_group("A", 3, 2, 2), _group("A", 9, 1, 3), _group("A", None, 4, 4), _group("B", 3, 1)], "case")
+    assert len(rows) == 2
+    row_a = next(r for r in rows.values() if r["entity_name"] == "A")
+    assert row_a["cases"] == 7 and row_a["samples"] == 9
+    assert row_a["days"] == {"3": 2, "9": 1}
+    assert row_a["days_missing"] == 4
+
+
+def test_fold_groups_ids_are_deterministic_per_kind():
+    case_ids = set(fold_groups([_group("A", 3, 1)], "case"))
+    assert case_ids == set(fold_groups([_group("A", 5, 1)], "case"))
+    assert case_ids.isdisjoint(fold_groups([_group("A", 3, 1)], "test"))
+
+
+def test_rollup_bucket_thresholds_and_average():
+    bucket = RollupBucket()
+    bucket.add({"cases": 4, "days": {"2": 1, "7": 2}, "days_missing": 1})
+    bucket.add({"cases": 1, "days": {"10": 1}})
+    assert bucket.within(7) == 3
+    assert bucket.within(7, include_missing=True) == 4
+    assert bucket.outside(7) == 1
+    assert bucket.average() == 26 / 4
+    assert bucket.average(missing_as_zero=True) == 26 / 5
+    assert (bucket.min_days, bucket.max_days) == (2, 10)
+    assert RollupBucket().average() is None
+
+
+def test_group_rows_merges_by_key():
+    rows = [
+        {"entity_name": "A", "cases": 1, "days": {"1": 1}},
+        {"entity_name": "B", "cases": 2, "days": {"4": 2}},
+        {"entity_name": "A", "cases": 3, "days": {"1": 3}},
+    ]
+    grouped = group_rows(rows, lambda r: r["entity_name"])
+    assert list(grouped) == ["A", "B"]
+    assert grouped["A"].cases == 4 and grouped["A"].days == {1: 4}
+
+
+def test_is_day_aligned():
+    assert is_day_aligned(datetime(2025, 1, 1))
+    assert not is_day_aligned(datetime(2025, 1, 1, 12))
+
+
+@pytest.mark.asyncio
+async def test_failed_day_is_retried_then_marked_stale(monkeypatch):
+    calls = {"refresh": 0, "stale": 0}
+
+    async def refresh_day(self, day):
+        calls["refresh"] += 1
+        if calls["refresh"] < 3:
+            raise RuntimeError("mongo caído")
+
+    async def mark_stale(self):
+        calls["stale"] += 1
+
+    monkeypatch.setattr(CaseStatsDailyRepository, "refresh_day", refresh_day)
+    monkeypatch.setattr(CaseStatsDailyRepository, "mark_stale", mark_stale)
+    monkeypatch.setattr(rollup_mod.settings, "STATISTICS_REFRESH_RETRY_SECONDS", 0)
+    monkeypatch.setattr(rollup_mod.settings, "STATISTICS_REFRESH_RETRIES", 5)
+    monkeypatch.setattr(rollup_mod, "_attempts", {})
+
+    rollup_mod._dirty_days.add(datetime(2025, 1, 2))
+    await rollup_mod._drain(MagicMock())
+    # Dos fallos transitorios y un recálculo correcto: el día no se pierde
+    assert calls == {"refresh": 3, "stale": 0}
+    assert rollup_mod._attempts == {}
+
+    calls["refresh"] = -10
+    monkeypatch.setattr(rollup_mod.settings, "STATISTICS_REFRESH_RETRIES", 1)
+    rollup_mod._dirty_days.add(datetime(2025, 1, 3))
+    await rollup_mod._drain(MagicMock())
+    assert calls == {"refresh": -8, "stale": 1}
@@ -0,0 +1,80 @@
+from datetime import datetime
+
+import pytest
+from pymongo import DeleteMany, ReplaceOne
+
+from app.modules.cases.repositories.statistics import case_tests_repository as facts_mod
+from app.modules.cases.repositories.statistics.case_tests_repository import (
+    CaseTestsRepository,
+    case_test_rows,
+    strip_test_unwinds,
+)
+from app.modules.cases.tests.conftest import FakeCollection, FakeDB
+
+
+CASE = {
+    "case_code": "2025-00001",
+    "state": "Completado",
+    "signed_at": datetime(2025, 3, 4),
+    "business_days": 3,
+    "patient_info": {"entity_info": {"id": "E1", "name": "Clínica"}},
+    "samples": [
+        {"body_region": "Piel", "tests": [{"id": "T1", "name": "Biopsia"}, {"id": "T2", "name": "Inmuno"}]},
+        {"body_region": "Colon", "tests": [{"id": "T1", "name": "Biopsia"}]},
+        {"body_region": "Hígado", "tests": []},
+    ],
+}
+
+PIPELINE = [
+    {"$match": {"state": "Completado"}},
+    {"$unwind": "$samples"},
+    {"$unwind": "$samples.tests"},
+    {"$group": {"_id": "$samples.tests.id", "count": {"$sum": 1}}},
+]
+
+
+def test_rows_mirror_unwound_documents():
+    rows = case_test_rows(CASE)
+
+    assert [r["_id"] for r in rows] == ["2025-00001:0:0", "2025-00001:0:1", "2025-00001:1:0"]
+    assert rows[1]["samples"] == {"body_region": "Piel", "tests": {"id": "T2", "name": "Inmuno"}}
+    assert rows[2]["patient_info"]["entity_info"]["id"] == "E1"
+    assert all(r["business_days"] == 3 and r["state"] == "Completado" for r in rows)
+
+
+def test_strip_unwinds_only_when_both_present():
+    assert strip_test_unwinds(PIPELINE) == [PIPELINE[0], PIPELINE[3]]
+    assert strip_test_unwinds([PIPELINE[0], PIPELINE[1]]) is None
+
+
+@pytest.mark.asyncio
+async def test_aggregate_reads_fact_collection_when_ready(monkeypatch):
+    monkeypatch.setattr(facts_mod.CaseTestsRepository, "_ready", True)
+    db = FakeDB()
+    await CaseTestsRepository(db).aggregate_tests(PIPELINE)
+
+    assert db.cases.pipelines == []
+    assert db.case_tests.pipelines == [[PIPELINE[0], PIPELINE[3]]]
+
+    monkeypatch.setattr(facts_mod.CaseTestsRepository, "_ready", False)
+    await CaseTestsRepository(db).aggregate_tests(PIPELINE)
+    assert db.cases.pipelines == [PIPELINE]
+
+
+@pytest.mark.asyncio
+async def test_sync_case_replaces_and_prunes_rows():
+    db = FakeDB(cases=FakeCollection(doc=CASE))
+    assert await CaseTestsRepository(db).sync_case("2025-00001") == 3
+
+    replaces = [op for op in db.case_tests.ops if isinstance(op, ReplaceOne)]
+    deletes = [op for op in db.case_tests.ops if isinstance(op, DeleteMany)]
+    assert len(replaces) == 3 and len(deletes) == 1
+    assert deletes[0]._filter == {
+        "case_code": "2025-00001",
+        "_id": {"$nin": ["2025-00001:0:0", "2025-00001:0:1", "2025-00001:1:0"]},
+    }
+
+    # Caso borrado: solo queda el borrado de sus filas
+    db = FakeDB()
+    assert await CaseTestsRepository(db).sync_case("2025-00001") == 0
+    assert [type(op) for op in db.case_tests.ops] == [DeleteMany]
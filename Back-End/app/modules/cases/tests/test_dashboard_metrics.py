@@ -0,0 +1,67 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app.modules.cases.repositories.statistics.dashboard_statistics_repository import DashboardStatisticsRepository
+from app.modules.cases.tests.conftest import FakeCollection, FakeDB
+
+
+@pytest.mark.asyncio
+async def test_metrics_general_runs_one_facet_aggregation():
+    facets = {
+        "pacientes_mes_actual": [{"total": 3}],
+        "casos_mes_actual": [{"total": 5}],
+        "casos_mes_anterior": [{"total": 4}],
+        "casos_last30": [{"total": 6}],
+        "casos_prev30": [{"total": 4}],
+        "pacientes_last30": [],
+        "pacientes_prev30": [],
+    }
+    cases = FakeCollection([facets])
+    repo = DashboardStatisticsRepository(FakeDB(cases=cases))
+
+    result = await repo.get_metrics_general()
+
+    assert len(cases.pipelines) == 1
+    stages = cases.pipelines[0]
+    assert "$facet" in stages[-1] and len(stages[-1]["$facet"]) == 10
+    assert result["casos"] == {"mes_actual": 5, "mes_anterior": 4, "mes_anterior_anterior": 0, "cambio_porcentual": 50.0}
+    assert result["pacientes"]["mes_actual"] == 3 and result["pacientes"]["cambio_porcentual"] == 0.0
+
+
+@pytest.mark.asyncio
+async def test_metrics_pathologist_filters_before_facet():
+    cases = FakeCollection([])
+    repo = DashboardStatisticsRepository(FakeDB(cases=cases))
+
+    result = await repo.get_metrics_pathologist("P-1")
+
+    match = cases.pipelines[0][0]["$match"]
+    assert match["assigned_pathologist.id"] == "P-1"
+    facets = cases.pipelines[0][-1]["$facet"]
+    # Se conserva el filtro de cada conteo original: casos del mes actual sin excluir la entidad
+    assert "patient_info.entity_info.id" not in facets["casos_mes_actual"][0]["$match"]
+    assert "patient_info.entity_info.id" in facets["casos_mes_anterior"][0]["$match"]
+    assert result["casos"]["mes_actual"] == 0
+
+
+@pytest.mark.asyncio
+async def test_dashboard_overview_totals_from_state_facet():
+    cases = FakeCollection([{
+        "current": [{"total": 2}],
+        "previous": [],
+        "by_state": [{"_id": "Completado", "count": 7}, {"_id": "En proceso", "count": 3}],
+    }])
+    repo = DashboardStatisticsRepository(FakeDB(cases=cases))
+
+    result = await repo.get_dashboard_overview()
+
+    assert len(cases.pipelines) == 1
+    assert result["total_casos"] == 10
+    assert result["casos_mes_actual"] == 2 and result["cambio_porcentual"] == 100.0
+    assert result["casos_por_estado"] == {"Completado": 7, "En proceso": 3}
+
+
+def test_month_starts_cross_year():
+    starts = DashboardStatisticsRepository._month_starts(datetime(2025, 1, 15, tzinfo=timezone.utc))
+    assert [(d.year, d.month) for d in starts] == [(2024, 11), (2024, 12), (2025, 1), (2025, 2)]
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+import app.config.database as database
+from app.config.database import check_database_health, database_manager, get_database, start_health_monitor, stop_health_monitor
+
+
+class _Admin:
+    def __init__(self):
+        self.pings = 0
+        self.fail = False
+
+    async def command(self, name):
+        self.pings += 1
+        if self.fail:
+            raise ConnectionError("sin conexión")
+        return {"ok": 1}
+
+
+class _Client:
+    def __init__(self):
+        self.admin = _Admin()
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fake = _Client()
+    monkeypatch.setattr(database_manager, "client", fake)
+    monkeypatch.setattr(database_manager, "database", object())
+    monkeypatch.setattr(database_manager, "healthy", True)
+    return fake
+
+
+@pytest.mark.asyncio
+async def test_get_database_returns_cached_handle_without_ping(client):
+    db = await get_database()
+    assert db is database_manager.database
+    assert client.admin.pings == 0
+
+
+@pytest.mark.asyncio
+async def test_health_check_tracks_state_and_keeps_client(client):
+    client.admin.fail = True
+    assert await check_database_health() is False
+    assert database_manager.healthy is False
+    assert database_manager.client is client
+
+    client.admin.fail = False
+    assert await check_database_health() is True
+    assert database_manager.healthy is True
+
+
+@pytest.mark.asyncio
+async def test_health_check_reconnects_when_there_is_no_client(monkeypatch):
+    calls = []
+
+    async def _connect():
+        calls.append(1)
+        database_manager.healthy = True
+
+    monkeypatch.setattr(database_manager, "client", None)
+    monkeypatch.setattr(database, "connect_to_mongo", _connect)
+
+    assert await check_database_health() is True
+    assert calls == [1]
+
+
+@pytest.mark.asyncio
+async def test_monitor_pings_in_background(client, monkeypatch):
+    real_sleep = asyncio.sleep
+    monkeypatch.setattr(database.asyncio, "sleep", lambda _s: real_sleep(0))
+
+    start_health_monitor()
+    for _ in range(5):
+        await asyncio.sleep(0)
+    await stop_health_monitor()
+
+    assert client.admin.pings > 0
+    assert database_manager._monitor_task is None
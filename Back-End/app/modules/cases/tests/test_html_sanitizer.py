@@ -0,0 +1,44 @@
+from app.modules.cases.services import html_sanitizer as san_mod
+from app.modules.cases.services.html_sanitizer import sanitize_html
+
+
+def test_keeps_allowed_tags_and_styles():
+    html = '<p style="text-align: center; color: red">Hola <b onclick="x()">mundo</b></p><br/>'
+    assert str(sanitize_html(html)) == '<p style="text-align: center">Hola <b>mundo</b></p><br/>'
+
+
+def test_drops_disallowed_tags_scripts_and_comments():
+    html = (
+        '<!--[if gte mso 9]><xml>x</xml><![endif]-->'
+        '<div class="MsoNormal"><script>alert(1)</script><span style=\'font-family:Arial\'>Texto</span>'
+        '<o:p></o:p><img src=x onerror=alert(1)><STYLE>p{}</STYLE></div>'
+    )
+    assert str(sanitize_html(html)) == '<div class="MsoNormal"><span>Texto</span></div>'
+
+
+def test_text_is_kept_as_is_and_empty_input():
+    assert str(sanitize_html("a < b &nbsp; c")) == "a < b &nbsp; c"
+    assert str(sanitize_html(None)) == ""
+
+
+def test_output_is_memoized_by_content(monkeypatch):
+    calls = []
+    original = san_mod._sanitize
+    monkeypatch.setattr(san_mod, "_memo", san_mod.OrderedDict())
+    monkeypatch.setattr(san_mod, "_sanitize", lambda html: calls.append(html) or original(html))
+    first = sanitize_html("<p>igual</p>")
+    assert sanitize_html("<p>igual</p>") is first
+    assert len(calls) == 1
+
+
+def test_slash_separated_attributes_do_not_bypass():
+    assert str(sanitize_html("<img/src=x onerror=alert(1)>")) == ""
+    assert str(sanitize_html("<svg/onload=alert(1)>x</svg>")) == "x"
+    assert str(sanitize_html('<b/onclick="x()">y</b>')) == "<b>y</b>"
+    assert str(sanitize_html("<p>a<br/></p>")) == "<p>a<br/></p>"
+
+
+def test_unterminated_tags_are_neutralized():
+    assert str(sanitize_html("<img src=x onerror=alert(1)<p>t</p>")) == "t</p>"
+    assert str(sanitize_html("a<img src=x onerror=alert(1)")) == "aimg src=x onerror=alert(1)"
+    assert "<svg" not in str(sanitize_html('<p title="a>b">c</p><svg onload=x'))
@@ -0,0 +1,128 @@
+from datetime import datetime
+
+import pytest
+
+from app.modules.cases.repositories.case_repository import CASE_INDEXES, CaseRepository
+from app.modules.cases.repositories.statistics.opportunity_statistics_repository import (
+    OpportunityStatisticsRepository,
+)
+from app.modules.cases.services.index_advisor import (
+    IndexAdvisor,
+    plan_stages,
+    redundant_indexes,
+    statistics_query_shapes,
+)
+
+INDEX_INFO = {
+    "_id_": {"key": [("_id", 1)]},
+    "case_code_1": {"key": [("case_code", 1)], "unique": True},
+    "state_1": {"key": [("state", 1)]},
+    "created_at_1": {"key": [("created_at", 1)]},
+    "signed_at_1": {"key": [("signed_at", 1)]},
+    "assigned_pathologist.id_1": {"key": [("assigned_pathologist.id", 1)]},
+    "created_at_-1_state_1": {"key": [("created_at", -1), ("state", 1)]},
+    "created_at_-1_state_1_assigned_pathologist.name_1": {
+        "key": [("created_at", -1), ("state", 1), ("assigned_pathologist.name", 1)]
+    },
+    "state_1_created_at_1_business_days_1": {"key": [("state", 1), ("created_at", 1), ("business_days", 1)]},
+    "signed_at_1_patient_info.entity_info.id_1": {
+        "key": [("signed_at", 1), ("patient_info.entity_info.id", 1)],
+        "partialFilterExpression": {"state": "Completado"},
+    },
+    "assigned_pathologist.id_1_state_1_signed_at_1": {
+        "key": [("assigned_pathologist.id", 1), ("state", 1), ("signed_at", 1)]
+    },
+}
+
+
+def test_redundant_indexes_are_prefixes_of_full_indexes():
+    redundant = redundant_indexes(INDEX_INFO)
+
+    assert set(redundant) == {"state_1", "created_at_1", "assigned_pathologist.id_1", "created_at_-1_state_1"}
+    assert redundant["state_1"] == "state_1_created_at_1_business_days_1"
+    # Solo lo cubre un índice parcial: se conserva
+    assert "signed_at_1" not in redundant
+    assert "case_code_1" not in redundant
+
+
+def test_declared_indexes_leave_no_redundant_single_fields():
+    info = {
+        "_".join(f"{f}_{d}" for f, d in keys): {"key": keys, **options}
+        for keys, options in CASE_INDEXES
+    }
+    assert redundant_indexes(info) == {}
+
+
+def test_plan_stages_walks_nested_explain():
+    explain = {"stages": [{"$cursor": {"queryPlanner": {"winningPlan": {
+        "stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "state_1_created_at_1_business_days_1"}
+    }}}}]}
+    assert plan_stages(explain) == ({"FETCH", "IXSCAN"}, {"state_1_created_at_1_business_days_1"})
+
+
+class _Collection:
+    def __init__(self):
+        self.dropped = []
+        self.created = []
+
+    async def index_information(self):
+        return INDEX_INFO
+
+    async def drop_index(self, name):
+        self.dropped.append(name)
+
+    async def create_index(self, keys, **options):
+        self.created.append((keys, options))
+
+
+class _DB:
+    def __init__(self):
+        self.cases = _Collection()
+        self.commands = []
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+    def __getattr__(self, name):
+        # Otras colecciones que abren los repositorios de estadísticas
+        return _Collection()
+
+    async def command(self, name, spec, **kwargs):
+        self.commands.append(spec["pipeline"])
+        first = spec["pipeline"][0]["$match"]
+        stage = "COLLSCAN" if "samples.tests" in first else "IXSCAN"
+        return {"queryPlanner": {"winningPlan": {"stage": stage, "indexName": "idx"}}}
+
+
+@pytest.mark.asyncio
+async def test_report_flags_collscans_and_drops_redundant():
+    db = _DB()
+    advisor = IndexAdvisor(db)
+
+    report = await advisor.report()
+
+    assert report["collscans"] == ["tests.completed"]
+    assert report["plans"]["opportunity.range"] == {"collscan": False, "indexes": ["idx"]}
+    assert await advisor.drop_redundant() == list(report["redundant"])
+    assert db.cases.dropped == list(report["redundant"])
+
+
+def test_shapes_come_from_repository_match_builders():
+    db = _DB()
+    start, end = datetime(2025, 1, 1), datetime(2025, 2, 1)
+
+    shapes = statistics_query_shapes(db)
+
+    assert shapes["opportunity.range"](start, end) == OpportunityStatisticsRepository(db).opportunity_match(start, end)
+    assert shapes["dashboard.windowed_counts"](start, end) == {"created_at": {"$gte": start, "$lt": end}}
+    entity = shapes["entity.completed"](start, end)["patient_info.entity_info.id"]["$in"]
+    assert len(entity) == 2 and entity[0] == str(entity[1])
+
+
+@pytest.mark.asyncio
+async def test_ensure_indexes_creates_declared_set():
+    db = _DB()
+    await CaseRepository(db).ensure_indexes()
+
+    assert len(db.cases.created) == len(CASE_INDEXES)
+    assert ([("case_code", 1)], {"unique": True}) in db.cases.created
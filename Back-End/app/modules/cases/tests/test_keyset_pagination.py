@@ -0,0 +1,58 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from app.core.exceptions import BadRequestError
+from app.core.pagination import apply_keyset, decode_cursor, encode_cursor, keyset_filter, next_cursor
+from app.modules.cases.services.case_service import CaseService
+from app.modules.cases.tests.conftest import FakeCollection
+
+
+def test_cursor_roundtrip_keeps_bson_types():
+    created = datetime(2025, 5, 1, 8, 30)
+    oid = ObjectId()
+    value, tiebreak = decode_cursor(encode_cursor(created, oid))
+    assert value == created and tiebreak == oid
+
+    with pytest.raises(BadRequestError):
+        decode_cursor("no-es-un-cursor")
+
+
+def test_keyset_filter_continues_after_last_item():
+    oid = ObjectId()
+    created = datetime(2025, 5, 1)
+    cursor = encode_cursor(created, oid)
+
+    assert keyset_filter(cursor, "created_at", -1) == {"$or": [
+        {"created_at": {"$lt": created}},
+        {"created_at": created, "_id": {"$lt": oid}},
+        {"created_at": None},
+    ]}
+    assert keyset_filter(cursor, "created_at", 1) == {"$or": [
+        {"created_at": {"$gt": created}},
+        {"created_at": created, "_id": {"$gt": oid}},
+    ]}
+    assert apply_keyset({"state": "Completado"}, None, "created_at") == {"state": "Completado"}
+    assert apply_keyset({"state": "Completado"}, cursor, "created_at")["$and"][0] == {"state": "Completado"}
+
+
+def test_next_cursor_only_when_page_is_full():
+    items = [(datetime(2025, 5, 2), 1), (datetime(2025, 5, 1), 2)]
+    assert next_cursor(items, 3, lambda i: i) is None
+    assert decode_cursor(next_cursor(items, 2, lambda i: i)) == (datetime(2025, 5, 1), 2)
+
+
+@pytest.mark.asyncio
+async def test_list_cases_with_cursor_seeks_instead_of_skipping():
+    service = CaseService.__new__(CaseService)
+    collection = FakeCollection()
+    service.repo = type("Repo", (), {"collection": collection})()
+    cursor = encode_cursor(datetime(2025, 5, 1), ObjectId())
+
+    await service.list_cases(skip=200, limit=50, state="Completado", cursor=cursor)
+
+    query, _ = collection.finds[0]
+    assert query["$and"][0]["state"] == "Completado"
+    assert "$or" in query["$and"][1]
+    assert collection.cursors[0].calls == [("sort", [("created_at", -1), ("_id", -1)]), ("limit", 50)]
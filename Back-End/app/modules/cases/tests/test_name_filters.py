@@ -0,0 +1,80 @@
+import pytest
+from bson import ObjectId
+
+from app.modules.cases.repositories.statistics import name_filters as filters_mod
+from app.modules.cases.repositories.statistics.name_filters import StatisticsNameResolver, merge_match
+from app.modules.cases.tests.conftest import FakeCollection, FakeDB
+
+
+def _catalogs():
+    return FakeDB(
+        entities=FakeCollection([
+            {"_id": "e1", "name": "Clínica CES", "entity_code": "CES"},
+            {"_id": "e2", "name": "Hospital General de Medellín", "entity_code": "HGM"},
+        ]),
+        pathologists=FakeCollection([
+            {"pathologist_name": "Ana Gómez", "pathologist_code": "P1"},
+            {"pathologist_name": "Luis Pérez", "pathologist_code": "P2"},
+        ]),
+    )
+
+
+@pytest.fixture(autouse=True)
+def fresh_tables(monkeypatch):
+    monkeypatch.setattr(filters_mod, "catalog_tables", filters_mod.CatalogTables(ttl_seconds=60))
+
+
+@pytest.mark.asyncio
+async def test_entity_name_resolves_to_indexed_ids():
+    db = _catalogs()
+    resolver = StatisticsNameResolver(db)
+
+    assert await resolver.entity_match("clínica") == {"patient_info.entity_info.id": {"$in": ["CES", "e1"]}}
+    assert await resolver.entity_match("hospital", rollup=True) == {"entity_id": {"$in": ["HGM", "e2"]}}
+    # La tabla del catálogo se carga una sola vez
+    assert len(db.entities.finds) == 1
+
+
+@pytest.mark.asyncio
+async def test_legacy_object_id_entities_match_both_forms():
+    oid = ObjectId()
+    db = _catalogs()
+    db.entities.docs.append({"_id": oid, "name": "Laboratorio Antiguo"})
+    resolver = StatisticsNameResolver(db)
+
+    expected = [str(oid), oid]
+    assert await resolver.entity_match("antiguo") == {"patient_info.entity_info.id": {"$in": expected}}
+    assert await resolver.entity_match("antiguo", rollup=True) == {"entity_id": {"$in": expected}}
+
+
+@pytest.mark.asyncio
+async def test_unknown_name_keeps_regex():
+    resolver = StatisticsNameResolver(_catalogs())
+
+    assert await resolver.entity_match("Otra") == {"patient_info.entity_info.name": {"$regex": "Otra", "$options": "i"}}
+
+
+@pytest.mark.asyncio
+async def test_pathologist_code_or_name():
+    resolver = StatisticsNameResolver(_catalogs())
+
+    assert await resolver.pathologist_match("P2", accept_code=True) == {"assigned_pathologist.id": {"$in": ["P2"]}}
+    assert await resolver.pathologist_match("ana") == {"assigned_pathologist.id": {"$in": ["P1"]}}
+    assert await resolver.pathologist_match("X9", rollup=True, accept_code=True) == {
+        "$or": [{"pathologist_id": "X9"}, {"pathologist_name": {"$regex": "X9", "$options": "i"}}]
+    }
+
+
+@pytest.mark.asyncio
+async def test_canonical_filters_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(filters_mod.settings, "STATISTICS_CANONICAL_FILTERS", False)
+    resolver = StatisticsNameResolver(_catalogs())
+
+    assert await resolver.entity_match("CES") == {"patient_info.entity_info.name": {"$regex": "CES", "$options": "i"}}
+
+
+def test_merge_match_combines_operators():
+    match = {"patient_info.entity_info.id": {"$ne": "HAMA"}, "$or": [{"a": 1}]}
+    merge_match(match, {"patient_info.entity_info.id": {"$in": ["CES"]}, "$or": [{"b": 2}]})
+    assert match["patient_info.entity_info.id"] == {"$ne": "HAMA", "$in": ["CES"]}
+    assert match["$and"] == [{"$or": [{"b": 2}]}]
@@ -0,0 +1,98 @@
+from datetime import datetime
+
+import pytest
+
+from app.modules.cases.repositories.statistics import case_stats_daily_repository as rollup_mod
+from app.modules.cases.repositories.statistics.opportunity_statistics_repository import OpportunityStatisticsRepository
+from app.modules.cases.tests.conftest import FakeCollection, FakeDB
+
+
+class _Rollup(FakeCollection):
+    # El repositorio del rollup pide un solo tipo de fila por consulta
+    def find(self, query=None, projection=None, **kwargs):
+        cursor = super().find(query, projection, **kwargs)
+        cursor._docs = [row for row in self.docs if row["kind"] == query["kind"]]
+        return cursor
+
+
+@pytest.fixture
+def rollup_not_ready(monkeypatch):
+    monkeypatch.setattr(rollup_mod.CaseStatsDailyRepository, "_ready", False)
+
+
+@pytest.mark.asyncio
+async def test_yearly_series_uses_one_grouped_aggregation(rollup_not_ready):
+    cases = FakeCollection([
+        {"_id": 1, "total": 4, "within": 3, "sum_days": 20},
+        {"_id": 3, "total": 2, "within": 0, "sum_days": 30},
+    ])
+    repo = OpportunityStatisticsRepository(FakeDB(cases=cases))
+
+    series = await repo.get_yearly_opportunity(2025, 7)
+
+    assert len(cases.pipelines) == 1
+    assert cases.pipelines[0][-1]["$group"]["_id"] == {"$month": "$created_at"}
+    assert series == [75.0, 0.0, 0.0] + [0.0] * 9
+
+
+@pytest.mark.asyncio
+async def test_monthly_breakdown_maps_facets(rollup_not_ready):
+    cases = FakeCollection([{
+        "summary": [{"_id": 5, "total": 2, "within": 1, "sum_days": 12}],
+        "pathologists": [{"_id": {"month": 5, "key": "P1"}, "code": "P1", "name": "Ana", "count": 2, "within": 1, "sum_days": 12}],
+        "tests": [{"_id": {"month": 5, "key": "T1"}, "code": "T1", "name": "Biopsia", "count": 3, "within": 3, "sum_days": 9}],
+    }])
+    repo = OpportunityStatisticsRepository(FakeDB(cases=cases))
+
+    monthly = await repo.get_monthly_opportunity(5, 2025, 7)
+
+    assert "$facet" in cases.pipelines[0][-1]
+    assert monthly["summary"] == {"total": 2, "within": 1, "out": 1, "averageDays": 6.0}
+    assert monthly["pathologists"] == [{"code": "P1", "name": "Ana", "withinOpportunity": 1, "outOfOpportunity": 1, "averageDays": 6.0}]
+    assert monthly["tests"][0]["withinOpportunity"] == 3
+
+    empty = await repo.get_monthly_opportunity(6, 2025, 7)
+    assert empty == {"tests": [], "pathologists": [], "summary": {"total": 0, "within": 0, "out": 0, "averageDays": 0.0}}
+
+
+@pytest.mark.asyncio
+async def test_yearly_detail_from_rollup(monkeypatch):
+    monkeypatch.setattr(rollup_mod.CaseStatsDailyRepository, "_ready", True)
+    rows = [
+        {"kind": "case", "day": datetime(2025, 2, 3), "pathologist_id": "P1", "pathologist_name": "Ana",
+         "cases": 3, "days": {"2": 2, "9": 1}},
+        {"kind": "case", "day": datetime(2025, 4, 1), "pathologist_id": "P2", "pathologist_name": "Luis",
+         "cases": 1, "days": {"4": 1}},
+        {"kind": "test", "day": datetime(2025, 2, 3), "test_code": "T1", "test_name": "Biopsia",
+         "cases": 2, "days": {"2": 2}},
+    ]
+    cases = FakeCollection()
+    repo = OpportunityStatisticsRepository(FakeDB(cases=cases, case_stats_daily=_Rollup(rows)))
+
+    months = await repo.get_opportunity_by_month(2025, 7, breakdown=True)
+
+    assert cases.pipelines == []
+    assert [m["summary"]["total"] for m in months] == [0, 3, 0, 1] + [0] * 8
+    assert months[1]["summary"]["within"] == 2
+    assert months[1]["tests"][0]["code"] == "T1"
+    assert months[3]["pathologists"][0]["name"] == "Luis"
+    assert months[3]["tests"] == []
+
+
+@pytest.mark.asyncio
+async def test_range_opportunity_is_grouped_on_the_server(rollup_not_ready):
+    cases = FakeCollection([{"_id": None, "total": 4, "dentro": 3, "sum_days": 22}])
+    repo = OpportunityStatisticsRepository(FakeDB(cases=cases))
+
+    metrics = await repo._compute_opportunity_for_range(datetime(2025, 1, 1), datetime(2025, 2, 1), "P1", 7)
+
+    match = cases.pipelines[0][0]["$match"]
+    assert match["state"] == {"$in": ["Completado", "Por entregar"]}
+    assert match["assigned_pathologist.id"] == "P1"
+    assert metrics == {
+        "porcentaje_oportunidad": 75.0,
+        "tiempo_promedio": 5.5,
+        "casos_dentro_oportunidad": 3,
+        "casos_fuera_oportunidad": 1,
+        "total_casos_mes_anterior": 4,
+    }
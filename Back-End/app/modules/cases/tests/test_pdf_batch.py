@@ -0,0 +1,175 @@
+import asyncio
+import io
+import zipfile
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from pypdf import PdfReader, PdfWriter
+
+from app.modules.cases.services import browser_pool as pool_mod
+from app.modules.cases.services.pdf_service import CasePdfService, iter_spool
+
+
+def _pdf(pages: int) -> bytes:
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=100, height=100)
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+class FakePool:
+    capacity = 2
+
+
+@pytest.fixture
+def service(monkeypatch):
+    async def _get_instance():
+        return FakePool()
+
+    monkeypatch.setattr(pool_mod.BrowserPool, "get_instance", staticmethod(_get_instance))
+    svc = CasePdfService.__new__(CasePdfService)
+    svc.in_flight = 0
+    svc.max_in_flight = 0
+
+    async def generate_case_pdf(case_code):
+        svc.in_flight += 1
+        svc.max_in_flight = max(svc.max_in_flight, svc.in_flight)
+        try:
+            # Los primeros casos terminan más tarde para forzar resultados fuera de orden
+            await asyncio.sleep(0.01 if case_code.endswith("1") else 0)
+            if case_code == "BAD":
+                raise ValueError("Caso con código BAD no encontrado")
+            return _pdf(int(case_code[-1]))
+        finally:
+            svc.in_flight -= 1
+
+    async def preload_batch(_codes):
+        # Sin precarga: cada caso se carga por separado con generate_case_pdf
+        return {}
+
+    svc.generate_case_pdf = generate_case_pdf
+    svc.preload_batch = preload_batch
+    return svc
+
+
+@pytest.mark.asyncio
+async def test_iter_batch_keeps_order_and_bounds_window(service):
+    codes = ["C1", "C2", "BAD", "C3", "C1", "C2"]
+    got = [(code, isinstance(result, Exception)) async for code, result in service.iter_batch_pdfs(codes)]
+
+    assert [code for code, _ in got] == codes
+    assert [failed for _, failed in got] == [False, False, True, False, False, False]
+    assert service.max_in_flight <= FakePool.capacity * 2
+
+
+@pytest.mark.asyncio
+async def test_merge_to_spool_skips_failures(service):
+    spool, count = await service.merge_batch_to_spool(["C1", "BAD", "C2"])
+    data = b"".join([chunk async for chunk in iter_spool(spool, chunk_size=64)])
+
+    assert count == 2
+    assert spool.closed
+    assert len(PdfReader(io.BytesIO(data)).pages) == 3
+
+
+@pytest.mark.asyncio
+async def test_merge_raises_when_nothing_rendered(service):
+    with pytest.raises(ValueError):
+        await service.merge_batch_to_spool(["BAD"])
+
+
+@pytest.mark.asyncio
+async def test_stream_zip_emits_one_entry_per_case(service):
+    chunks = [chunk async for chunk in service.stream_batch_zip(["C1", "BAD", "C2"])]
+    # El primer caso se envía antes de terminar el lote
+    assert chunks[0]
+
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+    assert archive.namelist() == ["C1.pdf", "C2.pdf", "errores.txt"]
+    assert len(PdfReader(io.BytesIO(archive.read("C2.pdf"))).pages) == 2
+    assert b"BAD" in archive.read("errores.txt")
+
+
+@pytest.mark.asyncio
+async def test_stream_zip_close_cancels_pending_renders(service):
+    closed = []
+    iter_batch_pdfs = service.iter_batch_pdfs
+
+    async def tracked(codes):
+        try:
+            async for item in iter_batch_pdfs(codes):
+                yield item
+        finally:
+            closed.append(True)
+
+    service.iter_batch_pdfs = tracked
+    stream = service.stream_batch_zip(["C1", "C2", "C3", "C4"])
+    assert await stream.__anext__()
+    await stream.aclose()
+    # Cerrado al cerrar el stream, no cuando lo recoja el GC
+    assert closed == [True]
+    await asyncio.sleep(0)
+    assert service.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_preload_batch_uses_one_query_per_collection(monkeypatch):
+    from app.modules.approvals.models.approval_request import ApprovalStateEnum
+    from app.modules.cases.services import pdf_service as pdf_mod
+    from app.modules.pathologists.services.signature_cache import SignatureCache
+
+    signatures = SignatureCache(ttl_seconds=60, negative_ttl_seconds=60, max_entries=10, max_bytes=0)
+    monkeypatch.setattr(pdf_mod, "signature_cache", signatures)
+
+    calls = []
+    now = datetime.now(timezone.utc)
+
+    def case(code, resident=None):
+        data = {
+            "id": code, "case_code": code, "state": "Por entregar", "patient_info": {"name": "P"},
+            "assigned_pathologist": {"id": "PAT-1", "name": "Dra. Demo"},
+            "assigned_resident": {"id": resident, "name": "Res"} if resident else None,
+            "samples": [], "result": None,
+        }
+        return SimpleNamespace(model_dump=lambda: data)
+
+    class CaseSvc:
+        async def get_cases_by_codes(self, codes):
+            calls.append("cases")
+            return {c: case(c, resident="RES-1" if c == "C1" else None) for c in codes if c != "MISSING"}
+
+    class ApprovalSvc:
+        async def get_approvals_by_case_codes(self, codes, states):
+            calls.append("approvals")
+            return [SimpleNamespace(
+                original_case_code="C2", approval_state=ApprovalStateEnum.PENDING_APPROVAL,
+                approval_info=SimpleNamespace(reason="IHQ"), created_at=now,
+                complementary_tests=[SimpleNamespace(code="898807", name="IHQ", quantity=2)],
+            )]
+
+    class ResidentSvc:
+        async def get_residents_by_codes(self, codes):
+            calls.append("residents")
+            return {"RES-1": SimpleNamespace(medical_license="RM-9")}
+
+    class PathologistSvc:
+        async def get_pathologists_by_codes(self, codes):
+            calls.append("pathologists")
+            return {"PAT-1": SimpleNamespace(signature="data:image/png;base64,AAA")}
+
+    svc = CasePdfService.__new__(CasePdfService)
+    svc.case_service, svc.approval_service = CaseSvc(), ApprovalSvc()
+    svc.resident_service, svc.pathologist_service = ResidentSvc(), PathologistSvc()
+
+    preloaded = await svc.preload_batch(["C1", "C2", "MISSING"])
+
+    assert sorted(calls) == ["approvals", "cases", "pathologists", "residents"]
+    c1, tests1 = preloaded["C1"]
+    assert c1["residente_asignado"]["registro_medico"] == "RM-9" and tests1 is None
+    _, tests2 = preloaded["C2"]
+    assert tests2["motivo"] == "IHQ" and tests2["pruebas"][0]["cantidad"] == 2
+    assert isinstance(preloaded["MISSING"], ValueError)
+    assert signatures.lookup("PAT-1") == (True, "data:image/png;base64,AAA")
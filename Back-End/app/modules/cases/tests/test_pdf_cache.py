@@ -0,0 +1,53 @@
+import pytest
+
+from app.modules.cases.services.pdf_cache import PdfArtifactCache, compute_pdf_key
+
+
+def _case(**overrides):
+    data = {"caso_code": "2025-00001", "estado": "Completado", "resultado": {"diagnostico": "Benigno"}}
+    data.update(overrides)
+    return data
+
+
+def test_key_changes_with_content_signature_and_tests():
+    base = compute_pdf_key(_case(), None, "data:image/png;base64,AAA")
+    assert base == compute_pdf_key(_case(), None, "data:image/png;base64,AAA")
+    assert base != compute_pdf_key(_case(resultado={"diagnostico": "Maligno"}), None, "data:image/png;base64,AAA")
+    assert base != compute_pdf_key(_case(), None, "data:image/png;base64,BBB")
+    assert base != compute_pdf_key(_case(), {"pruebas": [{"codigo": "IHQ"}]}, "data:image/png;base64,AAA")
+
+
+@pytest.mark.asyncio
+async def test_memory_and_disk_tiers(tmp_path):
+    cache = PdfArtifactCache(tmp_path, memory_bytes=1024)
+    key = compute_pdf_key(_case(), None, None)
+
+    assert await cache.get("2025-00001", key) is None
+    await cache.put("2025-00001", key, b"%PDF-1")
+    assert await cache.get("2025-00001", key) == b"%PDF-1"
+    assert cache.hits == 1
+
+    # Un proceso nuevo (memoria vacía) recupera el PDF desde disco
+    cache.clear_memory()
+    assert await cache.get("2025-00001", key) == b"%PDF-1"
+    assert cache.disk_hits == 1
+
+
+@pytest.mark.asyncio
+async def test_lru_evicts_by_bytes(tmp_path):
+    cache = PdfArtifactCache(tmp_path, memory_bytes=10)
+    await cache.put("A", "k1", b"123456")
+    await cache.put("B", "k2", b"123456")
+    assert "k1" not in cache._memory
+    assert "k2" in cache._memory
+    assert cache._memory_size == 6
+
+
+@pytest.mark.asyncio
+async def test_invalidate_drops_memory_and_disk(tmp_path):
+    cache = PdfArtifactCache(tmp_path, memory_bytes=1024)
+    await cache.put("2025-00001", "k1", b"%PDF-1")
+    await cache.invalidate("2025-00001")
+
+    assert await cache.get("2025-00001", "k1") is None
+    assert not any(tmp_path.iterdir())
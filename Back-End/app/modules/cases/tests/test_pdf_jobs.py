@@ -0,0 +1,187 @@
+import asyncio
+
+import pytest
+
+from app.core.exceptions import BadRequestError, ConflictError
+from app.modules.cases.schemas.pdf_job import PdfJobCreate
+from app.modules.cases.services import pdf_job_service as job_mod
+from app.modules.cases.services import pdf_service as pdf_mod
+
+
+class FakeJobRepo:
+    jobs = {}
+
+    def __init__(self, db):
+        pass
+
+    async def create(self, job):
+        self.jobs[job["job_id"]] = dict(job)
+        return job
+
+    async def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    async def has_queued_prerender(self, case_code):
+        return any(
+            j.get("kind") == "prerender" and j["status"] == "queued" and j["case_codes"] == [case_code]
+            for j in self.jobs.values()
+        )
+
+    async def add_progress(self, job_id, worker_id, rendered=0, failed=0):
+        job = self.jobs[job_id]
+        job["rendered"] += rendered
+        job["failed"] += failed
+        return {"cancel_requested": job.get("cancel_requested", False)}
+
+    async def heartbeat(self, job_id, worker_id):
+        job = self.jobs[job_id]
+        job["heartbeats"] = job.get("heartbeats", 0) + 1
+        return job["status"] == "running"
+
+    async def finish(self, job_id, worker_id, status, retention, artifact_path=None, error=None):
+        self.jobs[job_id].update(status=status, artifact_path=artifact_path, error=error)
+        return True
+
+
+class FakePdfService:
+    rendered = []
+    write_delay = 0
+
+    def __init__(self, db):
+        pass
+
+    async def generate_case_pdf(self, case_code):
+        self.rendered.append(case_code)
+        return b"%PDF"
+
+    async def write_batch(self, case_codes, output, format="pdf", on_result=None):
+        # Simula una precarga lenta sin reportar progreso
+        await asyncio.sleep(self.write_delay)
+        for code in case_codes:
+            result = ValueError("no existe") if code == "BAD" else b"%PDF"
+            if not isinstance(result, Exception):
+                output.write(result)
+            await on_result(code, result)
+            if code == "STOP":
+                FakeJobRepo.jobs[next(iter(FakeJobRepo.jobs))]["cancel_requested"] = True
+        return len(case_codes)
+
+
+@pytest.fixture
+def runner(monkeypatch, tmp_path):
+    FakeJobRepo.jobs = {}
+    FakePdfService.write_delay = 0
+    monkeypatch.setattr(job_mod, "PdfJobRepository", FakeJobRepo)
+    monkeypatch.setattr(pdf_mod, "CasePdfService", FakePdfService)
+    r = job_mod.PdfJobRunner(workers=1, jobs_dir=str(tmp_path))
+    monkeypatch.setattr(job_mod.PdfJobRunner, "_instance", r)
+    return r
+
+
+@pytest.mark.asyncio
+async def test_submit_dedupes_and_limits(runner, monkeypatch):
+    service = job_mod.PdfJobService(None)
+    job = await service.submit(PdfJobCreate(case_codes=["A", " A", "B"], format="zip"))
+    assert job.status == "queued" and job.total == 2
+    assert FakeJobRepo.jobs[job.job_id]["case_codes"] == ["A", "B"]
+
+    monkeypatch.setattr(job_mod.settings, "PDF_JOBS_MAX_CASES", 1)
+    with pytest.raises(BadRequestError):
+        await service.submit(PdfJobCreate(case_codes=["A", "B"]))
+
+    with pytest.raises(ConflictError):
+        await service.get_artifact(job.job_id)
+
+
+@pytest.mark.asyncio
+async def test_run_job_writes_artifact_and_progress(runner, tmp_path):
+    service = job_mod.PdfJobService(None)
+    job = await service.submit(PdfJobCreate(case_codes=["A", "BAD", "B"]))
+    await runner.run_job(FakeJobRepo.jobs[job.job_id], "w-1")
+
+    done = await service.get_job(job.job_id)
+    assert (done.status, done.rendered, done.failed) == ("completed", 2, 1)
+    assert done.download_url.endswith(f"/cases/batch/pdf/jobs/{job.job_id}/download")
+    path, name, media_type = await service.get_artifact(job.job_id)
+    assert path.read_bytes() == b"%PDF%PDF"
+    assert media_type == "application/pdf" and name.endswith(".pdf")
+    assert not list(tmp_path.glob("*.part"))
+
+
+@pytest.mark.asyncio
+async def test_run_job_heartbeats_while_batch_is_silent(monkeypatch, runner, tmp_path):
+    monkeypatch.setattr(runner, "stale_seconds", 0.03)
+    monkeypatch.setattr(FakePdfService, "write_delay", 0.1)
+    service = job_mod.PdfJobService(None)
+    job = await service.submit(PdfJobCreate(case_codes=["A"]))
+    FakeJobRepo.jobs[job.job_id]["status"] = "running"
+    await runner.run_job(FakeJobRepo.jobs[job.job_id], "w-1")
+
+    doc = FakeJobRepo.jobs[job.job_id]
+    assert doc["status"] == "completed" and doc["heartbeats"] >= 2
+    # Artefacto propio del worker: un worker que retome el trabajo no lo pisa
+    assert doc["artifact_path"].endswith(f"{job.job_id}.w-1.pdf")
+    heartbeats = doc["heartbeats"]
+    await asyncio.sleep(0.05)
+    assert doc["heartbeats"] == heartbeats
+
+
+@pytest.mark.asyncio
+async def test_run_job_stops_on_cancel(runner, tmp_path):
+    service = job_mod.PdfJobService(None)
+    job = await service.submit(PdfJobCreate(case_codes=["STOP", "A", "B"]))
+    await runner.run_job(FakeJobRepo.jobs[job.job_id], "w-1")
+
+    done = await service.get_job(job.job_id)
+    assert done.status == "cancelled"
+    # Se detiene en el siguiente caso tras la cancelación, sin renderizar el resto
+    assert done.rendered == 2
+    assert not list(tmp_path.iterdir())
+
+
+@pytest.mark.asyncio
+async def test_prerender_job_renders_once_without_artifact(runner, tmp_path):
+    FakePdfService.rendered = []
+    service = job_mod.PdfJobService(None)
+    job = await service.enqueue_prerender("2025-00001")
+    # Un segundo aviso mientras sigue en cola no duplica el trabajo
+    assert await service.enqueue_prerender("2025-00001") is None
+
+    await runner.run_job(FakeJobRepo.jobs[job.job_id], "w-1")
+    done = await service.get_job(job.job_id)
+    assert (done.kind, done.status, done.rendered) == ("prerender", "completed", 1)
+    assert done.download_url is None
+    assert FakePdfService.rendered == ["2025-00001"]
+    assert not list(tmp_path.iterdir())
+
+
+@pytest.mark.asyncio
+async def test_sign_case_enqueues_prerender_when_enabled(runner, monkeypatch):
+    from app.modules.cases.services import sign_service as sign_mod
+    from app.modules.cases.schemas.sign import CaseSignRequest, CaseSignValidation
+
+    svc = sign_mod.SignService.__new__(sign_mod.SignService)
+    svc.db = None
+
+    async def validate(case_code):
+        return CaseSignValidation(case_code=case_code, can_sign=True, message="ok", current_state="Por firmar")
+
+    class Repo:
+        async def sign_case(self, case_code, data):
+            return {"case_code": case_code}
+
+    async def noop(_code):
+        pass
+
+    svc.repo = Repo()
+    svc.validate_case_for_signing = validate
+    svc._to_case_response = lambda doc: doc
+    monkeypatch.setattr(sign_mod, "invalidate_case_pdf", noop)
+
+    monkeypatch.setattr(sign_mod.settings, "PDF_PRERENDER_ON_SIGN", False)
+    await svc.sign_case("2025-00002", CaseSignRequest())
+    assert not FakeJobRepo.jobs
+
+    monkeypatch.setattr(sign_mod.settings, "PDF_PRERENDER_ON_SIGN", True)
+    await svc.sign_case("2025-00002", CaseSignRequest())
+    assert [j["case_codes"] for j in FakeJobRepo.jobs.values()] == [["2025-00002"]]
@@ -0,0 +1,72 @@
+from contextlib import asynccontextmanager
+
+import pytest
+
+from app.modules.cases.services import browser_pool as pool_mod
+from app.modules.cases.services import pdf_metrics as metrics_mod
+from app.modules.cases.services.pdf_metrics import Histogram, PdfMetrics, PdfTimings
+from app.modules.cases.services.pdf_service import CasePdfService
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert [b["count"] for b in snapshot["buckets"]] == [2, 3, 4]
+    assert snapshot["buckets"][-1]["le"] == "+Inf"
+    assert snapshot["count"] == 4 and snapshot["max"] == 3.0
+
+
+def test_timings_feed_metrics_and_server_timing():
+    metrics = PdfMetrics()
+    timings = PdfTimings(metrics)
+    timings.add("merge", 0.010)
+    timings.add("merge", 0.005)
+    with timings.stage("render"):
+        pass
+    header = timings.server_timing()
+    assert header.startswith("merge;dur=15.0, render;dur=")
+    assert "total;dur=" in header
+    assert metrics.histograms["merge"].count == 2
+
+
+class FakePage:
+    async def set_content(self, *_a, **_k):
+        pass
+
+    async def pdf(self, **_k):
+        return b"%PDF-fake"
+
+
+class FakePool:
+    @asynccontextmanager
+    async def checkout(self):
+        yield FakePage()
+
+
+@pytest.mark.asyncio
+async def test_render_records_each_stage(monkeypatch):
+    async def _get_instance():
+        return FakePool()
+
+    monkeypatch.setattr(pool_mod.BrowserPool, "get_instance", staticmethod(_get_instance))
+    monkeypatch.setattr(metrics_mod, "pdf_metrics", PdfMetrics())
+    svc = CasePdfService.__new__(CasePdfService)
+
+    async def _get_case_data(_code):
+        return {"caso_code": "2025-00001", "estado": "Por firmar"}
+
+    async def _none(*_a):
+        return None
+
+    svc._get_case_data = _get_case_data
+    svc._get_complementary_tests = _none
+    svc._get_pathologist_signature = _none
+
+    timings = PdfTimings()
+    assert await svc.generate_case_pdf("2025-00001", timings=timings) == b"%PDF-fake"
+    assert list(timings.durations) == [
+        "data", "complementary", "signature", "render", "checkout", "set_content", "pdf"
+    ]
+    assert metrics_mod.pdf_metrics.histograms["pdf"].count == 1
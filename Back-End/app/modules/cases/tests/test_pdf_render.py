@@ -0,0 +1,30 @@
+import os
+
+from app.modules.cases.services import pdf_service as pdf_mod
+from app.modules.cases.services.pdf_service import CasePdfService, get_render_context
+
+
+def test_render_context_is_shared_and_reloads_on_change(monkeypatch, tmp_path):
+    monkeypatch.setattr(pdf_mod, "_render_context", None)
+    ctx = get_render_context()
+    assert get_render_context() is ctx
+    assert set(ctx.logos) == {"lime", "udea", "hama"}
+
+    template = ctx.get_template()
+    assert ctx.get_template() is template
+
+    # Una plantilla modificada en disco se recompila en el siguiente render
+    path = pdf_mod.TEMPLATES_DIR / pdf_mod.REPORT_TEMPLATE
+    stat = path.stat()
+    try:
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert ctx.get_template() is not template
+    finally:
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+
+def test_service_construction_is_lazy(mock_db):
+    svc = CasePdfService(mock_db)
+    assert "case_service" not in svc.__dict__
+    assert svc.case_service is svc.case_service
+    assert "resident_service" not in svc.__dict__
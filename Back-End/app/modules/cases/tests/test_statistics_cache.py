@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+
+from app.modules.cases.services.statistics import statistics_cache as cache_mod
+from app.modules.cases.services.statistics.statistics_cache import StatisticsCache, parse_ttls
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_load():
+    cache = StatisticsCache(default_ttl=30)
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"total": 5}
+
+    results = await asyncio.gather(*(cache.get_or_load("dashboard.overview", {}, loader) for _ in range(40)))
+
+    assert calls == 1
+    assert all(r == {"total": 5} for r in results)
+    # Cada llamador recibe su propia copia
+    results[0]["total"] = 0
+    assert (await cache.get_or_load("dashboard.overview", {}, loader)) == {"total": 5}
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_entries_expire_with_endpoint_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache_mod.time, "monotonic", lambda: now[0])
+    cache = StatisticsCache(default_ttl=30, ttls={"dashboard.overview": 5})
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return len(calls)
+
+    assert await cache.get_or_load("dashboard.overview", {}, loader) == 1
+    assert await cache.get_or_load("dashboard.metrics_general", {}, loader) == 2
+    now[0] += 10
+    assert await cache.get_or_load("dashboard.overview", {}, loader) == 3
+    assert await cache.get_or_load("dashboard.metrics_general", {}, loader) == 2
+
+
+@pytest.mark.asyncio
+async def test_params_are_part_of_the_key():
+    cache = StatisticsCache(default_ttl=30)
+
+    def loader_for(year):
+        async def loader():
+            return year
+        return loader
+
+    assert await cache.get_or_load("dashboard.cases_by_month", {"year": 2024}, loader_for(2024)) == 2024
+    assert await cache.get_or_load("dashboard.cases_by_month", {"year": 2025}, loader_for(2025)) == 2025
+
+
+@pytest.mark.asyncio
+async def test_invalidate_during_load_discards_result():
+    cache = StatisticsCache(default_ttl=30)
+    release = asyncio.Event()
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return calls
+
+    first = asyncio.create_task(cache.get_or_load("dashboard.overview", {}, loader))
+    await asyncio.sleep(0)
+    cache.invalidate()
+    release.set()
+    assert await first == 1
+    assert await cache.get_or_load("dashboard.overview", {}, loader) == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_load_is_not_cached():
+    cache = StatisticsCache(default_ttl=30)
+
+    async def failing():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_load("dashboard.overview", {}, failing)
+
+    async def loader():
+        return "ok"
+
+    assert await cache.get_or_load("dashboard.overview", {}, loader) == "ok"
+
+
+def test_parse_ttls_ignores_invalid_entries():
+    assert parse_ttls("dashboard.overview=15, opportunity.yearly=300,bad") == {
+        "dashboard.overview": 15.0,
+        "opportunity.yearly": 300.0,
+    }
+    assert parse_ttls("") == {}
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_hang_waiters():
+    cache = StatisticsCache(default_ttl=30)
+    started = asyncio.Event()
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        started.set()
+        await asyncio.sleep(0.05)
+        return {"total": calls}
+
+    leader = asyncio.create_task(cache.get_or_load("dashboard.overview", {}, loader))
+    await started.wait()
+    waiters = [asyncio.create_task(cache.get_or_load("dashboard.overview", {}, loader)) for _ in range(5)]
+    await asyncio.sleep(0)
+    # El cliente que inició la carga se desconecta
+    leader.cancel()
+
+    results = await asyncio.wait_for(asyncio.gather(*waiters), timeout=1)
+
+    assert leader.cancelled()
+    # Uno de los que esperaban retoma la carga y el resto la comparte
+    assert calls == 2
+    assert results == [{"total": 2}] * 5
@@ -0,0 +1,79 @@
+import warnings
+from datetime import datetime, timezone
+from typing import List
+
+from bson import ObjectId
+from pydantic import TypeAdapter
+
+from app.core.serialization import construct_trusted, json_response
+from app.modules.cases.schemas.case import CaseResponse, PatientInfo, SampleTest
+from app.modules.cases.services.case_service import CaseService
+from app.modules.cases.services.result_service import ResultService
+from app.modules.cases.services.sign_service import SignService
+
+
+def _full_doc(sample_case_doc):
+    return {
+        **sample_case_doc,
+        "patient_info": {**sample_case_doc["patient_info"], "location": {"municipality_name": "Medellín"}},
+        "assigned_pathologist": {"id": "P-1", "name": "Dra. Demo"},
+        "result": {"method": ["HE"], "diagnosis": "<p>Benigno</p>"},
+        "additional_notes": [{"date": datetime(2025, 5, 2, tzinfo=timezone.utc), "note": "Revisar"}],
+        "signed_at": datetime(2025, 5, 3, tzinfo=timezone.utc),
+    }
+
+
+def test_trusted_response_matches_validated_response(sample_case_doc):
+    service = CaseService.__new__(CaseService)
+    trusted = service._to_response(_full_doc(sample_case_doc))
+
+    assert isinstance(trusted.patient_info, PatientInfo)
+    assert isinstance(trusted.samples[0].tests[0], SampleTest)
+    validated = CaseResponse.model_validate(trusted.model_dump())
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert trusted.model_dump_json() == validated.model_dump_json()
+
+
+def test_json_response_serializes_without_revalidating(sample_case_doc):
+    service = CaseService.__new__(CaseService)
+    cases = [service._to_response(_full_doc(sample_case_doc))]
+    adapter = TypeAdapter(List[CaseResponse])
+
+    resp = json_response(adapter, cases)
+
+    assert resp.media_type == "application/json"
+    assert resp.body == adapter.dump_json(cases)
+
+
+def test_construct_trusted_keeps_only_model_fields():
+    test = construct_trusted(SampleTest, {"id": "T-1", "name": "Biopsia", "legacy": True})
+    assert test.quantity == 1
+    assert test.model_dump() == {"id": "T-1", "name": "Biopsia", "quantity": 1}
+
+
+def test_loosely_typed_legacy_data_matches_validated_response(sample_case_doc):
+    doc = _full_doc(sample_case_doc)
+    doc["patient_info"] = {**doc["patient_info"], "identification_type": "1", "identification_number": 1234567}
+    doc["patient_info"]["entity_info"] = {"id": ObjectId("695fabcc483c3b4cc99ee1ac"), "name": "Legado"}
+    doc["business_days"] = 3.0
+    doc["samples"] = [{"body_region": "Piel", "tests": [{"id": "T-1", "name": "Biopsia", "quantity": "2"}]}]
+    service = CaseService.__new__(CaseService)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        trusted = service._to_response(doc)
+        dumped = trusted.model_dump_json()
+
+    assert trusted.patient_info.identification_type == 1
+    assert trusted.business_days == 3
+    assert trusted.samples[0].tests[0].quantity == 2
+    assert dumped == CaseResponse.model_validate(trusted.model_dump()).model_dump_json()
+
+
+def test_result_and_sign_services_share_the_case_normalization(sample_case_doc):
+    doc = {**_full_doc(sample_case_doc), "business_days": 4.0}
+    expected = CaseService.__new__(CaseService)._to_response(doc).model_dump_json()
+
+    assert ResultService.__new__(ResultService)._to_case_response(doc).model_dump_json() == expected
+    assert SignService.__new__(SignService)._to_case_response(doc).model_dump_json() == expected
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta, timezone
+import time
+
+import pytest
+
+from app.modules.cases.repositories.urgent_cases_repository import UrgentCasesRepository, days_in_system
+from app.modules.cases.tests.conftest import FakeCollection, FakeDB
+
+
+@pytest.fixture(autouse=True)
+def reset_refresh(monkeypatch):
+    monkeypatch.setattr(UrgentCasesRepository, "_refreshed_at", None)
+
+
+def test_days_in_system_counts_calendar_days_in_utc():
+    now = datetime(2025, 3, 10, 1, 0, tzinfo=timezone.utc)
+    assert days_in_system(datetime(2025, 3, 4, 23, 59), now) == 6
+    assert days_in_system(datetime(2025, 3, 9, 20, 0, tzinfo=timezone(timedelta(hours=-5))), now) == 0
+    assert days_in_system(None, now) is None
+
+
+@pytest.mark.asyncio
+async def test_refresh_materializes_open_cases_and_marks_fresh():
+    db = FakeDB()
+    repo = UrgentCasesRepository(db)
+    assert not repo.is_fresh()
+
+    await repo.refresh()
+
+    pipeline = db.cases.pipelines[0]
+    assert pipeline[0]["$match"]["state"] == {"$in": ["En proceso", "Por firmar"]}
+    assert pipeline[-1] == {"$out": "urgent_cases"}
+    assert "created_at" in db.urgent_cases.indexes
+    assert repo.is_fresh()
+
+
+@pytest.mark.asyncio
+async def test_fresh_view_is_an_indexed_range_read():
+    created = datetime(2020, 1, 1)
+    db = FakeDB(urgent_cases=FakeCollection([{"case_code": "2020-00001", "created_at": created, "state": "En proceso"}]))
+    repo = UrgentCasesRepository(db)
+    UrgentCasesRepository._refreshed_at = time.monotonic()
+
+    rows = await repo.find_urgent_cases(limit=10, min_days=6, pathologist_code="P-9")
+
+    assert db.cases.pipelines == []
+    query, projection = db.urgent_cases.finds[0]
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    assert query == {"created_at": {"$lt": today - timedelta(days=5)}, "pathologist_id": "P-9"}
+    assert projection == {"_id": 0, "pathologist_id": 0}
+    assert db.urgent_cases.cursors[0].calls == [("sort", "created_at", 1), ("limit", 10)]
+    assert rows[0]["days_in_system"] == (today.date() - created.date()).days
+
+
+@pytest.mark.asyncio
+async def test_sync_case_upserts_open_cases_and_removes_closed_ones():
+    row = {"_id": "2025-00001", "case_code": "2025-00001"}
+    db = FakeDB(cases=FakeCollection([row]))
+    await UrgentCasesRepository(db).sync_case("2025-00001")
+    assert db.cases.pipelines[0][0]["$match"]["case_code"] == "2025-00001"
+    assert db.urgent_cases.replaced == [({"_id": "2025-00001"}, row, True)]
+
+    db = FakeDB()
+    await UrgentCasesRepository(db).sync_case("2025-00002")
+    assert db.urgent_cases.deleted == [{"_id": "2025-00002"}]
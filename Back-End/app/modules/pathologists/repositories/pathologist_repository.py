@@ -49,6 +49,14 @@ class PathologistRepository:
         doc = await self.collection.find_one({"pathologist_code": pathologist_code})
         return self._convert_doc_to_response(doc) if doc else None
 
+    async def get_by_pathologist_codes(self, pathologist_codes: List[str]) -> List[dict]:
+        """Obtener varios patólogos por código en una sola consulta"""
+        if not pathologist_codes:
+            return []
+        cursor = self.collection.find({"pathologist_code": {"$in": list(pathologist_codes)}})
+        docs = await cursor.to_list(length=len(pathologist_codes))
+        return [self._convert_doc_to_response(doc) for doc in docs]
+
     async def get_by_email(self, email: str) -> Optional[dict]:
         """Obtener patólogo por email"""
         doc = await self.collection.find_one({"pathologist_email": email})
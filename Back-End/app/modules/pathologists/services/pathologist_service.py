@@ -6,6 +6,8 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.core.exceptions import NotFoundError, ConflictError, BadRequestError
 from app.modules.pathologists.schemas.pathologist import PathologistCreate, PathologistUpdate, PathologistResponse, PathologistSearch
 from app.modules.pathologists.repositories.pathologist_repository import PathologistRepository
+from app.modules.pathologists.services.signature_cache import invalidate_signature
+from app.modules.cases.repositories.statistics.name_filters import invalidate_name_lookup
 from app.shared.services.user_management import UserManagementService
 
 class PathologistService:
@@ -50,6 +52,7 @@ class PathologistService:
             await self.repo.delete_by_pathologist_code(payload.pathologist_code)
             raise ConflictError("Failed to create user account")
         
+        invalidate_name_lookup("pathologist")
         return self._to_response(doc)
     
     async def get_pathologist(self, pathologist_code: str) -> PathologistResponse:
@@ -59,6 +62,11 @@ class PathologistService:
             raise NotFoundError(f"Pathologist with code {pathologist_code} not found")
         return self._to_response(doc)
     
+    async def get_pathologists_by_codes(self, pathologist_codes: List[str]) -> Dict[str, PathologistResponse]:
+        """Obtener varios patólogos por código, indexados por código"""
+        docs = await self.repo.get_by_pathologist_codes(pathologist_codes)
+        return {doc["pathologist_code"]: self._to_response(doc) for doc in docs}
+
     async def list_pathologists(self, skip: int = 0, limit: int = 100) -> List[PathologistResponse]:
         """Listar patólogos activos"""
         pathologists = await self.repo.list_active(skip=skip, limit=limit)
@@ -93,6 +101,10 @@ class PathologistService:
         updated = await self.repo.update_by_pathologist_code(pathologist_code, update_data)
         if not updated:
             raise BadRequestError("Failed to update pathologist")
+        if "signature" in update_data:
+            invalidate_signature(pathologist_code)
+        if "pathologist_name" in update_data:
+            invalidate_name_lookup("pathologist")
         
         # Actualizar el usuario correspondiente en la colección users
         if payload.pathologist_name or payload.pathologist_email or payload.is_active is not None or payload.password:
@@ -117,6 +129,8 @@ class PathologistService:
             raise NotFoundError(f"Pathologist with code {pathologist_code} not found")
         
         ok = await self.repo.delete_by_pathologist_code(pathologist_code)
+        invalidate_signature(pathologist_code)
+        invalidate_name_lookup("pathologist")
         return {"deleted": ok, "pathologist_code": pathologist_code}
     
     async def update_signature(self, pathologist_code: str, signature_url: str) -> PathologistResponse:
@@ -130,6 +144,7 @@ class PathologistService:
         updated = await self.repo.update_signature_by_code(pathologist_code, signature_url)
         if not updated:
             raise BadRequestError("Failed to update signature")
+        invalidate_signature(pathologist_code)
         
         return self._to_response(updated)
 
@@ -184,6 +199,7 @@ class PathologistService:
         updated = await self.repo.update_signature_by_code(pathologist_code, signature_data)
         if not updated:
             raise BadRequestError("Failed to update signature in database")
+        invalidate_signature(pathologist_code)
 
         # Si había una firma previa guardada en disco, limpiarla
         if previous_signature and previous_signature.startswith("/uploads"):
@@ -204,6 +220,7 @@ class PathologistService:
         updated = await self.repo.update_signature_by_code(pathologist_code, "")
         if not updated:
             raise BadRequestError("Failed to clear signature")
+        invalidate_signature(pathologist_code)
 
         # Borra archivo físico solo si la firma anterior era una ruta
         if current_signature and current_signature.startswith("/uploads"):
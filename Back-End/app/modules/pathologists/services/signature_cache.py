@@ -0,0 +1,145 @@
+"""
+Caché de firmas de patólogos para los informes en PDF.
+
+Compartida por todo el proceso: guarda la firma ya lista para la plantilla (data
+URL o URL absoluta) por código de patólogo, con TTL, límite de entradas y de bytes
+(LRU). Las firmas ausentes se recuerdan con un TTL más corto para no consultar la
+BD en cada informe, pero sin fijarlas para siempre. `PathologistService` la invalida
+al cambiar o borrar una firma; en despliegues con varios procesos el TTL acota el
+tiempo que otro proceso puede servir una firma anterior.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import base64
+import logging
+import time
+
+from app.config.settings import settings
+from app.core.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Raíz del backend: las firmas antiguas se guardaban como /uploads/signatures/xxx
+BACKEND_ROOT = Path(__file__).parent.parent.parent.parent.parent
+
+MIME_MAP = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp'
+}
+
+
+def _read_legacy_file(file_path: Path) -> Optional[str]:
+    if not file_path.is_file():
+        return None
+    mime = MIME_MAP.get(file_path.suffix.lower(), 'image/png')
+    return f"data:{mime};base64,{base64.b64encode(file_path.read_bytes()).decode('utf-8')}"
+
+
+async def resolve_signature(signature_value: Optional[str]) -> Optional[str]:
+    """Convertir la firma registrada en BD a un valor utilizable por la plantilla."""
+    if not signature_value:
+        return None
+    # Data URL o URL absoluta: usar tal cual
+    if signature_value.startswith(("data:", "http")):
+        return signature_value
+    # Ruta relativa legacy: leer el archivo fuera del event loop y convertir a base64
+    rel_path = signature_value[1:] if signature_value.startswith('/') else signature_value
+    file_path = BACKEND_ROOT / rel_path
+    data_url = await asyncio.to_thread(_read_legacy_file, file_path)
+    if data_url is None:
+        logger.warning("Ruta de firma no encontrada en disco: %s", file_path)
+    return data_url
+
+
+class SignatureCache:
+    """LRU con TTL de firmas resueltas, indexada por código de patólogo."""
+
+    def __init__(self, ttl_seconds: float, negative_ttl_seconds: float, max_entries: int, max_bytes: int):
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max(0, max_bytes)
+        # código -> (expira_en, firma)
+        self._entries: OrderedDict[str, Tuple[float, Optional[str]]] = OrderedDict()
+        self._size = 0
+        self._flights = SingleFlight()
+        # Se incrementa con cada invalidación para descartar cargas iniciadas antes
+        self._generation: Dict[str, int] = {}
+
+    def lookup(self, code: str) -> Tuple[bool, Optional[str]]:
+        """Retorna (encontrada, firma). Una firma ausente cacheada es (True, None)."""
+        entry = self._entries.get(code)
+        if entry is None:
+            return False, None
+        if entry[0] <= time.monotonic():
+            self._drop(code)
+            return False, None
+        self._entries.move_to_end(code)
+        return True, entry[1]
+
+    def contains(self, code: str) -> bool:
+        return self.lookup(code)[0]
+
+    def set(self, code: str, signature: Optional[str]) -> None:
+        size = len(signature) if signature else 0
+        if self.max_bytes and size > self.max_bytes:
+            return
+        self._drop(code)
+        ttl = self.ttl_seconds if signature else self.negative_ttl_seconds
+        self._entries[code] = (time.monotonic() + ttl, signature)
+        self._size += size
+        while self._entries and (
+            len(self._entries) > self.max_entries or (self.max_bytes and self._size > self.max_bytes)
+        ):
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+
+    async def get_or_load(self, code: str, loader: Callable[[], Awaitable[Optional[str]]]) -> Optional[str]:
+        """Obtener la firma; si no está, cargarla una sola vez aunque haya peticiones concurrentes."""
+        found, signature = self.lookup(code)
+        if found:
+            return signature
+
+        generation = self._generation.get(code, 0)
+
+        async def load() -> Optional[str]:
+            signature = await loader()
+            if self._generation.get(code, 0) == generation:
+                self.set(code, signature)
+            return signature
+
+        return await self._flights.run(code, load)
+
+    def invalidate(self, code: str) -> None:
+        self._generation[code] = self._generation.get(code, 0) + 1
+        self._drop(code)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._size = 0
+
+    def _drop(self, code: str) -> None:
+        entry = self._entries.pop(code, None)
+        if entry is not None and entry[1]:
+            self._size -= len(entry[1])
+
+
+signature_cache = SignatureCache(
+    ttl_seconds=settings.SIGNATURE_CACHE_TTL_SECONDS,
+    negative_ttl_seconds=settings.SIGNATURE_CACHE_NEGATIVE_TTL_SECONDS,
+    max_entries=settings.SIGNATURE_CACHE_MAX_ENTRIES,
+    max_bytes=settings.SIGNATURE_CACHE_MAX_MB * 1024 * 1024,
+)
+
+
+def invalidate_signature(pathologist_code: Optional[str]) -> None:
+    """Hook para `PathologistService` al modificar o borrar una firma."""
+    if pathologist_code:
+        signature_cache.invalidate(pathologist_code)
@@ -0,0 +1,82 @@
+import asyncio
+import pytest
+
+from app.modules.pathologists.services import signature_cache as sig_mod
+from app.modules.pathologists.services.signature_cache import SignatureCache, resolve_signature
+
+
+def _cache(**kwargs):
+    defaults = dict(ttl_seconds=60, negative_ttl_seconds=60, max_entries=10, max_bytes=1024)
+    defaults.update(kwargs)
+    return SignatureCache(**defaults)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_loads_hit_loader_once():
+    cache = _cache()
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "data:image/png;base64,AAA"
+
+    results = await asyncio.gather(*[cache.get_or_load("P1", loader) for _ in range(5)])
+    assert results == ["data:image/png;base64,AAA"] * 5
+    assert calls == 1
+    assert await cache.get_or_load("P1", loader) == "data:image/png;base64,AAA"
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_missing_signature_expires_with_negative_ttl():
+    cache = _cache(negative_ttl_seconds=0)
+
+    async def loader():
+        return None
+
+    assert await cache.get_or_load("P1", loader) is None
+    # Con TTL negativo en 0 la ausencia no queda fijada
+    assert cache.contains("P1") is False
+
+
+def test_lru_respects_entry_and_byte_limits():
+    cache = _cache(max_entries=2, max_bytes=10)
+    cache.set("A", "12345")
+    cache.set("B", "12345")
+    cache.lookup("A")
+    cache.set("C", "1234")
+    assert cache.contains("A") and cache.contains("C")
+    assert not cache.contains("B")
+    cache.set("D", "x" * 11)
+    assert not cache.contains("D")
+
+
+@pytest.mark.asyncio
+async def test_invalidate_discards_load_in_progress():
+    cache = _cache()
+    release = asyncio.Event()
+
+    async def loader():
+        await release.wait()
+        return "data:old"
+
+    task = asyncio.create_task(cache.get_or_load("P1", loader))
+    await asyncio.sleep(0)
+    cache.invalidate("P1")
+    release.set()
+    assert await task == "data:old"
+    assert cache.contains("P1") is False
+
+
+@pytest.mark.asyncio
+async def test_resolve_legacy_file(tmp_path, monkeypatch):
+    (tmp_path / "uploads").mkdir()
+    (tmp_path / "uploads" / "firma.jpg").write_bytes(b"\xff\xd8")
+    monkeypatch.setattr(sig_mod, "BACKEND_ROOT", tmp_path)
+
+    assert await resolve_signature("/uploads/firma.jpg") == "data:image/jpeg;base64,/9g="
+    assert await resolve_signature("/uploads/otra.png") is None
+    assert await resolve_signature("https://cdn/firma.png") == "https://cdn/firma.png"
+    assert await resolve_signature("") is None
@@ -5,6 +5,9 @@ from pymongo.errors import DuplicateKeyError
 from pymongo import TEXT
 from ..schemas import PatientCreate, PatientUpdate, PatientSearch
 from app.core.exceptions import ConflictError, NotFoundError
+from app.core.pagination import apply_keyset, next_cursor
+from app.modules.cases.repositories.case_search_repository import retokenize_cases
+import asyncio
 import logging
 import re
 
@@ -55,7 +58,8 @@ class PatientRepository:
             await self.collection.create_index("gender")
             await self.collection.create_index("care_type")
             await self.collection.create_index("birth_date")
-            await self.collection.create_index("created_at")
+            # Orden de la búsqueda y paginación por cursor (created_at, _id)
+            await self.collection.create_index([("created_at", -1), ("_id", -1)])
             await self.collection.create_index("entity_info.name")
             await self.collection.create_index("location.municipality_code")
             
@@ -239,8 +243,14 @@ class PatientRepository:
         if cases_collection is not None:
             await cases_collection.update_many(
                 {"patient_info.patient_code": old_code},
-                {"$set": {"patient_info.patient_code": new_code}}
+                {"$set": {
+                    "patient_info.patient_code": new_code,
+                    "patient_info.identification_type": new_identification_type,
+                    "patient_info.identification_number": new_identification_number,
+                }}
             )
+            # Recalcular los tokens completos: los de la identificación anterior no deben quedar
+            await retokenize_cases(cases_collection, {"patient_info.patient_code": new_code})
 
         updated_patient = await self.collection.find_one({"patient_code": new_code})
         if not updated_patient:
@@ -388,31 +398,43 @@ class PatientRepository:
                         {"patient_code": {"$regex": escaped_term, "$options": "i"}}
                     ]
             
-        pipeline = [
-            {"$match": filter_dict},
-            {"$facet": {
-                "patients": [
-                    {"$sort": {"created_at": -1}},
-                    {"$skip": search_params.skip},
-                    {"$limit": search_params.limit}
-                ],
-                "total": [{"$count": "count"}]
-            }}
-        ]
-        
-        result = await self.collection.aggregate(pipeline).to_list(length=1)
-        if result:
-            patients = result[0]["patients"]
-            total = result[0]["total"][0]["count"] if result[0]["total"] else 0
+        if search_params.cursor:
+            # Página por cursor: rango sobre el índice (created_at, _id) y conteo aparte
+            query = apply_keyset(filter_dict, search_params.cursor, "created_at", -1)
+            patients, total = await asyncio.gather(
+                self.collection.find(query)
+                .sort([("created_at", -1), ("_id", -1)])
+                .limit(search_params.limit)
+                .to_list(length=search_params.limit),
+                self.collection.count_documents(filter_dict),
+            )
         else:
-            patients = []
-            total = 0
+            pipeline = [
+                {"$match": filter_dict},
+                {"$facet": {
+                    "patients": [
+                        {"$sort": {"created_at": -1, "_id": -1}},
+                        {"$skip": search_params.skip},
+                        {"$limit": search_params.limit}
+                    ],
+                    "total": [{"$count": "count"}]
+                }}
+            ]
+
+            result = await self.collection.aggregate(pipeline).to_list(length=1)
+            if result:
+                patients = result[0]["patients"]
+                total = result[0]["total"][0]["count"] if result[0]["total"] else 0
+            else:
+                patients = []
+                total = 0
             
         return {
             "patients": [self._convert_doc_to_response(p) for p in patients],
             "total": total,
             "skip": search_params.skip,
-            "limit": search_params.limit
+            "limit": search_params.limit,
+            "next_cursor": next_cursor(patients, search_params.limit, lambda p: (p.get("created_at"), p.get("_id")))
         }
 
     async def count_total(self) -> int:
@@ -46,6 +46,7 @@ async def search_patients(
     date_to: Optional[str] = Query(None, description="[Deprecated] Use created_at_to"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (next_cursor); reemplaza a skip"),
     service: PatientService = Depends(get_service)
 ):
     try:
@@ -70,7 +71,8 @@ async def search_patients(
             date_from=date_from,
             date_to=date_to,
             skip=skip,
-            limit=limit
+            limit=limit,
+            cursor=cursor
         )
         return await service.search_patients(search_params)
     except BadRequestError as e:
@@ -104,6 +106,7 @@ async def search_patients_advanced(
     date_to: Optional[str] = Query(None, description="[Deprecated] Use created_at_to"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (next_cursor); reemplaza a skip"),
     service: PatientService = Depends(get_service)
 ):
     """
@@ -132,7 +135,8 @@ async def search_patients_advanced(
             date_from=date_from,
             date_to=date_to,
             skip=skip,
-            limit=limit
+            limit=limit,
+            cursor=cursor
         )
         return await service.search_patients(search_params)
     except BadRequestError as e:
@@ -239,6 +239,8 @@ class PatientSearch(BaseModel):
     date_to: Optional[str] = Field(None, description="[Deprecated] Fecha hasta en formato YYYY-MM-DD. Use created_at_to en su lugar.")
     skip: int = Field(0, ge=0)
     limit: int = Field(100, ge=1, le=1000)
+    # Cursor de la página siguiente (next_cursor de la respuesta anterior); reemplaza a skip
+    cursor: Optional[str] = None
 
     @field_validator('search', 'identification_number', 'first_name', 'first_lastname', 'municipality_code', 'municipality_name', 'subregion', 'entity', mode='before')
     def empty_to_none(cls, v):
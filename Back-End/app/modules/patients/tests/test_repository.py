@@ -1,5 +1,5 @@
 import pytest
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock
 from app.modules.patients.repositories.patient_repository import PatientRepository
 
 
@@ -16,6 +16,18 @@ async def test_change_identification_updates_cases_patient_info(mock_db, sample_
 
     mock_db.patients.update_one = AsyncMock(return_value=None)
     mock_db.cases.update_many = AsyncMock(return_value=None)
+    mock_db.cases.bulk_write = AsyncMock(return_value=None)
+    # El caso ya con la identificación nueva, como lo devuelve Mongo tras update_many
+    case_doc = {
+        "_id": "c1",
+        "case_code": "2025-00001",
+        "patient_info": {"name": "Ana", "patient_code": "1-87654321", "identification_number": "87654321"},
+    }
+
+    async def _cases(*_args, **_kwargs):
+        yield case_doc
+
+    mock_db.cases.find = MagicMock(side_effect=_cases)
 
     updated = await repo.change_identification(
         old_code="1-12345678",
@@ -28,7 +40,15 @@ async def test_change_identification_updates_cases_patient_info(mock_db, sample_
     mock_db.cases.update_many.assert_awaited()
     args, kwargs = mock_db.cases.update_many.call_args
     assert args[0] == {"patient_info.patient_code": "1-12345678"}
-    assert args[1] == {"$set": {"patient_info.patient_code": "1-87654321"}}
+    assert args[1] == {"$set": {
+        "patient_info.patient_code": "1-87654321",
+        "patient_info.identification_type": 1,
+        "patient_info.identification_number": "87654321",
+    }}
+    # Los tokens se recalculan completos (sin los de la identificación anterior)
+    assert mock_db.cases.find.call_args.args[0] == {"patient_info.patient_code": "1-87654321"}
+    ops = mock_db.cases.bulk_write.call_args.args[0]
+    assert ops[0]._doc == {"$set": {"search_tokens": ["00001", "1", "2025", "87654321", "ana"]}}
 
     # Verifica el retorno del paciente con nuevo código
     assert updated["patient_code"] == "1-87654321"
\ No newline at end of file
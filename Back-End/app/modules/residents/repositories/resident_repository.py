@@ -49,6 +49,14 @@ class ResidentRepository:
         doc = await self.collection.find_one({"resident_code": resident_code})
         return self._convert_doc_to_response(doc) if doc else None
 
+    async def get_by_resident_codes(self, resident_codes: List[str]) -> List[dict]:
+        """Obtener varios residentes por código en una sola consulta"""
+        if not resident_codes:
+            return []
+        cursor = self.collection.find({"resident_code": {"$in": list(resident_codes)}})
+        docs = await cursor.to_list(length=len(resident_codes))
+        return [self._convert_doc_to_response(doc) for doc in docs]
+
     async def get_by_email(self, email: str) -> Optional[dict]:
         """Obtener residente por email"""
         doc = await self.collection.find_one({"resident_email": email})
@@ -59,6 +59,11 @@ class ResidentService:
             raise NotFoundError(f"Resident with code {resident_code} not found")
         return self._to_response(doc)
     
+    async def get_residents_by_codes(self, resident_codes: List[str]) -> Dict[str, ResidentResponse]:
+        """Obtener varios residentes por código, indexados por código"""
+        docs = await self.repo.get_by_resident_codes(resident_codes)
+        return {doc["resident_code"]: self._to_response(doc) for doc in docs}
+
     async def list_residents(self, skip: int = 0, limit: int = 100) -> List[ResidentResponse]:
         """Listar residentes activos"""
         residents = await self.repo.list_active(skip=skip, limit=limit)
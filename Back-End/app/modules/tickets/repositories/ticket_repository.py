@@ -5,10 +5,15 @@ from datetime import datetime, timezone
 from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
+from app.core.exceptions import BadRequestError
+from app.core.pagination import apply_keyset
 from app.shared.repositories.base import BaseRepository
 from app.modules.tickets.models.ticket import Ticket
 from app.modules.tickets.schemas.ticket import TicketCreate, TicketUpdate, TicketSearch
 
+# Sort fields that TicketListResponse exposes, so the next cursor can be built from a page
+CURSOR_SORT_FIELDS = ("ticket_date", "ticket_code", "title", "status", "category")
+
 
 class TicketRepository(BaseRepository[Ticket, TicketCreate, TicketUpdate]):
     """Repository for ticket CRUD operations."""
@@ -133,9 +138,13 @@ class TicketRepository(BaseRepository[Ticket, TicketCreate, TicketUpdate]):
         skip: int = 0,
         limit: int = 20,
         sort_by: str = "ticket_date",
-        sort_order: str = "desc"
+        sort_order: str = "desc",
+        cursor: Optional[str] = None
     ) -> List[Ticket]:
-        """Advanced ticket search with filters and pagination."""
+        """Advanced ticket search with filters and pagination (by skip or by keyset cursor)."""
+        if cursor and sort_by not in CURSOR_SORT_FIELDS:
+            raise BadRequestError(f"Cursor pagination is not supported when sorting by {sort_by}")
+        sort_direction = -1 if sort_order.lower() == "desc" else 1
         try:
             # Build filters
             query = {}
@@ -163,13 +172,15 @@ class TicketRepository(BaseRepository[Ticket, TicketCreate, TicketUpdate]):
                     date_filter["$lte"] = search_params.date_to
                 query["ticket_date"] = date_filter
             
-            # Configure sorting
-            sort_direction = -1 if sort_order.lower() == "desc" else 1
-            sort_criteria = [(sort_by, sort_direction)]
+            # Configure sorting (ticket_code breaks ties so cursor pages are stable)
+            sort_criteria = [(sort_by, sort_direction), ("ticket_code", sort_direction)]
             
             # Execute query
-            cursor = self.collection.find(query).sort(sort_criteria).skip(skip).limit(limit)
-            documents = await cursor.to_list(length=limit)
+            find_cursor = self.collection.find(apply_keyset(query, cursor, sort_by, sort_direction, "ticket_code"))
+            find_cursor = find_cursor.sort(sort_criteria)
+            if not cursor:
+                find_cursor = find_cursor.skip(skip)
+            documents = await find_cursor.limit(limit).to_list(length=limit)
             
             # Clean and convert to models
             tickets = []
@@ -180,6 +191,8 @@ class TicketRepository(BaseRepository[Ticket, TicketCreate, TicketUpdate]):
             
             return tickets
             
+        except BadRequestError:
+            raise
         except Exception as e:
             raise ValueError(f"Error in ticket search: {str(e)}")
 
@@ -284,4 +297,5 @@ class TicketRepository(BaseRepository[Ticket, TicketCreate, TicketUpdate]):
         await self.collection.create_index("ticket_code", unique=True)  # MAIN - unique
         await self.collection.create_index([("created_by", 1), ("ticket_date", -1)])
         await self.collection.create_index([("status", 1), ("category", 1)])
+        await self.collection.create_index([("ticket_date", -1), ("ticket_code", -1)])
         await self.collection.create_index([("title", "text"), ("description", "text")])
@@ -2,7 +2,7 @@
 
 from typing import List, Optional
 from functools import wraps
-from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status, UploadFile, File
 from motor.motor_asyncio import AsyncIOMotorDatabase
 import logging
 
@@ -18,6 +18,8 @@ from app.modules.tickets.schemas.ticket import (
 )
 from app.config.database import get_database
 from app.core.exceptions import ConflictError, NotFoundError, BadRequestError
+from app.core.pagination import NEXT_CURSOR_HEADER, next_cursor
+from app.modules.tickets.repositories.ticket_repository import CURSOR_SORT_FIELDS
 from app.modules.auth.routes.auth_routes import get_current_user_id
 
 # Configure logger
@@ -80,16 +82,23 @@ async def list_tickets(
 @router.post("/search", response_model=List[TicketListResponse])
 @handle_exceptions
 async def search_tickets(
+    response: Response,
     search_params: TicketSearch,
     skip: int = Query(0, ge=0, description="Number of tickets to skip"),
     limit: int = Query(20, ge=1, le=100, description="Maximum number of tickets to return"),
     sort_by: str = Query("ticket_date", description="Field to sort by"),
     sort_order: str = Query("desc", regex="^(asc|desc)$", description="Ascending or descending order"),
+    cursor: Optional[str] = Query(None, description="Cursor of the next page (X-Next-Cursor header); replaces skip"),
     ticket_service: TicketService = Depends(get_ticket_service),
     current_user_id: str = Depends(get_current_user_id)
 ):
     """Advanced ticket search with filters."""
-    return await ticket_service.search_tickets(search_params, skip, limit, sort_by, sort_order)
+    tickets = await ticket_service.search_tickets(search_params, skip, limit, sort_by, sort_order, cursor=cursor)
+    if sort_by in CURSOR_SORT_FIELDS:
+        token = next_cursor(tickets, limit, lambda t: (getattr(t, sort_by), t.ticket_code))
+        if token:
+            response.headers[NEXT_CURSOR_HEADER] = token
+    return tickets
 
 
 @router.get("/count", response_model=dict)
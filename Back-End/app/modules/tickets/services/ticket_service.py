@@ -85,11 +85,12 @@ class TicketService:
         skip: int = 0, 
         limit: int = 20,
         sort_by: str = "ticket_date",
-        sort_order: str = "desc"
+        sort_order: str = "desc",
+        cursor: Optional[str] = None
     ) -> List[TicketListResponse]:
-        """Search tickets with advanced filters."""
+        """Search tickets with advanced filters (skip or keyset cursor pagination)."""
         tickets = await self.repository.search_tickets(
-            search_params, skip, limit, sort_by, sort_order
+            search_params, skip, limit, sort_by, sort_order, cursor=cursor
         )
         return [self._to_list_response(ticket) for ticket in tickets]
     
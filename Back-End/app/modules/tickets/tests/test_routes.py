@@ -47,7 +47,7 @@ class FakeService(TicketService):
         items = list(self._store.values())
         return [TicketListResponse(**i.model_dump()) for i in items[skip: skip + limit]]
 
-    async def search_tickets(self, search_params, skip=0, limit=20, sort_by="ticket_date", sort_order="desc"):
+    async def search_tickets(self, search_params, skip=0, limit=20, sort_by="ticket_date", sort_order="desc", cursor=None):
         items = list(self._store.values())
         if search_params.search_text:
             txt = search_params.search_text.lower()
@@ -53,7 +53,7 @@ class FakeTicketRepo:
     async def list_all_tickets(self, skip=0, limit=20, sort_by="ticket_date", sort_order="desc"):
         return list(self._by_code.values())[skip: skip + limit]
 
-    async def search_tickets(self, search_params: TicketSearch, skip=0, limit=20, sort_by="ticket_date", sort_order="desc"):
+    async def search_tickets(self, search_params: TicketSearch, skip=0, limit=20, sort_by="ticket_date", sort_order="desc", cursor=None):
         items = list(self._by_code.values())
         if search_params.search_text:
             txt = search_params.search_text.lower()